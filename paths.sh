@@ -66,3 +66,34 @@ SWISSPROT_DIAMOND_DB="/home/soldat/documents/databases/swissprot_diamond/swisspr
 # PER-INSTALL absolute path — downloaded ON the cluster OUTSIDE the repo, never
 # committed. Placeholder to set per-install.
 AFDB_SWISSPROT_DB="/home/soldat/documents/databases/afdb_swissprot/afdb_swissprot"
+
+############################################################
+# Persistent caches                                        #
+############################################################
+# Content-addressed pairwise-alignment cache (one SQLite file) shared by
+# max_sequence_identity, local_sequence_search and sdr_divergence: re-scoring an
+# overlapping design batch against the same reference only aligns the new pairs.
+# PER-INSTALL path on shared storage OUTSIDE the repo (never committed). Leave empty
+# to disable; a wrapper's explicit --alignment_cache overrides it. Concurrent jobs
+# serialise on SQLite's file lock (rollback journal, no WAL); across nodes that needs
+# a filesystem honouring POSIX locks (NFSv4 / Lustre with flock) -- otherwise point
+# it at node-local storage.
+ALIGNMENT_CACHE=""
+# Content-addressed per-sequence result cache (one SQLite file) shared by the
+# per-sequence predictors (ESM pseudo-perplexity/embeddings, TmProt, CataPro,
+# SoluProt, EnzymeExplorer sequence-only): re-submitting an overlapping FASTA only
+# runs the models on sequences they have never scored. Size-bounded (LRU; budget
+# via `python -m tps_eval.data.result_cache <file> --max_gb N`). PER-INSTALL path
+# OUTSIDE the repo; leave empty to disable. Wrappers accept --no-cache to bypass it.
+# Same locking rules as ALIGNMENT_CACHE: rollback journal, writers wait for the
+# file lock; across nodes only on a filesystem honouring POSIX locks, otherwise
+# keep it on node-local storage.
+RESULT_CACHE=""
+# Prebuilt foldseek DBs (createdb + createindex) shared by structural_identity,
+# domain_structural_identity and foldseek_swissprot_search: the known-TPS reference
+# sets are converted once, and a design structs dir once for all three tools.
+# Versioned entries keyed by structure content + foldseek version (manifest.json in
+# each). PER-INSTALL dir OUTSIDE the repo; leave empty to build per run. Not
+# size-bounded on its own: prune it with
+# `python -m tps_eval.foldseek.databases "$FOLDSEEK_DB_CACHE" --max_gb N`.
+FOLDSEEK_DB_CACHE=""
@@ -0,0 +1,131 @@
+#!/bin/bash
+#SBATCH --time=04:00:00
+#SBATCH --ntasks=8
+#SBATCH --constraint=alphafold3
+#SBATCH --mem=100G
+#SBATCH --gres=gpu:1
+
+# One task of a PACKED AlphaFold3 array (src/tps_eval/alphafold/pack_jobs.py): folds every
+# member of bundle $SLURM_ARRAY_TASK_ID sequentially in ONE AF3 process (run_alphafold.py
+# --input_dir), so the container start, model load and per-bucket compilation are paid once
+# per bundle instead of once per sequence. Members that already have <ID>.pdb are skipped, so
+# a resubmitted task (pack_jobs resubmit) only refolds what is missing. The task exits
+# non-zero if any member ends without a structure. Time limit: pack_jobs submits the array
+# with --time = --job_minutes (default 4 h, as alphafold.sh) x the members of its largest
+# bundle; the 4 h above only applies to a one-member bundle submitted by hand.
+
+############################################################
+# Argument parsing                                         #
+############################################################
+USAGE="--working_directory <working_directory> --plan_dir <plan_dir>"
+
+Help()
+{
+    # Display Help
+    echo "Usage: sbatch --array=0-<N-1> alphafold_bundle.sh $USAGE"
+    echo
+    echo "Arguments:"
+    echo "  --working_directory         AF3 working directory (af_input/, af_output/)"
+    echo "  --plan_dir                  Bundle plan directory written by pack_jobs.py (plan.json + task_<i>.json)"
+    echo "  -h, --help                  Show this help message and exit"
+    echo
+}
+
+while [[ $# -gt 0 ]]; do
+    key="$1"
+    case $key in
+        --working_directory)
+            WRK_DIR="$2"
+            shift 2
+            ;;
+        --plan_dir)
+            PLAN_DIR="$2"
+            shift 2
+            ;;
+        -h|--help)
+            Help
+            exit 0
+            ;;
+        *)
+            echo "Unknown option: $1"
+            Help
+            exit 1
+            ;;
+    esac
+done
+
+if [[ -z "$WRK_DIR" || -z "$PLAN_DIR" || -z "$SLURM_ARRAY_TASK_ID" ]]; then
+    echo "Missing --working_directory/--plan_dir, or not running as an array task."
+    Help
+    exit 1
+fi
+
+
+
+############################################################
+# Main                                                     #
+############################################################
+echo "Running on $hostname" # Print the node
+
+SCRIPT_PATH=$(scontrol show job "$SLURM_JOB_ID" | awk -F= '/Command=/{print $2}')
+cd $(dirname "$SCRIPT_PATH")
+
+mkdir -p "${WRK_DIR}/af_input" "${WRK_DIR}/af_output"
+
+
+
+############################################################
+# Write the bundle's AF3 input JSONs                       #
+############################################################
+eval "$(conda shell.bash hook)"
+conda activate tps_eval
+
+# Prints the bundle's input dir name under af_input/ as its last line.
+BUNDLE_INPUT=$(python -m tps_eval.alphafold.pack_jobs prepare_task \
+    --plan_dir "$PLAN_DIR" --task_id "$SLURM_ARRAY_TASK_ID" | tail -n 1)
+if [[ -z "$BUNDLE_INPUT" ]]; then
+    echo "Could not prepare bundle task ${SLURM_ARRAY_TASK_ID} from ${PLAN_DIR}"
+    exit 1
+fi
+
+
+
+############################################################
+# Run AlphaFold3 on the whole bundle                       #
+############################################################
+# alphafold 3 installation folder. Only available in b032.
+AF3_DIR="/hpcg/local/soft/alphafold3/"
+AF3_SIF="alphafold3-20250108.sif"
+
+if [[ -n "$(ls -A "${WRK_DIR}/af_input/${BUNDLE_INPUT}")" ]]; then
+    echo "Running AlphaFold3 for bundle ${BUNDLE_INPUT}"
+    time apptainer exec \
+         --nv \
+         --bind ${WRK_DIR}/af_input:/root/af_input \
+         --bind ${WRK_DIR}/af_output:/root/af_output \
+         --bind ${AF3_DIR}/models:/root/models \
+         --bind ${AF3_DIR}/db:/root/public_databases \
+         --bind ${AF3_DIR}/db:/root/public_databases_fallback \
+         --bind ${AF3_DIR}/bin/run_alphafold.py:/usr/local/bin/run_alphafold.py \
+         ${AF3_DIR}/bin/${AF3_SIF} \
+         python /usr/local/bin/run_alphafold.py \
+         --input_dir=/root/af_input/${BUNDLE_INPUT} \
+         --model_dir=/root/models \
+         --db_dir=/root/public_databases \
+         --db_dir=/root/public_databases_fallback \
+         --output_dir=/root/af_output
+else
+    echo "Every member of bundle ${BUNDLE_INPUT} already has a structure"
+fi
+
+
+
+############################################################
+# Extract final pdb structures                             #
+############################################################
+eval "$(conda shell.bash hook)"
+conda activate tps_eval
+
+# Sanitizing CIF -> PDB per member (see alphafold.sh); exits 1 if any member has no model.
+python -m tps_eval.alphafold.pack_jobs finish_task \
+    --plan_dir "$PLAN_DIR" --task_id "$SLURM_ARRAY_TASK_ID"
@@ -0,0 +1,17 @@
+#!/bin/bash
+#SBATCH -J combined_structure_metrics
+#SBATCH --constraint=gen-a
+#SBATCH --time=0-01:00:00
+#SBATCH --nodes=1
+#SBATCH --ntasks=1
+#SBATCH --cpus-per-task=4
+#SBATCH --mem=16G
+
+# Usage: sbatch combined_structure_metrics.sh --structs_dir <structs_dir> [--metrics <m1,m2,...>] [--save_dir <save_dir>]
+# Aurum3's submit plugin auto-selects the partition from --constraint/--time/--mem.
+
+SCRIPT_PATH=$(scontrol show job "$SLURM_JOB_ID" | awk -F= '/Command=/{print $2}')
+
+cd $(dirname "$SCRIPT_PATH")/../..
+
+sh tool_wrappers/run_combined_structure_metrics.sh "$@"
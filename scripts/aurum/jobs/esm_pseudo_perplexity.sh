@@ -8,7 +8,7 @@
 #SBATCH --mem=24G
 #SBATCH --gres=gpu:geforce_rtx_3090:1
 
-# Usage: sbatch esm_pseudo_perplexity.sh --fasta_path <fasta_path> [--method swoop|masked]
+# Usage: sbatch esm_pseudo_perplexity.sh --fasta_path <fasta_path> [--method swoop|masked] [--with_embeddings]
 # Light naturalness metric (ESM-1b masked-LM). Use gen-b RTX 3090, matching the other
 # ESM/MPNN GPU jobs: gen-a + gpu:1 routes to the single-node a36_96_gpu partition
 # (node a233), which is frequently down and leaves the job PENDING (and blocks plots).
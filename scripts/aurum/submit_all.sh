@@ -13,7 +13,7 @@ Help()
     echo "Arguments:"
     echo "  --fasta_path                Path to the FASTA file (required)"
     echo "  --train_path                Path to the reference FASTA file (optional)"
-    echo "  --train_embeddings_path     Custom path to the reference embeddings file (optional), otherwise <train_path>_embedding_esm1b.csv will be used or the embeddings will be generated."
+    echo "  --train_embeddings_path     Custom path to the reference embeddings file (optional), otherwise <train_path>_embedding_esm1b.npy will be used or the embeddings will be generated."
     echo "  --structs_dir               Directory containing structures (optional)"
     echo "  --train_structs_dir         Directory containing train structures (optional)"
     echo "  -h, --help                  Show this help message and exit"
@@ -168,7 +168,7 @@ fi
 ############################################################
 # Min embedding distance to train data                     #
 ############################################################
-embeddings_path="$(dirname "$fasta_path")/$(basename "$fasta_path" .fasta)_embedding_esm1b.csv"
+embeddings_path="$(dirname "$fasta_path")/$(basename "$fasta_path" .fasta)_embedding_esm1b.npy"
 if [[ -f "$embeddings_path" ]]; then
     echo "Embeddings file already exists: $embeddings_path"
 else
@@ -181,7 +181,7 @@ fi
 if [[ -n "$train_path" ]] && [[ "$train_path" != "" ]]; then
     # If `train_embeddings_path` is not provided, check if the embeddings file exists in the same path as `train_path`.
     if [[ -z "$train_embeddings_path" ]] || [[ "$train_embeddings_path" == "" ]]; then
-        potential_train_embeddings_path="$(dirname "$train_path")/$(basename "$train_path" .fasta)_embedding_esm1b.csv"
+        potential_train_embeddings_path="$(dirname "$train_path")/$(basename "$train_path" .fasta)_embedding_esm1b.npy"
         if [[ -f "$potential_train_embeddings_path" ]]; then
             train_embeddings_path="$potential_train_embeddings_path"
             echo "Train embeddings file already exists: $train_embeddings_path"
@@ -194,7 +194,7 @@ if [[ -n "$train_path" ]] && [[ "$train_path" != "" ]]; then
         train_esm_embedding_sbatch_ret=$(sbatch "$OUTPUT_ARG" "$JOBS_DIR"/esm_embedding.sh --fasta_path "$train_path")
         echo "$train_esm_embedding_sbatch_ret"
         train_esm_embedding_job_id=${train_esm_embedding_sbatch_ret##* }
-        train_embeddings_path="$(dirname "$train_path")/$(basename "$train_path" .fasta)_embedding_esm1b.csv"
+        train_embeddings_path="$(dirname "$train_path")/$(basename "$train_path" .fasta)_embedding_esm1b.npy"
     fi
 
     # Prepare min_embedding_distance dependencies
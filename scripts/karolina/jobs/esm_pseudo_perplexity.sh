@@ -8,7 +8,7 @@
 #SBATCH --gres=gpu:1
 #SBATCH --partition=qgpu
 
-# Usage: sbatch esm_pseudo_perplexity.sh --fasta_path <fasta_path> [--method swoop|masked]
+# Usage: sbatch esm_pseudo_perplexity.sh --fasta_path <fasta_path> [--method swoop|masked] [--with_embeddings]
 
 SCRIPT_PATH=$(scontrol show job "$SLURM_JOB_ID" | awk -F= '/Command=/{print $2}')
 cd "$(dirname "$SCRIPT_PATH")/../.."
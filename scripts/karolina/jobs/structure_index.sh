@@ -0,0 +1,16 @@
+#!/bin/bash
+#SBATCH -J structure_index
+#SBATCH --time=0-01:00:00
+#SBATCH --nodes=1
+#SBATCH --ntasks=1
+#SBATCH --cpus-per-task=4
+#SBATCH --mem=16G
+#SBATCH --partition=qcpu
+
+# Usage: sbatch structure_index.sh --structs_dir <structs_dir> [--index_dir <index_dir>]
+
+SCRIPT_PATH=$(scontrol show job "$SLURM_JOB_ID" | awk -F= '/Command=/{print $2}')
+
+cd "$(dirname "$SCRIPT_PATH")/../.."
+
+sh tool_wrappers/run_structure_index.sh "$@"
@@ -3,21 +3,24 @@
 # Login-node FAN-OUT driver wrapper for the orchestrator's `--fold alphafold3`.
 # Builds the AlphaFold3 input CSV(s) (apo / Mg / Mg+PPi / Mg+substrate / per-design EE
 # substrate) via src/tps_eval/alphafold/build_cofold_input.py, then runs the existing
-# src/tps_eval/alphafold/run_alphafold_jobs.py for each input group, submitting ONE AF3 SLURM job
-# per sequence (skipping designs whose <ID>.pdb already exists). The orchestrator's Engine
-# runs THIS script directly (not via sbatch) and parses the SINGLE final line
+# src/tps_eval/alphafold/run_alphafold_jobs.py for each input group (skipping designs whose
+# <ID>.pdb already exists). By default every group is queued into ONE bundle plan
+# (src/tps_eval/alphafold/pack_jobs.py) and submitted as a SINGLE SLURM array job whose tasks
+# fold several sequences each; --no_pack restores one AF3 job per sequence. The
+# orchestrator's Engine runs THIS script directly (not via sbatch) and parses the SINGLE
+# final line
 #   AlphaFold job IDs: [123, 456]
 # for the afterok dependencies of the structure branch (it matches the FIRST such line, so
 # we suppress the per-group lines and print one combined line at the end).
 
-USAGE="--cluster <c> --fasta_path <fasta> --working_directory <dir> [--cofold MODE] [--enzymeexplorer_csv <csv>] [--model_seeds S1 S2 ...]"
+USAGE="--cluster <c> --fasta_path <fasta> --working_directory <dir> [--cofold MODE] [--enzymeexplorer_csv <csv>] [--no_pack] [--max_bundle_tokens N] [--model_seeds S1 S2 ...]"
 
 Help() {
     echo "Usage: $0 $USAGE"
     echo
     echo "Arguments:"
     echo "  --cluster            Cluster name passed through to submit_job.sh (e.g. aurum)"
-    echo "  --fasta_path         Generated sequences FASTA to fold (one AF3 job per record)"
+    echo "  --fasta_path         Generated sequences FASTA to fold"
     echo "  --working_directory  AF3 work dir; structures land in <dir>/structs, AF3 trees in <dir>/af_output"
     echo "  --cofold             Co-fold the class-I TPS active site (HOLO):"
     echo "                         none    (default) apo protein only"
@@ -26,6 +29,8 @@ Help() {
     echo "                         mg_gpp|mg_fpp|mg_ggpp|mg_gfpp  Mg + ONE forced prenyl-PP substrate (SMILES), all designs"
     echo "                         mg_ee   Mg + each design's EnzymeExplorer-predicted substrate (needs --enzymeexplorer_csv)"
     echo "  --enzymeexplorer_csv             EnzymeExplorer seq-only CSV (REQUIRED for --cofold mg_ee)"
+    echo "  --no_pack            Submit one AF3 job per sequence instead of one packed array job"
+    echo "  --max_bundle_tokens  Padded AF3 tokens per packed bundle (default: pack_jobs.py default)"
     echo "  --model_seeds        AF3 model seeds (all remaining tokens; default 42)"
     echo "  -h, --help           Show this help message and exit"
 }
@@ -35,6 +40,8 @@ if [[ $# -lt 1 ]]; then Help; exit 1; fi
 model_seeds=()
 cofold="none"
 ee_csv=""
+pack=1
+bundle_args=()
 while [[ $# -gt 0 ]]; do
     case "$1" in
         --cluster) cluster="$2"; shift 2 ;;
@@ -42,6 +49,8 @@ while [[ $# -gt 0 ]]; do
         --working_directory) working_directory="$2"; shift 2 ;;
         --cofold) cofold="$2"; shift 2 ;;
         --enzymeexplorer_csv) ee_csv="$2"; shift 2 ;;
+        --no_pack) pack=0; shift ;;
+        --max_bundle_tokens) bundle_args+=(--max_bundle_tokens "$2"); shift 2 ;;
         --model_seeds)
             shift
             while [[ $# -gt 0 && "$1" != --* ]]; do model_seeds+=("$1"); shift; done ;;
@@ -91,9 +100,16 @@ eval "$(echo "$build_out" | grep -E '^(ION_ID_COLS|ION_CCD_COLS|LIG_ID_COL|LIG_S
 
 manifest="$working_directory/af3_cofold_manifest.tsv"
 
-# Fan out: per input group, one AF3 job per sequence. --use_protein_id_as_filename ->
-# <ID>.pdb. We capture each group's stdout, strip its own "AlphaFold job IDs:" line (so the
-# orchestrator doesn't match a per-group line), and accumulate the ids.
+# Fan out: per input group, queue its jobs into the shared bundle plan (or, with --no_pack,
+# submit one AF3 job per sequence). --use_protein_id_as_filename -> <ID>.pdb. We capture each
+# group's stdout, strip its own "AlphaFold job IDs:" line (so the orchestrator doesn't match a
+# per-group line), and accumulate the ids.
+pack_args=()
+if [[ $pack -eq 1 ]]; then
+    # A fresh plan per run: a still-queued array of an earlier run keeps its own manifests.
+    plan_dir="$working_directory/af3_bundles/fanout_$(date +%Y%m%d_%H%M%S)"
+    pack_args+=(--pack --defer_submit --plan_dir "$plan_dir")
+fi
 all_ids=()
 while IFS=$'\t' read -r csv has_lig n_designs; do
     [[ "$csv" == "csv_path" ]] && continue
@@ -113,12 +129,25 @@ while IFS=$'\t' read -r csv has_lig n_designs; do
         --use_protein_id_as_filename \
         --cluster "$cluster" \
         --model_seeds "${model_seeds[@]}" \
-        "${ion_args[@]}" "${lig_args[@]}")
+        "${ion_args[@]}" "${lig_args[@]}" "${pack_args[@]}")
     echo "$out" | grep -v "AlphaFold job IDs:"
     for id in $(echo "$out" | grep "AlphaFold job IDs:" | grep -oE "[0-9]+"); do
         all_ids+=("$id")
     done
 done < "$manifest"
 
+# Packed: plan every queued job into token-budgeted bundles and submit ONE array job.
+if [[ $pack -eq 1 && -f "$plan_dir/jobs.json" ]]; then
+    out=$(python -m tps_eval.alphafold.pack_jobs submit \
+        --plan_dir "$plan_dir" --cluster "$cluster" "${bundle_args[@]}")
+    submit_rc=$?
+    echo "$out" | grep -v "AlphaFold job IDs:"
+    if [[ $submit_rc -ne 0 ]]; then echo "[fanout] array submission failed"; exit $submit_rc; fi
+    for id in $(echo "$out" | grep "AlphaFold job IDs:" | grep -oE "[0-9]+"); do
+        all_ids+=("$id")
+    done
+    echo "[fanout] failed bundle tasks can be resubmitted with: python -m tps_eval.alphafold.pack_jobs resubmit --plan_dir $plan_dir --cluster $cluster"
+fi
+
 # Single combined contract line for the orchestrator (the FIRST/only "AlphaFold job IDs:").
 echo "AlphaFold job IDs: [$(IFS=,; echo "${all_ids[*]}")]"
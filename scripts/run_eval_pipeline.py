@@ -16,10 +16,11 @@ soluprot, enzyme_explorer_sequence_only) AND the structure-level metrics that
 consume already-folded structures: pLDDT (folding confidence) and foldseek
 structural identity to the nearest known TPS (--structs_dir / --known_structs_dir).
 Structure PRODUCERS are wired via --fold: 'esmfold' (both clusters, one whole-FASTA
-job) and 'alphafold3' (Aurum-only, a per-sequence FAN-OUT — one AF3 job per design via
-a login-node driver that captures the N job ids, then a PAE-extraction step). Either
-folds the generated FASTA into a structs dir (+ PAE) the whole structure branch then
-consumes, so no pre-supplied --structs_dir is needed. What is NOT yet ported (v2):
+job) and 'alphafold3' (Aurum-only, a FAN-OUT via a login-node driver — by default the
+designs are packed into bundles submitted as ONE SLURM array job, one step downstream;
+--af3_no_pack submits one AF3 job per design and captures the N ids — then a
+PAE-extraction step). Either folds the generated FASTA into a structs dir (+ PAE) the
+whole structure branch then consumes, so no pre-supplied --structs_dir is needed. What is NOT yet ported (v2):
 EnzymeExplorer-with-structures (AF3 holo co-folding via --af3_cofold IS wired).
 
 Usage:
@@ -66,7 +67,7 @@ import subprocess
 import sys
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
 REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # scripts/.. == repo root
 TOOLS_CONFIG = os.path.join(REPO, "scripts", "pipeline_tools.json")
@@ -131,6 +132,14 @@ def _slurm_fanout_ids(driver_stdout: str) -> List[str]:
     return re.findall(r"\d+", m.group(1))
 
 
+def _fanout_arrays(driver_stdout: str) -> Dict[str, str]:
+    """Array job id -> bundle plan dir, for each ``AlphaFold array: <id> tasks=<n>
+    plan=<dir>`` line a packed fan-out printed (pack_jobs.plan_and_submit). Such an id
+    is ONE array job covering all its bundle tasks, so afterok on it waits for them all."""
+    return {m.group(1): m.group(2) for m in
+            re.finditer(r"AlphaFold array:\s*(\S+)\s+tasks=\d+\s+plan=(\S+)", driver_stdout)}
+
+
 def _pbs_dep(job_ids: List[str]) -> List[str]:
     # PBS Pro ANDs colon-separated job ids in a single -W depend=afterok:… argument.
     # The ids carry their full `<num>.pbs-m1.metacentrum.cz` form (qstat/qsub accept the
@@ -211,7 +220,7 @@ def _base(fasta: str) -> str:
 
 
 def out_motif(f): return _base(f) + "_motifs.csv"
-def out_esm(f): return _base(f) + "_embedding_esm1b.csv"
+def out_esm(f): return _base(f) + "_embedding_esm1b.npy"
 def out_mindist(f): return _base(f) + "_embedding_esm1b_min_embedding_distance.csv"
 def out_mindist_self(f): return _base(f) + "_embedding_esm1b_min_embedding_distance_self.csv"
 def out_maxid(f): return _base(f) + "_max_sequence_identity.csv"
@@ -245,6 +254,26 @@ def out_esm_ppl(f): return _base(f) + "_esm_pseudo_perplexity.csv"
 # Structure-branch outputs are keyed by the structures DIRECTORY, not the fasta:
 # the tools save "<structs_dir>_<tool>.csv" as a sibling of the directory.
 def out_plddt(d): return d.rstrip(os.sep) + "_plddt.csv"
+# The parsed-structure index is a directory (memory-mapped columns), not a CSV.
+def out_structure_index(d): return d.rstrip(os.sep) + "_structure_index"
+# Steps whose tools read structures via structure_index.load_structure.
+STRUCTURE_INDEX_READERS = {
+    "plddt_gen", "motif_struct_gen", "active_site_geom_gen", "aromatic_lining_gen",
+    "diphosphate_sensor_gen", "ion_site_check_gen", "substrate_positioning_gen",
+    "cyclization_geometry_gen", "radius_of_gyration_gen", "pocket_descriptors_gen",
+    "self_consistency_gen", "sdr_divergence_gen", "combined_structure_metrics_gen",
+}
+# Tool key -> combined_structure_metrics metric for the cheap geometry steps that one
+# combined job replaces (it writes the same per-tool CSVs).
+COMBINED_STRUCTURE_METRICS = {
+    "plddt": "plddt",
+    "motif_struct": "motif_structural_distance",
+    "active_site_geom": "active_site_geometry",
+    "aromatic_lining": "aromatic_lining",
+    "diphosphate_sensor": "diphosphate_sensor",
+    "ion_site": "ion_site_check",
+    "radius_of_gyration": "radius_of_gyration",
+}
 def out_structural_identity(d): return d.rstrip(os.sep) + "_structural_identity.csv"
 def out_structural_identity_topk(d): return d.rstrip(os.sep) + "_structural_identity_topk.csv"
 # Consumer (dependency-heavy) outputs keyed by the gen fasta / structs dir:
@@ -295,7 +324,9 @@ DEFAULT_TOOLS: Dict[str, dict] = {
     "maxid_gen_vs_train":   {"default": True,  "branch": "sequence",  "description": "Max sequence identity of each gen seq vs the train set."},
     "mindist_gen_vs_train": {"default": True,  "branch": "sequence",  "description": "Min ESM-embedding distance of gen vs train (needs esm)."},
     "esmfold":              {"default": False, "branch": "producer",  "description": "ESMFold structure PRODUCER (both clusters): folds the gen FASTA into a structs dir + PAE. Opt-in via --fold esmfold (auto-enabled then); not a default-on metric."},
-    "alphafold3":           {"default": False, "branch": "producer",  "description": "AlphaFold3 structure PRODUCER (Aurum-only): per-sequence fan-out (one AF3 job each) into <gen>_af3/structs + af_output, then a PAE-extraction step. Opt-in via --fold alphafold3 (auto-enabled then); not a default-on metric."},
+    "alphafold3":           {"default": False, "branch": "producer",  "description": "AlphaFold3 structure PRODUCER (Aurum-only): fan-out (one packed SLURM array job of sequence bundles; --af3_no_pack: one AF3 job per sequence) into <gen>_af3/structs + af_output, then a PAE-extraction step. Opt-in via --fold alphafold3 (auto-enabled then); not a default-on metric."},
+    "structure_index":      {"default": True,  "branch": "structure", "description": "Parse every structure once into the shared columnar structure index (<structs_dir>_structure_index) that the Biopython-based structure tools read instead of re-parsing; they fall back to parsing without it."},
+    "combined_structure_metrics": {"default": True, "branch": "structure", "description": "Run the enabled cheap geometry metrics (plddt, motif_struct, active_site_geom, aromatic_lining, diphosphate_sensor, ion_site, radius_of_gyration) as ONE job that loads each structure once and writes the same per-tool CSVs. Exclude to submit them as separate jobs."},
     "plddt":                {"default": True,  "branch": "structure", "description": "AlphaFold/ESMFold pLDDT folding confidence."},
     "motif_struct":         {"default": True,  "branch": "structure", "description": "Structural distance between the two metal-binding motifs."},
     "active_site_geom":     {"default": True,  "branch": "structure", "description": "Active-site carboxylate-cage geometry (apo-robust)."},
@@ -436,7 +467,8 @@ class Step:
     name: str
     job: str                       # job-script basename under scripts/<cluster>/jobs/
     args: List[str]
-    output: str                    # file OR dir whose existence means "already done"
+    output: Union[str, List[str]]  # file OR dir whose existence means "already done"
+                                   # (a list: done once ALL of them exist)
     tool: str = ""                 # tool KEY this step belongs to (config-driven on/off)
     deps: List[str] = field(default_factory=list)        # HARD deps: skip step if unmet
     soft_deps: List[str] = field(default_factory=list)   # wait-on-if-submitted; never gates
@@ -458,7 +490,9 @@ class Engine:
         self.job_ids: Dict[str, List[str]] = {}
         self.satisfied: set = set()         # steps whose output exists or were submitted
 
-    def _exists(self, path: str) -> bool:
+    def _exists(self, path: Union[str, List[str]]) -> bool:
+        if isinstance(path, list):
+            return all(self._exists(p) for p in path)
         if os.path.isdir(path):
             return any(os.scandir(path))    # dir outputs count only if non-empty
         return os.path.isfile(path)
@@ -473,7 +507,9 @@ class Engine:
                 print(f"[dep ] {s.name}: skipped (unsatisfied deps: {', '.join(missing)})")
                 continue
             if self._exists(s.output):
-                print(f"[skip] {s.name}: output exists ({os.path.relpath(s.output, REPO)})")
+                outputs = s.output if isinstance(s.output, list) else [s.output]
+                print(f"[skip] {s.name}: output exists "
+                      f"({', '.join(os.path.relpath(o, REPO) for o in outputs)})")
                 self.satisfied.add(s.name)
                 continue
 
@@ -496,8 +532,16 @@ class Engine:
                 if proc.returncode != 0:
                     raise SystemExit(f"[FAIL] {s.name}: fan-out driver failed\n{out}")
                 jids = self.cfg["fanout_ids"](out)
-                print(f"[fan ] {s.name}: submitted {len(jids)} fold job(s)"
-                      f"{' ' + ':'.join(jids) if jids else ' (none — all structures present)'}")
+                arrays = _fanout_arrays(out)
+                if jids and set(jids) <= set(arrays):
+                    # Packed fan-out: one array job per plan -> still ONE step downstream.
+                    for jid in jids:
+                        print(f"[arr ] {s.name}: array job {jid} (resubmit failed tasks: "
+                              f"python -m tps_eval.alphafold.pack_jobs resubmit "
+                              f"--plan_dir {arrays[jid]} --cluster {self.cluster})")
+                else:
+                    print(f"[fan ] {s.name}: submitted {len(jids)} fold job(s)"
+                          f"{' ' + ':'.join(jids) if jids else ' (none — all structures present)'}")
                 self.job_ids[s.name] = jids
                 self.satisfied.add(s.name)
                 continue
@@ -562,7 +606,7 @@ def build_steps(args, enabled: set) -> List[Step]:
     # Fold producer: when --fold is given without a pre-supplied --structs_dir, the
     # producer makes the structures (+ PAE) the structure branch then consumes.
     #   esmfold     -> one whole-FASTA job; dirs mirror run_esmfold.sh's defaults.
-    #   alphafold3  -> a per-sequence FAN-OUT (one AF3 job each, Aurum-only) under a
+    #   alphafold3  -> a FAN-OUT (one packed array job, Aurum-only) under a
     #                  <gen>_af3/ work dir (structs/ + af_output/), then an extract_pae step.
     fold_mode = getattr(args, "fold", None)
     do_fold = bool(fold_mode) and not args.structs_dir
@@ -625,10 +669,18 @@ def build_steps(args, enabled: set) -> List[Step]:
                           out_motif(fa), tool="motif"))
         steps.append(Step(f"motif_pair_{tag}", "motif_pair_distance.sh",
                           ["--fasta_path", fa], out_motif_pair(fa), tool="motif_pair"))
-        steps.append(Step(f"esm_{tag}", "esm_embedding.sh", ["--fasta_path", fa],
-                          out_esm(fa), tool="esm"))
-        steps.append(Step(f"esm_ppl_{tag}", "esm_pseudo_perplexity.sh",
-                          ["--fasta_path", fa], out_esm_ppl(fa), tool="esm_ppl"))
+        # esm + esm_ppl both pending -> ONE fused job (one ESM-1b load, one forward
+        # per batch) that writes the embedding store AND the pseudo-perplexity CSV.
+        # It keeps the esm_<tag> name, so the mindist steps' deps are unchanged.
+        if ({"esm", "esm_ppl"} <= enabled
+                and not os.path.exists(out_esm(fa)) and not os.path.exists(out_esm_ppl(fa))):
+            steps.append(Step(f"esm_{tag}", "esm_pseudo_perplexity.sh",
+                              ["--fasta_path", fa, "--with_embeddings"], out_esm(fa), tool="esm"))
+        else:
+            steps.append(Step(f"esm_{tag}", "esm_embedding.sh", ["--fasta_path", fa],
+                              out_esm(fa), tool="esm"))
+            steps.append(Step(f"esm_ppl_{tag}", "esm_pseudo_perplexity.sh",
+                              ["--fasta_path", fa], out_esm_ppl(fa), tool="esm_ppl"))
         steps.append(Step(f"maxid_self_{tag}", "max_sequence_identity.sh",
                           ["--fasta_path", fa] + (["--train"] if is_train else []),
                           out_maxid_self(fa), tool="maxid_self"))
@@ -700,9 +752,10 @@ def build_steps(args, enabled: set) -> List[Step]:
             fold_producer = pae_producer = "esmfold_gen"
         elif do_fold and fold_mode == "alphafold3":
             # AF3 FAN-OUT producer (Aurum-only). A login-node driver runs the existing
-            # run_alphafold_jobs.py (one AF3 job per sequence -> structs/ + af_output/) and
-            # prints the N job ids; the Engine captures them so the structure branch waits
-            # on all N. A sentinel output (never created) -> the driver always runs and
+            # run_alphafold_jobs.py (-> structs/ + af_output/): packed by default into ONE
+            # SLURM array job of sequence bundles (one id, so the structure branch waits on
+            # one step), or with --af3_no_pack one AF3 job per sequence (N ids, all waited
+            # on). A sentinel output (never created) -> the driver always runs and
             # run_alphafold_jobs' own --skip_existing handles per-design idempotency.
             fanout_cmd = ["bash", os.path.join(REPO, "scripts", "run_alphafold_fanout.sh"),
                           "--cluster", args.cluster, "--fasta_path", gen,
@@ -712,6 +765,10 @@ def build_steps(args, enabled: set) -> List[Step]:
                 # Per-design EE substrate: the login-node driver needs the EE CSV up front
                 # (it cannot afterok-wait on the in-pipeline ee_seq SLURM job).
                 fanout_cmd += ["--enzymeexplorer_csv", args.enzymeexplorer_csv]
+            if args.af3_no_pack:
+                fanout_cmd += ["--no_pack"]
+            elif args.af3_max_bundle_tokens:
+                fanout_cmd += ["--max_bundle_tokens", str(args.af3_max_bundle_tokens)]
             fanout_cmd += ["--model_seeds"] + [str(s) for s in args.af3_model_seeds]
             steps.append(Step("af3_fold_gen", "", fanout_cmd,
                               os.path.join(af3_work, ".__never__"),
@@ -724,6 +781,10 @@ def build_steps(args, enabled: set) -> List[Step]:
                                   pae_dir, tool="alphafold3", deps=["af3_fold_gen"],
                                   requires_cap="alphafold"))
                 pae_producer = "af3_pae_gen"
+        # Parse every structure ONCE into the shared index the parsing tools below read
+        # (soft deps wired after the block: without the index they parse themselves).
+        steps.append(Step("structure_index_gen", "structure_index.sh", ["--structs_dir", structs],
+                          out_structure_index(structs), tool="structure_index"))
         steps.append(Step("plddt_gen", "plddt.sh", ["--structs_dir", structs],
                           out_plddt(structs), tool="plddt"))
         steps.append(Step("motif_struct_gen", "motif_structural_distance.sh",
@@ -823,6 +884,20 @@ def build_steps(args, enabled: set) -> List[Step]:
             print("[note] --structs_dir without --pae_dir: skipping global_confidence + "
                   "interdomain_pae (need <ID>_pae.npz from a PAE-saving fold).")
 
+        # One combined job in place of the cheap geometry steps (>= 2 of them enabled): it
+        # loads each structure once and writes the same per-tool CSVs, so nothing
+        # downstream changes. Done before the --fold fixup so it gets the producer dep.
+        if "combined_structure_metrics" in enabled:
+            fused = [s for s in steps[struct_block_start:]
+                     if s.tool in COMBINED_STRUCTURE_METRICS and s.tool in enabled]
+            if len(fused) > 1:
+                metrics = ",".join(COMBINED_STRUCTURE_METRICS[s.tool] for s in fused)
+                combined = Step("combined_structure_metrics_gen", "combined_structure_metrics.sh",
+                                ["--structs_dir", structs, "--metrics", metrics],
+                                [s.output for s in fused], tool="combined_structure_metrics")
+                at = steps.index(fused[0])
+                steps = steps[:at] + [combined] + [s for s in steps[at:] if s not in fused]
+
         # With --fold the structures are produced in-pipeline, so every structure step in
         # this block must wait on the producer (the producer steps themselves excepted).
         # PAE-consumers wait on the PAE producer specifically (for AF3 that's the separate
@@ -840,6 +915,12 @@ def build_steps(args, enabled: set) -> List[Step]:
                 if dep and dep not in s.deps:
                     s.deps = [dep] + list(s.deps)
 
+        # Tools that read structures through structure_index.load_structure wait on the
+        # index build when it was submitted (soft: never gates, they can parse alone).
+        for s in steps[struct_block_start:]:
+            if s.name in STRUCTURE_INDEX_READERS:
+                s.soft_deps = list(s.soft_deps) + ["structure_index_gen"]
+
     # --- Dependency-heavy consumers: k-NN label transfer + SDR divergence --------- #
     # Both read the three feeders' *_topk.csv. They are gated on the feeders actually
     # existing (train -> sequence/embedding feeders; structs+known_structs -> structural
@@ -910,7 +991,8 @@ def build_steps(args, enabled: set) -> List[Step]:
                 sdr_deps.append("local_search_gen_vs_train")
             sdr_args += ["--save_path", out_sdr_divergence(structs)]
             steps.append(Step("sdr_divergence_gen", "sdr_divergence.sh", sdr_args,
-                              out_sdr_divergence(structs), tool="sdr_divergence", deps=sdr_deps))
+                              out_sdr_divergence(structs), tool="sdr_divergence", deps=sdr_deps,
+                              soft_deps=["structure_index_gen"]))
 
     # Substrate-class combiner: same three feeders as k-NN (run with the SUBSTRATE label
     # file + calibration), cross-checked against pocket_descriptors volume + the EE
@@ -1047,12 +1129,19 @@ def main() -> None:
                    help="Fold the generated sequences FIRST, then run the structure branch "
                         "on the produced structures (no need to pre-supply --structs_dir). "
                         "'esmfold' runs ESMFold (both clusters) into <gen>_esmfold_structs/ "
-                        "+ a sibling _pae/. 'alphafold3' FANS OUT one AF3 job per sequence "
-                        "(Aurum-only) into <gen>_af3/structs/ + af_output/, then extracts PAE "
+                        "+ a sibling _pae/. 'alphafold3' FANS OUT the sequences as one packed "
+                        "AF3 array job (Aurum-only; --af3_no_pack: one job per sequence) into <gen>_af3/structs/ + af_output/, then extracts PAE "
                         "-> <gen>_af3/pae/. Both also enable global_confidence + "
                         "interdomain_pae. Ignored if --structs_dir is given.")
     p.add_argument("--af3_model_seeds", type=int, nargs="+", default=[42],
                    help="With --fold alphafold3: AF3 model seeds per sequence (default 42).")
+    p.add_argument("--af3_no_pack", action="store_true",
+                   help="With --fold alphafold3: submit one AF3 job per sequence instead of "
+                        "packing the sequences into token-budgeted bundles submitted as ONE "
+                        "SLURM array job (the default; see src/tps_eval/alphafold/pack_jobs.py).")
+    p.add_argument("--af3_max_bundle_tokens", type=int, default=None,
+                   help="With --fold alphafold3 (packed): padded AF3 tokens per bundle "
+                        "(default: pack_jobs.py's DEFAULT_MAX_BUNDLE_TOKENS).")
     p.add_argument("--af3_cofold", default="none",
                    choices=["none", "mg", "mg_ppi", "mg_gpp", "mg_fpp", "mg_ggpp", "mg_gfpp", "mg_ee"],
                    help="With --fold alphafold3: co-fold the class-I TPS active site for a "
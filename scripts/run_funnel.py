@@ -130,7 +130,10 @@ def run_selection(tier: dict, fasta: str, cfg: dict, args) -> str:
         if os.path.isfile(prev_csv):
             entries = [prev_csv] + entries
     out_prefix = os.path.join(args.workdir, tier["name"])
-    cmd = ["bash", RUN_SELECTION, "select", "--entries", *entries,
+    # The tier's metric store: re-selecting (--select-only, a changed spec) re-reads
+    # only the CSVs that changed since the last selection.
+    store = os.path.join(args.workdir, f"{tier['name']}_metrics")
+    cmd = ["bash", RUN_SELECTION, "select", "--entries", *entries, "--store", store,
            "--spec", spec, "--output_prefix", out_prefix, "--fasta", fasta,
            "--title", f"{cfg.get('name', 'funnel')} / {tier['name']}"]
     print(f"[funnel] select: {' '.join(cmd)}")
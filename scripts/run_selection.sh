@@ -7,6 +7,8 @@
 #   scripts/run_selection.sh merge  --entries <csv|dir|glob> [...] --output merged.csv
 #   scripts/run_selection.sh select --merged merged.csv --spec spec.json \
 #                                   --output_prefix phaseN [--fasta seed.fasta]
+#   scripts/run_selection.sh select --entries <csv|dir|glob> [...] --store metrics_dir \
+#                                   --spec spec.json --output_prefix phaseN
 
 USAGE="<merge|select> [op args...]"
 
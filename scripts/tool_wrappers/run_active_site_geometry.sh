@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--templates <ID,ID,...>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--templates <ID,ID,...>] [--workers <n>]"
 
 Help()
 {
@@ -11,6 +11,7 @@ Help()
     echo "  --save_path     Output CSV path (optional; default <structs_dir>_active_site_geometry.csv)"
     echo "  --templates     Comma-separated reference IDs in structs_dir for the catalytic-"
     echo "                  constellation template (optional; e.g. 1ps1,5eat)"
+    echo "  --workers       Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help      Show this help message and exit"
     echo
 }
@@ -31,6 +32,10 @@ while [[ $# -gt 0 ]]; do
             templates="$2"
             shift 2
             ;;
+        --workers)
+            workers="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -84,5 +89,8 @@ fi
 if [[ -n "$templates" ]]; then
     args+=(--templates "$templates")
 fi
+if [[ -n "$workers" ]]; then
+    args+=(--workers "$workers")
+fi
 
 python -m tps_eval.structure_metrics.run_active_site_geometry "${args[@]}"
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--save_residue_scores] [--residue_scores_dir <dir>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--save_residue_scores] [--residue_scores_dir <dir>] [--workers <n>]"
 
 Help()
 {
@@ -11,6 +11,7 @@ Help()
     echo "  --save_path             Output CSV path (optional; default <structs_dir>_aggregation.csv)"
     echo "  --save_residue_scores   Also dump per-residue A3D scores to a side dir (optional; off by default)"
     echo "  --residue_scores_dir    Directory for per-residue scores (optional; default <structs_dir>_aggregation_residue_scores)"
+    echo "  --workers               Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help              Show this help message and exit"
     echo
 }
@@ -36,6 +37,10 @@ while [[ $# -gt 0 ]]; do
             residue_scores_dir="$2"
             shift 2
             ;;
+        --workers)
+            workers="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -92,5 +97,8 @@ fi
 if [[ -n "$residue_scores_dir" ]]; then
     args+=(--residue_scores_dir "$residue_scores_dir")
 fi
+if [[ -n "$workers" ]]; then
+    args+=(--workers "$workers")
+fi
 
 python -m tps_eval.structure_metrics.run_aggregation "${args[@]}"
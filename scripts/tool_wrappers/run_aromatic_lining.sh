@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--cutoff <A>] [--cation_pi_min <A>] [--cation_pi_max <A>] [--face_angle_deg <deg>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--cutoff <A>] [--cation_pi_min <A>] [--cation_pi_max <A>] [--face_angle_deg <deg>] [--workers <n>]"
 
 Help()
 {
@@ -13,6 +13,7 @@ Help()
     echo "  --cation_pi_min   Min ring-centroid->locus distance for inward hit (optional; default 3.5)"
     echo "  --cation_pi_max   Max ring-centroid->locus distance for inward hit (optional; default 6.0)"
     echo "  --face_angle_deg  Max ring-normal vs locus angle for face-on hit (optional; default 45)"
+    echo "  --workers         Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help        Show this help message and exit"
     echo
 }
@@ -45,6 +46,10 @@ while [[ $# -gt 0 ]]; do
             face_angle_deg="$2"
             shift 2
             ;;
+        --workers)
+            workers="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -107,5 +112,8 @@ fi
 if [[ -n "$face_angle_deg" ]]; then
     args+=(--face_angle_deg "$face_angle_deg")
 fi
+if [[ -n "$workers" ]]; then
+    args+=(--workers "$workers")
+fi
 
 python -m tps_eval.structure_metrics.run_aromatic_lining "${args[@]}"
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--fasta_path <fasta_path> [--target_substrate <CODE>] [--smiles <SMILES>] [--device cuda|cpu] [--model_dpath <dir>] [--batch_size <n>] [--out_suffix <s>] [--save_path <path>]"
+USAGE="--fasta_path <fasta_path> [--target_substrate <CODE>] [--smiles <SMILES>] [--device cuda|cpu] [--model_dpath <dir>] [--batch_size <n>] [--out_suffix <s>] [--save_path <path>] [--result_cache <sqlite>] [--no-cache]"
 
 Help()
 {
@@ -15,6 +15,8 @@ Help()
     echo "  --batch_size        CataPro batch size (default 64)"
     echo "  --out_suffix        Output suffix -> <fasta>_<suffix>.csv (default catapro)"
     echo "  --save_path         Output CSV path (optional)"
+    echo "  --result_cache      Persistent result-cache file (default \$RESULT_CACHE from paths.sh)"
+    echo "  --no-cache          Predict every sequence, ignoring the result cache"
     echo "  -h, --help          Show this help message and exit"
     echo
 }
@@ -30,6 +32,8 @@ while [[ $# -gt 0 ]]; do
         --batch_size)        batch_size="$2"; shift 2 ;;
         --out_suffix)        out_suffix="$2"; shift 2 ;;
         --save_path)         save_path="$2"; shift 2 ;;
+        --result_cache)      result_cache="$2"; shift 2 ;;
+        --no-cache|--no_cache) no_cache=1; shift ;;
         -h|--help)           Help; exit 0 ;;
         *)                   echo "Unknown option: $1"; Help; exit 1 ;;
     esac
@@ -48,6 +52,9 @@ fi
 if [[ -n "$save_path" && "$save_path" != /* ]]; then
     save_path="$(cd "$(dirname "$save_path")" && pwd)/$(basename "$save_path")"
 fi
+if [[ -n "$result_cache" && "$result_cache" != /* ]]; then
+    result_cache="$(pwd)/$result_cache"
+fi
 
 ############################################################
 # Main                                                     #
@@ -58,7 +65,7 @@ cd "$SCRIPT_DIR/../.."
 # `pip install -e .` -- put the in-repo package on PYTHONPATH so `import tps_eval`
 # works in ALL of them (absolute, so it survives later `cd`s and child processes).
 export PYTHONPATH="$(pwd)/src${PYTHONPATH:+:$PYTHONPATH}"
-. ./paths.sh # Load CATAPRO_ENV
+. ./paths.sh # Load CATAPRO_ENV, RESULT_CACHE
 
 eval "$(conda shell.bash hook)"
 conda activate "$CATAPRO_ENV"
@@ -77,5 +84,7 @@ if [[ -n "$model_dpath" ]]; then args+=(--model_dpath "$model_dpath"); fi
 if [[ -n "$batch_size" ]]; then args+=(--batch_size "$batch_size"); fi
 if [[ -n "$out_suffix" ]]; then args+=(--out_suffix "$out_suffix"); fi
 if [[ -n "$save_path" ]]; then args+=(--save_path "$save_path"); fi
+result_cache="${result_cache:-$RESULT_CACHE}"
+if [[ -z "$no_cache" && -n "$result_cache" ]]; then args+=(--result_cache "$result_cache"); fi
 
 python -m tps_eval.sequence_metrics.run_catapro "${args[@]}"
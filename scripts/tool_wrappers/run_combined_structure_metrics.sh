@@ -0,0 +1,97 @@
+#!/bin/bash
+
+USAGE="--structs_dir <structs_dir> [--metrics <m1,m2,...>] [--save_dir <save_dir>] [--workers <n>]"
+
+Help()
+{
+    echo "Usage: $0 $USAGE"
+    echo
+    echo "Arguments:"
+    echo "  --structs_dir   Directory of structures (.pdb/.cif); file stem = ID (required)"
+    echo "  --metrics       Comma-separated metrics (optional; default all: plddt,radius_of_gyration,"
+    echo "                  motif_structural_distance,active_site_geometry,aromatic_lining,"
+    echo "                  diphosphate_sensor,ion_site_check)"
+    echo "  --save_dir      Output directory (optional; default: next to structs_dir, as <structs_dir>_<metric>.csv)"
+    echo "  --workers       Worker processes (optional; default all CPUs allocated to the job)"
+    echo "  -h, --help      Show this help message and exit"
+    echo
+}
+
+# Parse long options manually
+while [[ $# -gt 0 ]]; do
+    key="$1"
+    case $key in
+        --structs_dir)
+            structs_dir="$2"
+            shift 2
+            ;;
+        --metrics)
+            metrics="$2"
+            shift 2
+            ;;
+        --save_dir)
+            save_dir="$2"
+            shift 2
+            ;;
+        --workers)
+            workers="$2"
+            shift 2
+            ;;
+        -h|--help)
+            Help
+            exit 0
+            ;;
+        *)
+            echo "Unknown option: $1"
+            Help
+            exit 1
+            ;;
+    esac
+done
+
+if [ -z "$structs_dir" ]; then
+    echo "Usage: $0 $USAGE"
+    exit 1
+fi
+
+# Convert structs_dir to absolute path if relative
+if [[ "$structs_dir" != /* ]]; then
+    structs_dir="$(cd "$structs_dir" && pwd)"
+fi
+# Convert save_dir to absolute path if relative
+if [[ -n "$save_dir" && "$save_dir" != /* ]]; then
+    save_dir="$(cd "$save_dir" && pwd)"
+fi
+
+############################################################
+# Main                                                     #
+############################################################
+SCRIPT_DIR=$(dirname "$BASH_SOURCE")
+cd "$SCRIPT_DIR/../.."
+# Every tool activates its own conda env, but only the main tps_eval env gets
+# `pip install -e .` -- put the in-repo package on PYTHONPATH so `import tps_eval`
+# works in ALL of them (absolute, so it survives later `cd`s and child processes).
+export PYTHONPATH="$(pwd)/src${PYTHONPATH:+:$PYTHONPATH}"
+. ./paths.sh # Load TPS_EVAL_ENV
+
+eval "$(conda shell.bash hook)"
+conda activate "$TPS_EVAL_ENV"
+# Fix for Karolina compute nodes whose /lib64/libstdc++.so.6 lacks GLIBCXX_3.4.29
+# (required by the env's pandas/numpy C extensions). Prepend the env's own libstdc++.
+export LD_LIBRARY_PATH="$CONDA_PREFIX/lib:${LD_LIBRARY_PATH:-}"
+echo "Active conda environment: $(conda info --json | python -c "import sys, json; print(json.load(sys.stdin)['active_prefix_name'])")"
+echo "Using python: $(which python)"
+
+
+args=("$structs_dir")
+if [[ -n "$metrics" ]]; then
+    args+=(--metrics "$metrics")
+fi
+if [[ -n "$save_dir" ]]; then
+    args+=(--save_dir "$save_dir")
+fi
+if [[ -n "$workers" ]]; then
+    args+=(--workers "$workers")
+fi
+
+python -m tps_eval.structure_metrics.run_combined_structure_metrics "${args[@]}"
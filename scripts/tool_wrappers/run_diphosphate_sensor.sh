@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--cutoff <A>] [--ry_dist <A>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--cutoff <A>] [--ry_dist <A>] [--workers <n>]"
 
 Help()
 {
@@ -11,6 +11,7 @@ Help()
     echo "  --save_path     Output CSV path (optional; default <structs_dir>_diphosphate_sensor.csv)"
     echo "  --cutoff        Distance (A) from the metal point for basic-residue terminal N (optional; default 12)"
     echo "  --ry_dist       Distance (A) for the spatial RY-pair criterion (optional; default 6)"
+    echo "  --workers       Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help      Show this help message and exit"
     echo
 }
@@ -35,6 +36,10 @@ while [[ $# -gt 0 ]]; do
             ry_dist="$2"
             shift 2
             ;;
+        --workers)
+            workers="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -91,5 +96,8 @@ fi
 if [[ -n "$ry_dist" ]]; then
     args+=(--ry_dist "$ry_dist")
 fi
+if [[ -n "$workers" ]]; then
+    args+=(--workers "$workers")
+fi
 
 python -m tps_eval.structure_metrics.run_diphosphate_sensor "${args[@]}"
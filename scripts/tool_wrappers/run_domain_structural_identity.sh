@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--known_domain_structures_root <dir>] [--save_path <csv>] [--n_jobs <n>] [--n_iters <n>] [--keep_detected_domains <dir>] [--self_mode]"
+USAGE="--structs_dir <structs_dir> [--known_domain_structures_root <dir>] [--save_path <csv>] [--n_jobs <n>] [--n_iters <n>] [--keep_detected_domains <dir>] [--self_mode] [--db_cache <dir>]"
 
 Help()
 {
@@ -14,6 +14,7 @@ Help()
     echo "  --n_jobs                        Parallel jobs for detection (optional; default 10)"
     echo "  --n_iters                       EnzymeExplorer detection iterations (optional; default 3)"
     echo "  --keep_detected_domains         If given, keep the per-design detected domain .pdb files here (optional)"
+    echo "  --db_cache                      Prebuilt foldseek DB cache dir (optional; default \$FOLDSEEK_DB_CACHE from paths.sh)"
     echo "  --self_mode                     Searching a domain set against itself: drop hits to a reference domain"
     echo "                                  from the query's own source structure (leave-one-out band; optional)"
     echo "  -h, --help                      Show this help message and exit"
@@ -30,6 +31,7 @@ while [[ $# -gt 0 ]]; do
         --n_iters) n_iters="$2"; shift 2 ;;
         --keep_detected_domains) keep_detected_domains="$2"; shift 2 ;;
         --self_mode) self_mode=1; shift ;;
+        --db_cache) db_cache="$2"; shift 2 ;;
         -h|--help) Help; exit 0 ;;
         *) echo "Unknown option: $1"; Help; exit 1 ;;
     esac
@@ -91,5 +93,7 @@ args=("$structs_dir" "$known_domain_structures_root")
 [[ -n "$n_iters" ]] && args+=(--n_iters "$n_iters")
 [[ -n "$keep_detected_domains" ]] && args+=(--keep_detected_domains "$keep_detected_domains")
 [[ -n "$self_mode" ]] && args+=(--self_mode)
+db_cache="${db_cache:-$FOLDSEEK_DB_CACHE}"
+[[ -n "$db_cache" ]] && args+=(--db_cache "$db_cache")
 
 python -m tps_eval.structure_metrics.run_domain_structural_identity "${args[@]}"
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--fasta_path <fasta_path>"
+USAGE="--fasta_path <fasta_path> [--result_cache <sqlite>] [--no-cache]"
 
 Help()
 {
@@ -9,6 +9,8 @@ Help()
     echo
     echo "Arguments:"
     echo "  --fasta_path                Path to the FASTA file (required)"
+    echo "  --result_cache              Persistent result-cache file (optional; default \$RESULT_CACHE from paths.sh)"
+    echo "  --no-cache                  Score every sequence, ignoring the result cache"
     echo "  -h, --help                  Show this help message and exit"
     echo
 }
@@ -22,6 +24,15 @@ while [[ $# -gt 0 ]]; do
             shift
             shift
             ;;
+        --result_cache)
+            result_cache="$2"
+            shift
+            shift
+            ;;
+        --no-cache|--no_cache)
+            no_cache=1
+            shift
+            ;;
         -h|--help)
             Help
             exit 0
@@ -42,6 +53,9 @@ fi
 
 # Convert fasta_path to absolute path if it's relative
 fasta_path="$(cd "$(dirname "$fasta_path")" && pwd)/$(basename "$fasta_path")"
+if [[ -n "$result_cache" ]] && [[ "$result_cache" != /* ]]; then
+    result_cache="$(pwd)/$result_cache"
+fi
 
 ############################################################
 # Main                                                     #
@@ -52,7 +66,7 @@ cd "$SCRIPT_DIR/../.."
 # `pip install -e .` -- put the in-repo package on PYTHONPATH so `import tps_eval`
 # works in ALL of them (absolute, so it survives later `cd`s and child processes).
 export PYTHONPATH="$(pwd)/src${PYTHONPATH:+:$PYTHONPATH}"
-. "./paths.sh" # Load ENZYME_EXPLORER_SEQUENCE_ONLY_PATH, ENZYME_EXPLORER_SEQUENCE_ONLY_ENV variables
+. "./paths.sh" # Load ENZYME_EXPLORER_SEQUENCE_ONLY_PATH, ENZYME_EXPLORER_SEQUENCE_ONLY_ENV, RESULT_CACHE variables
 
 eval "$(conda shell.bash hook)"
 conda activate "$ENZYME_EXPLORER_SEQUENCE_ONLY_ENV"
@@ -74,4 +88,17 @@ echo "  output CSV path: $output_path"
 # under data/ (enzyme_explorer_plm_checkpoints.pkl, calibration_fit_summary.csv)
 # resolve. Output schema: id, sequence, <class>_score, <class>_p_calibrated.
 cd "$ENZYME_EXPLORER_SEQUENCE_ONLY_PATH"
-predict_sequences_only --sequences "$fasta_path" --output-csv "$output_path"
+result_cache="${result_cache:-$RESULT_CACHE}"
+if [[ -z "$no_cache" ]] && [[ -n "$result_cache" ]]; then
+    # Only sequences never scored by this installation go through the predictor.
+    python -m tps_eval.data.run_cached_fasta_tool \
+        --fasta_path "$fasta_path" \
+        --output_csv "$output_path" \
+        --tool enzyme_explorer_sequence_only \
+        --model "$ENZYME_EXPLORER_SEQUENCE_ONLY_PATH" \
+        --id_column id \
+        --result_cache "$result_cache" \
+        -- predict_sequences_only --sequences {fasta} --output-csv {csv}
+else
+    predict_sequences_only --sequences "$fasta_path" --output-csv "$output_path"
+fi
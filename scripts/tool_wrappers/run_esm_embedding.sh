@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--fasta_path <fasta_path>"
+USAGE="--fasta_path <fasta_path> [--csv] [--result_cache <sqlite>] [--no-cache]"
 
 Help()
 {
@@ -9,11 +9,15 @@ Help()
     echo
     echo "Arguments:"
     echo "  --fasta_path    Path to the FASTA file (required)"
+    echo "  --csv           Also export the legacy wide <input>_embedding_esm1b.csv next to the .npy store"
+    echo "  --result_cache  Persistent result-cache file (optional; default \$RESULT_CACHE from paths.sh)"
+    echo "  --no-cache      Embed every sequence, ignoring the result cache"
     echo "  -h, --help      Show this help message and exit"
     echo
 }
 
 # Parse long options manually
+csv_args=()
 while [[ $# -gt 0 ]]; do
     key="$1"
     case $key in
@@ -22,6 +26,19 @@ while [[ $# -gt 0 ]]; do
             shift
             shift
             ;;
+        --csv)
+            csv_args=(--csv)
+            shift
+            ;;
+        --result_cache)
+            result_cache="$2"
+            shift
+            shift
+            ;;
+        --no-cache|--no_cache)
+            no_cache=1
+            shift
+            ;;
         -h|--help)
             Help
             exit 0
@@ -44,6 +61,9 @@ fi
 if [[ "$fasta_path" != /* ]]; then
     fasta_path="$(cd "$(dirname "$fasta_path")" && pwd)/$(basename "$fasta_path")"
 fi
+if [[ -n "$result_cache" && "$result_cache" != /* ]]; then
+    result_cache="$(pwd)/$result_cache"
+fi
 
 ############################################################
 # Main                                                     #
@@ -54,7 +74,7 @@ cd "$SCRIPT_DIR/../.."
 # `pip install -e .` -- put the in-repo package on PYTHONPATH so `import tps_eval`
 # works in ALL of them (absolute, so it survives later `cd`s and child processes).
 export PYTHONPATH="$(pwd)/src${PYTHONPATH:+:$PYTHONPATH}"
-. ./paths.sh # Load TPS_EVAL_ENV
+. ./paths.sh # Load TPS_EVAL_ENV, RESULT_CACHE
 
 eval "$(conda shell.bash hook)"
 conda activate "$TPS_EVAL_ENV"
@@ -64,8 +84,16 @@ export LD_LIBRARY_PATH="$CONDA_PREFIX/lib:${LD_LIBRARY_PATH:-}"
 echo "Active conda environment: $(conda info --json | python -c "import sys, json; print(json.load(sys.stdin)['active_prefix_name'])")"
 echo "Using python: $(which python)"
 
+cache_args=()
+result_cache="${result_cache:-$RESULT_CACHE}"
+if [[ -z "$no_cache" && -n "$result_cache" ]]; then
+    cache_args=(--result_cache "$result_cache")
+fi
+
 python -m tps_eval.esm.extract_embeddings \
     esm1b_t33_650M_UR50S \
     "$fasta_path" \
     --repr_layers 33 \
-    --include mean
+    --include mean \
+    "${csv_args[@]}" \
+    "${cache_args[@]}"
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--fasta_path <fasta_path> [--save_path <save_path>] [--method swoop|masked] [--nogpu]"
+USAGE="--fasta_path <fasta_path> [--save_path <save_path>] [--method swoop|masked] [--nogpu] [--threads <n>] [--precision float32|bfloat16|int8] [--adaptive_tol <nats>] [--with_embeddings] [--result_cache <sqlite>] [--no-cache]"
 
 Help()
 {
@@ -12,11 +12,18 @@ Help()
     echo "  --method        swoop (fast single-pass approx, default) or masked (exact, slow)"
     echo "  --model_location ESM model name/path (optional; default esm1b_t33_650M_UR50S)"
     echo "  --nogpu         Do not use GPU even if available (optional)"
+    echo "  --threads       Torch CPU threads (optional)"
+    echo "  --precision     float32 (default), bfloat16 autocast, or int8 dynamic quantisation (CPU)"
+    echo "  --adaptive_tol  masked only: stop masking once the mean-PLL 95% CI half-width <= this (nats)"
+    echo "  --with_embeddings  Fused mode (swoop): also write <fasta>_embedding_esm1b.npy from the same forward pass"
+    echo "  --result_cache  Persistent result-cache file (optional; default \$RESULT_CACHE from paths.sh)"
+    echo "  --no-cache      Score every sequence, ignoring the result cache"
     echo "  -h, --help      Show this help message and exit"
     echo
 }
 
 nogpu_flag=""
+embeddings_flag=""
 while [[ $# -gt 0 ]]; do
     key="$1"
     case $key in
@@ -40,6 +47,30 @@ while [[ $# -gt 0 ]]; do
             nogpu_flag="--nogpu"
             shift
             ;;
+        --threads)
+            threads="$2"
+            shift 2
+            ;;
+        --precision)
+            precision="$2"
+            shift 2
+            ;;
+        --adaptive_tol)
+            adaptive_tol="$2"
+            shift 2
+            ;;
+        --with_embeddings)
+            embeddings_flag="--with_embeddings"
+            shift
+            ;;
+        --result_cache)
+            result_cache="$2"
+            shift 2
+            ;;
+        --no-cache|--no_cache)
+            no_cache=1
+            shift
+            ;;
         -h|--help)
             Help
             exit 0
@@ -65,6 +96,9 @@ fi
 if [[ -n "$save_path" && "$save_path" != /* ]]; then
     save_path="$(cd "$(dirname "$save_path")" && pwd)/$(basename "$save_path")"
 fi
+if [[ -n "$result_cache" && "$result_cache" != /* ]]; then
+    result_cache="$(pwd)/$result_cache"
+fi
 
 ############################################################
 # Main                                                     #
@@ -75,7 +109,7 @@ cd "$SCRIPT_DIR/../.."
 # `pip install -e .` -- put the in-repo package on PYTHONPATH so `import tps_eval`
 # works in ALL of them (absolute, so it survives later `cd`s and child processes).
 export PYTHONPATH="$(pwd)/src${PYTHONPATH:+:$PYTHONPATH}"
-. ./paths.sh # Load TPS_EVAL_ENV
+. ./paths.sh # Load TPS_EVAL_ENV, RESULT_CACHE
 
 eval "$(conda shell.bash hook)"
 conda activate "$TPS_EVAL_ENV"
@@ -99,5 +133,21 @@ fi
 if [[ -n "$nogpu_flag" ]]; then
     args+=("$nogpu_flag")
 fi
+if [[ -n "$threads" ]]; then
+    args+=(--threads "$threads")
+fi
+if [[ -n "$precision" ]]; then
+    args+=(--precision "$precision")
+fi
+if [[ -n "$adaptive_tol" ]]; then
+    args+=(--adaptive_tol "$adaptive_tol")
+fi
+if [[ -n "$embeddings_flag" ]]; then
+    args+=("$embeddings_flag")
+fi
+result_cache="${result_cache:-$RESULT_CACHE}"
+if [[ -z "$no_cache" && -n "$result_cache" ]]; then
+    args+=(--result_cache "$result_cache")
+fi
 
 python -m tps_eval.sequence_metrics.run_esm_pseudo_perplexity "${args[@]}"
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--fasta_path <fasta_path> --save_dir <save_dir> [--no-skip_existing] [--chunk_size <n>] [--device <cuda|cpu>] [--pae_dir <dir>] [--no-save_pae]"
+USAGE="--fasta_path <fasta_path> --save_dir <save_dir> [--no-skip_existing] [--chunk_size <n>] [--device <cuda|cpu>] [--pae_dir <dir>] [--no-save_pae] [--toks_per_batch <n>] [--pae_format compressed|float16]"
 
 Help()
 {
@@ -14,6 +14,8 @@ Help()
     echo "  --device            Torch device cuda/cpu (optional; default cuda if available)"
     echo "  --pae_dir           Directory for <ID>_pae.npz PAE matrices (optional; default <save_dir>_pae/)"
     echo "  --no-save_pae       Do not save PAE matrices (optional; default: save them)"
+    echo "  --toks_per_batch    Padded residues per batched forward pass, 1 = one sequence per pass (optional; default 1024)"
+    echo "  --pae_format        compressed (float32, default) or float16 (uncompressed, memory-mappable) (optional)"
     echo "  -h, --help          Show this help message and exit"
     echo
 }
@@ -52,6 +54,14 @@ while [[ $# -gt 0 ]]; do
             save_pae_flag="--no-save_pae"
             shift
             ;;
+        --toks_per_batch)
+            toks_per_batch="$2"
+            shift 2
+            ;;
+        --pae_format)
+            pae_format="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -122,5 +132,11 @@ fi
 if [[ -n "$save_pae_flag" ]]; then
     args+=("$save_pae_flag")
 fi
+if [[ -n "$toks_per_batch" ]]; then
+    args+=(--toks_per_batch "$toks_per_batch")
+fi
+if [[ -n "$pae_format" ]]; then
+    args+=(--pae_format "$pae_format")
+fi
 
 python -m tps_eval.esmfold.run_esmfold "${args[@]}"
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <csv> --top_n <n> --max_seqs <n>]"
+USAGE="--structs_dir <structs_dir> [--save_path <csv> --top_n <n> --max_seqs <n> --db_cache <dir>]"
 
 Help()
 {
@@ -15,6 +15,7 @@ Help()
     echo "  --save_path    Output CSV path (optional; default <structs_dir>_foldseek_swissprot_search.csv)"
     echo "  --top_n        Top-N hits per query (optional; default 25)"
     echo "  --max_seqs     foldseek --max-seqs prefilter (optional; default 300)"
+    echo "  --db_cache     Prebuilt foldseek DB cache dir (optional; default \$FOLDSEEK_DB_CACHE from paths.sh)"
     echo "  -h, --help     Show this help message and exit"
     echo
     echo "Requires paths.sh: AFDB_SWISSPROT_DB (foldseek AFDB-Swiss-Prot DB) and TPS_ACCESSIONS."
@@ -28,6 +29,7 @@ while [[ $# -gt 0 ]]; do
         --save_path) save_path="$2"; shift 2 ;;
         --top_n) top_n="$2"; shift 2 ;;
         --max_seqs) max_seqs="$2"; shift 2 ;;
+        --db_cache) db_cache="$2"; shift 2 ;;
         -h|--help) Help; exit 0 ;;
         *) echo "Unknown option: $1"; Help; exit 1 ;;
     esac
@@ -73,6 +75,8 @@ args=("$structs_dir" "$AFDB_SWISSPROT_DB" "$TPS_ACCESSIONS")
 [[ -n "$save_path" ]] && args+=(--save_path "$save_path")
 [[ -n "$top_n" ]] && args+=(--top_n "$top_n")
 [[ -n "$max_seqs" ]] && args+=(--max_seqs "$max_seqs")
+db_cache="${db_cache:-$FOLDSEEK_DB_CACHE}"
+[[ -n "$db_cache" ]] && args+=(--db_cache "$db_cache")
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] Starting foldseek_swissprot_search..."
 python -m tps_eval.homology_search.run_foldseek_swissprot_search "${args[@]}"
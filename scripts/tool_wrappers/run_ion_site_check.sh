@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--site_radius <A>] [--coord_cutoff <A>] [--min_coord_contacts <n>] [--ion_resnames <R...>] [--diphosphate_resnames <R...>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--site_radius <A>] [--coord_cutoff <A>] [--min_coord_contacts <n>] [--ion_resnames <R...>] [--diphosphate_resnames <R...>] [--workers <n>]"
 
 Help()
 {
@@ -14,6 +14,7 @@ Help()
     echo "  --min_coord_contacts   Min coordinating-O contacts for well-placed (optional; default 2)"
     echo "  --ion_resnames         Ion HETATM residue names (optional; default MG MN)"
     echo "  --diphosphate_resnames Diphosphate HETATM residue names (optional; default POP PPV PPK)"
+    echo "  --workers              Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help             Show this help message and exit"
     echo
 }
@@ -58,6 +59,10 @@ while [[ $# -gt 0 ]]; do
                 shift
             done
             ;;
+        --workers)
+            workers="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -123,5 +128,8 @@ fi
 if [[ ${#diphosphate_resnames[@]} -gt 0 ]]; then
     args+=(--diphosphate_resnames "${diphosphate_resnames[@]}")
 fi
+if [[ -n "$workers" ]]; then
+    args+=(--workers "$workers")
+fi
 
 python -m tps_eval.structure_metrics.run_ion_site_check "${args[@]}"
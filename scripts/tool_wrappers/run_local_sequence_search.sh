@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--fasta_path <fasta_path> [--train_path <ref.fasta> --backend <mmseqs2|diamond> --top_k <N> --threads <n> --sensitivity <s> --save_path <csv> --topk_save_path <csv>]"
+USAGE="--fasta_path <fasta_path> [--train_path <ref.fasta> --backend <mmseqs2|diamond> --top_k <N> --threads <n> --sensitivity <s> --save_path <csv> --topk_save_path <csv> --alignment_cache <sqlite>]"
 
 Help()
 {
@@ -23,6 +23,7 @@ Help()
     echo "  --sensitivity     Backend sensitivity knob (mmseqs2 -s value; diamond flag name)"
     echo "  --save_path       Metric CSV path (optional)"
     echo "  --topk_save_path  Top-k CSV path (optional)"
+    echo "  --alignment_cache Persistent alignment-cache file (optional; default \$ALIGNMENT_CACHE from paths.sh)"
     echo "  -h, --help        Show this help message and exit"
     echo
     echo "Output: <input>_local_sequence_search.csv keyed by ID. Per-backend mapping:"
@@ -45,6 +46,7 @@ while [[ $# -gt 0 ]]; do
         --sensitivity) sensitivity="$2"; shift 2 ;;
         --save_path) save_path="$2"; shift 2 ;;
         --topk_save_path) topk_save_path="$2"; shift 2 ;;
+        --alignment_cache) alignment_cache="$2"; shift 2 ;;
         -h|--help) Help; exit 0 ;;
         *) echo "Unknown option: $1"; Help; exit 1 ;;
     esac
@@ -104,6 +106,8 @@ args+=(--threads "$threads")
 [[ -n "$sensitivity" ]] && args+=(--sensitivity "$sensitivity")
 [[ -n "$save_path" ]] && args+=(--save_path "$save_path")
 [[ -n "$topk_save_path" ]] && args+=(--topk_save_path "$topk_save_path")
+alignment_cache="${alignment_cache:-$ALIGNMENT_CACHE}"
+[[ -n "$alignment_cache" ]] && args+=(--alignment_cache "$alignment_cache")
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] Starting local_sequence_search (backend=${backend:-mmseqs2})..."
 python -m tps_eval.sequence_metrics.run_local_sequence_search "${args[@]}"
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--fasta_path <fasta_path> [--train_path <train_path> --train --top_k <N>]"
+USAGE="--fasta_path <fasta_path> [--train_path <train_path> --train --top_k <N> --alignment_cache <sqlite> --prefilter --prefilter_candidates <C> --recall_sample <N>]"
 
 Help()
 {
@@ -15,12 +15,17 @@ Help()
     echo "  --train_path   Path to the reference FASTA file (optional)"
     echo "  --train        Turns on train data mode. "_self" results will be also copied as non-"_self" results."
     echo "  --top_k        If >=1, also write <input>_max_sequence_identity_topk.csv (query_id,rank,neighbour_id,score; score = identity percent, LARGER closer)"
+    echo "  --alignment_cache  Persistent alignment-cache file (optional; default \$ALIGNMENT_CACHE from paths.sh)"
+    echo "  --prefilter    Approximate mode: align each query only against its best 3-mer candidates (large batches)"
+    echo "  --prefilter_candidates  Candidates aligned per query with --prefilter (default 50)"
+    echo "  --recall_sample  With --prefilter, also report recall vs exact mode on N random queries"
     echo "  -h, --help     Show this help message and exit"
     echo
 }
 
 # Parse long options manually
 train_mode=false
+prefilter=false
 while [[ $# -gt 0 ]]; do
     key="$1"
     case $key in
@@ -43,6 +48,25 @@ while [[ $# -gt 0 ]]; do
             shift
             shift
             ;;
+        --alignment_cache)
+            alignment_cache="$2"
+            shift
+            shift
+            ;;
+        --prefilter)
+            prefilter=true
+            shift
+            ;;
+        --prefilter_candidates)
+            prefilter_candidates="$2"
+            shift
+            shift
+            ;;
+        --recall_sample)
+            recall_sample="$2"
+            shift
+            shift
+            ;;
         -h|--help)
             Help
             exit 0
@@ -100,6 +124,19 @@ topk_args=()
 if [[ -n "$top_k" ]]; then
     topk_args=(--top_k "$top_k")
 fi
+alignment_cache="${alignment_cache:-$ALIGNMENT_CACHE}"
+if [[ -n "$alignment_cache" ]]; then
+    topk_args+=(--alignment_cache "$alignment_cache")
+fi
+if $prefilter; then
+    topk_args+=(--prefilter)
+fi
+if [[ -n "$prefilter_candidates" ]]; then
+    topk_args+=(--prefilter_candidates "$prefilter_candidates")
+fi
+if [[ -n "$recall_sample" ]]; then
+    topk_args+=(--recall_sample "$recall_sample")
+fi
 
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] Starting max_sequence_identity computation..."
 if [[ -n "$train_path" ]] && [[ "$train_path" != "" ]]; then
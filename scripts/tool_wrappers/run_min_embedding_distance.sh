@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--embeddings_path <embeddings_path> [--train_embeddings_path <train_embeddings_path> --train --top_k <N>]"
+USAGE="--embeddings_path <embeddings_path> [--train_embeddings_path <train_embeddings_path> --train --top_k <N> --block_size <B> --threads <T> --index <ivf.npz> --nprobe <P>]"
 
 Help()
 {
@@ -11,10 +11,14 @@ Help()
     echo "and return the second minimum embedding distance \(first will be 0. with itself\)."
     echo
     echo "Arguments:"
-    echo "  --embeddings_path           Path to the CSV file with embeddings (required)"
-    echo "  --train_embeddings_path     Path to the reference CSV file with embeddings (optional)"
+    echo "  --embeddings_path           Path to the embeddings (.npy store or CSV; required)"
+    echo "  --train_embeddings_path     Path to the reference embeddings (.npy store or CSV; optional)"
     echo "  --train                     Turns on train data mode. "_self" results will be also copied as non-"_self" results."
     echo "  --top_k                     If >=1, also write <input>_min_embedding_distance_topk.csv (query_id,rank,neighbour_id,score; score = embedding distance, SMALLER closer)"
+    echo "  --block_size                Rows/columns per distance tile; bounds memory to ~block_size^2 float64 per thread (default 1024)"
+    echo "  --threads                   Threads computing query blocks in parallel (default 1)"
+    echo "  --index                     Prebuilt reference index (run_build_embedding_index); replaces --train_embeddings_path, approximate"
+    echo "  --nprobe                    With --index: index cells visited per query (recall/speed knob, default 8)"
     echo "  -h, --help                  Show this help message and exit"
     echo
 }
@@ -43,6 +47,26 @@ while [[ $# -gt 0 ]]; do
             shift
             shift
             ;;
+        --block_size)
+            block_size="$2"
+            shift
+            shift
+            ;;
+        --threads)
+            threads="$2"
+            shift
+            shift
+            ;;
+        --index)
+            index_path="$2"
+            shift
+            shift
+            ;;
+        --nprobe)
+            nprobe="$2"
+            shift
+            shift
+            ;;
         -h|--help)
             Help
             exit 0
@@ -100,6 +124,18 @@ topk_args=()
 if [[ -n "$top_k" ]]; then
     topk_args=(--top_k "$top_k")
 fi
+if [[ -n "$block_size" ]]; then
+    topk_args+=(--block_size "$block_size")
+fi
+if [[ -n "$threads" ]]; then
+    topk_args+=(--threads "$threads")
+fi
+if [[ -n "$index_path" ]]; then
+    topk_args+=(--index "$index_path")
+fi
+if [[ -n "$nprobe" ]]; then
+    topk_args+=(--nprobe "$nprobe")
+fi
 
 if [[ -n "$train_embeddings_path" ]] && [[ "$train_embeddings_path" != "" ]]; then
     python -m tps_eval.sequence_metrics.run_min_embedding_distance "$embeddings_path" "$train_embeddings_path" "${topk_args[@]}"
@@ -110,8 +146,10 @@ rc=$?
 
 if $train_mode; then
     # Copy self results to non-self results
-    cp "${embeddings_path%.csv}_min_embedding_distance_self.csv" "${embeddings_path%.csv}_min_embedding_distance.csv"
-    echo "Copied self results to non-self results: ${embeddings_path%.csv}_min_embedding_distance_self.csv -> ${embeddings_path%.csv}_min_embedding_distance.csv"
+    # The input is the .npy store or a legacy CSV; outputs share its stem.
+    embeddings_stem="${embeddings_path%.*}"
+    cp "${embeddings_stem}_min_embedding_distance_self.csv" "${embeddings_stem}_min_embedding_distance.csv"
+    echo "Copied self results to non-self results: ${embeddings_stem}_min_embedding_distance_self.csv -> ${embeddings_stem}_min_embedding_distance.csv"
 fi
 
 # Propagate python's exit code so a failed run FAILS the SLURM job (else the
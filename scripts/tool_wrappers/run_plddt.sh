@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--confident_threshold <plddt>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--confident_threshold <plddt>] [--workers <n>]"
 
 Help()
 {
@@ -10,6 +10,7 @@ Help()
     echo "  --structs_dir           Directory of AlphaFold structures (.pdb/.cif); file stem = ID (required)"
     echo "  --save_path             Output CSV path (optional; default <structs_dir>_plddt.csv)"
     echo "  --confident_threshold   pLDDT cutoff for frac_plddt_confident (optional; default 70)"
+    echo "  --workers               Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help              Show this help message and exit"
     echo
 }
@@ -30,6 +31,10 @@ while [[ $# -gt 0 ]]; do
             confident_threshold="$2"
             shift 2
             ;;
+        --workers)
+            workers="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -83,5 +88,8 @@ fi
 if [[ -n "$confident_threshold" ]]; then
     args+=(--confident_threshold "$confident_threshold")
 fi
+if [[ -n "$workers" ]]; then
+    args+=(--workers "$workers")
+fi
 
 python -m tps_eval.structure_metrics.run_plddt "${args[@]}"
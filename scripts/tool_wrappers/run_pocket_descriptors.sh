@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--workers <n>]"
 
 Help()
 {
@@ -9,6 +9,7 @@ Help()
     echo "Arguments:"
     echo "  --structs_dir   Directory of structures (.pdb/.cif) or AF3 af_output; file stem = ID (required)"
     echo "  --save_path     Output CSV path (optional; default <structs_dir>_pocket_descriptors.csv)"
+    echo "  --workers       Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help      Show this help message and exit"
     echo
 }
@@ -25,6 +26,10 @@ while [[ $# -gt 0 ]]; do
             save_path="$2"
             shift 2
             ;;
+        --workers)
+            workers="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -84,5 +89,8 @@ if [[ -n "$P2RANK_PATH" && -x "$P2RANK_PATH/prank" ]]; then
 else
     echo "[note] P2RANK_PATH unset or $P2RANK_PATH/prank not executable; skipping P2Rank cross-check."
 fi
+if [[ -n "$workers" ]]; then
+    args+=(--workers "$workers")
+fi
 
 python -m tps_eval.structure_metrics.run_pocket_descriptors "${args[@]}"
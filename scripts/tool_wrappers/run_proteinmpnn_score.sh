@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--model_name <name>] [--seed <n>] [--backbone_noise <f>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--model_name <name>] [--seed <n>] [--backbone_noise <f>] [--engine batched|subprocess] [--device <cuda|cpu>] [--token_budget <n>]"
 
 Help()
 {
@@ -12,6 +12,9 @@ Help()
     echo "  --model_name      ProteinMPNN model name (optional; default v_48_020)"
     echo "  --seed            Random seed (optional; default 0 = random)"
     echo "  --backbone_noise  Std of backbone noise when scoring (optional; default 0)"
+    echo "  --engine          subprocess (one ProteinMPNN run per structure, default) or batched (one resident model)"
+    echo "  --device          Torch device for the batched engine (optional; default cuda if available)"
+    echo "  --token_budget    Batched engine: padded residues per forward pass (optional; default 8192)"
     echo "  -h, --help        Show this help message and exit"
     echo
 }
@@ -39,6 +42,18 @@ while [[ $# -gt 0 ]]; do
             backbone_noise="$2"
             shift 2
             ;;
+        --engine)
+            engine="$2"
+            shift 2
+            ;;
+        --device)
+            device="$2"
+            shift 2
+            ;;
+        --token_budget)
+            token_budget="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -98,5 +113,14 @@ fi
 if [[ -n "$backbone_noise" ]]; then
     args+=(--backbone_noise "$backbone_noise")
 fi
+if [[ -n "$engine" ]]; then
+    args+=(--engine "$engine")
+fi
+if [[ -n "$device" ]]; then
+    args+=(--device "$device")
+fi
+if [[ -n "$token_budget" ]]; then
+    args+=(--token_budget "$token_budget")
+fi
 
 python -m tps_eval.structure_metrics.run_proteinmpnn_score "${args[@]}"
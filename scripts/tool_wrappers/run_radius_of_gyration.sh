@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--workers <n>]"
 
 Help()
 {
@@ -9,6 +9,7 @@ Help()
     echo "Arguments:"
     echo "  --structs_dir   Directory of structures (.pdb/.cif); file stem = ID (required)"
     echo "  --save_path     Output CSV path (optional; default <structs_dir>_radius_of_gyration.csv)"
+    echo "  --workers       Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help      Show this help message and exit"
     echo
 }
@@ -25,6 +26,10 @@ while [[ $# -gt 0 ]]; do
             save_path="$2"
             shift 2
             ;;
+        --workers)
+            workers="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -75,5 +80,8 @@ args=("$structs_dir")
 if [[ -n "$save_path" ]]; then
     args+=(--save_path "$save_path")
 fi
+if [[ -n "$workers" ]]; then
+    args+=(--workers "$workers")
+fi
 
 python -m tps_eval.structure_metrics.run_radius_of_gyration "${args[@]}"
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> --known_structs_dir <known_structs_dir> [--structural_topk <csv>] [--sequence_topk <csv>] [--sdr_panel <csv>] [--panel_cutoff <A>] [--map_tolerance <A>] [--tau_high <s>] [--tau_low <s>] [--save_path <path>]"
+USAGE="--structs_dir <structs_dir> --known_structs_dir <known_structs_dir> [--structural_topk <csv>] [--sequence_topk <csv>] [--sdr_panel <csv>] [--panel_cutoff <A>] [--map_tolerance <A>] [--tau_high <s>] [--tau_low <s>] [--save_path <path>] [--alignment_cache <sqlite>] [--workers <n>]"
 
 Help()
 {
@@ -22,6 +22,8 @@ Help()
     echo "  --tau_high           Global-similarity floor in [0,1] (default 0.6)"
     echo "  --tau_low            SDR-identity ceiling in [0,1] (default 0.7)"
     echo "  --save_path          Output CSV path (default <structs_dir>_sdr_divergence.csv)"
+    echo "  --alignment_cache    Persistent alignment-cache file (default \$ALIGNMENT_CACHE from paths.sh)"
+    echo "  --workers            Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help           Show this help message and exit"
     echo
     echo "At least one of --structural_topk / --sequence_topk is required."
@@ -45,9 +47,10 @@ while [[ $# -gt 0 ]]; do
     case "$1" in
         --structs_dir) structs_dir="$(abspath "$2")"; shift 2 ;;
         --known_structs_dir) known_structs_dir="$(abspath "$2")"; shift 2 ;;
+        --alignment_cache) alignment_cache="$(abspath "$2")"; shift 2 ;;
         --structural_topk|--sequence_topk|--sdr_panel|--save_path)
             opts+=("$1" "$(abspath "$2")"); shift 2 ;;
-        --panel_cutoff|--map_tolerance|--tau_high|--tau_low)
+        --panel_cutoff|--map_tolerance|--tau_high|--tau_low|--workers)
             opts+=("$1" "$2"); shift 2 ;;
         -h|--help) Help; exit 0 ;;
         *) echo "Unknown option: $1"; Help; exit 1 ;;
@@ -77,6 +80,9 @@ echo "Active conda environment: $(conda info --json | python -c "import sys, jso
 echo "Using python: $(which python)"
 
 
+alignment_cache="${alignment_cache:-$ALIGNMENT_CACHE}"
+[[ -n "$alignment_cache" ]] && opts+=(--alignment_cache "$alignment_cache")
+
 echo "[$(date '+%Y-%m-%d %H:%M:%S')] Starting sdr_divergence..."
 python -m tps_eval.specificity.run_sdr_divergence "$structs_dir" "$known_structs_dir" "${opts[@]}"
 rc=$?
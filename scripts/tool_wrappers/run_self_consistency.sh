@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--num_seqs <n>] [--sampling_temp <t>] [--model_name <name>] [--seed <n>] [--ids <id...>] [--limit <n>] [--device <cuda|cpu>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--num_seqs <n>] [--sampling_temp <t>] [--model_name <name>] [--seed <n>] [--ids <id...>] [--limit <n>] [--device <cuda|cpu>] [--mpnn_engine batched|subprocess] [--early_stop_k <k>] [--rmsd_threshold <A>] [--toks_per_batch <n>]"
 
 Help()
 {
@@ -16,6 +16,10 @@ Help()
     echo "  --ids             Restrict to these structure IDs (optional; validate on 1-2 first)"
     echo "  --limit           Score only the first N structures (optional; cheap validation)"
     echo "  --device          Torch device cuda/cpu for ESMFold (optional)"
+    echo "  --mpnn_engine     subprocess (one run per structure, default) or batched (one resident ProteinMPNN)"
+    echo "  --early_stop_k    Stop a design once k refolds are under --rmsd_threshold or k can no longer pass (optional; default off)"
+    echo "  --rmsd_threshold  scRMSD in A counted as a pass for --early_stop_k (optional; default 2.0)"
+    echo "  --toks_per_batch  Padded residues per batched ESMFold refold (optional; default esmfold's)"
     echo "  -h, --help        Show this help message and exit"
     echo
 }
@@ -67,6 +71,22 @@ while [[ $# -gt 0 ]]; do
                 shift
             done
             ;;
+        --mpnn_engine)
+            mpnn_engine="$2"
+            shift 2
+            ;;
+        --early_stop_k)
+            early_stop_k="$2"
+            shift 2
+            ;;
+        --rmsd_threshold)
+            rmsd_threshold="$2"
+            shift 2
+            ;;
+        --toks_per_batch)
+            toks_per_batch="$2"
+            shift 2
+            ;;
         -h|--help)
             Help
             exit 0
@@ -141,5 +161,17 @@ fi
 if [[ ${#ids[@]} -gt 0 ]]; then
     args+=(--ids "${ids[@]}")
 fi
+if [[ -n "$mpnn_engine" ]]; then
+    args+=(--mpnn_engine "$mpnn_engine")
+fi
+if [[ -n "$early_stop_k" ]]; then
+    args+=(--early_stop_k "$early_stop_k")
+fi
+if [[ -n "$rmsd_threshold" ]]; then
+    args+=(--rmsd_threshold "$rmsd_threshold")
+fi
+if [[ -n "$toks_per_batch" ]]; then
+    args+=(--toks_per_batch "$toks_per_batch")
+fi
 
 python -m tps_eval.structure_metrics.run_self_consistency "${args[@]}"
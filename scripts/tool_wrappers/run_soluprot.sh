@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--fasta_path <fasta_path>"
+USAGE="--fasta_path <fasta_path> [--result_cache <sqlite>] [--no-cache]"
 
 Help()
 {
@@ -9,6 +9,8 @@ Help()
     echo
     echo "Arguments:"
     echo "  --fasta_path                Path to the FASTA file (required)"
+    echo "  --result_cache              Persistent result-cache file (optional; default \$RESULT_CACHE from paths.sh)"
+    echo "  --no-cache                  Score every sequence, ignoring the result cache"
     echo "  -h, --help                  Show this help message and exit"
     echo
 }
@@ -22,6 +24,15 @@ while [[ $# -gt 0 ]]; do
             shift
             shift
             ;;
+        --result_cache)
+            result_cache="$2"
+            shift
+            shift
+            ;;
+        --no-cache|--no_cache)
+            no_cache=1
+            shift
+            ;;
         -h|--help)
             Help
             exit 0
@@ -44,6 +55,9 @@ fi
 if [[ "$fasta_path" != /* ]]; then
     fasta_path="$(cd "$(dirname "$fasta_path")" && pwd)/$(basename "$fasta_path")"
 fi
+if [[ -n "$result_cache" ]] && [[ "$result_cache" != /* ]]; then
+    result_cache="$(pwd)/$result_cache"
+fi
 
 ############################################################
 # Main                                                     #
@@ -54,7 +68,7 @@ cd "$SCRIPT_DIR/../.."
 # `pip install -e .` -- put the in-repo package on PYTHONPATH so `import tps_eval`
 # works in ALL of them (absolute, so it survives later `cd`s and child processes).
 export PYTHONPATH="$(pwd)/src${PYTHONPATH:+:$PYTHONPATH}"
-. "./paths.sh" # Load SOLUPROT_PATH, SOLUPROT_ENV variables
+. "./paths.sh" # Load SOLUPROT_PATH, SOLUPROT_ENV, RESULT_CACHE variables
 
 eval "$(conda shell.bash hook)"
 conda activate "$SOLUPROT_ENV"
@@ -74,10 +88,24 @@ else
     cleanup_tmp=1
 fi
 
-python "$SOLUPROT_PATH/soluprot.py" \
-    --i_fa "$fasta_path" \
-    --o_csv "$(dirname "$fasta_path")/$(basename "$fasta_path" .fasta)_soluprot.csv" \
-    --tmp_dir "$tmp_dir"
+output_path="$(dirname "$fasta_path")/$(basename "$fasta_path" .fasta)_soluprot.csv"
+result_cache="${result_cache:-$RESULT_CACHE}"
+if [[ -z "$no_cache" ]] && [[ -n "$result_cache" ]]; then
+    # Only sequences SoluProt has never scored go through soluprot.py.
+    python -m tps_eval.data.run_cached_fasta_tool \
+        --fasta_path "$fasta_path" \
+        --output_csv "$output_path" \
+        --tool soluprot \
+        --model "$SOLUPROT_PATH" \
+        --id_column fa_id \
+        --result_cache "$result_cache" \
+        -- python "$SOLUPROT_PATH/soluprot.py" --i_fa {fasta} --o_csv {csv} --tmp_dir "$tmp_dir"
+else
+    python "$SOLUPROT_PATH/soluprot.py" \
+        --i_fa "$fasta_path" \
+        --o_csv "$output_path" \
+        --tmp_dir "$tmp_dir"
+fi
 soluprot_rc=$?
 
 if [[ "$cleanup_tmp" == "1" ]]; then
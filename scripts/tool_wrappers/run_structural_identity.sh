@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> --known_structs_dir <known_structs_dir> [--save_path <save_path> --top_k <N>]"
+USAGE="--structs_dir <structs_dir> --known_structs_dir <known_structs_dir> [--save_path <save_path> --top_k <N> --db_cache <dir> --preset <name> --candidates <N> --recall_sample <N>]"
 
 Help()
 {
@@ -11,6 +11,10 @@ Help()
     echo "  --known_structs_dir   Directory of known-TPS reference structures (required)"
     echo "  --save_path           Output CSV path (optional; default <structs_dir>_structural_identity.csv)"
     echo "  --top_k               If >=1, also write <structs_dir>_structural_identity_topk.csv (query_id,rank,neighbour_id,score; score = TM-score, LARGER closer)"
+    echo "  --preset              foldseek search preset: exhaustive (default), sensitive, fast, two_stage"
+    echo "  --candidates          two_stage: first-pass hits per query to realign (optional; default 50)"
+    echo "  --recall_sample       With --top_k and a non-exhaustive preset: rerun N random queries exhaustively and print top-k recall"
+    echo "  --db_cache            Prebuilt foldseek DB cache dir (optional; default \$FOLDSEEK_DB_CACHE from paths.sh)"
     echo "  -h, --help            Show this help message and exit"
     echo
 }
@@ -22,6 +26,10 @@ while [[ $# -gt 0 ]]; do
         --known_structs_dir) known_structs_dir="$2"; shift 2 ;;
         --save_path) save_path="$2"; shift 2 ;;
         --top_k) top_k="$2"; shift 2 ;;
+        --db_cache) db_cache="$2"; shift 2 ;;
+        --preset) preset="$2"; shift 2 ;;
+        --candidates) candidates="$2"; shift 2 ;;
+        --recall_sample) recall_sample="$2"; shift 2 ;;
         -h|--help) Help; exit 0 ;;
         *) echo "Unknown option: $1"; Help; exit 1 ;;
     esac
@@ -65,5 +73,18 @@ fi
 if [[ -n "$top_k" ]]; then
     args+=(--top_k "$top_k")
 fi
+if [[ -n "$preset" ]]; then
+    args+=(--preset "$preset")
+fi
+if [[ -n "$candidates" ]]; then
+    args+=(--candidates "$candidates")
+fi
+if [[ -n "$recall_sample" ]]; then
+    args+=(--recall_sample "$recall_sample")
+fi
+db_cache="${db_cache:-$FOLDSEEK_DB_CACHE}"
+if [[ -n "$db_cache" ]]; then
+    args+=(--db_cache "$db_cache")
+fi
 
 python -m tps_eval.structure_metrics.run_structural_identity "${args[@]}"
@@ -0,0 +1,79 @@
+#!/bin/bash
+
+USAGE="--structs_dir <structs_dir> [--index_dir <index_dir>]"
+
+Help()
+{
+    echo "Usage: $0 $USAGE"
+    echo
+    echo "Arguments:"
+    echo "  --structs_dir   Directory of structures (.pdb/.cif); file stem = ID (required)"
+    echo "  --index_dir     Index directory (optional; default <structs_dir>_structure_index)"
+    echo "  -h, --help      Show this help message and exit"
+    echo
+}
+
+# Parse long options manually
+while [[ $# -gt 0 ]]; do
+    key="$1"
+    case $key in
+        --structs_dir)
+            structs_dir="$2"
+            shift 2
+            ;;
+        --index_dir)
+            index_dir="$2"
+            shift 2
+            ;;
+        -h|--help)
+            Help
+            exit 0
+            ;;
+        *)
+            echo "Unknown option: $1"
+            Help
+            exit 1
+            ;;
+    esac
+done
+
+if [ -z "$structs_dir" ]; then
+    echo "Usage: $0 $USAGE"
+    exit 1
+fi
+
+# Convert structs_dir to absolute path if relative
+if [[ "$structs_dir" != /* ]]; then
+    structs_dir="$(cd "$structs_dir" && pwd)"
+fi
+# Convert index_dir to absolute path if relative
+if [[ -n "$index_dir" && "$index_dir" != /* ]]; then
+    index_dir="$(cd "$(dirname "$index_dir")" && pwd)/$(basename "$index_dir")"
+fi
+
+############################################################
+# Main                                                     #
+############################################################
+SCRIPT_DIR=$(dirname "$BASH_SOURCE")
+cd "$SCRIPT_DIR/../.."
+# Every tool activates its own conda env, but only the main tps_eval env gets
+# `pip install -e .` -- put the in-repo package on PYTHONPATH so `import tps_eval`
+# works in ALL of them (absolute, so it survives later `cd`s and child processes).
+export PYTHONPATH="$(pwd)/src${PYTHONPATH:+:$PYTHONPATH}"
+. ./paths.sh # Load TPS_EVAL_ENV
+
+eval "$(conda shell.bash hook)"
+conda activate "$TPS_EVAL_ENV"
+# Fix for Karolina compute nodes whose /lib64/libstdc++.so.6 lacks GLIBCXX_3.4.29
+# (required by the env's pandas/numpy C extensions). Prepend the env's own libstdc++.
+export LD_LIBRARY_PATH="$CONDA_PREFIX/lib:${LD_LIBRARY_PATH:-}"
+echo "Active conda environment: $(conda info --json | python -c "import sys, json; print(json.load(sys.stdin)['active_prefix_name'])")"
+echo "Using python: $(which python)"
+
+
+args=("$structs_dir")
+if [[ -n "$index_dir" ]]; then
+    args+=(--index_dir "$index_dir")
+fi
+
+python -m tps_eval.structure_metrics.run_structure_index "${args[@]}"
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--coord_cutoff <A>] [--ion_resnames <R...>] [--min_substrate_carbons <n>] [--substrate_resname <R>]"
+USAGE="--structs_dir <structs_dir> [--save_path <save_path>] [--coord_cutoff <A>] [--ion_resnames <R...>] [--min_substrate_carbons <n>] [--substrate_resname <R>] [--workers <n>]"
 
 Help()
 {
@@ -13,6 +13,7 @@ Help()
     echo "  --ion_resnames           Ion HETATM residue names to exclude/measure-against (optional; default MG MN)"
     echo "  --min_substrate_carbons  Min carbons (with >=1 P) to count as a prenyl-PP substrate (optional; default 5)"
     echo "  --substrate_resname      Force a specific ligand residue name as the substrate (optional; default auto-detect)"
+    echo "  --workers                Worker processes (optional; default all CPUs allocated to the job)"
     echo "  -h, --help               Show this help message and exit"
     echo
 }
@@ -31,6 +32,7 @@ while [[ $# -gt 0 ]]; do
             ion_resnames=()
             while [[ $# -gt 0 && "$1" != --* ]]; do ion_resnames+=("$1"); shift; done
             ;;
+        --workers) workers="$2"; shift 2 ;;
         -h|--help) Help; exit 0 ;;
         *) echo "Unknown option: $1"; Help; exit 1 ;;
     esac
@@ -74,5 +76,6 @@ if [[ -n "$coord_cutoff" ]]; then args+=(--coord_cutoff "$coord_cutoff"); fi
 if [[ -n "$min_substrate_carbons" ]]; then args+=(--min_substrate_carbons "$min_substrate_carbons"); fi
 if [[ -n "$substrate_resname" ]]; then args+=(--substrate_resname "$substrate_resname"); fi
 if [[ ${#ion_resnames[@]} -gt 0 ]]; then args+=(--ion_resnames "${ion_resnames[@]}"); fi
+if [[ -n "$workers" ]]; then args+=(--workers "$workers"); fi
 
 python -m tps_eval.structure_metrics.run_substrate_positioning "${args[@]}"
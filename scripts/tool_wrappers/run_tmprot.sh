@@ -1,6 +1,6 @@
 #!/bin/bash
 
-USAGE="--fasta_path <fasta_path> [--device cpu|cuda]"
+USAGE="--fasta_path <fasta_path> [--device cpu|cuda] [--result_cache <sqlite>] [--no-cache]"
 
 Help()
 {
@@ -10,6 +10,8 @@ Help()
     echo "Arguments:"
     echo "  --fasta_path                Path to the FASTA file (required)"
     echo "  --device                    Optional device override (cpu|cuda)"
+    echo "  --result_cache              Persistent result-cache file (optional; default \$RESULT_CACHE from paths.sh)"
+    echo "  --no-cache                  Predict every sequence, ignoring the result cache"
     echo "  -h, --help                  Show this help message and exit"
     echo
 }
@@ -28,6 +30,15 @@ while [[ $# -gt 0 ]]; do
             shift
             shift
             ;;
+        --result_cache)
+            result_cache="$2"
+            shift
+            shift
+            ;;
+        --no-cache|--no_cache)
+            no_cache=1
+            shift
+            ;;
         -h|--help)
             Help
             exit 0
@@ -49,6 +60,9 @@ fi
 if [[ "$fasta_path" != /* ]]; then
     fasta_path="$(cd "$(dirname "$fasta_path")" && pwd)/$(basename "$fasta_path")"
 fi
+if [[ -n "$result_cache" ]] && [[ "$result_cache" != /* ]]; then
+    result_cache="$(pwd)/$result_cache"
+fi
 
 ############################################################
 # Main                                                     #
@@ -59,7 +73,7 @@ cd "$SCRIPT_DIR/../.."
 # `pip install -e .` -- put the in-repo package on PYTHONPATH so `import tps_eval`
 # works in ALL of them (absolute, so it survives later `cd`s and child processes).
 export PYTHONPATH="$(pwd)/src${PYTHONPATH:+:$PYTHONPATH}"
-. "./paths.sh" # Load TMPROT_ENV variable
+. "./paths.sh" # Load TMPROT_ENV, RESULT_CACHE variables
 
 eval "$(conda shell.bash hook)"
 conda activate "$TMPROT_ENV"
@@ -67,4 +81,11 @@ conda activate "$TMPROT_ENV"
 # (required by the env's pandas/numpy/torch C extensions). Prepend the env's own libstdc++.
 export LD_LIBRARY_PATH="$CONDA_PREFIX/lib:${LD_LIBRARY_PATH:-}"
 
-python -m tps_eval.sequence_metrics.run_tmprot --fasta_path "$fasta_path" ${device:+--device "$device"}
+args=(--fasta_path "$fasta_path")
+[[ -n "$device" ]] && args+=(--device "$device")
+result_cache="${result_cache:-$RESULT_CACHE}"
+if [[ -z "$no_cache" ]] && [[ -n "$result_cache" ]]; then
+    args+=(--result_cache "$result_cache")
+fi
+
+python -m tps_eval.sequence_metrics.run_tmprot "${args[@]}"
@@ -0,0 +1,471 @@
+"""Pack AlphaFold3 fold jobs into bundles and submit them as ONE SLURM array.
+
+run_alphafold_jobs.py submits one AF3 job per sequence: N queue entries, and every
+job pays the container start, model load and JAX compilation again. Packing plans
+the inputs into bundles instead; each bundle is one array task that runs its
+members sequentially in a single AF3 process (``run_alphafold.py --input_dir``):
+
+* Every job gets a token count the way AF3 counts tokens: one per residue, one per
+  ligand heavy atom, one per ion. AF3 pads each input to a size bucket and
+  compiles once per bucket, so bundles only mix jobs of the same bucket.
+* Within a bucket, jobs are packed (sorted by ID) while the padded tokens of the
+  bundle stay under ``max_bundle_tokens`` and it holds at most ``max_bundle_jobs``
+  members. A job above the budget gets a bundle of its own.
+
+The plan lives in ``<working_directory>/af3_bundles/<name>/``: ``plan.json`` (bundles
++ submission history) and one ``task_<i>.json`` manifest per array task, read by the
+``alphafold_bundle.sh`` job script through the ``prepare_task`` / ``finish_task``
+subcommands below. A task whose members did not all produce ``<ID>.pdb`` fails;
+``resubmit`` re-queues exactly the finished-but-incomplete tasks (per ``squeue``
+and the output files) as a new array and points pending jobs that depended on the
+old array at the new one.
+
+An array has one time limit for all of its tasks, so ``submit_array`` sets
+``--time`` from the largest bundle it submits: ``job_minutes`` (the per-job limit of
+the unpacked alphafold.sh) per member. A ``--time=`` in ``submit_args`` wins.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence
+
+from tps_eval.repo_paths import SCRIPTS_DIR
+
+# AF3's default compilation buckets (run_alphafold.py --buckets). Larger inputs are
+# padded to themselves.
+AF3_BUCKETS = (256, 512, 768, 1024, 1280, 1536, 2048, 2560, 3072, 3584, 4096, 4608, 5120)
+
+DEFAULT_MAX_BUNDLE_TOKENS = 6144
+DEFAULT_MAX_BUNDLE_JOBS = 8
+DEFAULT_JOB_MINUTES = 240  # alphafold.sh's --time for one fold job
+
+BUNDLE_JOB_NAME = "alphafold_bundle"
+PLAN_FILE = "plan.json"
+JOBS_FILE = "jobs.json"  # jobs queued with add_jobs, planned + submitted by `submit`
+
+# Heavy atoms of a SMILES string: bracket atoms, two-letter halogens, organic subset.
+_SMILES_ATOM = re.compile(r"\[[^\]]+\]|Cl|Br|[BCNOPSFI]|[bcnops]")
+
+
+def smiles_heavy_atoms(smiles: str) -> int:
+    """Heavy-atom count of a SMILES string (explicit [H] atoms excluded)."""
+    atoms = _SMILES_ATOM.findall(smiles)
+    return sum(1 for atom in atoms if not re.fullmatch(r"\[\d*H[+-]?\d*\]", atom))
+
+
+def job_tokens(job: dict) -> int:
+    """AF3 token count of one job: residues + ligand heavy atoms + ions."""
+    return (sum(len(seq) for _, seq in job["proteins"])
+            + sum(smiles_heavy_atoms(smiles) for _, smiles in job.get("ligands", []))
+            + len(job.get("ions", [])))
+
+
+def af3_bucket(tokens: int) -> int:
+    """Padded size AF3 compiles an input of ``tokens`` tokens at."""
+    for bucket in AF3_BUCKETS:
+        if tokens <= bucket:
+            return bucket
+    return tokens
+
+
+def plan_bundles(
+    jobs: Sequence[dict],
+    *,
+    max_bundle_tokens: int = DEFAULT_MAX_BUNDLE_TOKENS,
+    max_bundle_jobs: int = DEFAULT_MAX_BUNDLE_JOBS,
+) -> List[List[int]]:
+    """Indices into ``jobs`` grouped into bundles (see module docstring), largest
+    bucket first so the longest tasks start first."""
+    by_bucket: Dict[int, List[int]] = {}
+    for i, job in enumerate(jobs):
+        by_bucket.setdefault(af3_bucket(job_tokens(job)), []).append(i)
+    bundles: List[List[int]] = []
+    for bucket in sorted(by_bucket, reverse=True):
+        members = sorted(by_bucket[bucket], key=lambda i: jobs[i]["sequence_id"])
+        per_bundle = max(1, min(max_bundle_jobs, max_bundle_tokens // bucket))
+        bundles.extend(members[k:k + per_bundle] for k in range(0, len(members), per_bundle))
+    return bundles
+
+
+def write_plan(
+    plan_dir: str,
+    jobs: Sequence[dict],
+    bundles: Sequence[Sequence[int]],
+    *,
+    working_directory: str,
+) -> dict:
+    """Write ``plan.json`` + one ``task_<i>.json`` per bundle; returns the plan.
+
+    A job is a dict with ``sequence_id``, ``proteins`` / ``ligands`` / ``ions`` as
+    ``[id, sequence|smiles|ccd]`` pairs, ``model_seeds`` and ``output_pdb``."""
+    os.makedirs(plan_dir, exist_ok=True)
+    tasks = []
+    for task_id, bundle in enumerate(bundles):
+        members = []
+        for i in bundle:
+            job = jobs[i]
+            members.append({
+                "sequence_id": job["sequence_id"],
+                "proteins": [list(p) for p in job["proteins"]],
+                "ligands": [list(p) for p in job.get("ligands", [])],
+                "ions": [list(p) for p in job.get("ions", [])],
+                "model_seeds": list(job["model_seeds"]),
+                "tokens": job_tokens(job),
+                "output_pdb": job["output_pdb"],
+            })
+        manifest = {"task_id": task_id, "working_directory": working_directory,
+                    "members": members}
+        with open(_task_path(plan_dir, task_id), "w") as fh:
+            json.dump(manifest, fh, indent=2)
+        tasks.append({"task_id": task_id,
+                      "sequence_ids": [m["sequence_id"] for m in members],
+                      "bucket": af3_bucket(max(m["tokens"] for m in members))})
+    plan = {"working_directory": working_directory, "tasks": tasks, "submissions": []}
+    _save_plan(plan_dir, plan)
+    return plan
+
+
+def add_jobs(plan_dir: str, jobs: Sequence[dict], *, working_directory: str) -> int:
+    """Queue ``jobs`` in ``<plan_dir>/jobs.json`` for a later ``submit``, so several
+    input groups (e.g. the co-fold groups of the fan-out) share ONE array. A job
+    re-added under the same ``sequence_id`` replaces the earlier entry; returns the
+    number of queued jobs."""
+    os.makedirs(plan_dir, exist_ok=True)
+    queued = {job["sequence_id"]: job for job in load_jobs(plan_dir)}
+    queued.update((job["sequence_id"], dict(job)) for job in jobs)
+    with open(os.path.join(plan_dir, JOBS_FILE), "w") as fh:
+        json.dump({"working_directory": working_directory,
+                   "jobs": list(queued.values())}, fh, indent=2)
+    return len(queued)
+
+
+def load_jobs(plan_dir: str) -> List[dict]:
+    """Jobs queued by :func:`add_jobs` (empty if none)."""
+    path = os.path.join(plan_dir, JOBS_FILE)
+    if not os.path.isfile(path):
+        return []
+    with open(path) as fh:
+        return json.load(fh)["jobs"]
+
+
+def load_plan(plan_dir: str) -> dict:
+    with open(os.path.join(plan_dir, PLAN_FILE)) as fh:
+        return json.load(fh)
+
+
+def _save_plan(plan_dir: str, plan: dict) -> None:
+    tmp = os.path.join(plan_dir, PLAN_FILE + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(plan, fh, indent=2)
+    os.replace(tmp, os.path.join(plan_dir, PLAN_FILE))
+
+
+def _task_path(plan_dir: str, task_id: int) -> str:
+    return os.path.join(plan_dir, f"task_{task_id}.json")
+
+
+def load_task(plan_dir: str, task_id: int) -> dict:
+    with open(_task_path(plan_dir, task_id)) as fh:
+        return json.load(fh)
+
+
+def _array_spec(task_ids: Sequence[int], throttle: Optional[int]) -> str:
+    """``--array`` value: ranges for consecutive ids, optional ``%throttle``."""
+    ids = sorted(task_ids)
+    parts = []
+    start = prev = ids[0]
+    for t in ids[1:] + [None]:
+        if t is not None and t == prev + 1:
+            prev = t
+            continue
+        parts.append(str(start) if start == prev else f"{start}-{prev}")
+        if t is not None:
+            start = prev = t
+    return ",".join(parts) + (f"%{throttle}" if throttle else "")
+
+
+def _time_limit(minutes: int) -> str:
+    """SLURM ``--time`` value (``D-HH:MM:00``) for ``minutes``."""
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}-{hours:02d}:{minutes:02d}:00"
+
+
+def submit_array(
+    plan_dir: str,
+    *,
+    cluster: str,
+    task_ids: Optional[Sequence[int]] = None,
+    submit_args: str = "",
+    throttle: Optional[int] = None,
+    job_minutes: int = DEFAULT_JOB_MINUTES,
+) -> str:
+    """Submit ``task_ids`` (default: every task) of the plan as ONE array job via
+    scripts/submit_job.sh; records the submission in plan.json and returns the job id.
+    Unless ``submit_args`` sets ``--time=``, the array gets ``job_minutes`` per member
+    of its largest bundle."""
+    plan = load_plan(plan_dir)
+    if task_ids is None:
+        task_ids = [t["task_id"] for t in plan["tasks"]]
+    working_directory = plan["working_directory"]
+    name = os.path.basename(os.path.normpath(plan_dir))
+    submit_args = f"--array={_array_spec(task_ids, throttle)} {submit_args}".strip()
+    if "--time=" not in submit_args:
+        members = max(len(plan["tasks"][t]["sequence_ids"]) for t in task_ids)
+        submit_args += f" --time={_time_limit(job_minutes * members)}"
+    if "--job-name=" not in submit_args:
+        submit_args += f" --job-name=AF_bundle_{name}"
+    if "--output=" not in submit_args:
+        submit_args += f" --output={working_directory}/logs/%x.%A_%a.out"
+    os.makedirs(os.path.join(working_directory, "logs"), exist_ok=True)
+    cmd = [
+        "bash", str(SCRIPTS_DIR / "submit_job.sh"),
+        "--cluster", cluster,
+        "--job_name", BUNDLE_JOB_NAME,
+        "--job_args", f'"--working_directory {working_directory} --plan_dir {os.path.abspath(plan_dir)}"',
+        "--submit_args", f'"{submit_args}"',
+    ]
+    result = subprocess.run(cmd, check=False, capture_output=True, text=True)
+    match = re.search(r"Submitted batch job (\d+)", result.stdout)
+    if result.returncode != 0 or not match:
+        raise RuntimeError(f"array submission failed (exit {result.returncode}):\n"
+                           f"{result.stdout}\n{result.stderr}")
+    job_id = match.group(1)
+    plan["submissions"].append({"job_id": job_id, "task_ids": sorted(task_ids)})
+    _save_plan(plan_dir, plan)
+    return job_id
+
+
+def task_complete(plan_dir: str, task_id: int) -> bool:
+    return all(os.path.isfile(m["output_pdb"]) for m in load_task(plan_dir, task_id)["members"])
+
+
+def active_tasks(job_id: str) -> set:
+    """Array task ids of ``job_id`` still pending or running (``squeue -r``); empty
+    once the job has left the queue."""
+    result = subprocess.run(["squeue", "-h", "-r", "-j", job_id, "-o", "%i"],
+                            check=False, capture_output=True, text=True)
+    if result.returncode != 0:
+        return set()
+    return {int(m) for m in re.findall(rf"^{job_id}_(\d+)\s*$", result.stdout, re.MULTILINE)}
+
+
+def task_status(plan_dir: str) -> Dict[int, str]:
+    """task id -> "done" | "queued" | "failed" for the plan's latest submission of
+    each task (never-submitted tasks count as failed)."""
+    plan = load_plan(plan_dir)
+    last_job = {}
+    for submission in plan["submissions"]:
+        for task_id in submission["task_ids"]:
+            last_job[task_id] = submission["job_id"]
+    queued = {job_id: active_tasks(job_id) for job_id in set(last_job.values())}
+    status = {}
+    for task in plan["tasks"]:
+        task_id = task["task_id"]
+        if task_complete(plan_dir, task_id):
+            status[task_id] = "done"
+        elif task_id in queued.get(last_job.get(task_id), set()):
+            status[task_id] = "queued"
+        else:
+            status[task_id] = "failed"
+    return status
+
+
+def _rewire_dependents(old_job_ids: Sequence[str], new_job_id: str) -> List[str]:
+    """Point pending jobs that depend on any of ``old_job_ids`` at ``new_job_id``
+    (``scontrol update``); returns the updated job ids."""
+    result = subprocess.run(["squeue", "-h", "-t", "PD", "-o", "%i %E"],
+                            check=False, capture_output=True, text=True)
+    if result.returncode != 0:
+        return []
+    # Whole-array references only ("123" / "123_*"), not single tasks ("123_4").
+    old = re.compile(r"(?<!\d)(%s)(_\*)?(?![\d_])" % "|".join(re.escape(j) for j in old_job_ids))
+    updated = []
+    for line in result.stdout.splitlines():
+        parts = line.split(None, 1)
+        if len(parts) != 2 or not old.search(parts[1]):
+            continue
+        # %E reads e.g. "afterok:123_*(unfulfilled),afterok:456(unfulfilled)".
+        dependency = old.sub(new_job_id, re.sub(r"\([^)]*\)", "", parts[1]))
+        subprocess.run(["scontrol", "update", f"JobId={parts[0]}", f"Dependency={dependency}"],
+                       check=False, capture_output=True, text=True)
+        updated.append(parts[0])
+    return updated
+
+
+def resubmit_failed(
+    plan_dir: str, *, cluster: str, submit_args: str = "", throttle: Optional[int] = None,
+    job_minutes: int = DEFAULT_JOB_MINUTES,
+) -> Optional[str]:
+    """Re-queue the plan's failed tasks as one new array; returns its job id, or
+    None when nothing failed."""
+    status = task_status(plan_dir)
+    failed = sorted(t for t, s in status.items() if s == "failed")
+    if not failed:
+        return None
+    previous = [s["job_id"] for s in load_plan(plan_dir)["submissions"]]
+    job_id = submit_array(plan_dir, cluster=cluster, task_ids=failed,
+                          submit_args=submit_args, throttle=throttle, job_minutes=job_minutes)
+    rewired = _rewire_dependents(previous, job_id) if previous else []
+    if rewired:
+        print(f"Pointed {len(rewired)} dependent job(s) at array {job_id}: {' '.join(rewired)}")
+    return job_id
+
+
+def plan_and_submit(
+    jobs: Sequence[dict],
+    plan_dir: str,
+    *,
+    working_directory: str,
+    cluster: str,
+    submit_args: str = "",
+    max_bundle_tokens: int = DEFAULT_MAX_BUNDLE_TOKENS,
+    max_bundle_jobs: int = DEFAULT_MAX_BUNDLE_JOBS,
+    throttle: Optional[int] = None,
+    job_minutes: int = DEFAULT_JOB_MINUTES,
+) -> Optional[str]:
+    """Plan ``jobs`` into bundles, write the manifests and submit the array; returns
+    the array job id (None when there is nothing to fold)."""
+    if not jobs:
+        return None
+    bundles = plan_bundles(jobs, max_bundle_tokens=max_bundle_tokens,
+                           max_bundle_jobs=max_bundle_jobs)
+    write_plan(plan_dir, jobs, bundles, working_directory=working_directory)
+    job_id = submit_array(plan_dir, cluster=cluster, submit_args=submit_args, throttle=throttle,
+                          job_minutes=job_minutes)
+    print(f"Packed {len(jobs)} fold job(s) into {len(bundles)} bundle(s) -> array job {job_id}")
+    print(f"AlphaFold array: {job_id} tasks={len(bundles)} plan={os.path.abspath(plan_dir)}")
+    return job_id
+
+
+# --------------------------------------------------------------------------- #
+# Array-task side (called from scripts/<cluster>/jobs/alphafold_bundle.sh)    #
+# --------------------------------------------------------------------------- #
+def _af3_name(sequence_id: str) -> str:
+    # AF3 lower-cases the job name for its output dir (see alphafold.sh).
+    return sequence_id.lower()
+
+
+def _af3_model(working_directory: str, sequence_id: str) -> str:
+    name = _af3_name(sequence_id)
+    return os.path.join(working_directory, "af_output", name, f"{name}_model.cif")
+
+
+def prepare_task(plan_dir: str, task_id: int) -> str:
+    """Write the AF3 input JSON of every member still missing both its ``<ID>.pdb``
+    and its AF3 model into ``af_input/<plan>_task_<i>/``; returns that dir's name
+    (under af_input/)."""
+    from tps_eval.alphafold.prepare_input import format_data
+
+    task = load_task(plan_dir, task_id)
+    name = f"{os.path.basename(os.path.normpath(plan_dir))}_task_{task_id}"
+    input_dir = os.path.join(task["working_directory"], "af_input", name)
+    os.makedirs(input_dir, exist_ok=True)
+    for stale in os.listdir(input_dir):
+        os.remove(os.path.join(input_dir, stale))
+    for member in task["members"]:
+        model = _af3_model(task["working_directory"], member["sequence_id"])
+        if os.path.isfile(member["output_pdb"]) or os.path.isfile(model):
+            continue
+        # A partial output dir of an interrupted run would make AF3 write a
+        # timestamped sibling instead, which finish_task would not find.
+        shutil.rmtree(os.path.dirname(model), ignore_errors=True)
+        data = format_data(argparse.Namespace(
+            sequence=None, sequence_id=member["sequence_id"],
+            proteins=[tok for pair in member["proteins"] for tok in pair],
+            ligands=[tok for pair in member["ligands"] for tok in pair],
+            ions=[tok for pair in member["ions"] for tok in pair],
+            model_seeds=member["model_seeds"],
+        ))
+        with open(os.path.join(input_dir, member["sequence_id"] + ".json"), "w") as fh:
+            json.dump(data, fh, indent=4)
+    return name
+
+
+def finish_task(plan_dir: str, task_id: int) -> List[str]:
+    """Convert each member's AF3 model to ``<ID>.pdb``; returns the IDs whose model
+    is missing (the task then exits non-zero so ``resubmit`` picks it up)."""
+    from tps_eval.alphafold.extract_pdb_files import cif_to_pdb_sanitized
+
+    task = load_task(plan_dir, task_id)
+    missing = []
+    for member in task["members"]:
+        if os.path.isfile(member["output_pdb"]):
+            continue
+        cif = _af3_model(task["working_directory"], member["sequence_id"])
+        if not os.path.isfile(cif):
+            missing.append(member["sequence_id"])
+            continue
+        os.makedirs(os.path.dirname(member["output_pdb"]), exist_ok=True)
+        cif_to_pdb_sanitized(cif, member["output_pdb"])
+    return missing
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Packed AlphaFold3 array jobs: per-task "
+                                     "preparation/extraction and failed-task resubmission.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command in ("prepare_task", "finish_task"):
+        p = sub.add_parser(command)
+        p.add_argument("--plan_dir", required=True)
+        p.add_argument("--task_id", type=int, required=True)
+    for command in ("submit", "status", "resubmit"):
+        p = sub.add_parser(command)
+        p.add_argument("--plan_dir", required=True)
+        if command == "status":
+            continue
+        p.add_argument("--cluster", default="aurum")
+        p.add_argument("--submit_args", default="")
+        p.add_argument("--throttle", type=int, default=None,
+                       help="Max array tasks running at once (--array=...%%N).")
+        p.add_argument("--job_minutes", type=int, default=DEFAULT_JOB_MINUTES,
+                       help="Time limit per bundle member; the array's --time is this x the "
+                       "largest bundle, unless --submit_args sets --time= (default: %(default)s).")
+        if command == "submit":
+            p.add_argument("--max_bundle_tokens", type=int, default=DEFAULT_MAX_BUNDLE_TOKENS,
+                           help="Padded AF3 tokens per bundle (default: %(default)s).")
+            p.add_argument("--max_bundle_jobs", type=int, default=DEFAULT_MAX_BUNDLE_JOBS,
+                           help="Fold jobs per bundle (default: %(default)s).")
+    args = parser.parse_args()
+
+    if args.command == "prepare_task":
+        print(prepare_task(args.plan_dir, args.task_id))
+    elif args.command == "finish_task":
+        missing = finish_task(args.plan_dir, args.task_id)
+        if missing:
+            print(f"No AF3 model for {len(missing)} member(s): {' '.join(missing)}")
+            sys.exit(1)
+    elif args.command == "submit":
+        # Plan + submit the jobs queued in <plan_dir>/jobs.json (run_alphafold_jobs.py
+        # --pack --defer_submit). Last line = the run_alphafold_jobs contract line.
+        jobs = load_jobs(args.plan_dir)
+        working_directory = ""
+        if jobs:
+            with open(os.path.join(args.plan_dir, JOBS_FILE)) as fh:
+                working_directory = json.load(fh)["working_directory"]
+        job_id = plan_and_submit(
+            jobs, args.plan_dir, working_directory=working_directory,
+            cluster=args.cluster, submit_args=args.submit_args,
+            max_bundle_tokens=args.max_bundle_tokens, max_bundle_jobs=args.max_bundle_jobs,
+            throttle=args.throttle, job_minutes=args.job_minutes)
+        print(f"AlphaFold job IDs: [{job_id or ''}]")
+    elif args.command == "status":
+        status = task_status(args.plan_dir)
+        for state in ("done", "queued", "failed"):
+            ids = [str(t) for t, s in sorted(status.items()) if s == state]
+            print(f"{state}: {len(ids)}{' (' + ','.join(ids) + ')' if ids and state != 'done' else ''}")
+    else:
+        job_id = resubmit_failed(args.plan_dir, cluster=args.cluster,
+                                 submit_args=args.submit_args, throttle=args.throttle,
+                                 job_minutes=args.job_minutes)
+        print("Nothing to resubmit." if job_id is None else f"AlphaFold job IDs: [{job_id}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import subprocess
 import argparse
 import pandas as pd
 
+from tps_eval.alphafold import pack_jobs
 from tps_eval.repo_paths import SCRIPTS_DIR
 
 
@@ -37,6 +38,15 @@ def parse_args():
     parser.add_argument('--cluster', default='aurum', help='Cluster on which this script is run. (default: aurum)')
     parser.add_argument('--submit_args', type=str, default="", help='Additional arguments to pass to the cluster job submission')
     parser.add_argument("--skip_existing", default=True, action=argparse.BooleanOptionalAction, help='Skip sequences that already have PDB files generated.')
+
+    # Packing (see pack_jobs.py)
+    parser.add_argument("--pack", default=False, action=argparse.BooleanOptionalAction, help='Pack the fold jobs into bundles run sequentially in one allocation each, submitted as ONE SLURM array job (instead of one job per sequence).')
+    parser.add_argument('--plan_dir', default=None, help='With --pack: directory for the bundle plan and per-task manifests (default: working_directory/af3_bundles/<csv name>).')
+    parser.add_argument("--defer_submit", default=False, action=argparse.BooleanOptionalAction, help='With --pack: only queue the jobs in --plan_dir; submit them later (together with other groups) via `python -m tps_eval.alphafold.pack_jobs submit`.')
+    parser.add_argument('--max_bundle_tokens', type=int, default=pack_jobs.DEFAULT_MAX_BUNDLE_TOKENS, help='With --pack: padded AF3 tokens per bundle (default: %(default)s).')
+    parser.add_argument('--max_bundle_jobs', type=int, default=pack_jobs.DEFAULT_MAX_BUNDLE_JOBS, help='With --pack: fold jobs per bundle (default: %(default)s).')
+    parser.add_argument('--array_throttle', type=int, default=None, help='With --pack: max array tasks running at once (--array=...%%N).')
+    parser.add_argument('--bundle_job_minutes', type=int, default=pack_jobs.DEFAULT_JOB_MINUTES, help='With --pack: time limit per bundle member; the array gets this times its largest bundle unless --submit_args sets --time= (default: %(default)s).')
     
     args = parser.parse_args()
     return args
@@ -66,8 +76,16 @@ def run_alphafold_jobs(
     model_seeds=[42],
     skip_existing=True,
     use_protein_id_as_filename=False,
+    pack=False,
+    plan_dir=None,
+    defer_submit=False,
+    max_bundle_tokens=pack_jobs.DEFAULT_MAX_BUNDLE_TOKENS,
+    max_bundle_jobs=pack_jobs.DEFAULT_MAX_BUNDLE_JOBS,
+    array_throttle=None,
+    bundle_job_minutes=pack_jobs.DEFAULT_JOB_MINUTES,
 ):
     script_dir = os.path.dirname(os.path.realpath(__file__))
+    seeds = list(model_seeds)
     model_seeds = SEED_SEPARATOR.join([str(seed) for seed in model_seeds])
 
     # Extract data from dataframe
@@ -113,7 +131,23 @@ def run_alphafold_jobs(
         raise ValueError("Duplicate folding IDs found in input data. Make sure that the combination of protein IDs and ligands for each row is unique, or that you are using unique IDs with")
 
     # Run AlphaFold jobs
+    packed_jobs = []
     for combined_protein_ids, proteins, ligands, ions in zip(all_combined_ids, all_proteins, all_ligands, all_ions):
+        if pack:
+            output_pdb_path = os.path.join(save_directory or os.path.join(working_directory, "structs"), f"{combined_protein_ids}.pdb")
+            if skip_existing and os.path.exists(output_pdb_path):
+                n_skipped += 1
+                continue
+            packed_jobs.append({
+                "sequence_id": combined_protein_ids,
+                "proteins": [[str(id), str(sequence)] for id, sequence in proteins],
+                "ligands": [[str(id), str(smiles)] for id, smiles in ligands],
+                "ions": [[str(id), str(ccdcode)] for id, ccdcode in ions],
+                "model_seeds": seeds,
+                "output_pdb": output_pdb_path,
+            })
+            continue
+
         proteins = SEQUENCE_PAIR_SEPARATOR.join([f'{id}{ID_SEQUENCE_SEPARATOR}{sequence}' for id, sequence in proteins])
         ligands = SEQUENCE_PAIR_SEPARATOR.join([f'{id}{ID_SEQUENCE_SEPARATOR}{smiles}' for id, smiles in ligands])
         ions = SEQUENCE_PAIR_SEPARATOR.join([f'{id}{ID_SEQUENCE_SEPARATOR}{smiles}' for id, smiles in ions])
@@ -149,6 +183,20 @@ def run_alphafold_jobs(
         cmd_output = result.stdout.strip()
         job_id = cmd_output.split()[-1] # Last word printed by `submit_job.sh` is the job ID
         job_ids.append(job_id)
+    if pack:
+        plan_dir = plan_dir or os.path.join(working_directory, "af3_bundles", "bundles")
+        if defer_submit:
+            n_queued = pack_jobs.add_jobs(plan_dir, packed_jobs, working_directory=working_directory)
+            print(f"Queued {len(packed_jobs)} fold job(s) in {plan_dir} ({n_queued} in total).")
+        else:
+            job_id = pack_jobs.plan_and_submit(
+                packed_jobs, plan_dir, working_directory=working_directory, cluster=cluster,
+                submit_args=submit_args, max_bundle_tokens=max_bundle_tokens,
+                max_bundle_jobs=max_bundle_jobs, throttle=array_throttle,
+                job_minutes=bundle_job_minutes,
+            )
+            if job_id is not None:
+                job_ids.append(job_id)
     print(f"Skipped running AlphaFold for {n_skipped} sequences without Uniprot ID that already have PDB files.")
     
     print("AlphaFold job IDs:", job_ids)
@@ -178,6 +226,13 @@ def main():
         model_seeds=args.model_seeds,
         skip_existing=args.skip_existing,
         use_protein_id_as_filename=args.use_protein_id_as_filename,
+        pack=args.pack,
+        plan_dir=args.plan_dir or os.path.join(args.working_directory, "af3_bundles", os.path.splitext(os.path.basename(args.csv_path))[0]),
+        defer_submit=args.defer_submit,
+        max_bundle_tokens=args.max_bundle_tokens,
+        max_bundle_jobs=args.max_bundle_jobs,
+        array_throttle=args.array_throttle,
+        bundle_job_minutes=args.bundle_job_minutes,
     )
 
 
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+"""Self-contained tests for pack_jobs.py (packed AF3 bundles + SLURM array submission).
+
+Run from this directory:
+    cd src/tps_eval/alphafold && python test_pack_jobs.py
+or under pytest:
+    cd src/tps_eval/alphafold && python -m pytest test_pack_jobs.py -q
+
+Nothing reaches a real scheduler: fake `sbatch` / `squeue` / `scontrol` shell shims are
+put first on PATH. `sbatch` logs its argv and hands out increasing job ids; `squeue`
+prints the lines of a queue file (active array tasks `<id>_<task>`, pending jobs with
+their dependency string); `scontrol` logs its argv. The real scripts/submit_job.sh runs
+in between, so the tests cover the whole submission path: planner -> manifests -> ONE
+--array job -> status from squeue + output files -> resubmission of failed tasks and
+repointing of dependent jobs.
+"""
+
+import json
+import os
+import stat
+import tempfile
+
+import tps_eval.alphafold.pack_jobs as pj
+
+_SBATCH = """#!/bin/bash
+echo "$*" >> "$FAKE_SLURM_DIR/sbatch.log"
+id=$(cat "$FAKE_SLURM_DIR/next_id" 2>/dev/null || echo 1000)
+echo $((id + 1)) > "$FAKE_SLURM_DIR/next_id"
+echo "Submitted batch job $id"
+"""
+
+_SQUEUE = """#!/bin/bash
+echo "$*" >> "$FAKE_SLURM_DIR/squeue.log"
+job=""
+pending=0
+while [[ $# -gt 0 ]]; do
+    case "$1" in
+        -j) job="$2"; shift 2 ;;
+        -t) [[ "$2" == "PD" ]] && pending=1; shift 2 ;;
+        *) shift ;;
+    esac
+done
+if [[ $pending -eq 1 ]]; then
+    cat "$FAKE_SLURM_DIR/pending" 2>/dev/null
+    exit 0
+fi
+grep "^${job}_" "$FAKE_SLURM_DIR/queue" 2>/dev/null
+exit 0
+"""
+
+_SCONTROL = """#!/bin/bash
+echo "$*" >> "$FAKE_SLURM_DIR/scontrol.log"
+"""
+
+
+def _fake_slurm(monkeypatch, root):
+    """Install the shims on PATH; returns the state dir they log into."""
+    bin_dir = os.path.join(root, "bin")
+    state = os.path.join(root, "slurm")
+    os.makedirs(bin_dir)
+    os.makedirs(state)
+    for name, body in (("sbatch", _SBATCH), ("squeue", _SQUEUE), ("scontrol", _SCONTROL)):
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as fh:
+            fh.write(body)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", bin_dir + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FAKE_SLURM_DIR", state)
+    return state
+
+
+def _log(state, name):
+    path = os.path.join(state, name + ".log")
+    if not os.path.isfile(path):
+        return []
+    with open(path) as fh:
+        return fh.read().splitlines()
+
+
+def _job(sequence_id, length, wd, ligands=(), ions=()):
+    return {
+        "sequence_id": sequence_id,
+        "proteins": [[sequence_id, "A" * length]],
+        "ligands": [list(p) for p in ligands],
+        "ions": [list(p) for p in ions],
+        "model_seeds": [42],
+        "output_pdb": os.path.join(wd, "structs", sequence_id + ".pdb"),
+    }
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fh:
+        fh.write("MODEL\n")
+
+
+def test_smiles_heavy_atoms():
+    assert pj.smiles_heavy_atoms("CCO") == 3
+    assert pj.smiles_heavy_atoms("ClCBr") == 3
+    assert pj.smiles_heavy_atoms("c1ccccc1") == 6
+    # diphosphate with charged bracket atoms; explicit [H] is not a heavy atom
+    assert pj.smiles_heavy_atoms("[O-]P(=O)([O-])OP(=O)([O-])[O-]") == 9
+    assert pj.smiles_heavy_atoms("[H]C([H])([H])[H]") == 1
+
+
+def test_job_tokens_and_bucket():
+    job = _job("a", 300, "/wd", ligands=[("L", "CCO")], ions=[("I1", "MG"), ("I2", "MG")])
+    assert pj.job_tokens(job) == 300 + 3 + 2
+    assert pj.af3_bucket(256) == 256
+    assert pj.af3_bucket(257) == 512
+    assert pj.af3_bucket(305) == 512
+    assert pj.af3_bucket(6000) == 6000
+
+
+def test_plan_bundles_groups_by_bucket_under_budget():
+    jobs = ([_job(f"s{i}", 200, "/wd") for i in range(5)]       # bucket 256
+            + [_job(f"m{i}", 600, "/wd") for i in range(3)]     # bucket 768
+            + [_job("huge", 7000, "/wd")])                      # above the budget
+    bundles = pj.plan_bundles(jobs, max_bundle_tokens=1536, max_bundle_jobs=4)
+    ids = [[jobs[i]["sequence_id"] for i in b] for b in bundles]
+    # largest bucket first; never mixing buckets; padded tokens within the budget
+    assert ids == [["huge"], ["m0", "m1"], ["m2"], ["s0", "s1", "s2", "s3"], ["s4"]]
+    assert sorted(i for b in bundles for i in b) == list(range(len(jobs)))
+
+
+def test_array_spec():
+    assert pj._array_spec([0, 1, 2, 3], None) == "0-3"
+    assert pj._array_spec([5, 0, 2, 3], 2) == "0,2-3,5%2"
+    assert pj._array_spec([7], None) == "7"
+
+
+def test_time_limit():
+    assert pj._time_limit(240) == "0-04:00:00"
+    assert pj._time_limit(8 * 240 + 30) == "1-08:30:00"
+
+
+def test_plan_and_submit_one_array(monkeypatch):
+    with tempfile.TemporaryDirectory() as root:
+        state = _fake_slurm(monkeypatch, root)
+        wd = os.path.join(root, "wd")
+        plan_dir = os.path.join(wd, "af3_bundles", "run")
+        jobs = [_job(f"s{i}", 200, wd) for i in range(5)]
+        job_id = pj.plan_and_submit(jobs, plan_dir, working_directory=wd, cluster="aurum",
+                                    max_bundle_tokens=512, max_bundle_jobs=8, throttle=2)
+        assert job_id == "1000"
+        calls = _log(state, "sbatch")
+        assert len(calls) == 1
+        argv = calls[0].split()
+        assert "--array=0-2%2" in argv
+        assert "--job-name=AF_bundle_run" in argv
+        assert "--time=0-08:00:00" in argv      # 2 members in the largest bundle x 4 h
+        assert os.path.basename(argv[argv.index("--working_directory") - 1]) == "alphafold_bundle.sh"
+        assert argv[argv.index("--plan_dir") + 1] == os.path.abspath(plan_dir)
+
+        plan = pj.load_plan(plan_dir)
+        assert [t["sequence_ids"] for t in plan["tasks"]] == [["s0", "s1"], ["s2", "s3"], ["s4"]]
+        assert plan["submissions"] == [{"job_id": "1000", "task_ids": [0, 1, 2]}]
+        task = pj.load_task(plan_dir, 1)
+        assert task["working_directory"] == wd
+        assert [m["output_pdb"] for m in task["members"]] == [
+            os.path.join(wd, "structs", "s2.pdb"), os.path.join(wd, "structs", "s3.pdb")]
+
+
+def test_plan_and_submit_nothing_to_fold(monkeypatch):
+    with tempfile.TemporaryDirectory() as root:
+        state = _fake_slurm(monkeypatch, root)
+        assert pj.plan_and_submit([], os.path.join(root, "plan"), working_directory=root,
+                                  cluster="aurum") is None
+        assert _log(state, "sbatch") == []
+
+
+def test_add_jobs_merges_groups():
+    with tempfile.TemporaryDirectory() as root:
+        plan_dir = os.path.join(root, "plan")
+        assert pj.add_jobs(plan_dir, [_job("a", 100, root), _job("b", 100, root)],
+                           working_directory=root) == 2
+        assert pj.add_jobs(plan_dir, [_job("b", 300, root), _job("c", 100, root)],
+                           working_directory=root) == 3
+        jobs = {j["sequence_id"]: j for j in pj.load_jobs(plan_dir)}
+        assert sorted(jobs) == ["a", "b", "c"]
+        assert pj.job_tokens(jobs["b"]) == 300   # re-added job replaces the earlier one
+        assert pj.load_jobs(os.path.join(root, "missing")) == []
+
+
+def test_prepare_task_skips_finished_members():
+    with tempfile.TemporaryDirectory() as wd:
+        plan_dir = os.path.join(wd, "af3_bundles", "run")
+        jobs = [_job("s0", 50, wd, ions=[("MG1", "MG")]), _job("s1", 50, wd), _job("S2", 50, wd)]
+        pj.write_plan(plan_dir, jobs, [[0, 1, 2]], working_directory=wd)
+        _touch(jobs[1]["output_pdb"])                                    # already extracted
+        _touch(os.path.join(wd, "af_output", "s2", "s2_model.cif"))      # folded, not extracted
+        _touch(os.path.join(wd, "af_output", "s0", "seed-42_sample-0", "model.cif"))  # partial
+        name = pj.prepare_task(plan_dir, 0)
+        assert not os.path.exists(os.path.join(wd, "af_output", "s0"))
+        assert name == "run_task_0"
+        input_dir = os.path.join(wd, "af_input", name)
+        assert os.listdir(input_dir) == ["s0.json"]
+        with open(os.path.join(input_dir, "s0.json")) as fh:
+            data = json.load(fh)
+        assert data["name"] == "s0"
+        assert data["modelSeeds"] == [42]
+        assert len(data["sequences"]) == 2
+
+
+def test_finish_task_reports_missing_models():
+    with tempfile.TemporaryDirectory() as wd:
+        plan_dir = os.path.join(wd, "plan")
+        jobs = [_job("S0", 50, wd), _job("S1", 50, wd)]
+        pj.write_plan(plan_dir, jobs, [[0, 1]], working_directory=wd)
+        _touch(jobs[0]["output_pdb"])
+        assert pj.finish_task(plan_dir, 0) == ["S1"]
+
+
+def test_resubmit_only_failed_tasks_and_rewire(monkeypatch):
+    with tempfile.TemporaryDirectory() as root:
+        state = _fake_slurm(monkeypatch, root)
+        wd = os.path.join(root, "wd")
+        plan_dir = os.path.join(wd, "af3_bundles", "run")
+        jobs = [_job(f"s{i}", 200, wd) for i in range(4)]
+        assert pj.plan_and_submit(jobs, plan_dir, working_directory=wd, cluster="aurum",
+                                  max_bundle_tokens=256) == "1000"
+        # task 0 finished, task 1 still running, tasks 2 + 3 ended without structures
+        _touch(jobs[0]["output_pdb"])
+        with open(os.path.join(state, "queue"), "w") as fh:
+            fh.write("1000_1\n")
+        with open(os.path.join(state, "pending"), "w") as fh:
+            fh.write("2000 afterok:1000_*(unfulfilled)\n2001 afterok:999(unfulfilled)\n")
+        assert pj.task_status(plan_dir) == {0: "done", 1: "queued", 2: "failed", 3: "failed"}
+
+        assert pj.resubmit_failed(plan_dir, cluster="aurum", submit_args="--time=2:00:00") == "1001"
+        calls = _log(state, "sbatch")
+        assert "--time=0-04:00:00" in calls[0].split()
+        assert len(calls) == 2 and "--array=2-3" in calls[1].split()
+        assert [a for a in calls[1].split() if a.startswith("--time=")] == ["--time=2:00:00"]
+        assert _log(state, "scontrol") == ["update JobId=2000 Dependency=afterok:1001"]
+        assert pj.load_plan(plan_dir)["submissions"][-1] == {"job_id": "1001", "task_ids": [2, 3]}
+
+        # the resubmitted tasks are now tracked under the new array id
+        with open(os.path.join(state, "queue"), "w") as fh:
+            fh.write("1000_1\n1001_2\n")
+        assert pj.task_status(plan_dir) == {0: "done", 1: "queued", 2: "queued", 3: "failed"}
+
+
+def test_resubmit_nothing_failed(monkeypatch):
+    with tempfile.TemporaryDirectory() as root:
+        state = _fake_slurm(monkeypatch, root)
+        wd = os.path.join(root, "wd")
+        plan_dir = os.path.join(wd, "plan")
+        jobs = [_job("s0", 200, wd)]
+        pj.plan_and_submit(jobs, plan_dir, working_directory=wd, cluster="aurum")
+        _touch(jobs[0]["output_pdb"])
+        assert pj.resubmit_failed(plan_dir, cluster="aurum") is None
+        assert len(_log(state, "sbatch")) == 1
+
+
+def main():
+    import inspect
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+
+    class _MP:
+        def __init__(self):
+            self._undo = []
+
+        def setattr(self, obj, name, value):
+            self._undo.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+        def setenv(self, name, value):
+            self._undo.append((os.environ, name, os.environ.get(name)))
+            os.environ[name] = value
+
+        def undo(self):
+            for obj, name, old in reversed(self._undo):
+                if obj is os.environ:
+                    if old is None:
+                        os.environ.pop(name, None)
+                    else:
+                        os.environ[name] = old
+                else:
+                    setattr(obj, name, old)
+            self._undo = []
+
+    for t in tests:
+        if "monkeypatch" in inspect.signature(t).parameters:
+            mp = _MP()
+            try:
+                t(mp)
+            finally:
+                mp.undo()
+        else:
+            t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
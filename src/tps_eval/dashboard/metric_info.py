@@ -354,6 +354,7 @@ METRIC_INFO = {
         "explanation": "Designability via self-consistency: whether a ProteinMPNN sequence refolds (ESMFold) back to the design; low scRMSD (<~2 Å) means designable.",
         "columns": {
             "sc_rmsd_min": "≥ 0 (Å)", "sc_rmsd_mean": "≥ 0 (Å)", "n_samples": "integer ≥ 0",
+            "n_samples_evaluated": "integer ≥ 0",
         },
     },
 }
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+"""Persistent, content-addressed cache of pairwise-alignment results.
+
+The identity-style metrics re-align the same (design, reference) pairs every time a
+batch is re-scored — the MARTS-DB train set is fixed, and successive design batches
+overlap heavily (re-ranked subsets, merged batches). This cache lets a re-run pay
+only for the pairs it has never seen.
+
+Storage is ONE SQLite file (stdlib, no extra dependency) in rollback-journal mode,
+opened through :func:`connect_cache_db`:
+
+    namespaces(id, params)                 one row per aligner-parameter fingerprint
+    pairs(ns, key1, key2, value)           WITHOUT ROWID, primary key (ns, key1, key2)
+
+* Keys are 16-byte BLAKE2b digests of the sequence text (:func:`sequence_key`), so
+  the cache is keyed by CONTENT, not by FASTA id — renamed designs still hit.
+* ``params`` is a caller-chosen string naming the algorithm + every parameter that
+  changes the result (e.g. ``"nw:BLOSUM62:open=-11:extend=-1"``). Different
+  parameters never share entries; bump the string when the computation changes.
+* ``value`` is an opaque BLOB — each caller owns its codec (:func:`pack_floats` for
+  fixed-width float tuples, JSON for anything ragged).
+* ``symmetric=True`` stores each pair in canonical (sorted-key) order so (a, b) and
+  (b, a) are the same entry; use it only when the cached metric is order-invariant.
+
+Typical use from a process pool: the parent opens the cache read-write and is the
+only writer; workers open it with ``readonly=True``, look up their rows, compute
+the misses and hand the new ``(key1, key2, value)`` entries back to the parent,
+which :meth:`AlignmentCache.put_many` s them.
+
+Concurrency: the file usually sits on shared storage written by several SLURM jobs.
+WAL mode is NOT used — its shared-memory index only works between processes on ONE
+host and corrupts or stalls across NFS/Lustre clients. In rollback-journal mode
+writers serialise on SQLite's file lock and wait up to ``BUSY_TIMEOUT_S`` for it
+instead of failing with "database is locked". That lock is a POSIX advisory lock,
+so jobs on different nodes are only safe where the filesystem honours those locks
+across clients (NFSv4 with locking, Lustre mounted with ``flock``). Otherwise keep
+the cache on node-local storage, i.e. one host at a time.
+"""
+
+import hashlib
+import os
+import sqlite3
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+KEY_BYTES = 16
+
+# How long a connection waits for another job's lock before "database is locked".
+BUSY_TIMEOUT_S = 300
+
+# SQLite's default SQLITE_MAX_VARIABLE_NUMBER is 32766 on current builds but 999 on
+# older ones; stay under the conservative limit for IN (...) lists.
+_MAX_SQL_VARIABLES = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS namespaces (
+    id INTEGER PRIMARY KEY,
+    params TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    ns INTEGER NOT NULL,
+    key1 BLOB NOT NULL,
+    key2 BLOB NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (ns, key1, key2)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pairs_by_key2 ON pairs (ns, key2);
+"""
+
+
+def connect_cache_db(path: str, *, readonly: bool = False) -> sqlite3.Connection:
+    """Connection to a cache file on possibly shared storage (see the module
+    docstring): rollback journal, ``BUSY_TIMEOUT_S`` busy timeout."""
+    if readonly:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_S)
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_S)
+    # Also converts a file an earlier version left in WAL mode.
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def sequence_key(sequence: str) -> bytes:
+    """Content address of a sequence: 16-byte BLAKE2b digest of its text."""
+    return hashlib.blake2b(str(sequence).encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+
+def records_key(records: Iterable[Tuple[str, str]]) -> bytes:
+    """Content address of a whole (id, sequence) set — e.g. a reference FASTA whose
+    search results are cached per query. Order- and id-sensitive by design."""
+    digest = hashlib.blake2b(digest_size=KEY_BYTES)
+    for record_id, sequence in records:
+        digest.update(str(record_id).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(str(sequence).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.digest()
+
+
+def pack_floats(*values: float) -> bytes:
+    return struct.pack(f"<{len(values)}d", *values)
+
+
+def unpack_floats(blob: bytes) -> Tuple[float, ...]:
+    return struct.unpack(f"<{len(blob) // 8}d", blob)
+
+
+class AlignmentCache:
+    """SQLite-backed ``(params, key1, key2) -> value`` store. See the module docstring."""
+
+    def __init__(
+        self,
+        path: str,
+        params: str,
+        *,
+        symmetric: bool = False,
+        readonly: bool = False,
+    ):
+        self.path = str(path)
+        self.params = params
+        self.symmetric = symmetric
+        self.readonly = readonly
+        self._conn = connect_cache_db(self.path, readonly=readonly)
+        if not readonly:
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO namespaces (params) VALUES (?)", (params,)
+            )
+            self._conn.commit()
+        row = self._conn.execute(
+            "SELECT id FROM namespaces WHERE params = ?", (params,)
+        ).fetchone()
+        # A read-only handle on a cache that never saw these params simply misses.
+        self._ns = row[0] if row is not None else None
+
+    # -- keys -----------------------------------------------------------------
+    def _canonical(self, key1: bytes, key2: bytes) -> Tuple[bytes, bytes]:
+        if self.symmetric and key2 < key1:
+            return key2, key1
+        return key1, key2
+
+    # -- reads ----------------------------------------------------------------
+    def get(self, key1: bytes, key2: bytes) -> Optional[bytes]:
+        if self._ns is None:
+            return None
+        key1, key2 = self._canonical(key1, key2)
+        row = self._conn.execute(
+            "SELECT value FROM pairs WHERE ns = ? AND key1 = ? AND key2 = ?",
+            (self._ns, key1, key2),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def partners(self, key: bytes) -> Dict[bytes, bytes]:
+        """Every cached ``partner -> value`` for ``key`` (either side if symmetric)."""
+        if self._ns is None:
+            return {}
+        out = {
+            k2: v
+            for k2, v in self._conn.execute(
+                "SELECT key2, value FROM pairs WHERE ns = ? AND key1 = ?", (self._ns, key)
+            )
+        }
+        if self.symmetric:
+            for k1, v in self._conn.execute(
+                "SELECT key1, value FROM pairs WHERE ns = ? AND key2 = ?", (self._ns, key)
+            ):
+                out[k1] = v
+        return out
+
+    def among(self, keys: Sequence[bytes]) -> Dict[Tuple[bytes, bytes], bytes]:
+        """Every cached entry whose two keys are both in ``keys``, keyed by the stored
+        (canonical when symmetric) ``(key1, key2)`` pair."""
+        if self._ns is None:
+            return {}
+        unique = sorted(set(keys))
+        if not unique:
+            return {}
+        out: Dict[Tuple[bytes, bytes], bytes] = {}
+        if 2 * len(unique) <= _MAX_SQL_VARIABLES:
+            marks = ",".join("?" * len(unique))
+            for k1, k2, v in self._conn.execute(
+                f"SELECT key1, key2, value FROM pairs "
+                f"WHERE ns = ? AND key1 IN ({marks}) AND key2 IN ({marks})",
+                (self._ns, *unique, *unique),
+            ):
+                out[(k1, k2)] = v
+            return out
+        wanted = set(unique)
+        for key in unique:
+            for k2, v in self._conn.execute(
+                "SELECT key2, value FROM pairs WHERE ns = ? AND key1 = ?", (self._ns, key)
+            ):
+                if k2 in wanted:
+                    out[(key, k2)] = v
+        return out
+
+    # -- writes ---------------------------------------------------------------
+    def put_many(self, entries: Iterable[Tuple[bytes, bytes, bytes]]) -> int:
+        """Insert-or-replace ``(key1, key2, value)`` entries in one transaction."""
+        if self.readonly:
+            raise RuntimeError(f"alignment cache {self.path} was opened read-only")
+        rows: List[Tuple[int, bytes, bytes, bytes]] = []
+        for key1, key2, value in entries:
+            key1, key2 = self._canonical(key1, key2)
+            rows.append((self._ns, key1, key2, value))
+        if rows:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO pairs (ns, key1, key2, value) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+        return len(rows)
+
+    def put(self, key1: bytes, key2: bytes, value: bytes) -> None:
+        self.put_many([(key1, key2, value)])
+
+    def __len__(self) -> int:
+        if self._ns is None:
+            return 0
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM pairs WHERE ns = ?", (self._ns,)
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "AlignmentCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,10 +1,26 @@
 from __future__ import annotations
 
+"""Embedding loading: binary ``.npy`` store first, CSV as the fallback.
+
+The ESM extractor writes ``<input>_embedding_esm1b.npy`` (an (n, d) float matrix,
+memory-mapped on read) plus an ``<input>_embedding_esm1b_ids.txt`` sidecar (one
+record id per line, same row order). The 1280-column CSV is only an optional
+export now; every loader resolves the store from either path, so callers that
+still pass ``..._embedding_esm1b.csv`` transparently read the binary file.
+"""
+
 import ast
-from typing import List
+import os
+from typing import List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
+from tps_eval.data.result_cache import ResultCache, open_result_cache
+
+EMBEDDING_STORE_EXTENSION = ".npy"
+EMBEDDING_IDS_SUFFIX = "_ids.txt"
+
 
 def _parse_embedding_cell(value) -> List[float]:
     if isinstance(value, list):
@@ -15,8 +31,85 @@ def _parse_embedding_cell(value) -> List[float]:
     raise ValueError(f"Unsupported embedding value type: {type(value)!r}")
 
 
+def embedding_store_paths(file_path: str) -> Tuple[str, str]:
+    """(matrix ``.npy``, id sidecar) paths sharing ``file_path``'s stem."""
+    stem = os.path.splitext(str(file_path))[0]
+    return stem + EMBEDDING_STORE_EXTENSION, stem + EMBEDDING_IDS_SUFFIX
+
+
+def save_embedding_store(
+    file_path: str,
+    ids: Sequence[str],
+    embeddings: np.ndarray,
+    *,
+    dtype: str = "float32",
+) -> str:
+    """Write the binary store for ``file_path``'s stem; returns the ``.npy`` path.
+
+    Both files are written to temporaries and renamed into place, ids first, so a
+    crashed job never leaves a matrix next to a mismatched id list.
+    """
+    embeddings = np.asarray(embeddings, dtype=dtype)
+    ids = [str(i) for i in ids]
+    if embeddings.ndim != 2 or embeddings.shape[0] != len(ids):
+        raise ValueError(
+            f"embeddings shape {embeddings.shape} does not match {len(ids)} ids"
+        )
+    npy_path, ids_path = embedding_store_paths(file_path)
+    with open(ids_path + ".tmp", "w") as handle:
+        handle.writelines(f"{i}\n" for i in ids)
+    os.replace(ids_path + ".tmp", ids_path)
+    with open(npy_path + ".tmp", "wb") as handle:
+        np.save(handle, embeddings)
+    os.replace(npy_path + ".tmp", npy_path)
+    return npy_path
+
+
+def find_embedding_store(file_path: str) -> Optional[str]:
+    """The ``.npy`` store to read for ``file_path``, or None to fall back to CSV.
+
+    The store wins whenever both files exist, unless ``file_path`` names a CSV
+    that is newer than the store (e.g. re-exported by hand after the extraction).
+    """
+    npy_path, ids_path = embedding_store_paths(file_path)
+    if not (os.path.isfile(npy_path) and os.path.isfile(ids_path)):
+        return None
+    file_path = str(file_path)
+    if file_path != npy_path and os.path.isfile(file_path):
+        if os.path.getmtime(file_path) > os.path.getmtime(npy_path):
+            return None
+    return npy_path
+
+
+def load_embedding_store(file_path: str, *, mmap: bool = True) -> Tuple[List[str], np.ndarray]:
+    """Read (ids, (n, d) matrix) from the store; the matrix is a read-only memmap
+    unless ``mmap=False``."""
+    npy_path, ids_path = embedding_store_paths(file_path)
+    with open(ids_path) as handle:
+        ids = [line.rstrip("\n") for line in handle]
+    matrix = np.load(npy_path, mmap_mode="r" if mmap else None)
+    if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+        raise ValueError(
+            f"{npy_path} has shape {matrix.shape} but {ids_path} lists {len(ids)} ids"
+        )
+    return ids, matrix
+
+
 def load_embeddings(file_path: str) -> pd.DataFrame:
-    """Load embedding vectors into a DataFrame with columns ['ID', 'embedding']."""
+    """Load embedding vectors into a DataFrame with columns ['ID', 'embedding'].
+
+    Reads the binary store when one exists for ``file_path`` (rows are then numpy
+    views into the memory-mapped matrix), else the CSV with the same stem (rows are
+    float lists).
+    """
+    store_path = find_embedding_store(file_path)
+    if store_path is not None:
+        ids, matrix = load_embedding_store(store_path)
+        return pd.DataFrame({"ID": ids, "embedding": list(matrix)})
+
+    if str(file_path).endswith(EMBEDDING_STORE_EXTENSION):
+        # A store path from a pipeline whose embeddings predate the store.
+        file_path = os.path.splitext(str(file_path))[0] + ".csv"
     original_df = pd.read_csv(file_path)
 
     if "id" in original_df.columns:
@@ -30,9 +123,7 @@ def load_embeddings(file_path: str) -> pd.DataFrame:
         sequence_embeddings = [_parse_embedding_cell(v) for v in original_df["embedding"].tolist()]
     else:
         feature_df = original_df.drop(columns=[id_col])
-        sequence_embeddings = []
-        for _, row in feature_df.iterrows():
-            sequence_embeddings.append([float(v) for v in row.tolist()])
+        sequence_embeddings = feature_df.to_numpy(dtype=float).tolist()
 
     embedding_df = pd.DataFrame(
         {
@@ -41,3 +132,45 @@ def load_embeddings(file_path: str) -> pd.DataFrame:
         }
     )
     return embedding_df
+
+
+def export_embeddings_csv(file_path: str, csv_path: Optional[str] = None) -> str:
+    """Write the legacy wide CSV (``id`` + one column per dimension) from the store."""
+    ids, matrix = load_embedding_store(file_path)
+    if csv_path is None:
+        csv_path = os.path.splitext(str(file_path))[0] + ".csv"
+    df = pd.concat([pd.DataFrame({"id": ids}), pd.DataFrame(np.asarray(matrix))], axis=1)
+    df.to_csv(csv_path, index=False)
+    return csv_path
+
+
+def encode_embedding(embedding: np.ndarray) -> bytes:
+    """Result-cache codec for one mean-pooled embedding (little-endian float32)."""
+    return np.asarray(embedding, dtype="<f4").tobytes()
+
+
+def decode_embedding(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f4").astype(np.float32)
+
+
+def open_embedding_cache(
+    result_cache: Optional[str],
+    model_location: str,
+    *,
+    layer: int,
+    truncation: int,
+    no_cache: bool = False,
+    **params,
+) -> Optional[ResultCache]:
+    """Result-cache handle for mean-pooled ESM embeddings, shared by
+    ``esm/extract_embeddings.py`` and the fused pseudo-perplexity pass; extra
+    ``params`` (e.g. a reduced precision) split off their own namespace."""
+    return open_result_cache(
+        result_cache,
+        "esm_embedding",
+        model_location,
+        no_cache=no_cache,
+        layer=layer,
+        truncation=truncation,
+        **params,
+    )
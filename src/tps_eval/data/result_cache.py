@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+"""Persistent, content-addressed cache of per-sequence model outputs.
+
+Generation campaigns resubmit overlapping FASTAs (re-ranked subsets, re-filtered
+top-N, merged batches), and every per-sequence predictor — ESM pseudo-perplexity
+and embeddings, TmProt, CataPro, SoluProt, EnzymeExplorer sequence-only — would
+otherwise recompute each design from scratch. With this cache a run looks its
+sequences up, sends only the misses to the model in one batch and writes its CSV
+in the original FASTA order.
+
+Storage is ONE SQLite file (stdlib only — it is imported from the tools' own conda
+envs, some of them Python 3.7), shared by all tools:
+
+    namespaces(id, params)                          one row per tool/model/parameters
+    entries(ns, key, value, bytes, last_used)       primary key (ns, key)
+    settings(name, value)                           the size budget
+
+* ``key`` is :func:`~tps_eval.data.alignment_cache.sequence_key` — a 16-byte
+  BLAKE2b digest of the sequence text, so renamed designs still hit.
+* The namespace is :func:`cache_namespace` ``(tool, model, **params)``: the tool,
+  the model/checkpoint version and every parameter that changes the result. Bump
+  the model string when the computation changes.
+* ``value`` is an opaque BLOB; each tool owns its codec (``pack_floats``, float32
+  bytes for embeddings, JSON for CSV rows).
+* Size-bounded LRU: lookups refresh ``last_used`` (a per-file tick, not wall
+  time) and each write trims the least recently used entries — across ALL tools —
+  until the file's payload fits the budget (``DEFAULT_MAX_BYTES`` unless set with
+  ``python -m tps_eval.data.result_cache <path> --max_gb N``). The payload size is
+  a counter in ``settings`` kept in step with every insert/replace/eviction, so a
+  write never scans the table. Hits are not written back one lookup at a time: the
+  handle remembers them and refreshes them in its next write transaction
+  (:meth:`ResultCache.flush`, also run by ``put_many`` and ``close``).
+* Only real results are cached — a tool returns ``None`` for a sequence it failed
+  on or silently dropped, and :func:`cached_results` retries it next time.
+
+Concurrency: same rules as the alignment cache (see
+:mod:`tps_eval.data.alignment_cache`) — rollback journal, never WAL, and writers
+wait up to ``BUSY_TIMEOUT_S`` for the file lock. Every write is ONE ``BEGIN
+IMMEDIATE`` transaction, so concurrent jobs cannot interleave the size counter.
+Jobs on different nodes are only safe where the shared filesystem honours POSIX
+locks across clients; otherwise keep the file on node-local storage (one host).
+"""
+
+import argparse
+import json
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from tps_eval.data.alignment_cache import KEY_BYTES, connect_cache_db, sequence_key
+
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+
+_MAX_SQL_VARIABLES = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS namespaces (
+    id INTEGER PRIMARY KEY,
+    params TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS entries (
+    ns INTEGER NOT NULL,
+    key BLOB NOT NULL,
+    value BLOB NOT NULL,
+    bytes INTEGER NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (ns, key)
+);
+CREATE INDEX IF NOT EXISTS entries_by_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def cache_namespace(tool: str, model: str, **params) -> str:
+    """``"tool|model|k1=v1:k2=v2"`` with the parameters in sorted order."""
+    fingerprint = ":".join(f"{k}={params[k]}" for k in sorted(params))
+    return f"{tool}|{model}|{fingerprint}"
+
+
+def _chunks(values: Sequence, size: int = _MAX_SQL_VARIABLES):
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+class ResultCache:
+    """SQLite-backed ``(namespace, sequence key) -> value`` store with an LRU size
+    budget. See the module docstring."""
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        *,
+        max_bytes: Optional[int] = None,
+        readonly: bool = False,
+    ):
+        self.path = str(path)
+        self.namespace = namespace
+        self.readonly = readonly
+        self._touched: set = set()
+        self._conn = connect_cache_db(self.path, readonly=readonly)
+        if not readonly:
+            self._conn.executescript(_SCHEMA)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO namespaces (params) VALUES (?)", (namespace,)
+                )
+                # Files written before the counter existed: count them once.
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO settings (name, value) "
+                    "SELECT 'total_bytes', COALESCE(SUM(bytes), 0) FROM entries"
+                )
+            if max_bytes is not None:
+                self.set_max_bytes(max_bytes)
+        row = self._conn.execute(
+            "SELECT id FROM namespaces WHERE params = ?", (namespace,)
+        ).fetchone()
+        self._ns = row[0] if row is not None else None
+
+    # -- budget ---------------------------------------------------------------
+    @property
+    def max_bytes(self) -> int:
+        row = self._conn.execute(
+            "SELECT value FROM settings WHERE name = 'max_bytes'"
+        ).fetchone()
+        return DEFAULT_MAX_BYTES if row is None else int(row[0])
+
+    def set_max_bytes(self, max_bytes: int) -> int:
+        """Persist a new budget for the whole file and trim to it; returns the
+        number of evicted entries."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO settings (name, value) VALUES ('max_bytes', ?)",
+                (str(int(max_bytes)),),
+            )
+        return self.evict()
+
+    def total_bytes(self) -> int:
+        row = self._conn.execute(
+            "SELECT value FROM settings WHERE name = 'total_bytes'"
+        ).fetchone()
+        if row is None:  # read-only handle on a file without the counter
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(bytes), 0) FROM entries"
+            ).fetchone()[0]
+        return int(row[0])
+
+    def _tick(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(MAX(last_used), 0) + 1 FROM entries"
+        ).fetchone()[0]
+
+    def _add_bytes(self, delta: int) -> None:
+        if delta:
+            self._conn.execute(
+                "UPDATE settings SET value = CAST(value AS INTEGER) + ? "
+                "WHERE name = 'total_bytes'",
+                (int(delta),),
+            )
+
+    def _write(self, body: Callable[[], int]) -> int:
+        """Run ``body`` in ONE immediate (write-locked) transaction."""
+        if self.readonly:
+            raise RuntimeError(f"result cache {self.path} was opened read-only")
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = body()
+        except BaseException:
+            self._conn.rollback()
+            raise
+        self._conn.commit()
+        return result
+
+    def _evict(self, budget: int) -> int:
+        excess = self.total_bytes() - budget
+        if excess <= 0:
+            return 0
+        victims: List[Tuple[int]] = []
+        freed = 0
+        for rowid, size in self._conn.execute(
+            "SELECT rowid, bytes FROM entries ORDER BY last_used"
+        ):
+            victims.append((rowid,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE rowid = ?", victims)
+        self._add_bytes(-freed)
+        return len(victims)
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Drop least recently used entries (any namespace) until the payload fits
+        ``max_bytes`` (default: the file's budget)."""
+        budget = self.max_bytes if max_bytes is None else int(max_bytes)
+        return self._write(lambda: self._evict(budget))
+
+    # -- reads ----------------------------------------------------------------
+    def get_many(self, keys: Iterable[bytes]) -> Dict[bytes, bytes]:
+        """Cached ``key -> value`` for every hit among ``keys``. Unless the handle is
+        read-only the hits' LRU position is refreshed at the next write
+        (:meth:`flush`), not here."""
+        if self._ns is None:
+            return {}
+        unique = sorted(set(keys))
+        out: Dict[bytes, bytes] = {}
+        for chunk in _chunks(unique):
+            marks = ",".join("?" * len(chunk))
+            for key, value in self._conn.execute(
+                f"SELECT key, value FROM entries WHERE ns = ? AND key IN ({marks})",
+                (self._ns, *chunk),
+            ):
+                out[key] = value
+        if not self.readonly:
+            self._touched.update(out)
+        return out
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    # -- writes ---------------------------------------------------------------
+    def put_many(self, entries: Iterable[Tuple[bytes, bytes]]) -> int:
+        """Insert-or-replace ``(key, value)`` entries, refresh the hits read since
+        the last write and trim the file to its budget — all in one transaction."""
+        if self.readonly:
+            raise RuntimeError(f"result cache {self.path} was opened read-only")
+        latest = dict(entries)
+        if not latest and not self._touched:
+            return 0
+
+        def body() -> int:
+            tick = self._tick()
+            keys = sorted(latest)
+            replaced = 0
+            for chunk in _chunks(keys):
+                marks = ",".join("?" * len(chunk))
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(bytes), 0) FROM entries "
+                    f"WHERE ns = ? AND key IN ({marks})",
+                    (self._ns, *chunk),
+                ).fetchone()[0]
+            rows = [
+                (self._ns, key, latest[key], len(latest[key]) + KEY_BYTES, tick)
+                for key in keys
+            ]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (ns, key, value, bytes, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._add_bytes(sum(row[3] for row in rows) - replaced)
+            touched = sorted(self._touched.difference(latest))
+            for chunk in _chunks(touched):
+                marks = ",".join("?" * len(chunk))
+                self._conn.execute(
+                    f"UPDATE entries SET last_used = ? WHERE ns = ? AND key IN ({marks})",
+                    (tick, self._ns, *chunk),
+                )
+            self._evict(self.max_bytes)
+            return len(rows)
+
+        written = self._write(body)
+        self._touched.clear()
+        return written
+
+    def flush(self) -> None:
+        """Write back the LRU refresh of the hits read since the last write."""
+        if self._touched and not self.readonly:
+            self.put_many([])
+
+    def put(self, key: bytes, value: bytes) -> None:
+        self.put_many([(key, value)])
+
+    def __len__(self) -> int:
+        if self._ns is None:
+            return 0
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE ns = ?", (self._ns,)
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_result_cache(
+    path: Optional[str],
+    tool: str,
+    model: str,
+    *,
+    no_cache: bool = False,
+    **params,
+) -> Optional[ResultCache]:
+    """The tool's cache handle, or None when no path is set or ``no_cache``."""
+    if not path or no_cache:
+        return None
+    return ResultCache(path, cache_namespace(tool, model, **params))
+
+
+def cached_results(
+    sequences: Sequence[str],
+    compute: Callable[[List[str]], Sequence],
+    *,
+    cache: Optional[ResultCache],
+    encode: Callable[[object], bytes],
+    decode: Callable[[bytes], object],
+) -> list:
+    """Per-sequence results in ``sequences`` order, computing only cache misses.
+
+    ``compute`` gets the distinct uncached sequences (first-seen order) as ONE
+    batch and returns one result per sequence; a ``None`` result is passed
+    through but not cached (a record the tool failed on or silently dropped —
+    never encode such a failure as a NaN value, it would be cached for good).
+    Without a cache, ``compute`` simply runs on ``sequences``.
+    """
+    if cache is None:
+        return list(compute(list(sequences)))
+    keys = [sequence_key(s) for s in sequences]
+    results = {key: decode(value) for key, value in cache.get_many(keys).items()}
+    n_hits = len(results)
+    missing: Dict[bytes, str] = {}
+    for key, sequence in zip(keys, sequences):
+        if key not in results and key not in missing:
+            missing[key] = sequence
+    new_entries = []
+    if missing:
+        computed = list(compute(list(missing.values())))
+        if len(computed) != len(missing):
+            raise RuntimeError(
+                f"expected {len(missing)} results from the model, got {len(computed)}"
+            )
+        for key, result in zip(missing, computed):
+            results[key] = result
+            if result is not None:
+                new_entries.append((key, encode(result)))
+    # One write for the new entries and the hits' LRU refresh.
+    cache.put_many(new_entries)
+    print(
+        f"[result cache] {cache.path} ({cache.namespace}): {n_hits} cached, "
+        f"{len(missing)} computed"
+    )
+    return [results[key] for key in keys]
+
+
+def json_encode(value) -> bytes:
+    return json.dumps(value).encode("utf-8")
+
+
+def json_decode(blob: bytes):
+    return json.loads(blob.decode("utf-8"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Report a result cache's per-tool usage and optionally set its "
+        "size budget (least recently used entries are evicted to fit)."
+    )
+    parser.add_argument("path", help="Result-cache SQLite file.")
+    parser.add_argument("--max_gb", type=float, default=None, help="New size budget in GiB.")
+    args = parser.parse_args()
+
+    with ResultCache(args.path, "") as cache:
+        if args.max_gb is not None:
+            evicted = cache.set_max_bytes(int(args.max_gb * 1024 ** 3))
+            print(f"Budget set to {args.max_gb:g} GiB ({evicted} entries evicted)")
+        for params, count, size in cache._conn.execute(
+            "SELECT n.params, COUNT(e.key), COALESCE(SUM(e.bytes), 0) "
+            "FROM namespaces n LEFT JOIN entries e ON e.ns = n.id "
+            "WHERE n.params != '' GROUP BY n.id ORDER BY n.params"
+        ):
+            print(f"  {count:>9} entries  {size / 1024 ** 2:>10.1f} MiB  {params}")
+        print(
+            f"Total {cache.total_bytes() / 1024 ** 2:.1f} MiB of "
+            f"{cache.max_bytes / 1024 ** 3:g} GiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
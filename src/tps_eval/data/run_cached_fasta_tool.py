@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+"""Run an external FASTA -> per-sequence CSV predictor through the result cache.
+
+For tools that only exist as a command line in their own conda env (SoluProt,
+EnzymeExplorer sequence-only), the wrapper hands the command to this runner with
+``{fasta}`` / ``{csv}`` placeholders:
+
+    python -m tps_eval.data.run_cached_fasta_tool --fasta_path designs.fasta \\
+        --output_csv designs_soluprot.csv --tool soluprot --model <version> \\
+        --id_column fa_id --result_cache cache.sqlite \\
+        -- python soluprot.py --i_fa {fasta} --o_csv {csv} --tmp_dir /tmp/x
+
+Sequences already in the cache are not sent to the tool; the misses go in one
+temporary FASTA (records renamed ``seq0..``), every returned row is cached as JSON
+(all columns except the id, values kept as the tool's text), and the output CSV
+lists the FASTA records in order — id column first, then the tool's columns. A
+record the tool omits is omitted here too and never cached.
+
+Stdlib only (the SoluProt env is Python 3.7 without the tps_eval dependencies).
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tps_eval.data.result_cache import (
+    cached_results,
+    json_decode,
+    json_encode,
+    open_result_cache,
+)
+
+
+def read_fasta_records(fasta_path: str) -> List[Tuple[str, str]]:
+    """(id, sequence) pairs; id = the header's first whitespace token."""
+    records: List[Tuple[str, str]] = []
+    with open(fasta_path) as handle:
+        for line in handle:
+            line = line.strip()
+            if line.startswith(">"):
+                header = line[1:].split()
+                records.append((header[0] if header else "", ""))
+            elif line and records:
+                records[-1] = (records[-1][0], records[-1][1] + line)
+    return records
+
+
+def _run(command: Sequence[str], fasta_path: str, csv_path: str) -> None:
+    argv = [arg.replace("{fasta}", fasta_path).replace("{csv}", csv_path) for arg in command]
+    proc = subprocess.run(argv)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{argv[0]} exited with status {proc.returncode}")
+    if not os.path.isfile(csv_path):
+        raise RuntimeError(f"{argv[0]} produced no output CSV {csv_path}")
+
+
+def _predict_rows(
+    sequences: List[str], command: Sequence[str], id_column: str
+) -> List[Optional[Dict[str, str]]]:
+    """The tool's output row (minus the id) for each sequence, None if it was dropped."""
+    with tempfile.TemporaryDirectory(prefix="cached_fasta_tool_") as tmp:
+        fasta_path = os.path.join(tmp, "misses.fasta")
+        csv_path = os.path.join(tmp, "misses.csv")
+        with open(fasta_path, "w") as handle:
+            handle.writelines(f">seq{i}\n{seq}\n" for i, seq in enumerate(sequences))
+        _run(command, fasta_path, csv_path)
+        with open(csv_path, newline="") as handle:
+            reader = csv.DictReader(handle)
+            if id_column not in (reader.fieldnames or []):
+                raise RuntimeError(
+                    f"tool output columns {reader.fieldnames} lack the id column {id_column!r}"
+                )
+            rows = {
+                row[id_column]: {k: v for k, v in row.items() if k != id_column}
+                for row in reader
+            }
+    return [rows.get(f"seq{i}") for i in range(len(sequences))]
+
+
+def run_cached_fasta_tool(
+    fasta_path: str,
+    output_csv: str,
+    command: Sequence[str],
+    *,
+    tool: str,
+    model: str,
+    id_column: str = "id",
+    result_cache: Optional[str] = None,
+    no_cache: bool = False,
+) -> int:
+    """Run ``command`` on the cache misses of ``fasta_path`` and write ``output_csv``;
+    returns the number of rows written. Without a cache the tool runs on the FASTA
+    itself and writes ``output_csv`` directly."""
+    cache = open_result_cache(result_cache, tool, model, no_cache=no_cache)
+    if cache is None:
+        _run(command, fasta_path, output_csv)
+        with open(output_csv, newline="") as handle:
+            return sum(1 for _ in csv.DictReader(handle))
+
+    records = read_fasta_records(fasta_path)
+    with cache:
+        rows = cached_results(
+            [seq for _, seq in records],
+            lambda batch: _predict_rows(batch, command, id_column),
+            cache=cache,
+            encode=json_encode,
+            decode=json_decode,
+        )
+    columns = [id_column]
+    for row in rows:
+        if row is not None:
+            columns += list(row)
+            break
+    written = 0
+    with open(output_csv + ".tmp", "w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for (record_id, _), row in zip(records, rows):
+            if row is not None:
+                writer.writerow(dict(row, **{id_column: record_id}))
+                written += 1
+    os.replace(output_csv + ".tmp", output_csv)
+    print(f"Wrote {written} rows to {output_csv}")
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run a FASTA -> per-sequence CSV tool on the sequences missing "
+        "from the result cache only. The command follows '--' and uses {fasta} / "
+        "{csv} placeholders for its input FASTA and output CSV."
+    )
+    parser.add_argument("--fasta_path", required=True)
+    parser.add_argument("--output_csv", required=True)
+    parser.add_argument("--tool", required=True, help="Cache namespace tool name.")
+    parser.add_argument(
+        "--model",
+        required=True,
+        help="Model/installation version; change it whenever the tool's results change.",
+    )
+    parser.add_argument("--id_column", default="id", help="ID column of the tool's CSV.")
+    parser.add_argument("--result_cache", default=None, help="Result-cache file (SQLite).")
+    parser.add_argument("--no_cache", "--no-cache", action="store_true")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        parser.error("missing tool command after '--'")
+    run_cached_fasta_tool(
+        args.fasta_path,
+        args.output_csv,
+        command,
+        tool=args.tool,
+        model=args.model,
+        id_column=args.id_column,
+        result_cache=args.result_cache,
+        no_cache=args.no_cache,
+    )
+
+
+if __name__ == "__main__":
+    main()
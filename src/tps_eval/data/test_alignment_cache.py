@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+"""Self-contained tests for data/alignment_cache.py (persistent alignment cache).
+
+Run from the repo root:
+    python -m pytest src/tps_eval/data/test_alignment_cache.py -q
+
+Temporary SQLite files only. Covers content keys, the float codec, namespaces
+(different parameters never share entries), symmetric canonical ordering, the
+partner / block lookups the process-pool tools use, read-only handles, and
+persistence across re-opens.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from tps_eval.data.alignment_cache import (
+    AlignmentCache,
+    pack_floats,
+    records_key,
+    sequence_key,
+    unpack_floats,
+)
+
+
+def test_keys_are_content_addressed():
+    assert sequence_key("ACDE") == sequence_key("ACDE")
+    assert sequence_key("ACDE") != sequence_key("ACDF")
+    assert len(sequence_key("ACDE")) == 16
+    assert records_key([("a", "ACDE")]) != records_key([("b", "ACDE")])
+    assert records_key([("a", "AC"), ("b", "DE")]) != records_key([("a", "ACD"), ("b", "E")])
+
+
+def test_float_codec_roundtrip():
+    assert unpack_floats(pack_floats(0.25, 1.0)) == (0.25, 1.0)
+
+
+def test_symmetric_namespace_and_persistence():
+    a, b, c = sequence_key("AAAA"), sequence_key("CCCC"), sequence_key("DDDD")
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "sub", "cache.sqlite")
+        with AlignmentCache(path, "p1", symmetric=True) as cache:
+            assert cache.put_many([(b, a, b"ab"), (a, c, b"ac")]) == 2
+            assert cache.get(a, b) == b"ab"  # either orientation
+            assert cache.get(b, a) == b"ab"
+            assert cache.partners(a) == {b: b"ab", c: b"ac"}
+            assert cache.partners(c) == {a: b"ac"}
+            block = cache.among([a, b])
+            assert list(block.values()) == [b"ab"]
+        with AlignmentCache(path, "p2", symmetric=True) as other:
+            assert other.get(a, b) is None  # other parameters, other namespace
+            assert len(other) == 0
+        with AlignmentCache(path, "p1", symmetric=True, readonly=True) as ro:
+            assert len(ro) == 2  # persisted
+            assert ro.get(b, a) == b"ab"
+            try:
+                ro.put(a, b, b"x")
+            except RuntimeError:
+                pass
+            else:
+                raise AssertionError("read-only cache accepted a write")
+        with AlignmentCache(path, "never-written", readonly=True) as ro:
+            assert ro.partners(a) == {}
+
+
+def test_ordered_namespace_keeps_orientation():
+    a, b = sequence_key("AAAA"), sequence_key("CCCC")
+    with tempfile.TemporaryDirectory() as d:
+        with AlignmentCache(os.path.join(d, "c.sqlite"), "ordered") as cache:
+            cache.put(a, b, b"ab")
+            assert cache.get(a, b) == b"ab"
+            assert cache.get(b, a) is None
+            assert cache.partners(b) == {}
+
+
+def test_rollback_journal_and_writer_waits_for_lock():
+    # Shared-storage safe: no WAL (a file an older version left in WAL mode is
+    # converted), and a second writer waits for the lock instead of failing.
+    a, b = sequence_key("AAAA"), sequence_key("CCCC")
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "c.sqlite")
+        legacy = sqlite3.connect(path)
+        legacy.execute("PRAGMA journal_mode=WAL")
+        legacy.close()
+        with AlignmentCache(path, "p") as cache:
+            mode = cache._conn.execute("PRAGMA journal_mode").fetchone()[0]
+            assert mode == "delete"
+            assert cache._conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+
+            holder = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            holder.execute("BEGIN IMMEDIATE")
+            release = threading.Timer(0.3, lambda: holder.execute("COMMIT"))
+            release.start()
+            started = time.monotonic()
+            cache.put(a, b, b"ab")
+            assert time.monotonic() - started >= 0.2
+            release.join()
+            holder.close()
+            assert cache.get(a, b) == b"ab"
+
+
+def main():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
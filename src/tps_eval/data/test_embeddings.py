@@ -7,9 +7,11 @@ Run from this directory:
 or under pytest:
     cd src/data && python -m pytest test_embeddings.py -q
 
-Synthetic in-memory CSVs only. No torch is required (this loader is pure pandas +
-ast). Covers the cell parser, the id-column auto-detection, both the ``embedding``
-list-column layout and the wide feature-column layout, and a CSV round-trip.
+Synthetic in-memory CSVs / .npy stores only. No torch is required (this loader is
+pure numpy + pandas + ast). Covers the cell parser, the id-column auto-detection,
+both the ``embedding`` list-column layout and the wide feature-column layout, a CSV
+round-trip, and the binary store (round-trip, preference over the CSV, legacy CSV
+fallback, mismatch detection, CSV export).
 """
 
 import os
@@ -20,7 +22,17 @@ from pathlib import Path
 import pandas as pd
 
 
-from tps_eval.data.embeddings import _parse_embedding_cell, load_embeddings  # noqa: E402
+import numpy as np
+
+from tps_eval.data.embeddings import (  # noqa: E402
+    _parse_embedding_cell,
+    embedding_store_paths,
+    export_embeddings_csv,
+    find_embedding_store,
+    load_embedding_store,
+    load_embeddings,
+    save_embedding_store,
+)
 
 
 def _tmp_csv(df: pd.DataFrame) -> str:
@@ -67,6 +79,67 @@ def test_id_column_is_stringified():
     print("ok id_column_is_stringified")
 
 
+def test_embedding_store_roundtrip_is_memory_mapped():
+    tmp = tempfile.mkdtemp(prefix="embeddings_")
+    matrix = np.arange(6, dtype=float).reshape(3, 2)
+    npy = save_embedding_store(os.path.join(tmp, "x_embedding_esm1b.csv"), ["a", "b", 7], matrix)
+    assert npy == os.path.join(tmp, "x_embedding_esm1b.npy")
+    assert embedding_store_paths(npy)[1] == os.path.join(tmp, "x_embedding_esm1b_ids.txt")
+    ids, loaded = load_embedding_store(npy)
+    assert ids == ["a", "b", "7"]
+    assert isinstance(loaded, np.memmap) and loaded.dtype == np.float32
+    assert np.array_equal(loaded, matrix)
+    half = save_embedding_store(os.path.join(tmp, "h.npy"), ["a", "b", "c"], matrix, dtype="float16")
+    assert load_embedding_store(half, mmap=False)[1].dtype == np.float16
+    print("ok embedding_store_roundtrip_is_memory_mapped")
+
+
+def test_store_preferred_over_csv_and_csv_fallback():
+    tmp = tempfile.mkdtemp(prefix="embeddings_")
+    csv = os.path.join(tmp, "e.csv")
+    pd.DataFrame({"id": ["x"], "0": [9.0], "1": [9.0]}).to_csv(csv, index=False)
+    # Only the CSV: the .npy-named path falls back to it.
+    assert find_embedding_store(csv) is None
+    assert load_embeddings(os.path.join(tmp, "e.npy"))["embedding"].tolist() == [[9.0, 9.0]]
+    save_embedding_store(csv, ["y"], np.array([[1.0, 2.0]]))
+    os.utime(csv, (0, 0))  # CSV older than the store
+    out = load_embeddings(csv)
+    assert list(out["ID"]) == ["y"]
+    assert np.array_equal(np.stack(out["embedding"].tolist()), [[1.0, 2.0]])
+    # A CSV re-exported after the store wins over the stale store.
+    future = os.path.getmtime(os.path.join(tmp, "e.npy")) + 10
+    os.utime(csv, (future, future))
+    assert list(load_embeddings(csv)["ID"]) == ["x"]
+    print("ok store_preferred_over_csv_and_csv_fallback")
+
+
+def test_store_mismatch_and_csv_export():
+    tmp = tempfile.mkdtemp(prefix="embeddings_")
+    try:
+        save_embedding_store(os.path.join(tmp, "m.npy"), ["a"], np.zeros((2, 3)))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError for ids/rows mismatch")
+    npy = save_embedding_store(os.path.join(tmp, "m.npy"), ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    with open(embedding_store_paths(npy)[1], "a") as handle:
+        handle.write("c\n")
+    try:
+        load_embedding_store(npy)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError for a truncated store")
+    npy = save_embedding_store(os.path.join(tmp, "ok.npy"), ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    csv = export_embeddings_csv(npy)
+    assert csv == os.path.join(tmp, "ok.csv")
+    os.remove(npy)
+    out = load_embeddings(csv)
+    assert list(out["ID"]) == ["a", "b"]
+    assert out["embedding"].tolist() == [[1.0, 2.0], [3.0, 4.0]]
+    print("ok store_mismatch_and_csv_export")
+
+
 def main():
     tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
     for t in tests:
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+"""Self-contained tests for data/result_cache.py (per-sequence result cache) and
+the data/run_cached_fasta_tool.py driver built on it.
+
+Run from the repo root:
+    python -m pytest src/tps_eval/data/test_result_cache.py -q
+
+Temporary SQLite files only. Covers namespaces, batched miss computation in the
+original order (duplicates computed once, ``None`` never cached), the LRU size
+budget (persisted in the file; incremental size counter, LRU refresh deferred to
+the next write), read-only handles, ``no_cache``, and the
+external-tool driver against a tiny Python stand-in CLI.
+"""
+
+import csv
+import os
+import sys
+import tempfile
+
+from tps_eval.data.alignment_cache import pack_floats, sequence_key, unpack_floats
+from tps_eval.data.result_cache import (
+    ResultCache,
+    cache_namespace,
+    cached_results,
+    open_result_cache,
+)
+from tps_eval.data.run_cached_fasta_tool import run_cached_fasta_tool
+
+
+def _length_model(calls):
+    def compute(batch):
+        calls.append(list(batch))
+        return [None if s == "X" else float(len(s)) for s in batch]
+
+    return compute
+
+
+def test_namespace_is_order_independent():
+    assert cache_namespace("t", "m1", b=2, a=1) == "t|m1|a=1:b=2"
+    assert cache_namespace("t", "m1") != cache_namespace("t", "m2")
+    assert open_result_cache(None, "t", "m") is None
+    assert open_result_cache("unused.sqlite", "t", "m", no_cache=True) is None
+
+
+def test_cached_results_computes_misses_once_in_order():
+    calls = []
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "sub", "rc.sqlite")
+        codec = dict(encode=pack_floats, decode=lambda b: unpack_floats(b)[0])
+        with ResultCache(path, cache_namespace("len", "v1")) as cache:
+            first = cached_results(["AAA", "C", "AAA", "X"], _length_model(calls), cache=cache, **codec)
+            assert first == [3.0, 1.0, 3.0, None]
+            assert calls == [["AAA", "C", "X"]]  # duplicates once, one batch
+            second = cached_results(["C", "GG", "AAA", "X"], _length_model(calls), cache=cache, **codec)
+            assert second == [1.0, 2.0, 3.0, None]
+            assert calls[-1] == ["GG", "X"]  # None results are retried, not cached
+            assert len(cache) == 3
+        with ResultCache(path, cache_namespace("len", "v2")) as other:
+            assert other.get(sequence_key("AAA")) is None
+        with ResultCache(path, cache_namespace("len", "v1"), readonly=True) as ro:
+            assert unpack_floats(ro.get(sequence_key("GG"))) == (2.0,)
+        assert cached_results(["AB"], _length_model(calls), cache=None, **codec) == [2.0]
+
+
+def test_lru_budget_evicts_least_recently_used():
+    a, b, c = (sequence_key(s) for s in ("A", "B", "C"))
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "rc.sqlite")
+        entry = 100 + 16
+        with ResultCache(path, "ns", max_bytes=2 * entry) as cache:
+            cache.put(a, b"x" * 100)
+            cache.put(b, b"y" * 100)
+            assert cache.get(a) is not None  # a is now more recent than b
+            cache.put(c, b"z" * 100)
+            assert cache.get(b) is None
+            assert cache.get(a) is not None and cache.get(c) is not None
+            assert cache.total_bytes() == 2 * entry
+        with ResultCache(path, "other") as reopened:
+            assert reopened.max_bytes == 2 * entry  # the budget lives in the file
+            assert reopened.set_max_bytes(entry) == 1
+            assert reopened.total_bytes() == entry
+
+
+def test_size_counter_and_deferred_lru_refresh():
+    """The payload counter follows replaces and evictions without rescanning; hits
+    are refreshed at the next write, not per lookup; the file uses a rollback
+    journal (no WAL on shared storage)."""
+    a, b = sequence_key("A"), sequence_key("B")
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "rc.sqlite")
+        with ResultCache(path, "ns") as cache:
+            assert cache._conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+            cache.put_many([(a, b"x" * 10), (b, b"y" * 20)])
+            cache.put(a, b"x" * 40)  # replace: counts the new size only
+            assert cache.total_bytes() == (40 + 16) + (20 + 16)
+            ticks = dict(cache._conn.execute("SELECT key, last_used FROM entries"))
+            assert cache.get(b) is not None
+            assert dict(cache._conn.execute("SELECT key, last_used FROM entries")) == ticks
+        with ResultCache(path, "ns") as cache:  # close() wrote the refresh back
+            ticks = dict(cache._conn.execute("SELECT key, last_used FROM entries"))
+            assert ticks[b] > ticks[a]
+            assert cache.evict(20 + 16) == 1  # a is now the least recently used
+            assert cache.total_bytes() == 20 + 16 and cache.get(b) is not None
+            actual = cache._conn.execute("SELECT SUM(bytes) FROM entries").fetchone()[0]
+            assert cache.total_bytes() == actual
+
+
+_FAKE_TOOL = r"""
+import sys
+fasta, out = sys.argv[1], sys.argv[2]
+with open(fasta) as f:
+    lines = [l.strip() for l in f if l.strip()]
+with open(out, "w") as f:
+    f.write("fa_id,soluble,length\n")
+    for header, seq in zip(lines[::2], lines[1::2]):
+        if seq != "XX":
+            f.write(f"{header[1:]},{len(seq) / 10:.3f},{len(seq)}\n")
+with open(sys.argv[3], "a") as f:
+    f.write(f"{len(lines) // 2}\n")
+"""
+
+
+def test_cached_fasta_tool_runs_misses_and_keeps_fasta_order():
+    with tempfile.TemporaryDirectory() as d:
+        tool = os.path.join(d, "tool.py")
+        with open(tool, "w") as handle:
+            handle.write(_FAKE_TOOL)
+        log = os.path.join(d, "calls.txt")
+        command = [sys.executable, tool, "{fasta}", "{csv}", log]
+        fasta = os.path.join(d, "gen.fasta")
+        cache = os.path.join(d, "rc.sqlite")
+        out = os.path.join(d, "gen_soluprot.csv")
+
+        def run(records):
+            with open(fasta, "w") as handle:
+                handle.writelines(f">{i} desc\n{s}\n" for i, s in records)
+            n = run_cached_fasta_tool(
+                fasta, out, command, tool="fake", model="v1", id_column="fa_id",
+                result_cache=cache,
+            )
+            with open(out, newline="") as handle:
+                return n, list(csv.reader(handle))
+
+        n, rows = run([("b", "MKTA"), ("a", "MK"), ("c", "XX")])
+        assert n == 2
+        assert rows == [["fa_id", "soluble", "length"], ["b", "0.400", "4"], ["a", "0.200", "2"]]
+        n, rows = run([("z", "MK"), ("y", "MKTAYI"), ("b", "MKTA")])
+        assert rows[1:] == [["z", "0.200", "2"], ["y", "0.600", "6"], ["b", "0.400", "4"]]
+        with open(log) as handle:
+            assert handle.read().split() == ["3", "1"]  # 2nd run: only MKTAYI
+
+
+def main():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+"""Self-contained tests for data/topk.py (vectorised top-k neighbour tables).
+
+Run from the repo root:
+    python -m pytest src/tps_eval/data/test_topk.py -q
+
+Checks the partitioned matrix reduction against a stable full argsort (ties, NaN,
+both directions, several blocks), the table builders' ranking / skipping / id
+tokens, the hit-table ranking with tie-breaks and a query order, and the CSV and
+Parquet round trip (Parquet only when pyarrow is installed).
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from tps_eval.data.topk import (
+    TOPK_COLUMNS,
+    read_topk,
+    topk_from_hits,
+    topk_from_lists,
+    topk_indices,
+    topk_table,
+    write_topk,
+)
+
+
+def test_topk_indices_matches_stable_argsort():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 5, size=(37, 23)).astype(float)  # many ties
+    scores[3, :] = 1.0
+    scores[5, [0, 7, 9]] = np.nan
+    for largest in (False, True):
+        key = np.where(np.isnan(scores), np.inf, -scores if largest else scores)
+        for k in (1, 4, 23, 40):
+            expected = np.argsort(key, axis=1, kind="stable")[:, : min(k, 23)]
+            values, indices = topk_indices(scores, k, largest=largest, block_rows=8)
+            assert np.array_equal(indices, expected), (largest, k)
+            assert np.array_equal(values, np.take_along_axis(scores, expected, axis=1), equal_nan=True)
+    values, indices = topk_indices(np.zeros((0, 4)), 3)
+    assert values.shape == indices.shape == (0, 3)
+
+
+def test_topk_table_skips_empty_slots_and_reranks():
+    table = topk_table(
+        ["q1 some description", "q2", ""],
+        ["r0 x", "r1", "r2"],
+        np.array([[np.inf, 0.5, 0.7], [0.1, np.nan, 0.2], [0.3, 0.4, 0.9]]),
+        np.array([[0, 1, 2], [2, 0, -1], [1, 0, 2]]),
+    )
+    assert list(table.columns) == TOPK_COLUMNS
+    assert table.values.tolist() == [
+        ["q1", 1, "r1", 0.5], ["q1", 2, "r2", 0.7],
+        ["q2", 1, "r2", 0.1],
+        ["", 1, "r1", 0.3], ["", 2, "r0", 0.4], ["", 3, "r2", 0.9],
+    ]
+
+
+def test_topk_from_lists():
+    table = topk_from_lists(["a", "b", "c"], ["x", "y", "z"], [[(2, 91.0), (0, 80.5)], [], [(1, 50.0)]])
+    assert table.values.tolist() == [["a", 1, "z", 91.0], ["a", 2, "x", 80.5], ["c", 1, "y", 50.0]]
+    assert topk_from_lists(["a"], ["x"], [[]]).empty
+
+
+def test_topk_from_hits_ties_keep_table_order():
+    hits = pd.DataFrame(
+        {
+            "query": ["q2", "q1", "q2", "q1", "q1", "q2"],
+            "target": ["t1", "t2", "t3", "t4", "t5", "t6"],
+            "tm": [0.5, 0.9, 0.7, 0.9, 0.3, 0.5],
+        }
+    )
+    table = topk_from_hits(hits, 2, query="query", neighbour="target", score="tm")
+    assert table.values.tolist() == [
+        ["q1", 1, "t2", 0.9], ["q1", 2, "t4", 0.9],
+        ["q2", 1, "t3", 0.7], ["q2", 2, "t1", 0.5],
+    ]
+    ascending = topk_from_hits(hits, 1, query="query", neighbour="target", score="tm", ascending=True)
+    assert ascending["neighbour_id"].tolist() == ["t5", "t1"]
+
+
+def test_topk_from_hits_tiebreak_and_query_order():
+    hits = pd.DataFrame(
+        {
+            "qseqid": ["b", "b", "b", "a", "zz"],
+            "sseqid": ["s3", "s1", "s2", "s1", "s9"],
+            "score": [90.0, 90.0, 90.0, 40.0, 99.0],
+            "_bits": [10.0, 10.0, 20.0, 5.0, 1.0],
+        }
+    )
+    table = topk_from_hits(
+        hits, 5, query="qseqid", neighbour="sseqid", score="score",
+        tiebreak=[("_bits", False), ("sseqid", True)], query_order=["b", "c", "a"],
+    )
+    assert table.values.tolist() == [
+        ["b", 1, "s2", 90.0], ["b", 2, "s1", 90.0], ["b", 3, "s3", 90.0],
+        ["a", 1, "s1", 40.0],
+    ]
+    assert list(topk_from_hits(hits.iloc[:0], 3, query="qseqid", neighbour="sseqid",
+                               score="score").columns) == TOPK_COLUMNS
+
+
+def test_write_and_read_csv_and_parquet():
+    table = topk_from_lists(["q1", "q2"], ["r0", "r1"], [[(1, 0.25), (0, 0.5)], [(0, 0.75)]])
+    suffixes = [".csv"]
+    try:
+        import pyarrow  # noqa: F401
+        suffixes.append(".parquet")
+    except ImportError:
+        pass
+    with tempfile.TemporaryDirectory() as d:
+        for suffix in suffixes:
+            path = os.path.join(d, f"topk{suffix}")
+            write_topk(table, path)
+            back = read_topk(path)
+            assert back.values.tolist() == table.values.tolist(), suffix
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "topk.csv")
+        write_topk(table, path)
+        with open(path) as fh:
+            assert fh.readline().strip() == "query_id,rank,neighbour_id,score"
+
+
+def main():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+"""Vectorised top-k neighbour tables shared by the feeder tools.
+
+Every nearest-neighbour tool (``max_sequence_identity``, ``min_embedding_distance``,
+``local_sequence_search``, ``structural_identity``) writes the same tidy table
+
+    query_id,rank,neighbour_id,score
+
+that ``knn_label_transfer`` and ``sdr_divergence`` read back. The helpers here
+build it from whatever form the tool's search produces, in whole-array passes —
+no per-query ``argsort`` or ``iterrows`` loop:
+
+* :func:`topk_indices` — a dense (queries x references) score matrix, reduced
+  block by block with a partition to the k-th value (only the few candidates at or
+  above it are sorted);
+* :func:`topk_table` — (n, k) ``(scores, indices)`` arrays, e.g. from
+  ``nearest_embedding_neighbours``;
+* :func:`topk_from_lists` — per-query lists of ``(reference index, score)``;
+* :func:`topk_from_hits` — a long hit table (foldseek / MMseqs2 / DIAMOND), ranked
+  with one sort and ``groupby().head(k)``.
+
+Ranking is deterministic: ties keep the lower reference index (a stable sort), or
+the hit table's own order / explicit tie-break columns. Query and neighbour ids
+are the first whitespace token of the FASTA/CSV identifier, as before.
+
+:func:`write_topk` writes CSV, or Parquet when the path ends in ``.parquet``
+(needs ``pyarrow``); :func:`read_topk` reads either.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+TOPK_COLUMNS = ["query_id", "rank", "neighbour_id", "score"]
+
+# Query rows per block in topk_indices: bounds the working copy of the score
+# matrix to block_rows x n_references floats.
+DEFAULT_BLOCK_ROWS = 4096
+
+
+def first_tokens(ids: Sequence) -> np.ndarray:
+    """``str(id).split()[0]`` for every id, as an object array (empty ids stay empty)."""
+    text = pd.Series(list(ids), dtype=object).astype(str)
+    first = text.str.split(n=1).str[0]
+    return first.where(first.notna(), text).to_numpy(dtype=object)
+
+
+def _empty_table() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "query_id": pd.Series([], dtype=object),
+            "rank": pd.Series([], dtype=np.int64),
+            "neighbour_id": pd.Series([], dtype=object),
+            "score": pd.Series([], dtype=float),
+        }
+    )
+
+
+def _ranked_table(query_ids, neighbour_ids, rows, cols, scores) -> pd.DataFrame:
+    """Tidy table from flat hits already grouped by query (``rows``) in rank order."""
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return _empty_table()
+    starts = np.ones(len(rows), dtype=bool)
+    starts[1:] = rows[1:] != rows[:-1]
+    positions = np.arange(len(rows))
+    rank = positions - np.maximum.accumulate(np.where(starts, positions, 0)) + 1
+    return pd.DataFrame(
+        {
+            "query_id": first_tokens(query_ids)[rows],
+            "rank": rank,
+            "neighbour_id": first_tokens(neighbour_ids)[np.asarray(cols, dtype=np.int64)],
+            "score": np.asarray(scores, dtype=float),
+        }
+    )
+
+
+def topk_indices(
+    scores: np.ndarray,
+    k: int,
+    *,
+    largest: bool = False,
+    block_rows: int = DEFAULT_BLOCK_ROWS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Per row, the ``k`` best columns of a dense score matrix.
+
+    ``largest`` ranks by descending score (identities, TM-scores); the default is
+    ascending (distances). Ties go to the lower column index and NaN ranks last,
+    so the result equals a stable ``argsort`` cut at k. Returns ``(values,
+    indices)``, both (n_rows, min(k, n_columns)).
+    """
+    scores = np.asarray(scores, dtype=float)
+    n, m = scores.shape
+    k = max(0, min(int(k), m))
+    indices = np.zeros((n, k), dtype=np.int64)
+    if n == 0 or k == 0:
+        return np.zeros((n, k)), indices
+    block_rows = max(1, int(block_rows))
+    for r0 in range(0, n, block_rows):
+        key = -scores[r0 : r0 + block_rows] if largest else scores[r0 : r0 + block_rows].copy()
+        key[np.isnan(key)] = np.inf
+        if k < m:
+            kth = np.take_along_axis(key, np.argpartition(key, k - 1, axis=1)[:, k - 1 : k], axis=1)
+            rows, cols = np.nonzero(key <= kth)
+        else:
+            rows, cols = np.nonzero(np.ones(key.shape, dtype=bool))
+        order = np.lexsort((cols, key[rows, cols], rows))
+        rows, cols = rows[order], cols[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+        keep = rank < k
+        indices[r0 + rows[keep], rank[keep]] = cols[keep]
+    return np.take_along_axis(scores, indices, axis=1), indices
+
+
+def topk_table(
+    query_ids: Sequence,
+    neighbour_ids: Sequence,
+    scores: np.ndarray,
+    indices: np.ndarray,
+) -> pd.DataFrame:
+    """Tidy table from (n_queries, k) ``scores`` / ``indices`` arrays in rank order.
+
+    Empty slots (index ``-1``, or a non-finite score such as an excluded self) are
+    skipped and the remaining neighbours ranked 1, 2, ..."""
+    scores = np.asarray(scores, dtype=float)
+    indices = np.asarray(indices, dtype=np.int64)
+    rows, slots = np.nonzero((indices >= 0) & np.isfinite(scores))
+    return _ranked_table(query_ids, neighbour_ids, rows, indices[rows, slots], scores[rows, slots])
+
+
+def topk_from_lists(
+    query_ids: Sequence,
+    neighbour_ids: Sequence,
+    ranked: Sequence[Sequence[Tuple[int, float]]],
+) -> pd.DataFrame:
+    """Tidy table from per-query lists of ``(neighbour index, score)``, best first."""
+    lengths = np.fromiter((len(r) for r in ranked), dtype=np.int64, count=len(ranked))
+    flat = np.array([hit for r in ranked for hit in r], dtype=float).reshape(-1, 2)
+    rows = np.repeat(np.arange(len(ranked)), lengths)
+    return _ranked_table(query_ids, neighbour_ids, rows, flat[:, 0].astype(np.int64), flat[:, 1])
+
+
+def topk_from_hits(
+    hits: pd.DataFrame,
+    k: int,
+    *,
+    query: str,
+    neighbour: str,
+    score: str,
+    ascending: bool = False,
+    tiebreak: Sequence[Tuple[str, bool]] = (),
+    query_order: Optional[Sequence] = None,
+) -> pd.DataFrame:
+    """Top ``k`` rows per query of a long hit table, as the tidy table.
+
+    Hits are ranked by ``score`` (descending unless ``ascending``), then by the
+    ``(column, ascending)`` pairs of ``tiebreak``, then in table order. Queries come
+    out sorted, or in ``query_order`` (whose queries without hits are skipped, as
+    are hits of queries not in it). ``query`` / ``neighbour`` values are written
+    as they are; ``score`` as float."""
+    if hits.empty:
+        return _empty_table()
+    if query_order is not None:
+        position = {q: i for i, q in reversed(list(enumerate(query_order)))}
+        group = hits[query].map(position)
+        hits = hits[group.notna()]
+        group = group[group.notna()]
+    else:
+        group = hits[query]
+    keys = [score] + [column for column, _ in tiebreak]
+    directions = [ascending] + [asc for _, asc in tiebreak]
+    ordered = hits.assign(__group=group.to_numpy()).sort_values(
+        ["__group"] + keys, ascending=[True] + directions, kind="stable"
+    )
+    top = ordered.groupby("__group", sort=False).head(k)
+    return pd.DataFrame(
+        {
+            "query_id": top[query].to_numpy(dtype=object),
+            "rank": top.groupby("__group", sort=False).cumcount().to_numpy() + 1,
+            "neighbour_id": top[neighbour].to_numpy(dtype=object),
+            "score": top[score].to_numpy(dtype=float),
+        }
+    )
+
+
+def write_topk(table: pd.DataFrame, save_path: str) -> None:
+    """Write a top-k table: Parquet for a ``.parquet`` path, CSV otherwise."""
+    if str(save_path).endswith(".parquet"):
+        table.to_parquet(save_path, index=False)
+    else:
+        table.to_csv(save_path, index=False)
+
+
+def read_topk(path: str) -> pd.DataFrame:
+    """Read a top-k table written by :func:`write_topk` (CSV or ``.parquet``)."""
+    if str(path).endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
@@ -21,9 +21,18 @@ import numpy as np
 
 from esm import Alphabet, FastaBatchedDataset, ProteinBertModel, pretrained, MSATransformer
 
-import pandas as pd
+from tps_eval.data.embeddings import (
+    decode_embedding,
+    encode_embedding,
+    export_embeddings_csv,
+    open_embedding_cache,
+    save_embedding_store,
+)
+from tps_eval.data.result_cache import cached_results
 
 EMBEDDING_LENGTH = 1280
+# Layer whose mean-pooled representation is stored (final ESM-1b layer).
+EMBEDDING_LAYER = 33
 
 
 def create_parser():
@@ -72,28 +81,40 @@ def create_parser():
     parser.add_argument("--drop_description", action="store_true", default=True, help="Drop description from FASTA headers when saving labels")
 
     parser.add_argument("--nogpu", action="store_true", help="Do not use GPU even if available")
+    parser.add_argument(
+        "--dtype",
+        type=str,
+        default="float32",
+        choices=["float32", "float16"],
+        help="storage dtype of the binary <input>_embedding_esm1b.npy store",
+    )
+    parser.add_argument(
+        "--csv",
+        action="store_true",
+        help="also export the legacy wide <input>_embedding_esm1b.csv (id + 1280 columns)",
+    )
+    parser.add_argument(
+        "--result_cache",
+        type=str,
+        default=None,
+        help="persistent result-cache file (SQLite); sequences embedded before are not re-run",
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        help="ignore --result_cache and embed every sequence",
+    )
     return parser
 
 
-def run(args):
-    model, alphabet = pretrained.load_model_and_alphabet(args.model_location)
-    model.eval()
-    if isinstance(model, MSATransformer):
-        raise ValueError(
-            "This script currently does not handle models with MSA input (MSA Transformer)."
-        )
-    if torch.cuda.is_available() and not args.nogpu:
-        model = model.cuda()
-        print("Transferred model to GPU")
-
-    dataset = FastaBatchedDataset.from_file(args.fasta_file)
+def _embed_sequences(model, alphabet, args, sequences):
+    """Mean layer-33 representation of each sequence, in input order."""
+    dataset = FastaBatchedDataset([str(i) for i in range(len(sequences))], list(sequences))
     batches = dataset.get_batch_indices(args.toks_per_batch, extra_toks_per_seq=1)
     data_loader = torch.utils.data.DataLoader(
         dataset, collate_fn=alphabet.get_batch_converter(args.truncation_seq_length), batch_sampler=batches
     )
-    print(f"Read {args.fasta_file} with {len(dataset)} sequences")
-
-    #args.output_dir.mkdir(parents=True, exist_ok=True)
     return_contacts = "contacts" in args.include
 
     assert all(-(model.num_layers + 1) <= i <= model.num_layers for i in args.repr_layers)
@@ -103,8 +124,6 @@ def run(args):
     embeddings = torch.empty(
         (len(dataset), EMBEDDING_LENGTH), dtype=torch.float32
     )
-    saved_embeddings_count = 0
-    embedding_labels = []
 
     with torch.no_grad():
         for batch_idx, (labels, strs, toks) in enumerate(data_loader):
@@ -117,66 +136,83 @@ def run(args):
             out = model(toks, repr_layers=repr_layers, return_contacts=return_contacts)
 
             ##### My saving into single file #####
-            #logits = out["logits"].to(device="cpu")
             representations = {
                 layer: t.to(device="cpu") for layer, t in out["representations"].items()
             }
-            #if return_contacts:
-            #    contacts = out["contacts"].to(device="cpu")
-
 
             for i, label in enumerate(labels):
-                if args.drop_description:
-                    label = label.split(" ")[0]
-                #args.output_file = args.output_dir / f"{label}.pt"
-                #args.output_file.parent.mkdir(parents=True, exist_ok=True)
-                result = {"label": label}
                 truncate_len = min(args.truncation_seq_length, len(strs[i]))
                 # Call clone on tensors to ensure tensors are not views into a larger representation
                 # See https://github.com/pytorch/pytorch/issues/1995
-                
-                #if "per_tok" in args.include:
-                #    result["representations"] = {
-                #        layer: t[i, 1 : truncate_len + 1].clone()
-                #        for layer, t in representations.items()
-                #    }
-                
                 if "mean" in args.include:
-                    result["mean_representations"] = {
-                        layer: t[i, 1 : truncate_len + 1].mean(0).clone()
-                        for layer, t in representations.items()
-                    }
-                
-                #if "bos" in args.include:
-                #    result["bos_representations"] = {
-                #        layer: t[i, 0].clone() for layer, t in representations.items()
-                #    }
-                
-                #if return_contacts:
-                #    result["contacts"] = contacts[i, : truncate_len, : truncate_len].clone()
-
-                embeddings[saved_embeddings_count, :] = result["mean_representations"][33]
-                saved_embeddings_count += 1
-                embedding_labels.append(label)
-
-                #torch.save(
-                #    result,
-                #    args.output_file,
-                #)
-        
+                    embeddings[int(label), :] = (
+                        representations[EMBEDDING_LAYER][i, 1 : truncate_len + 1].mean(0).clone()
+                    )
+
+    return list(embeddings.numpy())
+
+
+def run(args):
+    dataset = FastaBatchedDataset.from_file(args.fasta_file)
+    print(f"Read {args.fasta_file} with {len(dataset)} sequences")
+    embedding_labels = [
+        label.split(" ")[0] if args.drop_description else label
+        for label in dataset.sequence_labels
+    ]
+
+    loaded = {}
+
+    def embed(sequences):
+        if not loaded:
+            model, alphabet = pretrained.load_model_and_alphabet(args.model_location)
+            model.eval()
+            if isinstance(model, MSATransformer):
+                raise ValueError(
+                    "This script currently does not handle models with MSA input (MSA Transformer)."
+                )
+            if torch.cuda.is_available() and not args.nogpu:
+                model = model.cuda()
+                print("Transferred model to GPU")
+            loaded.update(model=model, alphabet=alphabet)
+        return _embed_sequences(loaded["model"], loaded["alphabet"], args, sequences)
+
+    # Only sequences missing from the result cache reach the model.
+    cache = open_embedding_cache(
+        args.result_cache,
+        args.model_location,
+        layer=EMBEDDING_LAYER,
+        truncation=args.truncation_seq_length,
+        no_cache=args.no_cache,
+    )
+    try:
+        embeddings = cached_results(
+            dataset.sequence_strs,
+            embed,
+            cache=cache,
+            encode=encode_embedding,
+            decode=decode_embedding,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+
     # Numpy
     partial_fasta_path = os.path.splitext(args.fasta_file)[0]
     partial_save_path = partial_fasta_path + "_embedding_esm1b"
 
-    # Torch
-    #torch.save(embeddings, partial_save_path + ".pt")
-    #np.save(partial_save_path + ".npy", embeddings.numpy())
+    # Binary store (.npy + _ids.txt sidecar), read by tps_eval.data.embeddings
+    matrix = np.stack(embeddings) if embeddings else np.zeros((0, EMBEDDING_LENGTH), dtype=np.float32)
+    store_path = save_embedding_store(
+        partial_save_path + ".npy",
+        embedding_labels,
+        matrix,
+        dtype=args.dtype,
+    )
+    print(f"Saved {len(embedding_labels)} embeddings to {store_path}")
 
-    # CSV
-    label_df = pd.DataFrame({"id": embedding_labels})
-    embedding_df = pd.DataFrame(embeddings.numpy())
-    df = pd.concat([label_df, embedding_df], axis=1)
-    df.to_csv(partial_save_path + ".csv", index=False)
+    # CSV (optional export)
+    if args.csv:
+        print(f"Exported {export_embeddings_csv(store_path)}")
 
 
 def main():
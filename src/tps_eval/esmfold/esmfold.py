@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import os
+import queue
 import sys
+import threading
+import zipfile
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 
 
 from tps_eval.data.sequences import load_fasta_sequences, separate_identifiers
@@ -24,6 +27,20 @@ MODEL_NAME = "facebook/esmfold_v1"
 CHUNK_LENGTH_THRESHOLD = 600
 DEFAULT_CHUNK_SIZE = 64
 
+# Padded residues (batch rows x longest sequence) per batched forward pass. Sequences
+# are sorted by length first, so padding stays small; a sequence above
+# CHUNK_LENGTH_THRESHOLD always folds on its own (chunked). 1 = one sequence per pass.
+DEFAULT_TOKENS_PER_BATCH = 1024
+
+# <ID>_pae.npz encodings: "compressed" = float32 savez_compressed (the shared
+# schema's default); "float16" = float16 in an uncompressed npz whose ``pae``
+# member can be memory-mapped in place (memmap_npz_array) — half the bytes, no
+# inflate on read.
+PAE_FORMATS = ("compressed", "float16")
+
+# Folded structures waiting for the background writer before folding blocks.
+_WRITER_QUEUE_SIZE = 64
+
 
 def _sanitize_id(record_id: str) -> str:
     """FASTA ids can carry path separators / whitespace that break a filename.
@@ -72,15 +89,15 @@ def _rescale_bfactor_to_0_100(pdb_str: str) -> str:
     return "\n".join(out_lines) + "\n"
 
 
-def _extract_pae(output, seq_len: int):
+def _extract_pae(output, seq_len: int, row: int = 0):
     """Pull the (L, L) Predicted Aligned Error matrix (Angstrom) out of an
     EsmForProteinFolding output, or return None if the head is unavailable.
 
     HF's output carries ``predicted_aligned_error`` as (batch, L, L) in Angstrom
     (the bin-expectation over ``aligned_confidence_probs``). We take batch element
-    0 and crop to the real sequence length defensively (ESMFold here folds with
-    add_special_tokens=False, so no BOS/EOS padding, but cropping is harmless and
-    robust to a future change). Returns a float32 numpy (L, L) or None — saving PAE
+    ``row`` and crop to the real sequence length (ESMFold here folds with
+    add_special_tokens=False, so no BOS/EOS; in a padded batch the crop drops the
+    padding). Returns a float32 numpy (L, L) or None — saving PAE
     must DEGRADE GRACEFULLY if the field is missing (the .pdb is unaffected)."""
     import numpy as np
 
@@ -92,8 +109,8 @@ def _extract_pae(output, seq_len: int):
     if pae is None:
         return None
     arr = pae.detach().to("cpu").float().numpy()
-    if arr.ndim == 3:  # (batch, L, L) -> first element
-        arr = arr[0]
+    if arr.ndim == 3:  # (batch, L, L) -> this row's element
+        arr = arr[row]
     if arr.ndim != 2 or arr.shape[0] != arr.shape[1]:
         return None
     # Crop to the actual residue count if any special tokens slipped in.
@@ -151,6 +168,115 @@ def fold_sequence(
     return pdb_str, pae, ptm
 
 
+def _ptm_from_logits(logits, max_bin: int = 31) -> float:
+    """pTM of one sequence from its (L, L, bins) pTM-head logits — openfold's
+    ``compute_tm`` (which HF's ``ptm`` field uses) for a single unpadded chain.
+
+    HF computes ``ptm`` over the whole padded batch (one argmax across all rows), so
+    in a batched fold each row's pTM is recomputed here from its cropped logits."""
+    import numpy as np
+
+    logits = np.asarray(logits, dtype=np.float64)
+    n_bins = logits.shape[-1]
+    boundaries = np.linspace(0, max_bin, n_bins - 1)
+    step = boundaries[1] - boundaries[0]
+    centers = np.append(boundaries + step / 2, boundaries[-1] + step / 2 + step)
+    d0 = 1.24 * (max(logits.shape[0], 19) - 15) ** (1.0 / 3) - 1.8
+    probs = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    probs /= probs.sum(axis=-1, keepdims=True)
+    per_pair = (probs / (1.0 + (centers / d0) ** 2)).sum(axis=-1)
+    return float(per_pair.mean(axis=-1).max())
+
+
+def fold_batch(
+    model, tokenizer, device: str, sequences: Sequence[str], *, chunk_size: Optional[int] = None
+) -> List[Tuple[str, "object", "object"]]:
+    """Fold several sequences in ONE padded forward pass; returns a
+    ``(pdb_str, pae, ptm)`` per sequence, as :func:`fold_sequence` would.
+
+    Padding is masked (``attention_mask``); HF drops the padded residues' atoms from
+    ``output_to_pdb`` (``atom37_atom_exists`` is masked), the PAE is cropped to each
+    sequence's length and pTM recomputed per row (see ``_ptm_from_logits``). A single
+    sequence goes through :func:`fold_sequence` unchanged."""
+    if len(sequences) == 1:
+        return [fold_sequence(model, tokenizer, device, sequences[0], chunk_size=chunk_size)]
+    import torch
+
+    longest = max(len(s) for s in sequences)
+    if chunk_size is not None:
+        model.trunk.set_chunk_size(chunk_size)
+    elif longest > CHUNK_LENGTH_THRESHOLD:
+        model.trunk.set_chunk_size(DEFAULT_CHUNK_SIZE)
+    else:
+        model.trunk.set_chunk_size(None)
+
+    tokenized = tokenizer(list(sequences), return_tensors="pt", add_special_tokens=False,
+                          padding=True)
+    tokenized = {k: v.to(device) for k, v in tokenized.items()}
+    with torch.no_grad():
+        output = model(**tokenized)
+    pdbs = model.output_to_pdb(output)
+    ptm_logits = output.get("ptm_logits") if isinstance(output, dict) else getattr(
+        output, "ptm_logits", None)
+    if ptm_logits is not None:
+        ptm_logits = ptm_logits.detach().to("cpu").float().numpy()
+    results = []
+    for row, sequence in enumerate(sequences):
+        L = len(sequence)
+        ptm = None if ptm_logits is None else _ptm_from_logits(ptm_logits[row, :L, :L])
+        results.append((_rescale_bfactor_to_0_100(pdbs[row]), _extract_pae(output, L, row), ptm))
+    return results
+
+
+def length_batches(lengths: Sequence[int], toks_per_batch: int) -> List[List[int]]:
+    """Indices into ``lengths`` grouped into batches: sorted by length, each batch
+    grown while rows x its longest length fits ``toks_per_batch`` (the swoop
+    batching of esm_pseudo_perplexity). Sequences above CHUNK_LENGTH_THRESHOLD
+    always get a batch of their own."""
+    batches: List[List[int]] = []
+    cur: List[int] = []
+    cur_max = 0
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        L = lengths[i]
+        new_max = max(cur_max, L)
+        if cur and (new_max * (len(cur) + 1) > toks_per_batch or L > CHUNK_LENGTH_THRESHOLD):
+            batches.append(cur)
+            cur, new_max = [], L
+        cur.append(i)
+        cur_max = new_max
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def iter_fold_batches(
+    model, tokenizer, device: str, sequences: Sequence[str], *,
+    chunk_size: Optional[int] = None, toks_per_batch: int = DEFAULT_TOKENS_PER_BATCH,
+):
+    """Fold `sequences` in length batches (length_batches), yielding
+    ``(indices, results)`` per batch as it completes: ``results[j]`` is the
+    :func:`fold_sequence` tuple for ``sequences[indices[j]]``, or the exception if
+    that sequence could not be folded. A batch that raises is retried one sequence
+    at a time."""
+    for batch in length_batches([len(s) for s in sequences], toks_per_batch):
+        batch_seqs = [sequences[i] for i in batch]
+        try:
+            results = fold_batch(model, tokenizer, device, batch_seqs, chunk_size=chunk_size)
+        except Exception as exc:  # noqa: BLE001 - retry the batch one by one
+            if len(batch) == 1:
+                yield batch, [exc]
+                continue
+            print(f"  [warn] batch of {len(batch)} failed ({exc}); folding singly")
+            results = []
+            for sequence in batch_seqs:
+                try:
+                    results.append(fold_sequence(model, tokenizer, device, sequence,
+                                                 chunk_size=chunk_size))
+                except Exception as single_exc:  # noqa: BLE001 - keep folding the rest
+                    results.append(single_exc)
+        yield batch, results
+
+
 def _default_pae_dir(save_dir: str) -> str:
     """Sibling PAE dir next to the structs dir: ``<save_dir>_pae/``."""
     d = save_dir.rstrip(os.sep)
@@ -178,7 +304,8 @@ def _residue_ids_from_pdb(pdb_str: str) -> List[int]:
     return res_ids
 
 
-def _save_pae(pae, pdb_str: str, pae_path: str, *, seq_len: int, ptm=None) -> bool:
+def _save_pae(pae, pdb_str: str, pae_path: str, *, seq_len: int, ptm=None,
+              pae_format: str = "compressed") -> bool:
     """Write the shared ``<ID>_pae.npz`` (schema: pae, residue_ids, n_residues,
     source, ptm). Returns True if written, False if `pae` was None (head
     unavailable). The schema is IDENTICAL to the AF3 extractor so interdomain_pae and
@@ -187,26 +314,118 @@ def _save_pae(pae, pdb_str: str, pae_path: str, *, seq_len: int, ptm=None) -> bo
     (ESMFold numbers contiguously). ``ptm`` is the global fold-confidence scalar
     (0-1), stored as a float32 (NaN if unavailable — additive, never affects the
     existing pae/residue_ids/n_residues/source fields). ESMFold is single-chain, so
-    no ipTM is stored."""
+    no ipTM is stored.
+
+    ``pae_format="float16"`` stores ``pae`` as float16 in an uncompressed npz (see
+    PAE_FORMATS). The file is written under a temporary name and renamed, so an
+    interrupted run never leaves a truncated npz that a resume would skip."""
     import numpy as np
 
     if pae is None:
         return False
+    if pae_format not in PAE_FORMATS:
+        raise ValueError(f"pae_format must be one of {PAE_FORMATS}, got {pae_format!r}")
     res_ids = _residue_ids_from_pdb(pdb_str)
     if len(res_ids) != pae.shape[0]:
         res_ids = list(range(1, pae.shape[0] + 1))
     os.makedirs(os.path.dirname(os.path.abspath(pae_path)), exist_ok=True)
-    np.savez_compressed(
-        pae_path,
-        pae=np.ascontiguousarray(pae, dtype=np.float32),
+    save = np.savez if pae_format == "float16" else np.savez_compressed
+    dtype = np.float16 if pae_format == "float16" else np.float32
+    tmp_path = pae_path + ".tmp.npz"
+    save(
+        tmp_path,
+        pae=np.ascontiguousarray(pae, dtype=dtype),
         residue_ids=np.asarray(res_ids, dtype=np.int32),
         n_residues=np.int64(pae.shape[0]),
         source="esmfold",
         ptm=np.float32(np.nan if ptm is None else ptm),
     )
+    os.replace(tmp_path, pae_path)
     return True
 
 
+def memmap_npz_array(npz_path: str, key: str = "pae"):
+    """Memory-map one member of an UNCOMPRESSED npz (e.g. a ``pae_format="float16"``
+    PAE file) read-only, without loading it. Raises ValueError for a compressed
+    member (load those with ``np.load``)."""
+    import numpy as np
+
+    name = key + ".npy"
+    with zipfile.ZipFile(npz_path) as zf:
+        info = zf.getinfo(name)
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{name} in {npz_path} is compressed; it cannot be memory-mapped")
+    with open(npz_path, "rb") as fh:
+        fh.seek(info.header_offset)
+        local = fh.read(30)
+        name_len = int.from_bytes(local[26:28], "little")
+        extra_len = int.from_bytes(local[28:30], "little")
+        fh.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(fh)
+        read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                       else np.lib.format.read_array_header_2_0)
+        shape, fortran_order, dtype = read_header(fh)
+        offset = fh.tell()
+    return np.memmap(npz_path, dtype=dtype, mode="r", shape=shape, offset=offset,
+                     order="F" if fortran_order else "C")
+
+
+def _write_text_atomic(path: str, text: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+class _OutputWriter:
+    """Background thread writing folded structures (``<ID>.pdb`` + PAE npz) while the
+    next batch folds. ``close()`` waits for the queue to drain and re-raises the
+    first write error."""
+
+    def __init__(self, *, save_pae: bool, pae_format: str):
+        self.save_pae = save_pae
+        self.pae_format = pae_format
+        self.written: List[str] = []
+        self.n_pae = 0
+        self._error: Optional[BaseException] = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=_WRITER_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="esmfold-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, stem: str, pdb_str: str, out_path: str, pae, pae_path, seq_len: int, ptm):
+        if self._error is not None:
+            raise self._error
+        self._queue.put((stem, pdb_str, out_path, pae, pae_path, seq_len, ptm))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            stem, pdb_str, out_path, pae, pae_path, seq_len, ptm = item
+            try:
+                # PAE first: a .pdb on disk means the record is complete.
+                if self.save_pae:
+                    if _save_pae(pae, pdb_str, pae_path, seq_len=seq_len, ptm=ptm,
+                                 pae_format=self.pae_format):
+                        self.n_pae += 1
+                    else:
+                        print(f"  [warn] {stem}: PAE head unavailable; wrote .pdb only "
+                              f"(no {os.path.basename(pae_path)})")
+                _write_text_atomic(out_path, pdb_str)
+                self.written.append(out_path)
+            except BaseException as exc:  # noqa: BLE001 - surfaced by close()/submit()
+                self._error = exc
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
 def fold_fasta(
     fasta_path: str,
     save_dir: str,
@@ -216,6 +435,8 @@ def fold_fasta(
     device: Optional[str] = None,
     save_pae: bool = True,
     pae_dir: Optional[str] = None,
+    toks_per_batch: int = DEFAULT_TOKENS_PER_BATCH,
+    pae_format: str = "compressed",
 ) -> List[str]:
     """Fold every sequence in `fasta_path` with ESMFold, writing `<ID>.pdb` into
     `save_dir`. Returns the list of written PDB paths. The output dir mirrors the
@@ -227,7 +448,15 @@ def fold_fasta(
     ``<save_dir>_pae/``), in the shared schema consumed by
     structure_metrics/interdomain_pae. PAE saving is ADDITIVE — the ``<ID>.pdb`` is
     unchanged — and degrades gracefully (warns, keeps the pdb) if the PAE head is
-    unavailable for a sequence."""
+    unavailable for a sequence. `pae_format` picks the npz encoding (PAE_FORMATS).
+
+    Sequences are folded in length-sorted batches of at most `toks_per_batch`
+    padded residues (1 = one per forward pass); a batch that fails is retried one
+    sequence at a time. Outputs are written by a background thread while the next
+    batch folds, each file atomically, so a re-run with `skip_existing` resumes
+    after the last completed record."""
+    if pae_format not in PAE_FORMATS:
+        raise ValueError(f"pae_format must be one of {PAE_FORMATS}, got {pae_format!r}")
     identifiers, sequences = separate_identifiers(
         load_fasta_sequences(fasta_path, load_identifiers=True)
     )
@@ -258,27 +487,35 @@ def fold_fasta(
         return []
 
     tokenizer, model, device = _load_model(device)
+    return _fold_todo(model, tokenizer, device, todo, save_dir=save_dir, save_pae=save_pae,
+                      pae_dir=pae_dir, chunk_size=chunk_size, toks_per_batch=toks_per_batch,
+                      pae_format=pae_format)
 
-    written: List[str] = []
+
+def _fold_todo(model, tokenizer, device, todo, *, save_dir, save_pae, pae_dir, chunk_size,
+               toks_per_batch, pae_format) -> List[str]:
+    """Fold ``(stem, sequence, out_path, pae_path)`` records in length batches and
+    hand the results to the background writer; returns the written PDB paths."""
     n = len(todo)
-    n_pae = 0
-    for i, (stem, sequence, out_path, pae_path) in enumerate(todo, start=1):
-        print(f"[{i}/{n}] folding {stem} ({len(sequence)} aa) -> {out_path}")
-        try:
-            pdb_str, pae, ptm = fold_sequence(model, tokenizer, device, sequence, chunk_size=chunk_size)
-        except Exception as exc:  # noqa: BLE001 - keep folding the rest of the batch
-            print(f"  [warn] failed to fold {stem}: {exc}")
-            continue
-        with open(out_path, "w") as fh:
-            fh.write(pdb_str)
-        written.append(out_path)
-        if save_pae:
-            if _save_pae(pae, pdb_str, pae_path, seq_len=len(sequence), ptm=ptm):
-                n_pae += 1
-            else:
-                print(f"  [warn] {stem}: PAE head unavailable; wrote .pdb only (no {os.path.basename(pae_path)})")
-
-    print(f"Wrote {len(written)}/{n} structure(s) to {save_dir}")
+    done = 0
+    writer = _OutputWriter(save_pae=save_pae, pae_format=pae_format)
+    try:
+        batches = iter_fold_batches(model, tokenizer, device, [t[1] for t in todo],
+                                    chunk_size=chunk_size, toks_per_batch=toks_per_batch)
+        for batch, results in batches:
+            for i, result in zip(batch, results):
+                stem, sequence, out_path, pae_path = todo[i]
+                done += 1
+                if isinstance(result, Exception):
+                    print(f"  [warn] failed to fold {stem}: {result}")
+                    continue
+                print(f"[{done}/{n}] folded {stem} ({len(sequence)} aa) -> {out_path}")
+                pdb_str, pae, ptm = result
+                writer.submit(stem, pdb_str, out_path, pae, pae_path, len(sequence), ptm)
+    finally:
+        writer.close()
+
+    print(f"Wrote {len(writer.written)}/{n} structure(s) to {save_dir}")
     if save_pae:
-        print(f"Wrote {n_pae}/{len(written)} PAE matrix file(s) to {pae_dir}")
-    return written
+        print(f"Wrote {writer.n_pae}/{len(writer.written)} PAE matrix file(s) to {pae_dir}")
+    return writer.written
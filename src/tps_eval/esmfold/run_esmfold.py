@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import argparse
 
-from tps_eval.esmfold.esmfold import fold_fasta
+from tps_eval.esmfold.esmfold import DEFAULT_TOKENS_PER_BATCH, PAE_FORMATS, fold_fasta
 
 
 def main() -> None:
@@ -53,6 +53,21 @@ def main() -> None:
         action="store_false",
         help="Do not save the PAE matrices (default: save <ID>_pae.npz alongside).",
     )
+    parser.add_argument(
+        "--toks_per_batch",
+        type=int,
+        default=DEFAULT_TOKENS_PER_BATCH,
+        help="Padded residues per batched forward pass; sequences are sorted by "
+        "length and folded together while rows x longest length fits. 1 = one "
+        f"sequence per pass. Default: {DEFAULT_TOKENS_PER_BATCH}.",
+    )
+    parser.add_argument(
+        "--pae_format",
+        choices=PAE_FORMATS,
+        default="compressed",
+        help="PAE npz encoding: 'compressed' (float32, savez_compressed; default) or "
+        "'float16' (uncompressed, memory-mappable, half the size of raw float32).",
+    )
     args = parser.parse_args()
     fold_fasta(
         args.fasta_path,
@@ -62,6 +77,8 @@ def main() -> None:
         device=args.device,
         save_pae=args.save_pae,
         pae_dir=args.pae_dir,
+        toks_per_batch=args.toks_per_batch,
+        pae_format=args.pae_format,
     )
 
 
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+"""Self-contained tests for the batched folding / streaming-writer path of esmfold.py.
+
+Run from the repo root:
+    python -m pytest src/tps_eval/esmfold/test_esmfold_batch.py -q
+
+transformers / the ESMFold weights are not needed: a tiny CPU stub stands in for
+EsmForProteinFolding + its tokenizer. Like the real model it folds a right-padded
+batch under an ``attention_mask`` (padded rows get garbage), writes one PDB per batch
+row from the unmasked residues only, and returns (batch, L, L) PAE and pTM logits
+plus an HF-style pTM computed over the WHOLE padded batch. We test:
+  * length_batches: every index once, length-sorted, within the token budget,
+    long sequences alone,
+  * fold_batch on a padded batch == fold_sequence one at a time (pdb, pae, ptm),
+    with the per-row pTM matching an independent compute_tm of the unpadded fold,
+  * fold_fasta through the background writer: outputs for every record, a resume
+    folds only the missing IDs, a failing batch is retried singly,
+  * pae_format="float16": uncompressed, memory-mappable, readable by interdomain_pae.
+"""
+
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+import torch
+
+import tps_eval.esmfold.esmfold as esmfold
+from tps_eval.esmfold.esmfold import (
+    CHUNK_LENGTH_THRESHOLD,
+    _save_pae,
+    fold_batch,
+    fold_fasta,
+    fold_sequence,
+    length_batches,
+    memmap_npz_array,
+)
+from tps_eval.structure_metrics.interdomain_pae import load_pae
+
+_AA = "ACDEFGHIKLMNPQRSTVWY"
+_N_BINS = 64
+
+
+class _StubTokenizer:
+    def __call__(self, sequences, return_tensors="pt", add_special_tokens=False, padding=False):
+        assert return_tensors == "pt" and not add_special_tokens
+        if len(sequences) > 1:
+            assert padding
+        width = max(len(s) for s in sequences)
+        ids = torch.zeros((len(sequences), width), dtype=torch.long)
+        mask = torch.zeros((len(sequences), width), dtype=torch.long)
+        for row, seq in enumerate(sequences):
+            ids[row, : len(seq)] = torch.tensor([_AA.index(a) + 1 for a in seq])
+            mask[row, : len(seq)] = 1
+        return {"input_ids": ids, "attention_mask": mask}
+
+
+class _StubTrunk:
+    def __init__(self):
+        self.chunk_sizes = []
+
+    def set_chunk_size(self, chunk_size):
+        self.chunk_sizes.append(chunk_size)
+
+
+def _compute_tm(logits):
+    """openfold compute_tm (no residue weights), as HF applies it to the batch."""
+    boundaries = torch.linspace(0, 31, steps=_N_BINS - 1, dtype=torch.float64)
+    step = boundaries[1] - boundaries[0]
+    centers = torch.cat([boundaries + step / 2, (boundaries[-1] + step / 2 + step)[None]])
+    n = max(logits.shape[-2], 19)
+    d0 = 1.24 * (n - 15) ** (1.0 / 3) - 1.8
+    probs = torch.softmax(logits.double(), dim=-1)
+    per_pair = (probs / (1 + centers ** 2 / d0 ** 2)).sum(dim=-1)
+    return per_pair.mean(dim=-1).max()
+
+
+class _StubESMFold:
+    """Residue features mixed with a masked mean over the sequence (the only
+    cross-residue term), so a row's real outputs depend on its own residues only."""
+
+    def __init__(self, fail_batches=False):
+        generator = torch.Generator().manual_seed(0)
+        self.embed = torch.randn(len(_AA) + 1, 8, generator=generator, dtype=torch.float64)
+        self.bins = torch.randn(8, _N_BINS, generator=generator, dtype=torch.float64)
+        self.trunk = _StubTrunk()
+        self.fail_batches = fail_batches
+        self.batch_sizes = []
+
+    def __call__(self, input_ids, attention_mask):
+        self.batch_sizes.append(input_ids.shape[0])
+        if self.fail_batches and input_ids.shape[0] > 1:
+            raise RuntimeError("CUDA out of memory (stub)")
+        mask = attention_mask.double()[..., None]
+        pos = torch.arange(input_ids.shape[1], dtype=torch.float64)[None, :, None]
+        h = self.embed[input_ids] + 0.1 * torch.sin(pos)
+        context = (h * mask).sum(1, keepdim=True) / mask.sum(1, keepdim=True)
+        h = torch.tanh(h + context)
+        h = torch.where(mask.bool(), h, torch.full_like(h, 777.0))  # garbage at padding
+        pae = (h[:, :, None, :] - h[:, None, :, :]).abs().sum(-1)
+        ptm_logits = (h[:, :, None, :] * h[:, None, :, :]) @ self.bins
+        return {
+            "positions": h[..., :3],
+            "plddt": torch.sigmoid(h[..., 3]),
+            "attention_mask": attention_mask,
+            "input_ids": input_ids,
+            "predicted_aligned_error": pae.float(),
+            "ptm_logits": ptm_logits.float(),
+            "ptm": _compute_tm(ptm_logits.float()),
+        }
+
+    def output_to_pdb(self, output):
+        pdbs = []
+        for row in range(output["input_ids"].shape[0]):
+            lines = []
+            for i in np.flatnonzero(output["attention_mask"][row].numpy()):
+                x, y, z = output["positions"][row, i].tolist()
+                aa = _AA[int(output["input_ids"][row, i]) - 1]
+                lines.append(
+                    f"ATOM  {i + 1:>5d}  CA  {aa}AA A{i + 1:>4d}    "
+                    f"{x:8.3f}{y:8.3f}{z:8.3f}  1.00{float(output['plddt'][row, i]):6.2f}"
+                    f"           C"
+                )
+            pdbs.append("\n".join(lines + ["END"]) + "\n")
+        return pdbs
+
+
+_SEQUENCES = ["MKTAYIAK", "GSH", "ACDEFGHIKLMNPQ", "WWYV", "MKTAYIAKQR"]
+
+
+def test_length_batches():
+    lengths = [50, 10, 300, 12, 49, 11, CHUNK_LENGTH_THRESHOLD + 1, CHUNK_LENGTH_THRESHOLD + 5]
+    batches = length_batches(lengths, toks_per_batch=120)
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    assert [lengths[i] for b in batches for i in b] == sorted(lengths)
+    for b in batches:
+        assert len(b) == 1 or len(b) * max(lengths[i] for i in b) <= 120
+    assert batches[-2:] == [[6], [7]]
+    big = length_batches(lengths, toks_per_batch=10**6)
+    assert big[-2:] == [[6], [7]] and len(big) == 3
+    assert length_batches(lengths, toks_per_batch=1) == [[i] for i in np.argsort(lengths, kind="stable")]
+    assert length_batches([], toks_per_batch=10) == []
+
+
+def test_fold_batch_matches_one_by_one():
+    tokenizer, model = _StubTokenizer(), _StubESMFold()
+    batched = fold_batch(model, tokenizer, "cpu", _SEQUENCES)
+    assert model.batch_sizes == [len(_SEQUENCES)]
+    for seq, (pdb_str, pae, ptm) in zip(_SEQUENCES, batched):
+        single_pdb, single_pae, single_ptm = fold_sequence(model, tokenizer, "cpu", seq)
+        assert pdb_str == single_pdb
+        assert pae.shape == (len(seq), len(seq)) and pae.dtype == np.float32
+        np.testing.assert_allclose(pae, single_pae, rtol=1e-6)
+        assert abs(ptm - single_ptm) < 1e-5
+    # pLDDT B-factors rescaled to 0-100 in the batched path too.
+    assert 0 < float(batched[0][0].splitlines()[0][60:66]) <= 100
+
+
+def _write_fasta(path, records):
+    with open(path, "w") as fh:
+        for rid, seq in records:
+            fh.write(f">{rid}\n{seq}\n")
+
+
+def test_fold_fasta_streams_outputs_and_resumes(monkeypatch):
+    model = _StubESMFold()
+    monkeypatch.setattr(esmfold, "_load_model", lambda device=None: (_StubTokenizer(), model, "cpu"))
+    with tempfile.TemporaryDirectory() as d:
+        fasta = os.path.join(d, "gen.fasta")
+        records = [(f"s{i}", seq) for i, seq in enumerate(_SEQUENCES)]
+        _write_fasta(fasta, records)
+        save_dir = os.path.join(d, "structs")
+        written = fold_fasta(fasta, save_dir, toks_per_batch=30)
+        assert sorted(os.path.basename(p) for p in written) == [f"s{i}.pdb" for i in range(5)]
+        assert max(model.batch_sizes) > 1
+        pae_dir = save_dir + "_pae"
+        assert sorted(os.listdir(pae_dir)) == [f"s{i}_pae.npz" for i in range(5)]
+        with np.load(os.path.join(pae_dir, "s2_pae.npz")) as npz:
+            assert npz["pae"].dtype == np.float32 and int(npz["n_residues"]) == 14
+            assert str(npz["source"]) == "esmfold" and 0 < float(npz["ptm"]) <= 1
+        with open(os.path.join(save_dir, "s2.pdb")) as fh:
+            assert fh.read() == fold_sequence(model, _StubTokenizer(), "cpu", _SEQUENCES[2])[0]
+
+        # Resume: only the records with a missing output are folded again.
+        os.remove(os.path.join(save_dir, "s1.pdb"))
+        os.remove(os.path.join(pae_dir, "s3_pae.npz"))
+        model.batch_sizes.clear()
+        written = fold_fasta(fasta, save_dir, toks_per_batch=30)
+        assert sorted(os.path.basename(p) for p in written) == ["s1.pdb", "s3.pdb"]
+        assert sum(model.batch_sizes) == 2
+        assert fold_fasta(fasta, save_dir) == []
+        assert not [f for f in os.listdir(save_dir) + os.listdir(pae_dir) if ".tmp" in f]
+
+
+def test_failed_batch_is_folded_singly(monkeypatch):
+    model = _StubESMFold(fail_batches=True)
+    monkeypatch.setattr(esmfold, "_load_model", lambda device=None: (_StubTokenizer(), model, "cpu"))
+    with tempfile.TemporaryDirectory() as d:
+        fasta = os.path.join(d, "gen.fasta")
+        _write_fasta(fasta, [("a", "MKTAYIAK"), ("b", "GSHW")])
+        written = fold_fasta(fasta, os.path.join(d, "structs"), save_pae=False)
+        assert sorted(os.path.basename(p) for p in written) == ["a.pdb", "b.pdb"]
+        assert model.batch_sizes == [2, 1, 1]
+
+
+def test_float16_pae_is_memory_mappable():
+    rng = np.random.RandomState(0)
+    pae = rng.uniform(0, 30, size=(6, 6)).astype(np.float32)
+    pdb_str = "".join(
+        f"ATOM  {i:>5d}  CA  ALA A{i + 10:>4d}       0.000   0.000   0.000  1.00 90.00           C\n"
+        for i in range(1, 7)
+    )
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "x_pae.npz")
+        assert _save_pae(pae, pdb_str, path, seq_len=6, ptm=0.5, pae_format="float16")
+        with zipfile.ZipFile(path) as zf:
+            assert all(i.compress_type == zipfile.ZIP_STORED for i in zf.infolist())
+        mapped = memmap_npz_array(path)
+        assert isinstance(mapped, np.memmap) and mapped.dtype == np.float16
+        np.testing.assert_allclose(mapped, pae, rtol=1e-3)
+        loaded, residue_ids = load_pae(path)
+        np.testing.assert_allclose(loaded, pae, rtol=1e-3)
+        assert residue_ids.tolist() == list(range(11, 17))
+        del mapped
+
+        compressed = os.path.join(d, "y_pae.npz")
+        assert _save_pae(pae, pdb_str, compressed, seq_len=6)
+        try:
+            memmap_npz_array(compressed)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("memory-mapped a compressed member")
+        try:
+            _save_pae(pae, pdb_str, compressed, seq_len=6, pae_format="bf16")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("unknown pae_format accepted")
+
+
+def main():
+    import inspect
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+
+    class _MP:
+        def __init__(self):
+            self._undo = []
+
+        def setattr(self, obj, name, value):
+            self._undo.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+        def undo(self):
+            for obj, name, old in reversed(self._undo):
+                setattr(obj, name, old)
+            self._undo = []
+
+    for t in tests:
+        if "monkeypatch" in inspect.signature(t).parameters:
+            mp = _MP()
+            try:
+                t(mp)
+            finally:
+                mp.undo()
+        else:
+            t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
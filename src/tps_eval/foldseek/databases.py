@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+"""Prebuilt, reusable foldseek databases for the foldseek-based tools.
+
+``foldseek easy-search <structs> <known_structs>`` runs ``createdb`` (the 3Di
+conversion) on BOTH sides on every call, so each run of ``structural_identity`` or
+``domain_structural_identity`` re-converts the whole MARTS-DB reference set. Here
+the conversion is done once per distinct structure set and kept in a cache dir:
+
+    <cache_dir>/v1/<source dir name>-<key>/
+        db, db.index, db_ss, db_ca, db_h, ...   foldseek DB (createdb)
+        manifest.json                           source dir + content hash, foldseek version
+    <cache_dir>/v1/<source dir name>-<key>-indexed/
+        db, ..., db.idx, ...                    the same DB + its index (createindex; targets)
+
+``<key>`` hashes the structure files (relative names + contents, recursively — the
+set ``createdb`` reads) and the foldseek version, so a changed reference set or a
+foldseek upgrade gets a fresh DB and never a stale one. A query structs dir is a
+cache entry like any other: ``structural_identity`` and ``foldseek_swissprot_search``
+on the same designs convert them once. Searches then run ``foldseek search`` +
+``convertalis`` against the prebuilt DBs, which is what ``easy-search`` does
+internally after its two ``createdb`` calls.
+
+Entries are built in a private staging dir and renamed into place, so concurrent
+jobs asking for the same DB never see a half-built one (the loser of the race
+discards its copy). A published entry is never modified: a target that was first
+converted as a query gets its index in a staged COPY, published as the separate
+``-indexed`` entry. Without a cache dir the DBs are built into the caller's scratch
+dir and thrown away with it; single-use query sets (detected domains, recall
+samples) are built there too (``structure_search(..., cache_query=False)``).
+
+Reusing an entry touches its manifest, and ``python -m tps_eval.foldseek.databases
+<cache_dir> --max_gb N`` removes the least recently used entries (never one used in
+the last ``--min_idle_hours``) until the cache fits N GiB.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import List, Optional, Sequence, Tuple
+
+CACHE_VERSION = "v1"
+MANIFEST = "manifest.json"
+DB_NAME = "db"
+INDEXED_SUFFIX = "-indexed"
+
+# prune_cache never removes an entry used more recently than this (a running job may
+# still be searching it).
+DEFAULT_MIN_IDLE_S = 24 * 3600
+
+# Files foldseek createdb reads from a directory (it recurses into subdirs).
+STRUCTURE_EXTENSIONS = (".pdb", ".cif", ".mmcif", ".ent", ".pdb.gz", ".cif.gz", ".mmcif.gz", ".ent.gz")
+
+
+def foldseek_version(foldseek_bin: str = "foldseek") -> str:
+    """``foldseek version`` (the commit hash), or "unknown" if it can't be run."""
+    try:
+        proc = subprocess.Popen(
+            [foldseek_bin, "version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+    except OSError:
+        return "unknown"
+    out = proc.stdout.read()
+    proc.stdout.close()
+    if proc.wait() != 0:
+        return "unknown"
+    return out.strip() or "unknown"
+
+
+def structure_files(src_dir: str) -> List[str]:
+    """Structure files under ``src_dir`` (recursive), as sorted relative paths."""
+    found = []
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        for name in files:
+            if name.lower().endswith(STRUCTURE_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(root, name), src_dir))
+    return sorted(found)
+
+
+def source_fingerprint(src_dir: str) -> Tuple[str, int]:
+    """(sha256 over the relative names + contents of every structure file, count).
+
+    Independent of where the directory lives, so a staged copy of the same files
+    hashes the same as the original."""
+    h = hashlib.sha256()
+    files = structure_files(src_dir)
+    for rel in files:
+        h.update(rel.encode("utf-8") + b"\0")
+        with open(os.path.join(src_dir, rel), "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+        h.update(b"\0")
+    return h.hexdigest(), len(files)
+
+
+def run_foldseek(cmd: Sequence[str]) -> None:
+    """Run one foldseek command, streaming its output; raise on a non-zero exit."""
+    cmd = [str(c) for c in cmd]
+    print("Running:", " ".join(cmd))
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    for line in process.stdout:
+        print(line, end="")
+    process.stdout.close()
+    return_code = process.wait()
+    if return_code != 0:
+        raise subprocess.CalledProcessError(return_code, cmd)
+
+
+def _read_manifest(entry: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(entry, MANIFEST)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _valid_entry(entry: str, source_hash: str, version: str, index: bool) -> bool:
+    manifest = _read_manifest(entry)
+    return manifest is not None and manifest.get("source_hash") == source_hash \
+        and manifest.get("foldseek_version") == version \
+        and (manifest.get("indexed") or not index)
+
+
+def ensure_db(
+    src_dir: str,
+    cache_dir: str,
+    *,
+    index: bool = False,
+    foldseek_bin: str = "foldseek",
+) -> str:
+    """Path of a foldseek DB of the structures under ``src_dir``, building it (and,
+    with ``index``, its ``createindex`` index) under ``cache_dir`` unless an entry
+    for the same files and foldseek version is already there.
+
+    ``index`` is for search TARGETS; query DBs don't need one (but use an indexed
+    entry when there is one). The indexed entry of a set first converted as a query
+    is built from a copy of the query entry, which stays untouched."""
+    version = foldseek_version(foldseek_bin)
+    source_hash, n_structures = source_fingerprint(src_dir)
+    key = hashlib.sha256(f"{source_hash}\0{version}".encode("utf-8")).hexdigest()[:16]
+    name = os.path.basename(os.path.normpath(src_dir)) or "structures"
+    root = os.path.join(cache_dir, CACHE_VERSION)
+    plain = os.path.join(root, f"{name}-{key}")
+    indexed = plain + INDEXED_SUFFIX
+
+    for entry in (indexed, plain):
+        if _valid_entry(entry, source_hash, version, index):
+            _touch(entry)
+            db = os.path.join(entry, DB_NAME)
+            print(f"Reusing foldseek DB {db} ({n_structures} structure(s) from {src_dir})")
+            return db
+
+    entry = indexed if index else plain
+    db = os.path.join(entry, DB_NAME)
+    base = plain if index and _valid_entry(plain, source_hash, version, False) else None
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{os.path.basename(entry)}.building-", dir=root)
+    try:
+        if base is None:
+            run_foldseek([foldseek_bin, "createdb", src_dir, os.path.join(staging, DB_NAME), "-v", "3"])
+        else:
+            for file_name in os.listdir(base):
+                if file_name != MANIFEST:
+                    shutil.copy2(os.path.join(base, file_name), staging)
+        if index:
+            _create_index(staging, foldseek_bin)
+        _write_manifest(staging, {
+            "source_dir": os.path.abspath(src_dir),
+            "source_hash": source_hash,
+            "n_structures": n_structures,
+            "foldseek_version": version,
+            "indexed": index,
+        })
+        if _read_manifest(entry) is not None:
+            # Another job published the same DB meanwhile; use theirs.
+            shutil.rmtree(staging, ignore_errors=True)
+            return db
+        # No valid entry under this key (absent, or damaged without a manifest).
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # Lost the race to publish; the winner's entry is equivalent.
+            shutil.rmtree(staging, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    print(f"Built foldseek DB {db} ({n_structures} structure(s) from {src_dir})")
+    return db
+
+
+def _create_index(staging: str, foldseek_bin: str) -> None:
+    tmp = os.path.join(staging, "tmp_index")
+    try:
+        run_foldseek([foldseek_bin, "createindex", os.path.join(staging, DB_NAME), tmp, "-v", "3"])
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _write_manifest(entry: str, manifest: dict) -> None:
+    path = os.path.join(entry, MANIFEST)
+    with open(path + ".tmp", "w") as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _touch(entry: str) -> None:
+    """Mark an entry as used now (its manifest's mtime is the LRU clock)."""
+    try:
+        os.utime(os.path.join(entry, MANIFEST))
+    except OSError:
+        pass
+
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for file_name in files:
+            try:
+                total += os.lstat(os.path.join(root, file_name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def cache_entries(cache_dir: str) -> List[Tuple[str, float, int]]:
+    """``(entry dir, last used (epoch s), bytes)`` of every published entry, least
+    recently used first."""
+    root = os.path.join(cache_dir, CACHE_VERSION)
+    if not os.path.isdir(root):
+        return []
+    entries = []
+    for entry_name in os.listdir(root):
+        entry = os.path.join(root, entry_name)
+        if entry_name.startswith(".") or not os.path.isdir(entry):
+            continue
+        try:
+            last_used = os.stat(os.path.join(entry, MANIFEST)).st_mtime
+        except OSError:
+            last_used = os.stat(entry).st_mtime  # damaged entry without a manifest
+        entries.append((entry, last_used, _dir_bytes(entry)))
+    return sorted(entries, key=lambda e: e[1])
+
+
+def prune_cache(
+    cache_dir: str,
+    max_bytes: int,
+    *,
+    min_idle_s: float = DEFAULT_MIN_IDLE_S,
+) -> List[str]:
+    """Remove least recently used entries until the cache fits ``max_bytes``; also
+    clears staging dirs abandoned by killed jobs. Entries (and staging dirs) touched
+    in the last ``min_idle_s`` seconds are kept even if the cache stays over budget.
+    Returns the removed entry dirs.
+
+    An entry is first renamed out of its published name, so a job looking it up
+    meanwhile rebuilds it rather than seeing it half-deleted."""
+    root = os.path.join(cache_dir, CACHE_VERSION)
+    now = time.time()
+    if os.path.isdir(root):
+        for entry_name in os.listdir(root):
+            path = os.path.join(root, entry_name)
+            if entry_name.startswith(".") and now - os.stat(path).st_mtime >= min_idle_s:
+                shutil.rmtree(path, ignore_errors=True)
+    entries = cache_entries(cache_dir)
+    total = sum(size for _, _, size in entries)
+    removed = []
+    for entry, last_used, size in entries:
+        if total <= max_bytes:
+            break
+        if now - last_used < min_idle_s:
+            break  # everything after it is more recent still
+        doomed = os.path.join(root, f".{os.path.basename(entry)}.removing-{os.getpid()}")
+        try:
+            os.rename(entry, doomed)
+        except OSError:
+            continue
+        shutil.rmtree(doomed, ignore_errors=True)
+        total -= size
+        removed.append(entry)
+    return removed
+
+
+def search_dbs(
+    query_db: str,
+    target_db: str,
+    out_tsv: str,
+    tmp_dir: str,
+    *,
+    format_output: str,
+    search_args: Sequence[str] = (),
+    prefilter_candidates: Optional[int] = None,
+    realign_args: Sequence[str] = (),
+    foldseek_bin: str = "foldseek",
+) -> None:
+    """``foldseek search`` + ``convertalis`` of two prebuilt DBs into ``out_tsv``
+    (the same tab-separated table ``easy-search`` writes).
+
+    With ``prefilter_candidates`` the search is two-stage: ``search_args`` is a
+    cheap first pass whose best ``prefilter_candidates`` hits per query (in foldseek's
+    result order) are kept (``filterdb --extract-lines``) and realigned with
+    ``structurealign`` + ``realign_args``. A candidate pair then scores exactly as in
+    a one-stage search with those alignment parameters; only pairs the first pass
+    missed are lost."""
+    os.makedirs(tmp_dir, exist_ok=True)
+    aln_db = os.path.join(tmp_dir, "aln")
+    if prefilter_candidates is None:
+        run_foldseek([foldseek_bin, "search", query_db, target_db, aln_db, tmp_dir, *search_args])
+    else:
+        first_db = os.path.join(tmp_dir, "prefilter_aln")
+        candidates_db = os.path.join(tmp_dir, "candidates")
+        run_foldseek([foldseek_bin, "search", query_db, target_db, first_db, tmp_dir, *search_args])
+        run_foldseek([
+            foldseek_bin, "filterdb", first_db, candidates_db,
+            "--extract-lines", str(prefilter_candidates), "-v", "3",
+        ])
+        run_foldseek([
+            foldseek_bin, "structurealign", query_db, target_db, candidates_db, aln_db, *realign_args,
+        ])
+    run_foldseek([
+        foldseek_bin, "convertalis", query_db, target_db, aln_db, out_tsv,
+        "--format-output", format_output, "-v", "3",
+    ])
+
+
+def structure_search(
+    query_dir: str,
+    target: str,
+    out_tsv: str,
+    tmp_dir: str,
+    *,
+    format_output: str,
+    search_args: Sequence[str] = (),
+    db_cache: Optional[str] = None,
+    cache_query: bool = True,
+    target_is_db: bool = False,
+    prefilter_candidates: Optional[int] = None,
+    realign_args: Sequence[str] = (),
+    foldseek_bin: str = "foldseek",
+) -> None:
+    """Search the structures in ``query_dir`` against ``target`` (a structures dir,
+    or an existing foldseek DB with ``target_is_db``) through prebuilt DBs
+    (two-stage with ``prefilter_candidates``, see ``search_dbs``).
+
+    DBs live under ``db_cache`` when given (reused across runs and tools), else
+    under ``tmp_dir`` for this run only. ``cache_query=False`` keeps a single-use
+    query set (e.g. a temporary dir of detected domains) out of ``db_cache``."""
+    run_dbs = os.path.join(tmp_dir, "dbs")
+    cache_dir = db_cache if db_cache else run_dbs
+    query_db = ensure_db(query_dir, cache_dir if cache_query else run_dbs, foldseek_bin=foldseek_bin)
+    target_db = target if target_is_db else ensure_db(
+        target, cache_dir, index=True, foldseek_bin=foldseek_bin
+    )
+    search_dbs(
+        query_db, target_db, out_tsv, os.path.join(tmp_dir, "search"),
+        format_output=format_output, search_args=search_args,
+        prefilter_candidates=prefilter_candidates, realign_args=realign_args,
+        foldseek_bin=foldseek_bin,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Report a foldseek DB cache's entries and optionally prune it to a "
+        "size budget (least recently used entries are removed first)."
+    )
+    parser.add_argument("cache_dir", help="foldseek DB cache dir (e.g. $FOLDSEEK_DB_CACHE).")
+    parser.add_argument("--max_gb", type=float, default=None, help="Prune to this many GiB.")
+    parser.add_argument("--min_idle_hours", type=float, default=DEFAULT_MIN_IDLE_S / 3600,
+                        help="Never remove entries used within this many hours (default %(default)g).")
+    args = parser.parse_args()
+
+    if args.max_gb is not None:
+        removed = prune_cache(args.cache_dir, int(args.max_gb * 1024 ** 3),
+                              min_idle_s=args.min_idle_hours * 3600)
+        print(f"Removed {len(removed)} entries")
+    entries = cache_entries(args.cache_dir)
+    for entry, last_used, size in entries:
+        print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(last_used))}  "
+              f"{size / 1024 ** 2:>10.1f} MiB  {os.path.basename(entry)}")
+    print(f"Total {sum(size for _, _, size in entries) / 1024 ** 2:.1f} MiB in {len(entries)} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,12 @@ import os
 import argparse
 from pathlib import Path
 import logging
-import subprocess
 from uuid import uuid4
 from shutil import rmtree
 
 import pandas as pd  # type: ignore
 
+from tps_eval.foldseek.databases import structure_search
 from tps_eval.pandas_compat import group_idxmax_skipna
 
 logger = logging.getLogger(__file__)
@@ -25,6 +25,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--output_root", type=str, required=True, help="Path to output CSV file.")
     parser.add_argument("--store_intermediate_results", action="store_true", help="Flag to keep files with intermediate results.", default=False)
     parser.add_argument("--random_run_id", action="store_true", default=False, help="Flag to add random uuid4 to output files to avoid overwriting.")
+    parser.add_argument("--db_cache", type=str, default=None, help="Directory of prebuilt foldseek DBs (see tps_eval.foldseek.databases): the query and reference DBs are built once and reused across runs. Default: built for this run only.")
     return parser.parse_args()
 
 
@@ -40,15 +41,13 @@ def main(args: argparse.Namespace):
     tsv_path = output_root / f'domain_alignments{f"_{run_id}" if args.random_run_id else ""}.tsv'
     tmp_path = output_root / f'tmp{f"_{run_id}" if args.random_run_id else ""}'
     
-    foldseek_command = f'foldseek easy-search {args.detected_domain_structures_root} {args.known_domain_structures_root} {tsv_path} {tmp_path} --max-seqs 5000 -e 1 -s 10 --exhaustive-search -v 3 --format-output query,target,fident,alnlen,mismatch,gapopen,qstart,qend,tstart,tend,evalue,bits,alntmscore,qtmscore,ttmscore,lddt'.split()
-    process = subprocess.Popen(foldseek_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
-    for line in process.stdout:
-        print(line, end="")
-    process.stdout.close()
-    return_code = process.wait()
-
-    if return_code != 0:
-        raise subprocess.CalledProcessError(return_code, foldseek_command)
+    # Search prebuilt (cached) query + reference DBs instead of easy-search, which
+    # re-runs createdb on the whole reference set every time.
+    structure_search(args.detected_domain_structures_root, args.known_domain_structures_root, tsv_path, tmp_path,
+                     format_output='query,target,fident,alnlen,mismatch,gapopen,qstart,qend,tstart,tend,evalue,bits,alntmscore,qtmscore,ttmscore,lddt',
+                     search_args='--max-seqs 5000 -e 1 -s 10 --exhaustive-search -v 3'.split(),
+                     db_cache=getattr(args, "db_cache", None),
+                     cache_query=getattr(args, "cache_query", True))
     print("Foldseek finished successfully.")
     
     # Create final output CSV
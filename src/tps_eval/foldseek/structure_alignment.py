@@ -2,17 +2,34 @@ import os
 import argparse
 from pathlib import Path
 import logging
-import subprocess
 from uuid import uuid4
 from shutil import rmtree
 
 import pandas as pd  # type: ignore
 
+from tps_eval.foldseek.databases import structure_search
 from tps_eval.pandas_compat import group_idxmax_skipna
 
 logger = logging.getLogger(__file__)
 logger.setLevel(logging.INFO)
 
+# Named foldseek search presets, slowest/most complete first. "exhaustive" (the
+# default, and the original behaviour) aligns every query against every reference;
+# "sensitive" and "fast" go through foldseek's k-mer prefilter at decreasing
+# sensitivity. "two_stage" runs the "fast" search, keeps each query's best
+# TWO_STAGE_CANDIDATES hits and realigns only those with the exhaustive preset's
+# alignment parameters (TWO_STAGE_REALIGN). Check a cheaper preset against
+# exhaustive with run_structural_identity --recall_sample before relying on it.
+SEARCH_PRESETS = {
+    "exhaustive": ["--max-seqs", "5000", "-e", "1", "-s", "10", "--exhaustive-search"],
+    "sensitive": ["--max-seqs", "1000", "-e", "1", "-s", "9.5"],
+    "fast": ["--max-seqs", "300", "-e", "1", "-s", "7.5"],
+}
+PRESETS = (*SEARCH_PRESETS, "two_stage")
+TWO_STAGE_CANDIDATES = 50
+TWO_STAGE_REALIGN = ["-e", "1"]
+FORMAT_OUTPUT = "query,target,fident,alnlen,mismatch,gapopen,qstart,qend,tstart,tend,evalue,bits,alntmscore,qtmscore,ttmscore,lddt"
+
 
 def parse_args() -> argparse.Namespace:
     """
@@ -25,13 +42,16 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--output_root", type=str, required=True, help="Path to output CSV file.")
     parser.add_argument("--store_intermediate_results", action="store_true", help="Flag to keep files with intermediate results.", default=False)
     parser.add_argument("--random_run_id", action="store_true", default=False, help="Flag to add random uuid4 to output files to avoid overwriting.")
+    parser.add_argument("--db_cache", type=str, default=None, help="Directory of prebuilt foldseek DBs (see tps_eval.foldseek.databases): the query and reference DBs are built once and reused across runs. Default: built for this run only.")
+    parser.add_argument("--preset", choices=PRESETS, default="exhaustive", help="foldseek search preset (default: exhaustive = every query against every reference).")
+    parser.add_argument("--candidates", type=int, default=TWO_STAGE_CANDIDATES, help="two_stage preset: first-pass hits per query to realign (default %(default)s).")
     parser.add_argument("--exclude_self", action="store_true", default=False, help="Drop self-hits (target structure stem == query structure stem) before the best-hit reduction, for searching a structure set against itself (leave-one-out).")
     return parser.parse_args()
 
 
 def _structure_stem(name: str) -> str:
     """Structure stem: drop any path and a trailing structure extension (mirrors
-    run_structural_identity._stem / _write_topk's self-hit convention)."""
+    run_structural_identity._stem / _topk_frame's self-hit convention)."""
     base = os.path.basename(str(name))
     for ext in (".pdb.gz", ".cif.gz", ".pdb", ".cif", ".ent"):
         if base.endswith(ext):
@@ -51,15 +71,17 @@ def main(args: argparse.Namespace):
     tsv_path = output_root / f'structure_alignments{f"_{run_id}" if args.random_run_id else ""}.tsv'
     tmp_path = output_root / f'tmp{f"_{run_id}" if args.random_run_id else ""}'
     
-    foldseek_command = f'foldseek easy-search {args.structures_root} {args.known_structures_root} {tsv_path} {tmp_path} --max-seqs 5000 -e 1 -s 10 --exhaustive-search -v 3 --format-output query,target,fident,alnlen,mismatch,gapopen,qstart,qend,tstart,tend,evalue,bits,alntmscore,qtmscore,ttmscore,lddt'.split()
-    process = subprocess.Popen(foldseek_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
-    for line in process.stdout:
-        print(line, end="")
-    process.stdout.close()
-    return_code = process.wait()
-
-    if return_code != 0:
-        raise subprocess.CalledProcessError(return_code, foldseek_command)
+    # Search prebuilt (cached) query + reference DBs instead of easy-search, which
+    # re-runs createdb on the whole reference set every time.
+    preset = getattr(args, "preset", "exhaustive")
+    two_stage = preset == "two_stage"
+    structure_search(args.structures_root, args.known_structures_root, tsv_path, tmp_path,
+                     format_output=FORMAT_OUTPUT,
+                     search_args=SEARCH_PRESETS["fast" if two_stage else preset] + ['-v', '3'],
+                     db_cache=getattr(args, "db_cache", None),
+                     cache_query=getattr(args, "cache_query", True),
+                     prefilter_candidates=getattr(args, "candidates", TWO_STAGE_CANDIDATES) if two_stage else None,
+                     realign_args=TWO_STAGE_REALIGN + ['-v', '3'])
     print("Foldseek finished successfully.")
     
     # Create final output CSV
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+"""Unit tests for the prebuilt foldseek DB cache (foldseek/databases.py).
+
+Run: python test_databases.py   (no pytest / foldseek binary required).
+
+foldseek is never executed: subprocess.Popen is monkeypatched with a fake that
+logs each command and leaves a DB file for createdb / an index file for
+createindex. Exercises DB reuse across runs and across query/target roles, rebuilds
+on changed structures or a new foldseek version, the index upgrade of a query-only
+entry (a separate, staged entry), the manifest, the search + convertalis command
+pair, single-use query DBs kept out of the cache, and LRU pruning.
+"""
+
+import inspect
+import io
+import json
+import os
+import tempfile
+import time
+
+import tps_eval.foldseek.databases as databases
+from tps_eval.foldseek.databases import (
+    INDEXED_SUFFIX,
+    MANIFEST,
+    cache_entries,
+    ensure_db,
+    prune_cache,
+    source_fingerprint,
+    structure_search,
+)
+
+
+class _FakePopen:
+    calls = []
+
+    def __init__(self, cmd, **kwargs):
+        _FakePopen.calls.append(list(cmd))
+        if cmd[1] == "createdb":
+            open(cmd[3], "w").close()
+        elif cmd[1] == "createindex":
+            open(cmd[2] + ".idx", "w").close()
+        elif cmd[1] == "convertalis":
+            open(cmd[5], "w").close()
+        self.stdout = io.StringIO("")
+
+    def wait(self):
+        return 0
+
+
+def _install(monkeypatch, version="9.427df8a"):
+    _FakePopen.calls = []
+    monkeypatch.setattr(databases.subprocess, "Popen", _FakePopen)
+    monkeypatch.setattr(databases, "foldseek_version", lambda foldseek_bin="foldseek": version)
+
+
+def _structs(root, name, contents):
+    d = os.path.join(root, name)
+    os.makedirs(d)
+    for stem, text in contents.items():
+        with open(os.path.join(d, f"{stem}.pdb"), "w") as fh:
+            fh.write(text)
+    return d
+
+
+def _steps():
+    return [c[1] for c in _FakePopen.calls]
+
+
+def test_fingerprint_follows_names_and_contents_not_location():
+    with tempfile.TemporaryDirectory() as d:
+        a = _structs(d, "a", {"x": "ATOM 1\n", "y": "ATOM 2\n"})
+        b = _structs(d, "b", {"x": "ATOM 1\n", "y": "ATOM 2\n"})
+        with open(os.path.join(a, "notes.txt"), "w") as fh:
+            fh.write("not a structure")
+        assert source_fingerprint(a) == source_fingerprint(b)
+        assert source_fingerprint(a)[1] == 2
+        with open(os.path.join(b, "y.pdb"), "w") as fh:
+            fh.write("ATOM 3\n")
+        assert source_fingerprint(a)[0] != source_fingerprint(b)[0]
+
+
+def test_db_is_built_once_and_reused(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        _install(monkeypatch)
+        known = _structs(d, "known", {"ref1": "ATOM 1\n", "ref2": "ATOM 2\n"})
+        cache = os.path.join(d, "cache")
+        db = ensure_db(known, cache, index=True)
+        assert _steps() == ["createdb", "createindex"]
+        assert os.path.isfile(db) and os.path.isfile(db + ".idx")
+        with open(os.path.join(os.path.dirname(db), MANIFEST)) as fh:
+            manifest = json.load(fh)
+        assert manifest["n_structures"] == 2 and manifest["indexed"] is True
+        assert manifest["foldseek_version"] == "9.427df8a"
+        assert manifest["source_dir"] == os.path.abspath(known)
+
+        assert ensure_db(known, cache, index=True) == db  # second run: nothing to do
+        assert _steps() == ["createdb", "createindex"]
+        assert [p for p in os.listdir(os.path.dirname(os.path.dirname(db))) if p.startswith(".")] == []
+
+        # Changed reference set or a foldseek upgrade -> a separate, fresh entry.
+        with open(os.path.join(known, "ref3.pdb"), "w") as fh:
+            fh.write("ATOM 3\n")
+        assert ensure_db(known, cache, index=True) != db
+        _install(monkeypatch, version="10.941cd33")
+        assert ensure_db(known, cache, index=True) != db
+        assert _steps() == ["createdb", "createindex"]
+
+
+def test_query_entry_gains_an_index_when_used_as_target(monkeypatch):
+    """The index is built in a staged copy published as a separate entry; the
+    query entry other jobs may be reading is left as it was."""
+    with tempfile.TemporaryDirectory() as d:
+        _install(monkeypatch)
+        structs = _structs(d, "designs", {"d1": "ATOM 1\n"})
+        cache = os.path.join(d, "cache")
+        db = ensure_db(structs, cache)
+        assert _steps() == ["createdb"]
+        indexed = ensure_db(structs, cache, index=True)
+        assert indexed != db and os.path.dirname(indexed).endswith(INDEXED_SUFFIX)
+        assert _steps() == ["createdb", "createindex"]  # copied, not re-converted
+        assert ".building-" in _FakePopen.calls[-1][2]  # indexed in staging
+        assert os.path.isfile(indexed + ".idx") and not os.path.exists(db + ".idx")
+        with open(os.path.join(os.path.dirname(db), MANIFEST)) as fh:
+            assert json.load(fh)["indexed"] is False
+        assert ensure_db(structs, cache) == indexed  # queries prefer the indexed entry
+        assert ensure_db(structs, cache, index=True) == indexed
+        assert _steps() == ["createdb", "createindex"]
+        root = os.path.dirname(os.path.dirname(db))
+        assert [p for p in os.listdir(root) if p.startswith(".")] == []
+
+
+def test_structure_search_shares_the_query_db(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        _install(monkeypatch)
+        structs = _structs(d, "designs", {"d1": "ATOM 1\n", "d2": "ATOM 2\n"})
+        known = _structs(d, "known", {"ref1": "ATOM 9\n"})
+        cache = os.path.join(d, "cache")
+        for run in ("run1", "run2"):
+            tmp = os.path.join(d, run)
+            structure_search(structs, known, os.path.join(tmp, "hits.tsv"), tmp,
+                             format_output="query,target,alntmscore",
+                             search_args=["-e", "1"], db_cache=cache)
+        # A different tool on the same designs against a prebuilt target DB.
+        structure_search(structs, "/db/afdb_swissprot", os.path.join(d, "sprot.tsv"),
+                         os.path.join(d, "run3"), format_output="query,target",
+                         db_cache=cache, target_is_db=True)
+        assert _steps() == ["createdb", "createdb", "createindex",
+                            "search", "convertalis", "search", "convertalis",
+                            "search", "convertalis"]
+        search = _FakePopen.calls[-2]
+        assert search[3] == "/db/afdb_swissprot", search
+        assert search[2] == ensure_db(structs, cache)  # the cached designs DB
+        convert = _FakePopen.calls[-1]
+        assert convert[convert.index("--format-output") + 1] == "query,target"
+
+        # Without a cache the DBs live in the run's tmp dir.
+        _FakePopen.calls = []
+        tmp = os.path.join(d, "nocache")
+        structure_search(structs, known, os.path.join(tmp, "hits.tsv"), tmp,
+                         format_output="query,target")
+        assert _FakePopen.calls[0][3].startswith(os.path.join(tmp, "dbs"))
+
+        # A single-use query set stays out of the shared cache.
+        _FakePopen.calls = []
+        tmp = os.path.join(d, "once")
+        once = _structs(d, "domains", {"dom1": "ATOM 5\n"})
+        structure_search(once, known, os.path.join(tmp, "hits.tsv"), tmp,
+                         format_output="query,target", db_cache=cache, cache_query=False)
+        assert _steps() == ["createdb", "search", "convertalis"]
+        assert _FakePopen.calls[0][3].startswith(os.path.join(tmp, "dbs"))
+        assert not any(e.startswith("domains-") for e in os.listdir(os.path.join(cache, "v1")))
+
+
+def test_prune_removes_least_recently_used_idle_entries(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        _install(monkeypatch)
+        cache = os.path.join(d, "cache")
+        dbs = []
+        for i, name in enumerate(("old", "mid", "new")):
+            db = ensure_db(_structs(d, name, {"s": f"ATOM {i}\n"}), cache)
+            with open(db, "w") as fh:
+                fh.write("x" * 1000)
+            dbs.append(db)
+        now = time.time()
+        for db, age_h in zip(dbs, (72, 48, 1)):
+            os.utime(os.path.join(os.path.dirname(db), MANIFEST), (now - age_h * 3600,) * 2)
+        abandoned = os.path.join(cache, "v1", ".x-1.building-abc")
+        os.makedirs(abandoned)
+        os.utime(abandoned, (now - 72 * 3600,) * 2)
+        sizes = {os.path.dirname(e): b for e, _, b in cache_entries(cache)}
+        assert [os.path.basename(e) for e, _, _ in cache_entries(cache)][0].startswith("old-")
+
+        # Budget for one entry: "old" and "mid" go, "new" is still in use.
+        removed = prune_cache(cache, max(sizes.values()) - 1)
+        assert [os.path.basename(e).split("-")[0] for e in removed] == ["old", "mid"]
+        assert [os.path.basename(e).split("-")[0] for e, _, _ in cache_entries(cache)] == ["new"]
+        assert os.listdir(os.path.join(cache, "v1")) == [os.path.basename(os.path.dirname(dbs[2]))]
+        assert prune_cache(cache, 0) == []  # idle guard
+
+        # Reuse refreshes the LRU clock.
+        ensure_db(os.path.join(d, "new"), cache)
+        assert time.time() - cache_entries(cache)[0][1] < 60
+
+
+def main():
+    class _MP:
+        def __init__(self):
+            self._undo = []
+
+        def setattr(self, obj, name, value):
+            self._undo.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+        def undo(self):
+            for obj, name, old in reversed(self._undo):
+                setattr(obj, name, old)
+            self._undo = []
+
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        if "monkeypatch" in inspect.signature(t).parameters:
+            mp = _MP()
+            try:
+                t(mp)
+            finally:
+                mp.undo()
+        else:
+            t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
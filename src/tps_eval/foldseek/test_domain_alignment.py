@@ -5,8 +5,8 @@ from __future__ import annotations
 Run: python test_domain_alignment.py   (no pytest / foldseek binary required).
 
 foldseek is never executed: subprocess.Popen is monkeypatched with a fake that
-writes a tiny synthetic foldseek TSV to the tool's output path and creates the tmp
-dir it later removes, driving main() end-to-end. Exercises the REAL 16-column TSV
+plays the createdb / search / convertalis steps, the last writing a tiny synthetic
+foldseek TSV to the tool's output path, driving main() end-to-end. Exercises the REAL 16-column TSV
 parser and the per-query best-hit (idxmax over alntmscore / qtmscore / ttmscore /
 lddt) reduction on synthetic data.
 """
@@ -20,19 +20,22 @@ from types import SimpleNamespace
 import pandas as pd
 
 
-import tps_eval.foldseek.domain_alignment as da  # noqa: E402
+import tps_eval.foldseek.databases as databases  # noqa: E402
 from tps_eval.foldseek.domain_alignment import main  # noqa: E402
 
 
 class _FakePopen:
+    """foldseek createdb leaves a DB file, convertalis (cmd[5] = out TSV) writes
+    `tsv_content`; createindex / search do nothing."""
+
     tsv_content = ""
 
     def __init__(self, cmd, **kwargs):
-        out_tsv = cmd[4]
-        tmp_dir = cmd[5]
-        os.makedirs(tmp_dir, exist_ok=True)
-        with open(out_tsv, "w") as fh:
-            fh.write(_FakePopen.tsv_content)
+        if cmd[1] == "createdb":
+            open(cmd[3], "w").close()
+        elif cmd[1] == "convertalis":
+            with open(cmd[5], "w") as fh:
+                fh.write(_FakePopen.tsv_content)
         self.stdout = io.StringIO("")
 
     def wait(self):
@@ -41,7 +44,7 @@ class _FakePopen:
 
 def _install_fake(tsv_content: str):
     _FakePopen.tsv_content = tsv_content
-    da.subprocess.Popen = _FakePopen  # type: ignore[attr-defined]
+    databases.subprocess.Popen = _FakePopen  # type: ignore[attr-defined]
 
 
 def _row(query, target, alntm, qtm, ttm, lddt):
@@ -5,8 +5,8 @@ from __future__ import annotations
 Run: python test_structure_alignment.py   (no pytest / foldseek binary required).
 
 foldseek is never executed: subprocess.Popen is monkeypatched with a fake that
-writes a tiny synthetic foldseek TSV (the 16-column easy-search format) to the
-tool's output path and creates the tmp dir it later removes. That drives main()
+plays the createdb / search / convertalis steps, the last writing a tiny synthetic
+foldseek TSV (the 16-column format) to the tool's output path. That drives main()
 end-to-end so the REAL TSV parser, per-query best-hit (idxmax over alntmscore /
 qtmscore / ttmscore / lddt) reduction, and the --exclude_self leave-one-out filter
 are all exercised on synthetic data. Also unit-tests the pure _structure_stem.
@@ -21,6 +21,7 @@ from types import SimpleNamespace
 import pandas as pd
 
 
+import tps_eval.foldseek.databases as databases  # noqa: E402
 import tps_eval.foldseek.structure_alignment as sa  # noqa: E402
 from tps_eval.foldseek.structure_alignment import _structure_stem, main  # noqa: E402
 
@@ -32,16 +33,19 @@ _COLS = [
 
 
 class _FakePopen:
-    """Writes `tsv_content` to the out_tsv (cmd[4]) and creates tmp dir (cmd[5])."""
+    """foldseek createdb leaves a DB file, convertalis (cmd[5] = out TSV) writes
+    `tsv_content`; createindex / search do nothing."""
 
     tsv_content = ""
+    calls = []
 
     def __init__(self, cmd, **kwargs):
-        out_tsv = cmd[4]
-        tmp_dir = cmd[5]
-        os.makedirs(tmp_dir, exist_ok=True)
-        with open(out_tsv, "w") as fh:
-            fh.write(_FakePopen.tsv_content)
+        _FakePopen.calls.append(list(cmd))
+        if cmd[1] == "createdb":
+            open(cmd[3], "w").close()
+        elif cmd[1] == "convertalis":
+            with open(cmd[5], "w") as fh:
+                fh.write(_FakePopen.tsv_content)
         self.stdout = io.StringIO("")
 
     def wait(self):
@@ -50,7 +54,8 @@ class _FakePopen:
 
 def _install_fake(tsv_content: str):
     _FakePopen.tsv_content = tsv_content
-    sa.subprocess.Popen = _FakePopen  # type: ignore[attr-defined]
+    _FakePopen.calls = []
+    databases.subprocess.Popen = _FakePopen  # type: ignore[attr-defined]
 
 
 def _row(query, target, alntm, qtm, ttm, lddt):
@@ -147,12 +152,45 @@ def test_all_nan_score_column_yields_nan_not_crash():
     print("ok all-NaN score column -> NaN (no crash)")
 
 
+def test_presets_and_two_stage_commands():
+    """The default preset is the exhaustive all-vs-all search; two_stage runs the fast
+    search, keeps --candidates hits per query and realigns them."""
+    tmp = tempfile.mkdtemp(prefix="sa_presets_")
+    steps = {}
+    for preset in ("exhaustive", "fast", "two_stage"):
+        _install_fake(_row("d1.pdb", "ref_a.pdb", 0.7, 0.7, 0.7, 0.7) + "\n")
+        args = SimpleNamespace(
+            random_run_id=False, output_root=os.path.join(tmp, preset), structures_root="/fake/q",
+            known_structures_root="/fake/k", store_intermediate_results=False,
+            exclude_self=False, preset=preset, candidates=7,
+        )
+        main(args)
+        steps[preset] = {c[1]: c for c in _FakePopen.calls if c[1] != "version"}
+
+    search = steps["exhaustive"]["search"]
+    assert "--exhaustive-search" in search and search[search.index("-s") + 1] == "10", search
+    assert list(steps["fast"]) == ["createdb", "createindex", "search", "convertalis"]
+    assert "--exhaustive-search" not in steps["fast"]["search"]
+
+    two = steps["two_stage"]
+    assert list(two) == ["createdb", "createindex", "search", "filterdb", "structurealign", "convertalis"]
+    assert two["search"][6:] == sa.SEARCH_PRESETS["fast"] + ["-v", "3"], two["search"]
+    assert two["filterdb"][two["filterdb"].index("--extract-lines") + 1] == "7"
+    assert two["filterdb"][3] == two["structurealign"][4]        # realigns the kept candidates
+    assert two["structurealign"][5] == two["convertalis"][4]     # and reports that alignment
+    assert two["structurealign"][6:] == sa.TWO_STAGE_REALIGN + ["-v", "3"]
+    scores = pd.read_csv(os.path.join(tmp, "two_stage", "structure_alignment_scores.csv"))
+    assert scores["max_alntmscore"].tolist() == [0.7]
+    print("ok presets + two-stage commands")
+
+
 def main_all():
     test_structure_stem()
     test_best_hit_reduction()
     test_exclude_self_leave_one_out()
     test_all_nan_score_column_yields_nan_not_crash()
-    print("\nAll 4 tests passed.")
+    test_presets_and_two_stage_commands()
+    print("\nAll 5 tests passed.")
 
 
 if __name__ == "__main__":
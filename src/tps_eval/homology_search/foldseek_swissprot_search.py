@@ -2,7 +2,7 @@ from __future__ import annotations
 
 """Tool B — broad STRUCTURE homology search of designs vs AlphaFold-Swiss-Prot.
 
-For each design structure, foldseek easy-search against the ANNOTATED AlphaFold DB
+For each design structure, foldseek search against the ANNOTATED AlphaFold DB
 Swiss-Prot set (`Alphafold/Swiss-Prot`), then report the top hit across ALL proteins
 (by TM-score) and whether it (and the top-N) are terpene synthases — the structural
 analog of the sequence search. Catches function-drift on the fold level and confirms
@@ -24,7 +24,6 @@ af3-vs-flat detection and dir-keyed naming). One row per design, NaN/empty if no
 import os
 import re
 import shutil
-import subprocess
 import sys
 import tempfile
 from pathlib import Path
@@ -36,6 +35,7 @@ CURRENT_DIR = Path(__file__).resolve().parent
 
 # Reuse the af3-vs-flat input detection + dir-keyed naming from the pLDDT tool.
 from tps_eval.structure_metrics.plddt import _collect_structures  # noqa: E402
+from tps_eval.foldseek.databases import structure_search  # noqa: E402
 from tps_eval.homology_search.tps_accessions import is_tps, load_tps_accessions  # noqa: E402
 
 # AFDB target ids look like `AF-<ACC>-F<frag>-model_v<n>` (sometimes with a `.pdb`
@@ -89,19 +89,16 @@ def _default_save_path(structs_dir: str) -> str:
 
 
 def _run_foldseek(query_dir: str, afdb_db: str, out_tsv: str, tmp_dir: str,
-                  *, max_seqs: int) -> None:
-    cmd = (
-        f"foldseek easy-search {query_dir} {afdb_db} {out_tsv} {tmp_dir} "
-        f"--max-seqs {max_seqs} --format-output {FOLDSEEK_OUTFMT} -v 3"
-    ).split()
-    print("Running:", " ".join(cmd))
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
-    for line in proc.stdout:
-        print(line, end="")
-    proc.stdout.close()
-    rc = proc.wait()
-    if rc != 0:
-        raise subprocess.CalledProcessError(rc, cmd)
+                  *, max_seqs: int, db_cache: Optional[str] = None) -> None:
+    # afdb_db is already a foldseek DB; only the query side needs converting, and
+    # with a db_cache that query DB is shared with the other foldseek tools.
+    structure_search(
+        query_dir, afdb_db, out_tsv, tmp_dir,
+        format_output=FOLDSEEK_OUTFMT,
+        search_args=["--max-seqs", str(max_seqs), "-v", "3"],
+        db_cache=db_cache,
+        target_is_db=True,
+    )
 
 
 def _summarize_query(group: pd.DataFrame, tps_set: frozenset, top_n: int) -> dict:
@@ -131,10 +128,13 @@ def foldseek_swissprot_search(
     save_path: Optional[str] = None,
     top_n: int = 25,
     max_seqs: int = 300,
+    db_cache: Optional[str] = None,
 ) -> pd.DataFrame:
     """foldseek every design structure vs AFDB-Swiss-Prot; classify top hits TPS/non-TPS.
 
-    Every design (af3 job name or flat-dir stem) gets a row, NaN/empty if no hits."""
+    Every design (af3 job name or flat-dir stem) gets a row, NaN/empty if no hits.
+    With ``db_cache`` the designs' query DB is built once and reused (see
+    ``tps_eval.foldseek.databases``)."""
     tps_set = load_tps_accessions(tps_accessions_path)
     structures, mode = _collect_structures(structs_dir)
     if not structures:
@@ -156,7 +156,7 @@ def foldseek_swissprot_search(
             ext = os.path.splitext(path)[1] or ".pdb"
             shutil.copy(path, os.path.join(query_dir, f"{ident}{ext}"))
 
-        _run_foldseek(query_dir, afdb_db, out_tsv, fs_tmp, max_seqs=max_seqs)
+        _run_foldseek(query_dir, afdb_db, out_tsv, fs_tmp, max_seqs=max_seqs, db_cache=db_cache)
         if os.path.isfile(out_tsv) and os.path.getsize(out_tsv) > 0:
             hits = pd.read_csv(out_tsv, sep="\t", header=None, names=FOLDSEEK_COLS)
         else:
@@ -8,7 +8,7 @@ from tps_eval.homology_search.foldseek_swissprot_search import foldseek_swisspro
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Broad structure homology search of designs vs AlphaFold-Swiss-Prot "
-        "(foldseek easy-search), reporting the top hit across all proteins and whether "
+        "(foldseek search), reporting the top hit across all proteins and whether "
         "the top-N hits are terpene synthases. Writes a CSV keyed by ID."
     )
     parser.add_argument("structs_dir", help="Directory of generated structures "
@@ -21,6 +21,10 @@ def main() -> None:
     parser.add_argument("--top_n", type=int, default=25, help="Top-N hits per query (default 25).")
     parser.add_argument("--max_seqs", type=int, default=300,
                         help="foldseek --max-seqs prefilter (default 300).")
+    parser.add_argument("--db_cache", default=None,
+                        help="Directory of prebuilt foldseek DBs: the designs' query DB is "
+                        "built once and shared with the other foldseek tools (default: "
+                        "built for this run only).")
     args = parser.parse_args()
 
     foldseek_swissprot_search(
@@ -30,6 +34,7 @@ def main() -> None:
         save_path=args.save_path,
         top_n=args.top_n,
         max_seqs=args.max_seqs,
+        db_cache=args.db_cache,
     )
 
 
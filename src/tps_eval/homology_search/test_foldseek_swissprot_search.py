@@ -5,7 +5,7 @@ from __future__ import annotations
 Run: python test_foldseek_swissprot_search.py   (no pytest / foldseek binary required).
 
 foldseek is never executed: subprocess.Popen is monkeypatched with a fake that
-records the built command and writes a tiny synthetic foldseek TSV to the tool's
+records the built commands (createdb / search / convertalis) and writes a tiny synthetic foldseek TSV to the tool's
 output path. Exercises the REAL command construction, AFDB-accession extraction,
 query->ID mapping, best-hit-by-alntmscore selection, TPS classification, ID keying,
 empty-result NaN contract, and CSV filename — all on synthetic data.
@@ -19,6 +19,7 @@ import tempfile
 import pandas as pd
 
 
+from tps_eval.foldseek import databases  # noqa: E402
 from tps_eval.homology_search import foldseek_swissprot_search as fss  # noqa: E402
 from tps_eval.homology_search.foldseek_swissprot_search import (  # noqa: E402
     _accession_from_target,
@@ -30,15 +31,17 @@ from tps_eval.homology_search.foldseek_swissprot_search import (  # noqa: E402
 
 
 class _FakePopen:
-    captured_cmd = None
+    captured_cmds = []
     tsv_content = ""
 
     def __init__(self, cmd, **kwargs):
-        _FakePopen.captured_cmd = list(cmd)
-        # foldseek easy-search <query> <db> <out_tsv> <tmp> ...  -> out is index 4.
-        out_path = cmd[4]
-        with open(out_path, "w") as fh:
-            fh.write(_FakePopen.tsv_content)
+        _FakePopen.captured_cmds.append(list(cmd))
+        if cmd[1] == "createdb":
+            open(cmd[3], "w").close()
+        elif cmd[1] == "convertalis":
+            # foldseek convertalis <qdb> <tdb> <alndb> <out_tsv> ...  -> out is index 5.
+            with open(cmd[5], "w") as fh:
+                fh.write(_FakePopen.tsv_content)
         self.stdout = io.StringIO("")
 
     def wait(self):
@@ -47,7 +50,8 @@ class _FakePopen:
 
 def _install_fake(tsv_content: str):
     _FakePopen.tsv_content = tsv_content
-    fss.subprocess.Popen = _FakePopen  # type: ignore[attr-defined]
+    _FakePopen.captured_cmds = []
+    databases.subprocess.Popen = _FakePopen  # type: ignore[attr-defined]
 
 
 def _write_pdb(path: str) -> None:
@@ -128,10 +132,13 @@ def test_full_run_command_and_parsing():
     df = foldseek_swissprot_search(structs, "/fake/afdb", acc, top_n=25, max_seqs=300)
 
     # --- command construction ---
-    cmd = _FakePopen.captured_cmd
-    assert cmd[0:2] == ["foldseek", "easy-search"], cmd
-    assert cmd[cmd.index("--max-seqs") + 1] == "300", cmd
-    assert cmd[cmd.index("--format-output") + 1] == fss.FOLDSEEK_OUTFMT, cmd
+    # Only the query side is converted; the AFDB target is already a foldseek DB.
+    cmds = [c for c in _FakePopen.captured_cmds if c[1] != "version"]
+    assert [c[1] for c in cmds] == ["createdb", "search", "convertalis"], cmds
+    search, convert = cmds[1:]
+    assert search[3] == "/fake/afdb", search
+    assert search[search.index("--max-seqs") + 1] == "300", search
+    assert convert[convert.index("--format-output") + 1] == fss.FOLDSEEK_OUTFMT, convert
 
     # --- parsing / classification ---
     by_id = df.set_index("ID")
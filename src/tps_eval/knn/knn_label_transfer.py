@@ -41,6 +41,8 @@ from typing import Dict, List, Optional, Sequence, Tuple
 import numpy as np
 import pandas as pd
 
+from tps_eval.data.topk import read_topk
+
 # --------------------------------------------------------------------------- #
 # Spaces
 # --------------------------------------------------------------------------- #
@@ -140,7 +142,7 @@ def load_label_map(label_file: str) -> Tuple[Dict[str, object], List[object]]:
 
 def _topk_groups(topk_csv: str) -> Dict[str, List[Tuple[int, str, float]]]:
     """Read a top-k CSV into {query_id: [(rank, neighbour_id, score), ...]} (rank asc)."""
-    df = pd.read_csv(topk_csv)
+    df = read_topk(topk_csv)
     df = df.sort_values(["query_id", "rank"], kind="stable")
     out: Dict[str, List[Tuple[int, str, float]]] = defaultdict(list)
     for qid, rank, nid, score in zip(
@@ -21,7 +21,7 @@ MISSING (NaN) FAILS that metric (it cannot be band-checked without a category).
 from __future__ import annotations
 
 import json
-from typing import Dict, Tuple
+from typing import Dict, Set, Tuple
 
 import pandas as pd
 
@@ -37,14 +37,26 @@ def _band_mask(vals: pd.Series, band: dict) -> pd.Series:
     return ok
 
 
-def apply_band_filter(df: pd.DataFrame, metrics: Dict[str, dict],
-                      bands_file: str = None) -> Tuple[pd.DataFrame, Dict]:
-    """Keep rows within every metric's band; add ``band_pass`` and drop failers."""
+def resolve_bands(metrics: Dict[str, dict], bands_file: str = None) -> Dict[str, dict]:
+    """The bands in effect: ``bands_file``'s, overridden/augmented by inline ``metrics``."""
     resolved: Dict[str, dict] = {}
     if bands_file:
         with open(bands_file) as fh:
             resolved.update(json.load(fh).get("metrics", {}))
     resolved.update(metrics or {})
+    return resolved
+
+
+def band_columns(metrics: Dict[str, dict], bands_file: str = None) -> Set[str]:
+    """Columns a band filter reads: every banded metric and its ``by`` column."""
+    resolved = resolve_bands(metrics, bands_file)
+    return set(resolved) | {leaf["by"] for leaf in resolved.values() if "by" in leaf}
+
+
+def apply_band_filter(df: pd.DataFrame, metrics: Dict[str, dict],
+                      bands_file: str = None) -> Tuple[pd.DataFrame, Dict]:
+    """Keep rows within every metric's band; add ``band_pass`` and drop failers."""
+    resolved = resolve_bands(metrics, bands_file)
 
     mask = pd.Series(True, index=df.index)
     per_metric = []
@@ -16,11 +16,17 @@ c10-only geometry gate that does not apply to c0/c1).
 ``apply_gate`` adds a boolean ``gate_pass`` column and (by default) returns only the passing
 rows, plus a report dict with the in/out counts and per-condition pass counts for the
 provenance manifest.
+
+Conditions are compiled once into a ``GatePlan`` of vectorised mask functions (a column's
+bool normalisation / numeric coercion is shared by all leaves on it). A plan can be fed
+record batches one at a time (``gate_batches``; e.g. from ``MetricStore.iter_batches``)
+so a large table is gated in bounded memory, its report accumulating across batches.
 """
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, List, Set, Tuple
 
+import numpy as np
 import pandas as pd
 
 _LEAF_OPS = {"eq", "ne", "lt", "le", "gt", "ge", "in", "not_in", "notnull", "isnull", "between"}
@@ -41,90 +47,173 @@ def _describe(cond: dict) -> str:
     return f"{col} <malformed>"
 
 
-def _eval_leaf(df: pd.DataFrame, cond: dict) -> pd.Series:
+def condition_columns(cond: dict) -> Set[str]:
+    """Columns a condition (leaf, group or ``when``) reads."""
+    cols: Set[str] = set()
+    if "when" in cond:
+        cols |= condition_columns(cond["when"])
+    for key in ("all_of", "any_of"):
+        for c in cond.get(key, []):
+            cols |= condition_columns(c)
+    if "col" in cond:
+        cols.add(cond["col"])
+    return cols
+
+
+_TRUE_TOKENS = ("true", "1", "1.0")
+_NUMERIC_OPS = ("lt", "le", "gt", "ge")
+
+
+class _Columns:
+    """Per-batch column views shared by every leaf of a plan: each column's missing
+    mask, bool normalisation and numeric coercion are computed once per batch."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._cache: Dict[Tuple[str, str], np.ndarray] = {}
+
+    def series(self, col: str) -> pd.Series:
+        if col not in self.df.columns:
+            raise ValueError(f"gate condition references unknown column '{col}'. "
+                             f"available: {list(self.df.columns)}")
+        return self.df[col]
+
+    def _memo(self, kind: str, col: str, compute: Callable[[pd.Series], pd.Series]) -> np.ndarray:
+        key = (kind, col)
+        if key not in self._cache:
+            self._cache[key] = _as_mask(compute(self.series(col))) if kind != "num" \
+                else compute(self.series(col)).to_numpy(dtype=float, na_value=np.nan)
+        return self._cache[key]
+
+    def present(self, col: str) -> np.ndarray:
+        return self._memo("present", col, lambda s: s.notna())
+
+    def truthy(self, col: str) -> np.ndarray:
+        # Booleans in a merged CSV may arrive as the strings "True"/"False".
+        return self._memo("bool", col,
+                          lambda s: s.astype(str).str.strip().str.lower().isin(_TRUE_TOKENS))
+
+    def numbers(self, col: str) -> np.ndarray:
+        return self._memo("num", col, lambda s: pd.to_numeric(s, errors="coerce"))
+
+
+def _as_mask(values) -> np.ndarray:
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=bool, na_value=False)
+    return np.asarray(values, dtype=bool)
+
+
+def _compile_leaf(cond: dict) -> Callable[[_Columns], np.ndarray]:
     col = cond.get("col")
     if col is None:
         raise ValueError(f"gate leaf missing 'col': {cond}")
-    if col not in df.columns:
-        raise ValueError(f"gate condition references unknown column '{col}'. "
-                         f"available: {list(df.columns)}")
-    s = df[col]
-    present = s.notna()
     if "notnull" in cond:
-        return present
+        return lambda c: c.present(col)
     if "isnull" in cond:
-        return ~present
-    if "eq" in cond:
-        target = cond["eq"]
-        # Booleans in a merged CSV may arrive as the strings "True"/"False".
+        return lambda c: ~c.present(col)
+    for op in ("eq", "ne"):
+        if op not in cond:
+            continue
+        target = cond[op]
         if isinstance(target, bool):
-            norm = s.map(lambda v: str(v).strip().lower() in ("true", "1", "1.0")
-                         if pd.notna(v) else False)
             # A missing value must FAIL every leaf (except isnull); guard with `present`
-            # so a NaN row does not spuriously satisfy `eq: False`.
-            return present & (norm == target)
-        return present & (s == target)
-    if "ne" in cond:
-        target = cond["ne"]
-        # Mirror the `eq` handling: a boolean column merged from a CSV may arrive as the
-        # strings "True"/"False", so normalise before comparing to a bool target.
-        if isinstance(target, bool):
-            norm = s.map(lambda v: str(v).strip().lower() in ("true", "1", "1.0")
-                         if pd.notna(v) else False)
-            return present & (norm != target)
-        return present & (s != target)
+            # so a NaN row does not spuriously satisfy `eq: False` / `ne: True`.
+            if op == "eq":
+                return lambda c: c.present(col) & (c.truthy(col) == target)
+            return lambda c: c.present(col) & (c.truthy(col) != target)
+        if op == "eq":
+            return lambda c: c.present(col) & _as_mask(c.series(col) == target)
+        return lambda c: c.present(col) & _as_mask(c.series(col) != target)
     if "in" in cond:
-        return present & s.isin(cond["in"])
+        return lambda c: c.present(col) & _as_mask(c.series(col).isin(cond["in"]))
     if "not_in" in cond:
-        return present & ~s.isin(cond["not_in"])
+        return lambda c: c.present(col) & ~_as_mask(c.series(col).isin(cond["not_in"]))
     if "between" in cond:
         lo, hi = cond["between"]
-        return present & (s.astype(float) >= lo) & (s.astype(float) <= hi)
-    num = pd.to_numeric(s, errors="coerce")
-    if "lt" in cond:
-        return num.notna() & (num < cond["lt"])
-    if "le" in cond:
-        return num.notna() & (num <= cond["le"])
-    if "gt" in cond:
-        return num.notna() & (num > cond["gt"])
-    if "ge" in cond:
-        return num.notna() & (num >= cond["ge"])
+
+        def _between(c: _Columns) -> np.ndarray:
+            vals = c.series(col).astype(float).to_numpy(dtype=float, na_value=np.nan)
+            return c.present(col) & (vals >= lo) & (vals <= hi)
+        return _between
+    for op in _NUMERIC_OPS:
+        if op in cond:
+            compare = {"lt": np.less, "le": np.less_equal,
+                       "gt": np.greater, "ge": np.greater_equal}[op]
+            target = cond[op]
+            # NaN compares False, so a missing / non-numeric value fails.
+            return lambda c: compare(c.numbers(col), target)
     raise ValueError(f"gate leaf has no recognised operator ({_LEAF_OPS}): {cond}")
 
 
-def _eval_condition(df: pd.DataFrame, cond: dict) -> pd.Series:
+def _compile(cond: dict) -> Callable[[_Columns], np.ndarray]:
     if "when" in cond:
         # Conditional: rows NOT matching `when` auto-pass; rows matching must satisfy the
         # rest of the condition. Used for class-specific filters (e.g. c10-only geometry).
-        when_mask = _eval_condition(df, cond["when"])
-        body = {k: v for k, v in cond.items() if k != "when"}
-        return (~when_mask) | _eval_condition(df, body)
+        when = _compile(cond["when"])
+        body = _compile({k: v for k, v in cond.items() if k != "when"})
+        return lambda c: ~when(c) | body(c)
     if "all_of" in cond:
-        mask = pd.Series(True, index=df.index)
-        for c in cond["all_of"]:
-            mask &= _eval_condition(df, c)
-        return mask
+        parts = [_compile(sub) for sub in cond["all_of"]]
+        return lambda c: np.logical_and.reduce([p(c) for p in parts] + [np.ones(len(c.df), bool)])
     if "any_of" in cond:
-        mask = pd.Series(False, index=df.index)
-        for c in cond["any_of"]:
-            mask |= _eval_condition(df, c)
+        parts = [_compile(sub) for sub in cond["any_of"]]
+        return lambda c: np.logical_or.reduce([p(c) for p in parts] + [np.zeros(len(c.df), bool)])
+    return _compile_leaf(cond)
+
+
+class GatePlan:
+    """Gate conditions compiled once into vectorised mask functions.
+
+    ``evaluate`` may be called on successive record batches of one table (e.g.
+    ``MetricStore.iter_batches``); the in/out and per-condition pass counts accumulate,
+    so ``report()`` covers everything evaluated so far.
+    """
+
+    def __init__(self, conditions: List[dict]):
+        self.conditions = list(conditions)
+        self.columns: Set[str] = set()
+        for cond in self.conditions:
+            self.columns |= condition_columns(cond)
+        self._compiled = [_compile(cond) for cond in self.conditions]
+        self.n_in = 0
+        self.n_pass = 0
+        self.passed = [0] * len(self.conditions)
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        """Boolean mask of the rows of ``df`` passing every condition (top-level AND)."""
+        columns = _Columns(df)
+        mask = np.ones(len(df), dtype=bool)
+        for i, compiled in enumerate(self._compiled):
+            cmask = compiled(columns)
+            self.passed[i] += int(cmask.sum())
+            mask &= cmask
+        self.n_in += len(df)
+        self.n_pass += int(mask.sum())
         return mask
-    return _eval_leaf(df, cond)
+
+    def report(self) -> Dict:
+        return {"op": "gate", "n_in": self.n_in, "n_pass": self.n_pass,
+                "conditions": [{"condition": _describe(cond), "passed": n}
+                               for cond, n in zip(self.conditions, self.passed)]}
 
 
 def apply_gate(df: pd.DataFrame, conditions: List[dict],
                keep_only_passing: bool = True) -> Tuple[pd.DataFrame, Dict]:
     """Add ``gate_pass`` (top-level AND of ``conditions``) and optionally drop failers."""
-    mask = pd.Series(True, index=df.index)
-    per_condition = []
-    for cond in conditions:
-        cmask = _eval_condition(df, cond)
-        per_condition.append({"condition": _describe(cond), "passed": int(cmask.sum())})
-        mask &= cmask
+    plan = GatePlan(conditions)
+    mask = plan.evaluate(df)
     out = df.copy()
-    out["gate_pass"] = mask.values
-    report = {"op": "gate", "n_in": len(df), "n_pass": int(mask.sum()),
-              "conditions": per_condition}
+    out["gate_pass"] = mask
     if keep_only_passing:
         out = out[out["gate_pass"]].drop(columns=["gate_pass"])
-    return out, report
+    return out, plan.report()
+
+
+def gate_batches(batches: Iterable[pd.DataFrame],
+                 conditions: List[dict]) -> Tuple[pd.DataFrame, Dict]:
+    """``apply_gate`` over a stream of record batches: only the passing rows of each
+    batch are kept, and the report counts every batch."""
+    plan = GatePlan(conditions)
+    kept = [batch[plan.evaluate(batch)] for batch in batches]
+    out = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=["ID"])
+    return out, plan.report()
@@ -20,7 +20,7 @@ from __future__ import annotations
 
 import glob
 import os
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 
 import pandas as pd
 
@@ -69,6 +69,104 @@ def _id_column(columns) -> Optional[str]:
     return next((c for c in ID_CANDIDATES if c in columns), None)
 
 
+def read_metric_csv(path: str) -> Optional[pd.DataFrame]:
+    """One per-tool CSV as an UNTYPED (string) frame indexed by ``ID`` (None if unusable).
+
+    The ID column (first of ID_CANDIDATES present) becomes the index (first row per ID
+    wins); a ``*_self.csv`` gets its data columns suffixed ``_self``; missing-value tokens
+    become NaN. Values stay the CSV's strings: a column's type is decided after the
+    first-wins join, from the values that won (``type_columns``).
+    """
+    try:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    except (pd.errors.EmptyDataError, pd.errors.ParserError):
+        return None
+    id_col = _id_column(df.columns)
+    if id_col is None or df.empty:
+        return None
+    data_cols = [c for c in df.columns if c != id_col and c not in _ID_LIKE]
+    if len(data_cols) > _MAX_COLUMNS_PER_FILE:
+        print(f"  [merge] skipping {os.path.basename(path)}: {len(data_cols)} data "
+              f"columns (> {_MAX_COLUMNS_PER_FILE}) — looks like a raw feature matrix.")
+        return None
+    # Self-file columns get a `_self` suffix (unless already so named).
+    tool_is_self = os.path.basename(path).rsplit(".", 1)[0].endswith("_self")
+    rename = {c: (f"{c}_self" if tool_is_self and not c.endswith("_self") else c)
+              for c in data_cols}
+    sub = df[[id_col] + data_cols].rename(columns={**{id_col: "ID"}, **rename})
+    sub = sub.drop_duplicates(subset="ID").set_index("ID")
+    # Normalise missing tokens to NaN BEFORE joining, else an earlier file's blank
+    # (kept-default-na off -> "") would count as present and win over a later real value.
+    return sub.replace(list(MISSING_TOKENS), pd.NA)
+
+
+def column_kind(values: pd.Series) -> str:
+    """How ``type_columns`` types a merged string column: ``"empty"`` (no value; left
+    as is), ``"string"`` (some value is not a number), else ``"int"`` / ``"float"`` —
+    the dtype ``pd.to_numeric`` gives the column (float as soon as a cell is missing)."""
+    nonnull = values.notna()
+    if not nonnull.any():
+        return "empty"
+    coerced = pd.to_numeric(values, errors="coerce")
+    # Numeric only if every non-missing value parsed (else keep str).
+    if not coerced[nonnull].notna().all():
+        return "string"
+    return "int" if pd.api.types.is_integer_dtype(coerced) else "float"
+
+
+def merge_kinds(kinds: Iterable[str]) -> str:
+    """The kind of a column from the kinds of its row batches (``column_kind``)."""
+    kinds = set(kinds)
+    if "string" in kinds:
+        return "string"
+    if kinds <= {"empty"}:
+        return "empty"
+    return "int" if kinds == {"int"} else "float"
+
+
+def type_columns(merged: pd.DataFrame, kinds: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Type the string columns of a merged frame in place: numeric-looking columns
+    become int/float (``pd.to_numeric``), the rest stay strings. ``kinds`` forces a
+    column's kind (e.g. decided over the whole table, for one row batch of it)."""
+    for c in merged.columns:
+        kind = (kinds or {}).get(c) or column_kind(merged[c])
+        if kind == "int":
+            merged[c] = pd.to_numeric(merged[c])
+        elif kind == "float":
+            merged[c] = pd.to_numeric(merged[c], errors="coerce").astype(float)
+    return merged
+
+
+def join_metrics(frames: List[pd.DataFrame],
+                 kinds: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Keyed join of ID-indexed string frames (``read_metric_csv``), per-(ID, column)
+    FIRST-WINS over the UNION of IDs (the ``combine_first`` fold, without re-allocating
+    the wide frame once per file): each column is assembled once from the frames that
+    carry it, then typed from the values that won (``type_columns``; ``kinds`` forces
+    the kinds). Returns a frame with ``ID`` as first column.
+    """
+    if len(frames) == 1:
+        merged = frames[0].copy()
+    else:
+        ids = frames[0].index
+        for f in frames[1:]:
+            ids = ids.union(f.index)
+        parts: Dict[str, List[pd.Series]] = {}
+        for f in frames:
+            for c in f.columns:
+                parts.setdefault(c, []).append(f[c])
+        columns = {}
+        for c, series in parts.items():
+            if len(series) == 1:
+                columns[c] = series[0].reindex(ids)
+                continue
+            # groupby().first() skips missing cells -> the first file with a value wins.
+            columns[c] = pd.concat(series).groupby(level=0, sort=False).first().reindex(ids)
+        merged = pd.DataFrame(columns, index=ids)
+    merged.index.name = "ID"
+    return type_columns(merged, kinds).reset_index()
+
+
 def merge_metrics(entries: List[str]) -> pd.DataFrame:
     """Merge the per-tool CSVs named by ``entries`` into one wide DataFrame indexed by ID.
 
@@ -81,53 +179,22 @@ def merge_metrics(entries: List[str]) -> pd.DataFrame:
       or two tools sharing ``sequence`` — is unioned by ID, each cell taken from the first
       file that has a value for it. (A naive column-level first-wins would blank out the
       rows only present in the later files.)
-    - Missing-value tokens are normalised to NaN; numeric-looking columns are coerced to
-      float, the rest left as strings.
+    - Missing-value tokens are normalised to NaN; after the join, a column whose winning
+      values all parse as numbers is coerced (``pd.to_numeric``: int when every cell is an
+      integer, else float), the rest left as strings.
+
+    The files are read as strings (``read_metric_csv``) and joined once (``join_metrics``);
+    for repeated selections over the same CSVs see ``MetricStore``.
 
     Raises ValueError if no usable CSVs are found.
     """
     csv_paths = resolve_csv_paths(entries)
     if not csv_paths:
         raise ValueError(f"no usable CSVs found in: {entries}")
-
-    merged: Optional[pd.DataFrame] = None
-    for path in csv_paths:
-        try:
-            df = pd.read_csv(path, dtype=str, keep_default_na=False)
-        except (pd.errors.EmptyDataError, pd.errors.ParserError):
-            continue
-        id_col = _id_column(df.columns)
-        if id_col is None or df.empty:
-            continue
-        data_cols = [c for c in df.columns if c != id_col and c not in _ID_LIKE]
-        if len(data_cols) > _MAX_COLUMNS_PER_FILE:
-            print(f"  [merge] skipping {os.path.basename(path)}: {len(data_cols)} data "
-                  f"columns (> {_MAX_COLUMNS_PER_FILE}) — looks like a raw feature matrix.")
-            continue
-        # Self-file columns get a `_self` suffix (unless already so named).
-        tool_is_self = os.path.basename(path).rsplit(".", 1)[0].endswith("_self")
-        rename = {c: (f"{c}_self" if tool_is_self and not c.endswith("_self") else c)
-                  for c in data_cols}
-        sub = df[[id_col] + data_cols].rename(columns={**{id_col: "ID"}, **rename})
-        sub = sub.drop_duplicates(subset="ID").set_index("ID")
-        # Normalise missing tokens to NaN BEFORE combining, else an earlier file's blank
-        # (kept-default-na off -> "") would count as present and win over a later real value.
-        sub = sub.replace(list(MISSING_TOKENS), pd.NA)
-        # combine_first: keep existing (earlier-file) values per (ID, col), fill gaps from
-        # this file, and UNION the index + columns. -> per-cell first-wins across all files.
-        merged = sub if merged is None else merged.combine_first(sub)
-
-    if merged is None:
+    frames = [f for f in (read_metric_csv(p) for p in csv_paths) if f is not None]
+    if not frames:
         raise ValueError(f"no CSV under {entries} had a recognised ID column {ID_CANDIDATES}.")
-
-    # Coerce numeric-looking columns to float (the rest stay strings).
-    for c in merged.columns:
-        coerced = pd.to_numeric(merged[c], errors="coerce")
-        # Treat a column as numeric only if every non-missing value parsed (else keep str).
-        nonnull = merged[c].notna()
-        if nonnull.any() and coerced[nonnull].notna().all():
-            merged[c] = coerced
-    return merged.reset_index()
+    return join_metrics(frames)
 
 
 def write_merged(df: pd.DataFrame, output_path: str) -> None:
@@ -0,0 +1,199 @@
+"""Columnar, incremental metric store — the merged table without re-merging CSVs.
+
+``merge_metrics`` re-reads and re-types every per-tool CSV on each call. For a funnel
+tier at 300k designs x 15 tools, re-selecting with a tweaked spec would redo all of
+that. A ``MetricStore`` keeps each ingested CSV as one Parquet partition:
+
+    <store>/manifest.json            per partition: source CSV, size/mtime, columns
+    <store>/parts/<tool>-<key>.parquet   ID + the tool's data columns (as strings)
+
+* ``ingest(entries)`` resolves entries like ``merge_metrics`` and (re)converts only the
+  CSVs whose size or mtime changed since the last ingest; partitions of CSVs no longer
+  named are dropped. The entry order is recorded — it is the first-wins order.
+* ``load(columns, ids)`` reads only the requested columns (plus ``ID``) of each
+  partition, optionally only the given IDs, and joins them with ``join_metrics`` — same
+  conventions and result as ``merge_metrics`` over the same entries. Partitions keep
+  the CSV strings because a column's type depends on which values win the join.
+* ``iter_batches(columns)`` streams the same table in record batches of IDs, so the
+  leading gates of a selection run in bounded memory. It reads the columns twice: a
+  first pass decides each column's type over the whole table, so every batch is
+  typed as the full ``load`` would be.
+
+``select_designs`` uses it to run the ops on just the columns a spec references
+(``spec_columns``) and fetch the remaining columns for the survivors only. Parquet
+needs ``pyarrow`` (in the ``tps_eval`` env).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from tps_eval.selection.merge import (
+    ID_CANDIDATES,
+    column_kind,
+    join_metrics,
+    merge_kinds,
+    read_metric_csv,
+    resolve_csv_paths,
+)
+
+MANIFEST = "manifest.json"
+# Bumped when the partition format changes; older stores are re-ingested from scratch
+# (format 1 stored partitions typed per file).
+STORE_FORMAT = 2
+_PARTS_DIR = "parts"
+
+# IDs per record batch in iter_batches (the streamed gate's memory bound).
+DEFAULT_BATCH_ROWS = 50_000
+
+
+class MetricStore:
+    """Per-tool Parquet partitions of the metric CSVs under ``root`` (see module doc)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._manifest = self._read_manifest()
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.root, MANIFEST)) as fh:
+                manifest = json.load(fh)
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get("format") != STORE_FORMAT:
+            return {"format": STORE_FORMAT, "order": [], "parts": {}}
+        return manifest
+
+    def _write_manifest(self) -> None:
+        path = os.path.join(self.root, MANIFEST)
+        with open(path + ".tmp", "w") as fh:
+            json.dump(self._manifest, fh, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def _part_path(self, name: str) -> str:
+        return os.path.join(self.root, _PARTS_DIR, f"{name}.parquet")
+
+    @staticmethod
+    def _part_name(csv_path: str) -> str:
+        stem = os.path.basename(csv_path).rsplit(".", 1)[0]
+        key = hashlib.sha1(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:10]
+        return f"{stem}-{key}"
+
+    def ingest(self, entries: List[str]) -> List[str]:
+        """Mirror the CSVs named by ``entries`` (files / dirs / globs); returns the
+        partition names in first-wins order. Unchanged CSVs are not re-read.
+
+        Raises ValueError if no usable CSVs are found."""
+        csv_paths = resolve_csv_paths(entries)
+        if not csv_paths:
+            raise ValueError(f"no usable CSVs found in: {entries}")
+        os.makedirs(os.path.join(self.root, _PARTS_DIR), exist_ok=True)
+        parts = self._manifest["parts"]
+        order: List[str] = []
+        n_read = 0
+        for path in csv_paths:
+            name = self._part_name(path)
+            st = os.stat(path)
+            known = parts.get(name)
+            if known is not None and known["size"] == st.st_size \
+                    and known["mtime_ns"] == st.st_mtime_ns:
+                if known["columns"] is not None:
+                    order.append(name)
+                continue
+            n_read += 1
+            frame = read_metric_csv(path)
+            columns = None
+            if frame is not None:
+                frame.reset_index().to_parquet(self._part_path(name), index=False)
+                columns = list(frame.columns)
+                order.append(name)
+            # Unusable CSVs are recorded too (columns None) so they are not re-read.
+            parts[name] = {"source": os.path.abspath(path), "size": st.st_size,
+                           "mtime_ns": st.st_mtime_ns, "n_rows": 0 if frame is None else len(frame),
+                           "columns": columns}
+        wanted = {self._part_name(p) for p in csv_paths}
+        for name in [n for n in parts if n not in wanted]:
+            del parts[name]
+            if os.path.exists(self._part_path(name)):
+                os.remove(self._part_path(name))
+        if not order:
+            raise ValueError(f"no CSV under {entries} had a recognised ID column {ID_CANDIDATES}.")
+        self._manifest["order"] = order
+        self._write_manifest()
+        print(f"[store] {len(order)} partition(s) in {self.root} "
+              f"({n_read} CSV(s) (re)read, {len(csv_paths) - n_read} unchanged)")
+        return order
+
+    def columns(self) -> List[str]:
+        """Every stored data column, in first-appearance (merge) order."""
+        seen: Dict[str, None] = {}
+        for name in self._manifest["order"]:
+            for c in self._manifest["parts"][name]["columns"]:
+                seen.setdefault(c, None)
+        return list(seen)
+
+    def schema(self) -> Dict[str, str]:
+        """Column -> type of the merged table (``int64`` / ``float64`` / ``string``),
+        decided like ``join_metrics`` from the values that win the join. Reads every
+        column once, in record batches."""
+        dtypes = {"int": "int64", "float": "float64", "string": "string", "empty": "string"}
+        return {c: dtypes[kind] for c, kind in self._kinds(None, DEFAULT_BATCH_ROWS).items()}
+
+    def _kinds(self, columns: Optional[List[str]], batch_rows: int) -> Dict[str, str]:
+        """Column -> ``column_kind`` over the whole merged table, batch by batch."""
+        seen: Dict[str, List[str]] = {}
+        ids = self.ids()
+        for start in range(0, len(ids), batch_rows):
+            batch = self._load(columns, ids[start:start + batch_rows], typed=False)
+            for c in batch.columns[1:]:
+                seen.setdefault(c, []).append(column_kind(batch[c]))
+        return {c: merge_kinds(kinds) for c, kinds in seen.items()}
+
+    def ids(self) -> List[str]:
+        """Every stored ID, in the merged table's row order."""
+        frames = [pd.read_parquet(self._part_path(name), columns=["ID"]).set_index("ID")
+                  for name in self._manifest["order"]]
+        return join_metrics(frames)["ID"].tolist()
+
+    def iter_batches(self, columns: Optional[Iterable[str]] = None,
+                     batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[pd.DataFrame]:
+        """The merged table as consecutive record batches of ``batch_rows`` IDs
+        (concatenated, they equal ``load(columns)``), for bounded-memory passes such
+        as ``gate.gate_batches``."""
+        if not self._manifest["order"]:
+            raise ValueError(f"metric store {self.root} is empty; ingest CSVs first.")
+        columns = None if columns is None else list(columns)
+        batch_rows = max(1, int(batch_rows))
+        kinds = self._kinds(columns, batch_rows)
+        ids = self.ids()
+        for start in range(0, len(ids), batch_rows):
+            yield self._load(columns, ids[start:start + batch_rows], kinds=kinds)
+
+    def load(self, columns: Optional[Iterable[str]] = None,
+             ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """The merged table (``ID`` + data columns), projected to ``columns`` (None =
+        all) and restricted to ``ids`` (None = all). Every partition still contributes
+        its IDs, so the row set does not depend on the projection. Columns are typed
+        from the loaded rows (as ``merge_metrics`` types the whole table)."""
+        return self._load(columns, ids)
+
+    def _load(self, columns: Optional[Iterable[str]], ids: Optional[Iterable[str]], *,
+              kinds: Optional[Dict[str, str]] = None, typed: bool = True) -> pd.DataFrame:
+        if not self._manifest["order"]:
+            raise ValueError(f"metric store {self.root} is empty; ingest CSVs first.")
+        wanted = None if columns is None else set(columns)
+        filters = None if ids is None else [("ID", "in", [str(i) for i in ids])]
+        frames = []
+        for name in self._manifest["order"]:
+            stored = self._manifest["parts"][name]["columns"]
+            cols = [c for c in stored if wanted is None or c in wanted]
+            frame = pd.read_parquet(self._part_path(name), columns=["ID"] + cols, filters=filters)
+            frames.append(frame.set_index("ID"))
+        if not typed:
+            # Every column forced to stay a string.
+            kinds = {c: "string" for f in frames for c in f.columns}
+        return join_metrics(frames, kinds)
@@ -5,7 +5,9 @@ Usage:
     python run_merge.py --entries <csv|dir|glob> [<csv|dir|glob> ...] --output merged.csv
 
 Each entry is a per-tool CSV, a directory of them, or a glob. They are merged into one
-wide table keyed by ID (see merge.py for the conventions).
+wide table keyed by ID (see merge.py for the conventions). With ``--store DIR`` the CSVs
+are ingested into a columnar metric store (metric_store.py; only changed CSVs are re-read)
+and the merged table is read back from it; ``--output`` is then optional.
 """
 from __future__ import annotations
 
@@ -13,6 +15,7 @@ import argparse
 import sys
 
 from tps_eval.selection.merge import merge_metrics, write_merged
+from tps_eval.selection.metric_store import MetricStore
 
 
 def main() -> int:
@@ -20,9 +23,20 @@ def main() -> int:
                                 formatter_class=argparse.RawDescriptionHelpFormatter)
     p.add_argument("--entries", nargs="+", required=True,
                    help="Per-tool CSVs / directories / globs to merge (keyed by ID).")
-    p.add_argument("--output", required=True, help="Output merged CSV path.")
+    p.add_argument("--output", default=None, help="Output merged CSV path.")
+    p.add_argument("--store", default=None,
+                   help="Columnar metric store dir to ingest the entries into.")
     args = p.parse_args()
-    df = merge_metrics(args.entries)
+    if args.output is None and args.store is None:
+        p.error("--output is required without --store")
+    if args.store:
+        store = MetricStore(args.store)
+        store.ingest(args.entries)
+        if args.output is None:
+            return 0
+        df = store.load()
+    else:
+        df = merge_metrics(args.entries)
     write_merged(df, args.output)
     return 0
 
@@ -10,6 +10,12 @@ Usage:
     python run_select.py --entries <csv|dir|glob> [...] --spec select_phase1.json \
         --output_prefix phase1 --fasta seed.fasta
 
+    # or keep the per-tool CSVs in a columnar metric store (re-reads only changed CSVs,
+    # loads only the columns the spec uses and streams them through the leading gates
+    # in --batch_rows batches; --store alone reuses the last ingest):
+    python run_select.py --entries <csv|dir|glob> [...] --store phase1_metrics \
+        --spec select_phase1.json --output_prefix phase1 --fasta seed.fasta
+
 Writes <prefix>_survivors.csv, <prefix>_survivors.fasta, and <prefix>_manifest.md.
 """
 from __future__ import annotations
@@ -24,16 +30,24 @@ import pandas as pd
 
 from tps_eval.selection.io_fasta import read_fasta_map
 from tps_eval.selection.merge import merge_metrics
-from tps_eval.selection.select_designs import select_and_write
+from tps_eval.selection.metric_store import DEFAULT_BATCH_ROWS, MetricStore
+from tps_eval.selection.select_designs import select_and_write, spec_columns
 
 
 def main() -> int:
     p = argparse.ArgumentParser(description=__doc__,
                                 formatter_class=argparse.RawDescriptionHelpFormatter)
-    src = p.add_mutually_exclusive_group(required=True)
+    src = p.add_mutually_exclusive_group()
     src.add_argument("--merged", help="Pre-merged wide metric CSV (keyed by ID).")
     src.add_argument("--entries", nargs="+",
                      help="Per-tool CSVs / dirs / globs to merge inline before selecting.")
+    p.add_argument("--store", default=None,
+                   help="Columnar metric store dir (see metric_store.py): --entries are "
+                        "ingested into it incrementally; without --entries the stored "
+                        "metrics are used as they are.")
+    p.add_argument("--batch_rows", type=int, default=DEFAULT_BATCH_ROWS,
+                   help="With --store: designs per record batch for the leading gate ops "
+                        f"(default {DEFAULT_BATCH_ROWS}).")
     p.add_argument("--spec", required=True, help="Selection spec JSON.")
     p.add_argument("--output_prefix", required=True, help="Output path prefix.")
     p.add_argument("--fasta", default=None,
@@ -44,13 +58,28 @@ def main() -> int:
                    help="Campaign target substrate (e.g. FPP). Default 'target' for any "
                         "substrate_specificity op that does not set its own.")
     args = p.parse_args()
+    if args.merged and args.store:
+        p.error("--store works with --entries (or alone), not with --merged")
+    if not (args.merged or args.entries or args.store):
+        p.error("one of --merged, --entries or --store is required")
 
     with open(args.spec) as fh:
         spec = json.load(fh)
-    df = pd.read_csv(args.merged) if args.merged else merge_metrics(args.entries)
+    load_rows = None
+    if args.store:
+        store = MetricStore(args.store)
+        if args.entries:
+            store.ingest(args.entries)
+        # Streamed: the spec's leading gates run per record batch (bounded memory).
+        df = store.iter_batches(spec_columns(spec, store.columns()), batch_rows=args.batch_rows)
+
+        def load_rows(ids):
+            return store.load(ids=ids)
+    else:
+        df = pd.read_csv(args.merged) if args.merged else merge_metrics(args.entries)
     fasta_map = read_fasta_map(args.fasta) if args.fasta else None
     select_and_write(df, spec, args.output_prefix, fasta_map=fasta_map, title=args.title,
-                     target_substrate=args.target_substrate)
+                     target_substrate=args.target_substrate, load_rows=load_rows)
     return 0
 
 
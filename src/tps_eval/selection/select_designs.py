@@ -34,24 +34,59 @@ import json
 import os
 import re
 import sys
-from typing import Dict, List, Optional, Tuple
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import pandas as pd
 
 
-from tps_eval.selection.band_filter import apply_band_filter
+from tps_eval.selection.band_filter import apply_band_filter, band_columns
 from tps_eval.selection.diversity_dedup import apply_diversity_dedup
-from tps_eval.selection.gate import apply_gate
+from tps_eval.selection.gate import GatePlan, apply_gate, condition_columns
 from tps_eval.selection.io_fasta import read_fasta_map, write_fasta
 from tps_eval.selection.score import apply_score
-from tps_eval.selection.substrate_specificity import DEFAULT_T_HI, DEFAULT_T_OFF, apply_substrate_specificity
+from tps_eval.selection.substrate_specificity import (
+    DEFAULT_T_HI,
+    DEFAULT_T_OFF,
+    apply_substrate_specificity,
+    ee_columns_by_substrate,
+)
 
 _SCORE_COL = "score"
 
 
-def _synthesise_group(df: pd.DataFrame, spec: dict) -> Tuple[pd.DataFrame, Optional[str]]:
+def spec_columns(spec: dict, available: Sequence[str]) -> List[str]:
+    """The columns of ``available`` that ``spec`` reads (its ops' columns, ``group_by``
+    and ``sequence``), in ``available`` order — the projection a ``MetricStore`` loads
+    for selection. A spec with an op this function does not know gets every column."""
+    group_by = spec.get("group_by")
+    needed = {"sequence", group_by}
+    for op_spec in spec.get("ops", []):
+        op = op_spec.get("op")
+        if op == "gate":
+            for cond in op_spec.get("conditions", []):
+                needed |= condition_columns(cond)
+        elif op == "band_filter":
+            needed |= band_columns(op_spec.get("metrics", {}), op_spec.get("bands_file"))
+        elif op == "score":
+            needed |= {t["col"] for t in op_spec.get("terms", [])}
+            needed.add(op_spec.get("zscore_within", group_by))
+        elif op == "diversity_dedup":
+            needed |= {op_spec.get("quality_col", _SCORE_COL), op_spec.get("group_col", group_by),
+                       op_spec.get("seq_col", "sequence")}
+        elif op == "substrate_specificity":
+            ee = ee_columns_by_substrate(pd.DataFrame(columns=list(available)))
+            needed |= {c for columns in ee.values() for c in columns}
+        else:
+            return list(available)
+    return [c for c in available if c in needed]
+
+
+def _with_group(df: pd.DataFrame, spec: dict) -> Tuple[pd.DataFrame, Optional[str], int]:
+    """(df with the group_from_id column synthesised if needed, group_by, #unmatched)."""
     group_by = spec.get("group_by")
     regex = spec.get("group_from_id")
+    missing = 0
     if group_by and regex and group_by not in df.columns:
         pat = re.compile(regex)
         def _extract(rid):
@@ -60,32 +95,91 @@ def _synthesise_group(df: pd.DataFrame, spec: dict) -> Tuple[pd.DataFrame, Optio
         df = df.copy()
         df[group_by] = df["ID"].map(_extract)
         missing = int(df[group_by].isna().sum())
-        if missing:
-            print(f"  [select] group_from_id '{regex}' matched no group for {missing} IDs.")
+    return df, group_by, missing
+
+
+def _warn_unmatched(spec: dict, missing: int) -> None:
+    if missing:
+        print(f"  [select] group_from_id '{spec.get('group_from_id')}' matched no group "
+              f"for {missing} IDs.")
+
+
+def _synthesise_group(df: pd.DataFrame, spec: dict) -> Tuple[pd.DataFrame, Optional[str]]:
+    df, group_by, missing = _with_group(df, spec)
+    _warn_unmatched(spec, missing)
     return df, group_by
 
 
-def run_selection(df: pd.DataFrame, spec: dict,
+def _inject_sequences(df: pd.DataFrame, fasta_map: Optional[Dict[str, str]]) -> pd.DataFrame:
+    if fasta_map is not None and "sequence" not in df.columns:
+        df = df.copy()
+        df["sequence"] = df["ID"].map(fasta_map)
+    return df
+
+
+def _stream_leading_gates(batches: Iterable[pd.DataFrame], spec: dict,
+                          fasta_map: Optional[Dict[str, str]]
+                          ) -> Tuple[pd.DataFrame, Optional[str], List[dict], List[dict]]:
+    """Run the spec's LEADING gate ops batch by batch, keeping only each batch's
+    survivors. Returns (survivors, group_by, reports for input + those gates, the
+    remaining ops). Counts and per-group tallies accumulate across batches."""
+    ops = list(spec.get("ops", []))
+    n_gates = 0
+    while n_gates < len(ops) and ops[n_gates]["op"] == "gate":
+        n_gates += 1
+    plans = [GatePlan(op_spec["conditions"]) for op_spec in ops[:n_gates]]
+    group_by = spec.get("group_by")
+    input_counts: Counter = Counter()
+    gate_counts: List[Counter] = [Counter() for _ in plans]
+    n_in = 0
+    missing = 0
+    kept = []
+    for batch in batches:
+        batch, group_by, unmatched = _with_group(batch, spec)
+        missing += unmatched
+        batch = _inject_sequences(batch, fasta_map)
+        n_in += len(batch)
+        input_counts.update(_group_counts(batch, group_by))
+        for plan, counts in zip(plans, gate_counts):
+            batch = batch[plan.evaluate(batch)]
+            counts.update(_group_counts(batch, group_by))
+        kept.append(batch)
+    _warn_unmatched(spec, missing)
+    df = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(columns=["ID"])
+    reports = [{"op": "input", "n_in": n_in, "group_counts": dict(input_counts)}]
+    for plan, counts in zip(plans, gate_counts):
+        reports.append(dict(plan.report(), group_counts=dict(counts)))
+    return df, group_by, reports, ops[n_gates:]
+
+
+def run_selection(df, spec: dict,
                   fasta_map: Optional[Dict[str, str]] = None,
                   target_substrate: Optional[str] = None
                   ) -> Tuple[pd.DataFrame, List[dict], Optional[str]]:
     """Apply the spec's ops in order, then cap to n_out_per_group. Returns
     (survivors_df, op_reports, group_col).
 
+    ``df`` is the merged table, or an iterable of its record batches (e.g.
+    ``MetricStore.iter_batches``): the spec's leading gates then run batch by batch and
+    only their survivors are held in memory for the remaining ops.
+
     ``target_substrate`` (the campaign substrate) is the default 'target' for any
     substrate_specificity op that does not set its own; a spec may still fall back to
     spec['target_substrate'] when neither is given."""
     target_substrate = target_substrate or spec.get("target_substrate")
-    df, group_by = _synthesise_group(df, spec)
-    # Inject sequences up front (from the seed FASTA) so ops that need them mid-pipeline —
-    # notably diversity_dedup — can use them, not just the final FASTA write.
-    if fasta_map is not None and "sequence" not in df.columns:
-        df = df.copy()
-        df["sequence"] = df["ID"].map(fasta_map)
-    reports: List[dict] = [{"op": "input", "n_in": len(df),
-                            "group_counts": _group_counts(df, group_by)}]
+    if isinstance(df, pd.DataFrame):
+        df, group_by = _synthesise_group(df, spec)
+        # Inject sequences up front (from the seed FASTA) so ops that need them
+        # mid-pipeline — notably diversity_dedup — can use them, not just the final
+        # FASTA write.
+        df = _inject_sequences(df, fasta_map)
+        reports: List[dict] = [{"op": "input", "n_in": len(df),
+                                "group_counts": _group_counts(df, group_by)}]
+        ops = spec.get("ops", [])
+    else:
+        df, group_by, reports, ops = _stream_leading_gates(df, spec, fasta_map)
     cur = df
-    for op_spec in spec.get("ops", []):
+    for op_spec in ops:
         op = op_spec["op"]
         if op == "gate":
             cur, rep = apply_gate(cur, op_spec["conditions"])
@@ -129,9 +223,7 @@ def run_selection(df: pd.DataFrame, spec: dict,
         reports.append({"op": "take_top_n", "n_out_per_group": n_out, "n_out": len(cur),
                         "group_counts": _group_counts(cur, group_by)})
 
-    if fasta_map is not None and "sequence" not in cur.columns:
-        cur = cur.copy()
-        cur["sequence"] = cur["ID"].map(fasta_map)
+    cur = _inject_sequences(cur, fasta_map)
     return cur.reset_index(drop=True), reports, group_by
 
 
@@ -188,12 +280,24 @@ def write_manifest(reports: List[dict], spec: dict, output_path: str,
     print(f"[select] wrote manifest -> {output_path}")
 
 
-def select_and_write(df: pd.DataFrame, spec: dict, output_prefix: str,
+def select_and_write(df, spec: dict, output_prefix: str,
                      fasta_map: Optional[Dict[str, str]] = None,
                      title: str = "Selection",
-                     target_substrate: Optional[str] = None) -> pd.DataFrame:
+                     target_substrate: Optional[str] = None,
+                     load_rows: Optional[Callable[[List[str]], pd.DataFrame]] = None
+                     ) -> pd.DataFrame:
+    """Run the selection and write survivors CSV / FASTA / manifest.
+
+    ``load_rows(ids)`` (with a column-projected ``df``, e.g. from a ``MetricStore``)
+    returns the full metric rows for the given IDs; the survivors CSV then carries every
+    stored column, as if the whole table had been selected on."""
     survivors, reports, group_by = run_selection(
         df, spec, fasta_map=fasta_map, target_substrate=target_substrate)
+    if load_rows is not None and len(survivors):
+        full = load_rows(survivors["ID"].astype(str).tolist())
+        order = list(full.columns) + [c for c in survivors.columns if c not in full.columns]
+        full = full[["ID"] + [c for c in full.columns if c not in survivors.columns]]
+        survivors = survivors.merge(full, on="ID", how="left")[order]
     csv_path = output_prefix + "_survivors.csv"
     survivors.to_csv(csv_path, index=False)
     print(f"[select] {reports[0]['n_in']} → {len(survivors)} survivors "
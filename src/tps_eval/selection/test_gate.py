@@ -20,7 +20,7 @@ import numpy as np
 import pandas as pd
 
 
-from tps_eval.selection.gate import apply_gate  # noqa: E402
+from tps_eval.selection.gate import GatePlan, apply_gate, gate_batches  # noqa: E402
 
 
 def _df():
@@ -128,6 +128,26 @@ def test_keep_only_passing_false_adds_column():
     assert list(out.set_index("ID")["gate_pass"]) == [False, True, True, False]
 
 
+def test_plan_over_batches_matches_whole_table():
+    conditions = [
+        {"col": "x", "ge": 2},
+        {"col": "s", "eq": "alpha", "when": {"col": "cls", "eq": "c0"}},
+        {"any_of": [{"col": "x", "isnull": True}, {"col": "cls", "in": ["c1"]}]},
+    ]
+    whole, report = apply_gate(_df(), conditions)
+    batches = [_df().iloc[:1], _df().iloc[1:3], _df().iloc[3:]]
+    streamed, streamed_report = gate_batches(iter(batches), conditions)
+    assert streamed["ID"].tolist() == whole["ID"].tolist() == ["c"]
+    assert streamed_report == report
+    assert report["conditions"][1]["passed"] == 3  # a (c0, alpha) + the auto-passing c1 rows
+
+    plan = GatePlan(conditions)
+    masks = [plan.evaluate(b) for b in batches]
+    assert [m.tolist() for m in masks] == [[False], [False, True], [False]]
+    assert plan.report()["n_in"] == 4 and plan.report()["n_pass"] == 1
+    assert plan.columns == {"x", "s", "cls"}
+
+
 def test_unknown_column_raises():
     df = _df()
     try:
@@ -10,8 +10,9 @@ or under pytest:
 Writes tiny temp CSVs only. Locks in the merge conventions the dashboard shares:
 per-cell FIRST-WINS over the UNION of IDs (a later file must not drop rows only it
 has, and must not overwrite an earlier file's cell), id-alias -> canonical ID, the
-`_self` suffixing, numeric coercion (all-or-nothing per column), the raw-feature-matrix
-skip, and resolve_csv_paths ordering/dedup.
+`_self` suffixing, numeric coercion (all-or-nothing per column, decided from the values
+that win the join — same table as the original combine_first fold), the
+raw-feature-matrix skip, and resolve_csv_paths ordering/dedup.
 """
 
 import os
@@ -139,6 +140,63 @@ def test_no_usable_csv_raises():
             raise AssertionError("expected ValueError on empty dir")
 
 
+def _combine_first_merge(d):
+    """The original merge: fold the string frames with combine_first, THEN type each
+    merged column. ``merge_metrics`` must produce exactly this table."""
+    from tps_eval.selection.merge import MISSING_TOKENS, _id_column
+
+    merged = None
+    for path in resolve_csv_paths([d]):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        id_col = _id_column(df.columns)
+        cols = [c for c in df.columns if c != id_col]
+        sub = df[[id_col] + cols].rename(columns={id_col: "ID"})
+        sub = sub.drop_duplicates(subset="ID").set_index("ID")
+        sub = sub.replace(list(MISSING_TOKENS), pd.NA)
+        merged = sub if merged is None else merged.combine_first(sub)
+    for c in merged.columns:
+        coerced = pd.to_numeric(merged[c], errors="coerce")
+        nonnull = merged[c].notna()
+        if nonnull.any() and coerced[nonnull].notna().all():
+            merged[c] = coerced
+    return merged.reset_index()
+
+
+def test_typing_after_join_matches_combine_first_fold():
+    """Types are decided from the values that WIN the join: a text value shadowed by
+    an earlier numeric one does not turn the column into text, and integer columns
+    stay integers (written as 1, not 1.0)."""
+    with tempfile.TemporaryDirectory() as d:
+        _write(d, "a.csv", pd.DataFrame({
+            "ID": ["x", "y", "z"],
+            "score": ["1.0", "3", "0.5"],      # numeric here ...
+            "count": ["1", "2", "3"],
+            "label": ["4", "5", "6"],
+        }))
+        _write(d, "b.csv", pd.DataFrame({
+            "ID": ["x", "w"],
+            "score": ["n/a", "0.25"],          # ... text only in a shadowed cell
+            "count": ["7", "8"],
+            "label": ["oops", "9"],
+        }))
+        df = merge_metrics([d])
+        pd.testing.assert_frame_equal(df, _combine_first_merge(d))
+        assert df["score"].dtype.kind == "f" and df["count"].dtype.kind == "i"
+        assert df["label"].dtype.kind == "i"  # "oops" lost to a's "4"
+        out = os.path.join(d, "merged.txt")
+        df.to_csv(out, index=False)
+        with open(out) as fh:
+            assert fh.read().splitlines()[1] == "w,0.25,8,9"
+        # A text cell that wins makes the column text; an ID missing a value makes an
+        # integer column float (pandas cannot hold NaN in int64) -- both as before.
+        _write(d, "c.csv", pd.DataFrame({"ID": ["v"], "label": ["text"]}))
+        df = merge_metrics([d])
+        pd.testing.assert_frame_equal(df, _combine_first_merge(d))
+        assert df["count"].dtype.kind == "f"
+        assert not pd.api.types.is_numeric_dtype(df["label"])
+        assert df.set_index("ID").loc["x", "label"] == "4"
+
+
 def main():
     tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
     for t in tests:
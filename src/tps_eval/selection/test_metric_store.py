@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+"""Self-contained tests for metric_store.py (columnar per-tool metric store).
+
+Run from the repo root:
+    python -m pytest src/tps_eval/selection/test_metric_store.py -q
+
+Temp CSVs + a temp store dir (Parquet via pyarrow). Checks that a loaded store equals
+``merge_metrics`` over the same entries, that re-ingesting re-reads only changed CSVs
+and drops vanished ones, the column / ID projection, record batches, ``spec_columns``, and that
+``run_select --store`` (streamed gates) writes the same survivors and manifest as the
+plain ``--entries`` merge.
+"""
+
+import inspect
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import tps_eval.selection.metric_store as metric_store
+from tps_eval.selection import run_select
+from tps_eval.selection.merge import merge_metrics
+from tps_eval.selection.metric_store import MetricStore
+from tps_eval.selection.select_designs import spec_columns
+
+
+def _write(d, name, df):
+    path = os.path.join(d, name)
+    df.to_csv(path, index=False)
+    return path
+
+
+def _metrics(d):
+    _write(d, "1_esmfold.csv", pd.DataFrame({
+        "ID": ["a", "b", "c"], "mean_plddt": [95.0, 80.0, np.nan], "class": ["c0", "c0", "c1"],
+    }))
+    _write(d, "2_identity.csv", pd.DataFrame({
+        "ID": ["a", "b", "c", "d"], "sequence_identity": [0.4, 0.5, 0.9, 0.3],
+        "sequence": ["MAAA", "MBBB", "MCCC", "MDDD"],
+    }))
+    _write(d, "3_identity_self.csv", pd.DataFrame({"ID": ["d", "c"], "sequence_identity": [0.7, 0.6]}))
+    _write(d, "4_plddt_c1.csv", pd.DataFrame({"id": ["c", "d"], "mean_plddt": [70.0, 91.0],
+                                               "class": ["c1", "c1"]}))
+
+
+def _same(a, b):
+    assert list(a.columns) == list(b.columns), (list(a.columns), list(b.columns))
+    pd.testing.assert_frame_equal(a.astype(object).where(a.notna(), None),
+                                  b.astype(object).where(b.notna(), None))
+
+
+def test_store_matches_merge_and_projects():
+    with tempfile.TemporaryDirectory() as d:
+        src = os.path.join(d, "metrics")
+        os.makedirs(src)
+        _metrics(src)
+        store = MetricStore(os.path.join(d, "store"))
+        store.ingest([src])
+        _same(store.load(), merge_metrics([src]))
+        assert store.columns() == ["mean_plddt", "class", "sequence_identity", "sequence",
+                                   "sequence_identity_self"]
+        assert store.schema()["mean_plddt"] == "float64" and store.schema()["class"] == "string"
+
+        # A fresh handle on the same dir sees the ingested data.
+        projected = MetricStore(os.path.join(d, "store")).load(["mean_plddt"])
+        assert list(projected.columns) == ["ID", "mean_plddt"]
+        assert projected["ID"].tolist() == ["a", "b", "c", "d"]  # every partition's IDs
+        assert projected.set_index("ID")["mean_plddt"].tolist() == [95.0, 80.0, 70.0, 91.0]
+
+        batches = list(store.iter_batches(["class", "sequence"], batch_rows=3))
+        assert [len(b) for b in batches] == [3, 1]
+        _same(pd.concat(batches, ignore_index=True), store.load(["class", "sequence"]))
+
+        rows = store.load(ids=["c"]).set_index("ID")
+        assert rows.index.tolist() == ["c"] and rows.loc["c", "sequence_identity_self"] == 0.6
+
+
+def test_types_follow_the_winning_values_in_every_batch():
+    """Schema and batches are typed from the whole merged table: an integer column
+    stays int64, a text cell shadowed by an earlier number does not make the column
+    text, and a text cell that wins does -- even in a batch holding only numbers."""
+    with tempfile.TemporaryDirectory() as d:
+        src = os.path.join(d, "metrics")
+        os.makedirs(src)
+        _write(src, "1_a.csv", pd.DataFrame({"ID": ["a", "b", "c", "d"], "n": [1, 2, 3, 4],
+                                             "x": ["1.5", "2", "3", "4"], "t": ["1", "2", "3", "4"]}))
+        _write(src, "2_b.csv", pd.DataFrame({"ID": ["a", "e"], "n": [9, 5],
+                                             "x": ["oops", "0.5"], "t": ["6", "word"]}))
+        store = MetricStore(os.path.join(d, "store"))
+        store.ingest([src])
+        _same(store.load(), merge_metrics([src]))
+        assert store.schema() == {"n": "int64", "x": "float64", "t": "string"}
+        batches = list(store.iter_batches(batch_rows=2))
+        assert [b["n"].dtype.kind for b in batches] == ["i", "i", "i"]
+        assert not any(pd.api.types.is_numeric_dtype(b["t"]) for b in batches)
+        pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), store.load())
+
+
+def test_ingest_rereads_only_changed_csvs(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        src = os.path.join(d, "metrics")
+        os.makedirs(src)
+        _metrics(src)
+        read = []
+        original = metric_store.read_metric_csv
+
+        def counting(path):
+            read.append(os.path.basename(path))
+            return original(path)
+
+        monkeypatch.setattr(metric_store, "read_metric_csv", counting)
+        root = os.path.join(d, "store")
+        MetricStore(root).ingest([src])
+        assert len(read) == 4
+        read.clear()
+        MetricStore(root).ingest([src])
+        assert read == []
+
+        _write(src, "2_identity.csv", pd.DataFrame({"ID": ["a"], "sequence_identity": [0.1]}))
+        os.remove(os.path.join(src, "4_plddt_c1.csv"))
+        store = MetricStore(root)
+        store.ingest([src])
+        assert read == ["2_identity.csv"]
+        assert len(os.listdir(os.path.join(root, "parts"))) == 3
+        _same(store.load(), merge_metrics([src]))
+
+
+def test_spec_columns():
+    available = ["mean_plddt", "class", "sequence_identity", "sequence", "FPP_score",
+                 "GPP_score", "architecture", "pocket_volume", "unused"]
+    spec = {
+        "group_by": "class",
+        "ops": [
+            {"op": "gate", "conditions": [
+                {"col": "mean_plddt", "ge": 80, "when": {"col": "class", "eq": "c0"}},
+                {"any_of": [{"col": "sequence_identity", "lt": 0.9}]},
+            ]},
+            {"op": "band_filter", "metrics": {"pocket_volume": {"by": "architecture",
+                                                               "single": {"min": 1}}}},
+            {"op": "substrate_specificity", "target": "FPP"},
+        ],
+    }
+    assert spec_columns(spec, available) == [c for c in available if c != "unused"]
+    assert spec_columns({"ops": [{"op": "future_op"}]}, available) == available
+
+
+def test_run_select_with_store_matches_entries(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        src = os.path.join(d, "metrics")
+        os.makedirs(src)
+        _metrics(src)
+        spec_path = os.path.join(d, "spec.json")
+        with open(spec_path, "w") as fh:
+            fh.write('{"group_by": "class", "n_out_per_group": 1, "ops": ['
+                     '{"op": "gate", "conditions": [{"col": "mean_plddt", "ge": 75}]},'
+                     '{"op": "score", "terms": [{"col": "sequence_identity", "direction": "lower"}]}]}')
+        outputs = {}
+        manifests = {}
+        store_args = ["--store", os.path.join(d, "store"), "--batch_rows", "1"]
+        for mode, extra in (("entries", []), ("store", store_args)):
+            prefix = os.path.join(d, mode)
+            monkeypatch.setattr(sys, "argv", ["run_select", "--entries", src, "--spec", spec_path,
+                                              "--output_prefix", prefix, *extra])
+            assert run_select.main() == 0
+            outputs[mode] = pd.read_csv(prefix + "_survivors.csv")
+            with open(prefix + "_manifest.md") as fh:
+                manifests[mode] = fh.read()
+        _same(outputs["store"], outputs["entries"])
+        # Gated one design per batch: the counts still cover the whole table.
+        assert manifests["store"] == manifests["entries"]
+        assert outputs["store"]["ID"].tolist() == ["a", "d"]
+
+        # --store alone reuses the ingested metrics.
+        monkeypatch.setattr(sys, "argv", ["run_select", "--store", os.path.join(d, "store"),
+                                          "--spec", spec_path, "--output_prefix",
+                                          os.path.join(d, "again")])
+        assert run_select.main() == 0
+        _same(pd.read_csv(os.path.join(d, "again_survivors.csv")), outputs["entries"])
+
+
+def main():
+    class _MP:
+        def __init__(self):
+            self._undo = []
+
+        def setattr(self, obj, name, value):
+            self._undo.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+        def undo(self):
+            for obj, name, old in reversed(self._undo):
+                setattr(obj, name, old)
+            self._undo = []
+
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        if "monkeypatch" in inspect.signature(t).parameters:
+            mp = _MP()
+            try:
+                t(mp)
+            finally:
+                mp.undo()
+        else:
+            t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,10 @@ from __future__ import annotations
 # output CSV to a tps_eval CSV keyed by ID. ID = FASTA header's first whitespace
 # token; CataPro tags rows as "<ID>_wild", which we strip back to <ID>. Output is
 # reindexed to the FULL FASTA ID set, so any sequence CataPro dropped gets a NaN row.
+#
+# With a result cache (tps_eval.data.result_cache; namespace = model dir + substrate
+# SMILES) only sequences never scored against that substrate are sent to CataPro.
+# Rows CataPro drops are not cached; they are sent again on the next run.
 
 import os
 import subprocess
@@ -38,6 +42,8 @@ import pandas as pd
 
 CURRENT_DIR = Path(__file__).resolve().parent
 
+from tps_eval.data.alignment_cache import pack_floats, unpack_floats
+from tps_eval.data.result_cache import cached_results, open_result_cache
 from tps_eval.data.sequences import load_fasta_sequences, separate_identifiers
 from tps_eval.alphafold.cofold_substrates import SUBSTRATE_SMILES
 
@@ -51,6 +57,7 @@ DEFAULT_MODEL_DPATH = CATAPRO_DIR / "models"
 DEFAULT_OUT_SUFFIX = "catapro"
 
 COLUMNS = ["ID", "catapro_kcat", "catapro_km", "catapro_kcat_km", "catapro_substrate"]
+_METRICS = COLUMNS[1:4]
 
 # Native (log10) column names written by vendor/CataPro/inference/predict.py.
 NATIVE_ID = "fasta_id"
@@ -162,6 +169,39 @@ def _reshape_native_output(native_csv: str, substrate: Optional[str]) -> pd.Data
     return frame[COLUMNS]
 
 
+def _predict_frame(
+    ids: List[str],
+    sequences: List[str],
+    smiles: str,
+    substrate: Optional[str],
+    *,
+    model_dpath: str,
+    device: str,
+    batch_size: int,
+) -> pd.DataFrame:
+    """Run CataPro on (ids, sequences) against one SMILES; the reshaped frame keyed
+    by ID holds only the rows CataPro returned."""
+    with tempfile.TemporaryDirectory(prefix="catapro_") as tmp:
+        input_csv = os.path.join(tmp, "catapro_input.csv")
+        native_csv = os.path.join(tmp, "catapro_native.csv")
+        pd.DataFrame(
+            {
+                "Enzyme_id": ids,
+                "type": CATAPRO_TYPE,
+                "sequence": sequences,
+                "smiles": smiles,
+            }
+        ).to_csv(input_csv)  # index written -> predict.py reads with index_col=0
+        run_catapro_predict(
+            input_csv,
+            native_csv,
+            model_dpath=model_dpath,
+            device=device,
+            batch_size=batch_size,
+        )
+        return _reshape_native_output(native_csv, substrate)
+
+
 def score_fasta(
     fasta_path: str,
     target_substrate: Optional[str],
@@ -172,6 +212,8 @@ def score_fasta(
     batch_size: int = 64,
     out_suffix: str = DEFAULT_OUT_SUFFIX,
     save_path: Optional[str] = None,
+    result_cache: Optional[str] = None,
+    no_cache: bool = False,
 ) -> pd.DataFrame:
     """Predict CataPro kinetics for every sequence in a FASTA against one substrate.
 
@@ -179,7 +221,8 @@ def score_fasta(
     (<fasta_stem>_<out_suffix>.csv) unless ``save_path`` is given. The output is
     reindexed to the full FASTA ID set (dropped/failed sequences -> NaN row). When
     no SMILES can be resolved for the substrate, every row is NaN (CataPro is not
-    invoked).
+    invoked). ``result_cache`` (a path) reuses predictions for sequences already
+    scored against the same SMILES and model; ``no_cache`` ignores it.
     """
     ids, sequences = _read_fasta_ids_and_sequences(fasta_path)
     if save_path is None:
@@ -200,25 +243,56 @@ def score_fasta(
         print(f"[catapro] wrote {len(result)} rows to {save_path}")
         return result
 
-    with tempfile.TemporaryDirectory(prefix="catapro_") as tmp:
-        input_csv = os.path.join(tmp, "catapro_input.csv")
-        native_csv = os.path.join(tmp, "catapro_native.csv")
-        pd.DataFrame(
-            {
-                "Enzyme_id": ids,
-                "type": CATAPRO_TYPE,
-                "sequence": sequences,
-                "smiles": resolved_smiles,
-            }
-        ).to_csv(input_csv)  # index written -> predict.py reads with index_col=0
-        run_catapro_predict(
-            input_csv,
-            native_csv,
+    cache = open_result_cache(
+        result_cache,
+        "catapro",
+        os.path.abspath(model_dpath),
+        no_cache=no_cache,
+        smiles=resolved_smiles,
+    )
+    if cache is None:
+        reshaped = _predict_frame(
+            ids,
+            sequences,
+            resolved_smiles,
+            substrate_label,
             model_dpath=model_dpath,
             device=device,
             batch_size=batch_size,
         )
-        reshaped = _reshape_native_output(native_csv, substrate_label)
+    else:
+
+        def predict(batch: List[str]) -> List[tuple]:
+            batch_ids = [f"seq{i}" for i in range(len(batch))]
+            frame = _predict_frame(
+                batch_ids,
+                batch,
+                resolved_smiles,
+                substrate_label,
+                model_dpath=model_dpath,
+                device=device,
+                batch_size=batch_size,
+            ).set_index("ID").reindex(batch_ids)
+            # A row CataPro dropped (or could not score) is None: retried next
+            # run instead of being cached as NaN.
+            return [
+                None if any(np.isnan(v) for v in row) else row
+                for row in frame[_METRICS].itertuples(index=False, name=None)
+            ]
+
+        with cache:
+            values = cached_results(
+                sequences,
+                predict,
+                cache=cache,
+                encode=lambda v: pack_floats(*v),
+                decode=unpack_floats,
+            )
+        reshaped = pd.DataFrame(
+            [(np.nan,) * len(_METRICS) if v is None else v for v in values],
+            columns=_METRICS,
+        )
+        reshaped.insert(0, "ID", ids)
 
     # Reindex to the full FASTA ID set so any dropped sequence gets a NaN row.
     result = reshaped.set_index("ID").reindex(ids)
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+"""Inverted-file (IVF) nearest-neighbour index over a fixed reference embedding set.
+
+``mindist_gen_vs_train`` always compares against the same MARTS-DB reference
+embeddings, so their structure can be paid for once: k-means splits the reference
+vectors into ``n_lists`` cells (default ~sqrt(M)), and a query is only compared
+with the members of its ``nprobe`` closest cells. ``nprobe`` is the recall/speed
+knob — ``nprobe == n_lists`` is an exhaustive scan.
+
+The index is one uncompressed ``.npz`` (``<reference stem>_ivf.npz`` by default,
+next to the reference ``.npy`` store) holding the centroids, the CSR cell layout,
+the reference vectors as float32 in cell order, and the reference ids — it is
+self-contained, so queries need neither the reference file nor a rebuild.
+
+Screening uses float32 BLAS distances; with ``exact_rerank`` (default) the best
+``RERANK_FACTOR * top_k`` screened candidates are re-measured as float64
+``norm(a - b)`` — the same arithmetic as ``min_embedding_distance``'s exact engine,
+so for a float32 reference store a neighbour the index finds gets exactly the
+distance the exhaustive path would report. Results use the engine's ``(distances, indices)`` contract (indices into
+the original reference order, ``inf`` / ``-1`` padding).
+"""
+
+import json
+import os
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from tps_eval.sequence_metrics.min_embedding_distance import (
+    _merge_topk,
+    nearest_embedding_neighbours,
+)
+
+INDEX_SUFFIX = "_ivf.npz"
+DEFAULT_NPROBE = 8
+RERANK_FACTOR = 2
+# Candidates re-measured per chunk in exact_rerank (bounds the float64 temporary).
+RERANK_CHUNK = 4096
+KMEANS_ITERATIONS = 20
+
+
+def default_index_path(reference_path: str) -> str:
+    return os.path.splitext(str(reference_path))[0] + INDEX_SUFFIX
+
+
+def _kmeans(vectors: np.ndarray, n_lists: int, *, iterations: int, seed: int) -> np.ndarray:
+    """Lloyd's k-means from a random sample of rows; returns the assignment.
+
+    Empty cells are re-seeded with the row currently farthest from its centroid,
+    taken only from a cell that keeps at least one other member.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    assignment = np.full(len(vectors), -1, dtype=np.int64)
+    for _ in range(iterations):
+        dist, nearest = nearest_embedding_neighbours(vectors, centroids, top_k=1)
+        new_assignment = nearest[:, 0]
+        counts = np.bincount(new_assignment, minlength=n_lists)
+        for empty in np.flatnonzero(counts == 0):
+            movable = counts[new_assignment] > 1
+            far = int(np.argmax(np.where(movable, dist[:, 0], -1.0)))
+            counts[new_assignment[far]] -= 1
+            counts[empty] += 1
+            new_assignment[far] = empty
+            dist[far, 0] = 0.0
+        if np.array_equal(new_assignment, assignment):
+            break
+        assignment = new_assignment
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        centroids = sums / np.bincount(assignment, minlength=n_lists)[:, None]
+    return assignment
+
+
+class EmbeddingIndex:
+    """IVF index; build with :meth:`build`, persist with :meth:`save` / :meth:`load`."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        order: np.ndarray,
+        vectors: np.ndarray,
+        meta: Optional[dict] = None,
+    ):
+        self.ids = [str(i) for i in ids]
+        self.centroids = np.asarray(centroids, dtype=float)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        self.position = np.empty_like(self.order)
+        self.position[self.order] = np.arange(len(self.order))
+        self.meta = dict(meta or {})
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[str],
+        embeddings: np.ndarray,
+        *,
+        n_lists: Optional[int] = None,
+        iterations: int = KMEANS_ITERATIONS,
+        seed: int = 0,
+        source: Optional[str] = None,
+    ) -> "EmbeddingIndex":
+        embeddings = np.asarray(embeddings, dtype=float)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(ids) or len(ids) == 0:
+            raise ValueError(f"cannot index embeddings of shape {embeddings.shape} with {len(ids)} ids")
+        if n_lists is None:
+            n_lists = int(round(np.sqrt(len(ids))))
+        n_lists = max(1, min(int(n_lists), len(ids)))
+        assignment = _kmeans(embeddings, n_lists, iterations=iterations, seed=seed)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        sums = np.zeros((n_lists, embeddings.shape[1]))
+        np.add.at(sums, assignment, embeddings)
+        centroids = sums / np.diff(offsets)[:, None]
+        meta = {"source": source, "n_lists": n_lists, "seed": seed, "dim": embeddings.shape[1]}
+        return cls(ids, centroids, offsets, order, embeddings[order], meta)
+
+    def save(self, path: str) -> str:
+        tmp = str(path) + ".tmp.npz"
+        np.savez(
+            tmp,
+            ids=np.array(self.ids, dtype=str),
+            centroids=self.centroids,
+            offsets=self.offsets,
+            order=self.order,
+            vectors=self.vectors,
+            meta=np.array(json.dumps(self.meta)),
+        )
+        os.replace(tmp, path)
+        return str(path)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["ids"].tolist(),
+                data["centroids"],
+                data["offsets"],
+                data["order"],
+                data["vectors"],
+                json.loads(str(data["meta"])),
+            )
+
+    def search(
+        self,
+        queries: np.ndarray,
+        *,
+        top_k: int = 1,
+        nprobe: int = DEFAULT_NPROBE,
+        exact_rerank: bool = True,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k neighbours; see the module docstring for the contract."""
+        queries = np.ascontiguousarray(queries, dtype=float)
+        n = queries.shape[0]
+        k = max(1, min(int(top_k), len(self)))
+        keep = min(len(self), RERANK_FACTOR * k) if exact_rerank else k
+        best_d = np.full((n, keep), np.inf)
+        best_j = np.full((n, keep), -1, dtype=np.int64)
+        if n == 0:
+            return best_d[:, :k], best_j[:, :k]
+        # Each probed cell contributes at most ``keep`` screened candidates per
+        # query; they are merged once at the end (<= n * nprobe * keep entries).
+        found_rows, found_d, found_j = [], [], []
+        nprobe = max(1, min(int(nprobe), self.n_lists))
+        _, probed = nearest_embedding_neighbours(queries, self.centroids, top_k=nprobe)
+        queries32 = queries.astype(np.float32)
+        query_norms = np.einsum("ij,ij->i", queries32, queries32)
+        for cell in np.unique(probed):
+            lo, hi = self.offsets[cell], self.offsets[cell + 1]
+            if hi == lo:
+                continue
+            rows = np.flatnonzero((probed == cell).any(axis=1))
+            sq = (
+                query_norms[rows, None]
+                + self.norms[None, lo:hi]
+                - 2.0 * (queries32[rows] @ self.vectors[lo:hi].T)
+            )
+            if hi - lo > keep:
+                cols = np.argpartition(sq, keep - 1, axis=1)[:, :keep]
+            else:
+                cols = np.broadcast_to(np.arange(hi - lo), (len(rows), hi - lo))
+            local = np.repeat(np.arange(len(rows)), cols.shape[1])
+            cols = cols.ravel()
+            found_rows.append(rows[local])
+            found_d.append(np.sqrt(np.maximum(sq[local, cols], 0.0)).astype(float))
+            found_j.append(self.order[lo + cols])
+        _merge_topk(
+            best_d,
+            best_j,
+            np.concatenate(found_rows),
+            np.concatenate(found_d),
+            np.concatenate(found_j),
+        )
+        if not exact_rerank:
+            return best_d[:, :k], best_j[:, :k]
+        rows, slots = np.nonzero(best_j >= 0)
+        refs = best_j[rows, slots]
+        # float64 - float32 promotes exactly, as in the exhaustive float64 path.
+        exact = np.concatenate(
+            [
+                np.linalg.norm(
+                    queries[rows[c : c + RERANK_CHUNK]]
+                    - self.vectors[self.position[refs[c : c + RERANK_CHUNK]]],
+                    axis=1,
+                )
+                for c in range(0, len(rows), RERANK_CHUNK)
+            ]
+            or [np.empty(0)]
+        )
+        out_d = np.full((n, k), np.inf)
+        out_j = np.full((n, k), -1, dtype=np.int64)
+        _merge_topk(out_d, out_j, rows, exact, refs)
+        return out_d, out_j
+
+
+def index_recall(
+    index: EmbeddingIndex,
+    queries: np.ndarray,
+    *,
+    top_k: int = 10,
+    nprobe: int = DEFAULT_NPROBE,
+) -> float:
+    """Mean fraction of each query's exact top-k (exhaustive scan over the indexed
+    vectors) that ``index.search`` returns at this ``nprobe``."""
+    exact = index.vectors[index.position].astype(float)
+    _, truth = nearest_embedding_neighbours(queries, exact, top_k=top_k)
+    _, found = index.search(queries, top_k=top_k, nprobe=nprobe)
+    overlaps = [
+        len(set(t[t >= 0]) & set(f[f >= 0])) / max(1, int((t >= 0).sum()))
+        for t, f in zip(truth, found)
+    ]
+    return float(np.mean(overlaps)) if overlaps else float("nan")
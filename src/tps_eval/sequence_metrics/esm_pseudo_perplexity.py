@@ -19,15 +19,32 @@ from __future__ import annotations
 #    standard cheap naturalness proxy.
 #
 #  * "masked" (exact, slow) — true masked marginals: for each position, mask it,
-#    forward, read log p(true | context). O(L) forwards per sequence. Use for a
-#    handful of sequences when you need the exact pseudo-perplexity.
+#    forward, read log p(true | context). O(L) masked copies per sequence; copies
+#    from several sequences are packed into token-budget batches and only the
+#    masked positions' logits are normalised. CPU knobs: `threads`, `precision`
+#    (bf16 autocast / int8 dynamic quantisation — approximate), and `adaptive_tol`,
+#    which masks positions in random rounds and stops once the mean-PLL 95% CI is
+#    that tight (an estimate, not the exact score).
 #
 # Output (CSV keyed by ID): esm_mean_pll (mean per-residue log-likelihood, <=0;
 # higher = more natural) and esm_pseudo_perplexity = exp(-esm_mean_pll)
-# (>=1; LOWER = more natural). Same model as src/esm/extract_embeddings.py
+# (>=1; LOWER = more natural), plus n_residues and n_masked (positions scored as
+# masked marginals: 0 for swoop, n_residues for exact masked, fewer when adaptive). Same model as src/esm/extract_embeddings.py
 # (ESM-1b, esm1b_t33_650M_UR50S) so the naturalness score is consistent with the
 # embedding-based metrics.
+#
+# Fused mode (``embeddings_path`` / --with_embeddings, swoop only): the swoop
+# forward already computes every layer, so the same pass also returns the
+# mean-pooled final-layer representation and writes the esm_embedding store
+# (<fasta>_embedding_esm1b.npy + _ids.txt) — one model load and one forward per
+# batch instead of two pipeline jobs.
+#
+# Result cache (``result_cache`` / --result_cache): per-sequence (mean PLL,
+# n_residues, n_masked) are cached per model + method, and fused embeddings under the same
+# "esm_embedding" namespace extract_embeddings uses, so only sequences never seen
+# before reach the model (which is not even loaded when everything is cached).
 
+import contextlib
 import os
 import sys
 from pathlib import Path
@@ -40,14 +57,30 @@ import torch
 from esm import pretrained
 
 
+from tps_eval.data.alignment_cache import pack_floats, unpack_floats
+from tps_eval.data.embeddings import (
+    decode_embedding,
+    encode_embedding,
+    open_embedding_cache,
+    save_embedding_store,
+)
+from tps_eval.data.result_cache import cached_results, open_result_cache
 from tps_eval.data.sequences import load_fasta_sequences, separate_identifiers
 
 # Same model the embedding tool loads, so naturalness is consistent across metrics.
 DEFAULT_MODEL = "esm1b_t33_650M_UR50S"
 # ESM-1b was trained on sequences truncated to 1022 residues (1024 with BOS/EOS).
 TRUNCATION_SEQ_LENGTH = 1022
+# Final ESM-1b layer; its mean-pooled residue representation is the embedding
+# src/tps_eval/esm/extract_embeddings.py writes.
+EMBEDDING_LAYER = 33
+
+COLUMNS = ["ID", "esm_pseudo_perplexity", "esm_mean_pll", "n_residues", "n_masked"]
 
-COLUMNS = ["ID", "esm_pseudo_perplexity", "esm_mean_pll", "n_residues"]
+# Forward-pass precisions: bf16 autocast, or int8 dynamic quantisation (CPU).
+PRECISIONS = ("float32", "bfloat16", "int8")
+# Positions masked per sequence per round in adaptive masked mode.
+ADAPTIVE_ROUND = 32
 
 
 def _per_position_log_probs(logits: torch.Tensor) -> torch.Tensor:
@@ -55,9 +88,22 @@ def _per_position_log_probs(logits: torch.Tensor) -> torch.Tensor:
     return torch.log_softmax(logits, dim=-1)
 
 
-def _score_swoop(model, alphabet, device, sequences: List[str], toks_per_batch: int) -> List[dict]:
+def _score_swoop(
+    model,
+    alphabet,
+    device,
+    sequences: List[str],
+    toks_per_batch: int,
+    *,
+    embedding_layer: Optional[int] = None,
+    precision: str = "float32",
+) -> List[dict]:
     """One Fell Swoop: a single (batched) unmasked forward pass per sequence,
-    reading log p(x_i | full context) at each residue's true token."""
+    reading log p(x_i | full context) at each residue's true token.
+
+    With ``embedding_layer`` the same forward also returns that layer's
+    representation, and each result carries its residue mean as ``"embedding"``
+    (float32 numpy vector)."""
     batch_converter = alphabet.get_batch_converter(TRUNCATION_SEQ_LENGTH)
     results: List[dict] = []
 
@@ -80,13 +126,19 @@ def _score_swoop(model, alphabet, device, sequences: List[str], toks_per_batch:
         batches.append(cur)
 
     scored = {}
-    with torch.no_grad():
+    with torch.inference_mode():
         for b, batch_idx in enumerate(batches):
             data = [(str(i), sequences[i][:TRUNCATION_SEQ_LENGTH]) for i in batch_idx]
             _, _, toks = batch_converter(data)
             toks = toks.to(device)
-            logits = model(toks)["logits"]
-            log_probs = _per_position_log_probs(logits)
+            with _precision_context(device, precision):
+                if embedding_layer is None:
+                    out = model(toks)
+                else:
+                    out = model(toks, repr_layers=[embedding_layer])
+            if embedding_layer is not None:
+                representations = out["representations"][embedding_layer].to(device="cpu")
+            log_probs = _per_position_log_probs(out["logits"].float())
             for row, i in enumerate(batch_idx):
                 L = min(len(sequences[i]), TRUNCATION_SEQ_LENGTH)
                 # positions 1..L are residues (0 is BOS, L+1 is EOS)
@@ -94,7 +146,11 @@ def _score_swoop(model, alphabet, device, sequences: List[str], toks_per_batch:
                 lp = log_probs[row, 1 : L + 1, :]
                 per_res = lp.gather(1, token_ids.unsqueeze(1)).squeeze(1)
                 mean_pll = float(per_res.mean().item())
-                scored[i] = {"mean_pll": mean_pll, "n_residues": int(L)}
+                scored[i] = {"mean_pll": mean_pll, "n_residues": int(L), "n_masked": 0}
+                if embedding_layer is not None:
+                    scored[i]["embedding"] = (
+                        representations[row, 1 : L + 1].mean(0).to(torch.float32).numpy()
+                    )
             print(f"  [swoop] batch {b + 1}/{len(batches)} ({len(batch_idx)} seqs)")
 
     for i in range(len(sequences)):
@@ -102,40 +158,196 @@ def _score_swoop(model, alphabet, device, sequences: List[str], toks_per_batch:
     return results
 
 
-def _score_masked(model, alphabet, device, sequences: List[str]) -> List[dict]:
+def _precision_context(device: str, precision: str):
+    """bf16 autocast for the forward passes; int8 is applied to the model itself
+    (:func:`_prepare_model`), float32 needs nothing."""
+    if precision == "bfloat16":
+        return torch.autocast(device_type=device, dtype=torch.bfloat16)
+    return contextlib.nullcontext()
+
+
+def _prepare_model(model, device: str, precision: str):
+    """Apply dynamic int8 quantisation of the Linear layers (CPU only)."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}' (expected one of {PRECISIONS}).")
+    if precision == "int8":
+        if device != "cpu":
+            raise ValueError("int8 dynamic quantisation runs on CPU only (use --nogpu).")
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return model
+
+
+def _masked_log_probs(
+    model,
+    alphabet,
+    device,
+    tokens: List[torch.Tensor],
+    jobs: np.ndarray,
+    toks_per_batch: int,
+    precision: str,
+) -> np.ndarray:
+    """log p(true residue | sequence with that residue masked) for each job.
+
+    ``jobs`` is an (n, 2) array of (sequence index, residue position). Masked
+    copies of several sequences are packed into padded batches of at most
+    ``toks_per_batch`` tokens; only the masked positions' logits are normalised.
+    """
+    out = np.empty(len(jobs))
+    lengths = np.array([len(t) for t in tokens])
+    # Length-sorted (stable, so a sequence's rows stay contiguous) to limit padding.
+    order = np.argsort(lengths[jobs[:, 0]], kind="stable")
+    start = 0
+    while start < len(order):
+        width = lengths[jobs[order[start], 0]]
+        stop = start + 1
+        while stop < len(order):
+            width_next = lengths[jobs[order[stop], 0]]
+            if (stop - start + 1) * width_next > toks_per_batch:
+                break
+            width = width_next
+            stop += 1
+        rows = order[start:stop]
+        seq_idx = jobs[rows, 0]
+        positions = torch.from_numpy(jobs[rows, 1] + 1)  # + BOS
+        batch = torch.full((len(rows), width), alphabet.padding_idx, dtype=torch.long)
+        for s in np.unique(seq_idx):
+            batch[seq_idx == s, : lengths[s]] = tokens[s]
+        arange = torch.arange(len(rows))
+        true_tokens = batch[arange, positions].clone()
+        batch[arange, positions] = alphabet.mask_idx
+        batch = batch.to(device)
+        with _precision_context(device, precision):
+            logits = model(batch)["logits"]
+        picked = logits[arange.to(device), positions.to(device)].float()
+        log_probs = _per_position_log_probs(picked)
+        out[rows] = (
+            log_probs.gather(1, true_tokens.to(device).unsqueeze(1)).squeeze(1).double().cpu().numpy()
+        )
+        start = stop
+    return out
+
+
+def _score_masked(
+    model,
+    alphabet,
+    device,
+    sequences: List[str],
+    *,
+    toks_per_batch: int = 4096,
+    precision: str = "float32",
+    adaptive_tol: Optional[float] = None,
+    seed: int = 0,
+) -> List[dict]:
     """Exact masked marginals: mask each position in turn, read log p(true|context).
-    O(L) forwards per sequence (positions batched together)."""
+
+    Masked copies from all sequences are packed into token-budget batches. With
+    ``adaptive_tol`` positions are instead masked in random rounds of
+    ``ADAPTIVE_ROUND`` per sequence, and a sequence stops once the 95% confidence
+    half-width of its mean PLL (finite-population corrected) is <= ``adaptive_tol``
+    nats; ``n_masked`` records how many positions were scored."""
     batch_converter = alphabet.get_batch_converter(TRUNCATION_SEQ_LENGTH)
-    mask_idx = alphabet.mask_idx
-    results: List[dict] = []
+    tokens = [
+        batch_converter([(str(i), seq[:TRUNCATION_SEQ_LENGTH])])[2][0]
+        for i, seq in enumerate(sequences)
+    ]
+    n_res = [min(len(seq), TRUNCATION_SEQ_LENGTH) for seq in sequences]
+    rng = np.random.default_rng(seed)
+    pending = [
+        rng.permutation(L) if adaptive_tol is not None else np.arange(L) for L in n_res
+    ]
+    values: List[List[float]] = [[] for _ in sequences]
+    step = ADAPTIVE_ROUND if adaptive_tol is not None else max(n_res, default=0)
+    active = [i for i, L in enumerate(n_res) if L > 0]
+    rounds = 0
+
+    with torch.inference_mode():
+        while active:
+            jobs = np.array(
+                [(i, p) for i in active for p in pending[i][len(values[i]) : len(values[i]) + step]],
+                dtype=np.int64,
+            ).reshape(-1, 2)
+            scored = _masked_log_probs(
+                model, alphabet, device, tokens, jobs, toks_per_batch, precision
+            )
+            for i in active:
+                values[i].extend(scored[jobs[:, 0] == i].tolist())
+            rounds += 1
+            still = []
+            for i in active:
+                n, L = len(values[i]), n_res[i]
+                if n >= L:
+                    continue
+                if n >= 2:
+                    sd = float(np.std(values[i], ddof=1))
+                    half_width = 1.96 * sd / np.sqrt(n) * np.sqrt((L - n) / (L - 1))
+                    if half_width <= adaptive_tol:
+                        continue
+                still.append(i)
+            active = still
+            print(f"  [masked] round {rounds}: {len(jobs)} masked positions, {len(active)} open")
+
+    return [
+        {
+            "mean_pll": float(np.mean(v)) if v else float("nan"),
+            "n_residues": int(L),
+            "n_masked": len(v),
+        }
+        for v, L in zip(values, n_res)
+    ]
+
+
+def _encode_score(score: dict) -> bytes:
+    return pack_floats(score["mean_pll"], score["n_residues"], score["n_masked"])
 
-    with torch.no_grad():
-        for i, seq in enumerate(sequences):
-            seq = seq[:TRUNCATION_SEQ_LENGTH]
-            L = len(seq)
-            _, _, toks = batch_converter([(str(i), seq)])
-            toks = toks.to(device)  # (1, L+2)
-            true_tokens = toks[0, 1 : L + 1].clone()
-
-            # Build one masked copy per residue position; batch them.
-            per_res = torch.empty(L, dtype=torch.float64)
-            # Chunk to bound memory on long sequences.
-            CHUNK = 64
-            pos = 0
-            while pos < L:
-                chunk_positions = list(range(pos, min(pos + CHUNK, L)))
-                batch = toks.repeat(len(chunk_positions), 1)
-                for r, p in enumerate(chunk_positions):
-                    batch[r, p + 1] = mask_idx
-                logits = model(batch)["logits"]
-                log_probs = _per_position_log_probs(logits)
-                for r, p in enumerate(chunk_positions):
-                    per_res[p] = float(log_probs[r, p + 1, true_tokens[p]].item())
-                pos += CHUNK
-            mean_pll = float(per_res.mean().item())
-            results.append({"mean_pll": mean_pll, "n_residues": int(L)})
-            print(f"  [masked] {i + 1}/{len(sequences)} ({L} aa)")
-    return results
+
+def _score_decoder(method: str, adaptive: bool):
+    """Cache decoder. Entries written before n_masked was stored hold only (mean PLL,
+    n_residues); their n_masked follows from the method, except in adaptive mode."""
+
+    def decode(blob: bytes) -> dict:
+        values = unpack_floats(blob)
+        mean_pll, n_residues = values[:2]
+        if len(values) > 2:
+            n_masked = values[2]
+        elif method == "swoop":
+            n_masked = 0
+        else:
+            n_masked = float("nan") if adaptive else n_residues
+        return {"mean_pll": mean_pll, "n_residues": int(n_residues), "n_masked": n_masked}
+
+    return decode
+
+
+def _cached_scores(
+    sequences: List[str], score, *, score_cache, embedding_cache, decode_score
+) -> List[dict]:
+    """``score(batch)`` on cache misses only. In fused mode a sequence needs both
+    its score and its embedding cached to skip the model."""
+    if embedding_cache is None:
+        return cached_results(
+            sequences, score, cache=score_cache, encode=_encode_score, decode=decode_score
+        )
+    fresh = {}
+
+    def embed(batch: List[str]) -> List[np.ndarray]:
+        fresh.update(zip(batch, score(batch)))
+        return [fresh[seq]["embedding"] for seq in batch]
+
+    def rescore(batch: List[str]) -> List[dict]:
+        todo = [seq for seq in batch if seq not in fresh]
+        if todo:
+            fresh.update(zip(todo, score(todo)))
+        return [fresh[seq] for seq in batch]
+
+    embeddings = cached_results(
+        sequences, embed, cache=embedding_cache, encode=encode_embedding, decode=decode_embedding
+    )
+    scored = cached_results(
+        sequences, rescore, cache=score_cache, encode=_encode_score, decode=decode_score
+    )
+    return [dict(s, embedding=e) for s, e in zip(scored, embeddings)]
 
 
 def compute_pseudo_perplexity(
@@ -146,29 +358,110 @@ def compute_pseudo_perplexity(
     method: str = "swoop",
     toks_per_batch: int = 4096,
     nogpu: bool = False,
+    embeddings_path: Optional[str] = None,
+    result_cache: Optional[str] = None,
+    no_cache: bool = False,
+    threads: Optional[int] = None,
+    precision: str = "float32",
+    adaptive_tol: Optional[float] = None,
 ) -> pd.DataFrame:
     """Score ESM pseudo-perplexity for every sequence in `fasta_path`, writing a
-    CSV keyed by ID. method: 'swoop' (fast single-pass approx) or 'masked' (exact)."""
+    CSV keyed by ID. method: 'swoop' (fast single-pass approx) or 'masked' (exact).
+
+    ``embeddings_path`` (swoop only) also writes the esm_embedding store from the
+    same forward pass (e.g. ``<fasta>_embedding_esm1b.npy``). ``result_cache`` (a
+    path) reuses scores/embeddings of sequences seen before; ``no_cache`` ignores
+    it. ``threads`` sets torch's intra-op CPU threads; ``precision`` is one of
+    PRECISIONS; ``adaptive_tol`` (masked only) stops masking a sequence once its
+    mean-PLL 95% CI half-width is within that many nats."""
+    if embeddings_path is not None and method != "swoop":
+        raise ValueError("Fused embeddings need the single-pass 'swoop' method.")
+    if method not in ("swoop", "masked"):
+        raise ValueError(f"Unknown method '{method}' (expected 'swoop' or 'masked').")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}' (expected one of {PRECISIONS}).")
+    if adaptive_tol is not None and method != "masked":
+        raise ValueError("adaptive_tol applies to the exact 'masked' method only.")
+    if threads:
+        torch.set_num_threads(threads)
     identifiers, sequences = separate_identifiers(
         load_fasta_sequences(fasta_path, load_identifiers=True)
     )
     identifiers = [i.split(" ", 1)[0] for i in identifiers]
     print(f"Read {fasta_path} with {len(sequences)} sequences")
 
-    model, alphabet = pretrained.load_model_and_alphabet(model_location)
-    model.eval()
-    device = "cpu"
-    if torch.cuda.is_available() and not nogpu:
-        model = model.cuda()
-        device = "cuda"
-        print("Transferred model to GPU")
-
-    if method == "swoop":
-        scored = _score_swoop(model, alphabet, device, sequences, toks_per_batch)
-    elif method == "masked":
-        scored = _score_masked(model, alphabet, device, sequences)
-    else:
-        raise ValueError(f"Unknown method '{method}' (expected 'swoop' or 'masked').")
+    loaded = {}
+
+    def score(batch: List[str]) -> List[dict]:
+        if not loaded:
+            model, alphabet = pretrained.load_model_and_alphabet(model_location)
+            model.eval()
+            device = "cpu"
+            if torch.cuda.is_available() and not nogpu:
+                model = model.cuda()
+                device = "cuda"
+                print("Transferred model to GPU")
+            model = _prepare_model(model, device, precision)
+            loaded.update(model=model, alphabet=alphabet, device=device)
+        model, alphabet, device = loaded["model"], loaded["alphabet"], loaded["device"]
+        if method == "swoop":
+            return _score_swoop(
+                model,
+                alphabet,
+                device,
+                batch,
+                toks_per_batch,
+                embedding_layer=EMBEDDING_LAYER if embeddings_path is not None else None,
+                precision=precision,
+            )
+        return _score_masked(
+            model,
+            alphabet,
+            device,
+            batch,
+            toks_per_batch=toks_per_batch,
+            precision=precision,
+            adaptive_tol=adaptive_tol,
+        )
+
+    # Non-default numerics get their own cache entries; float32 exact runs share.
+    numerics = {}
+    if precision != "float32":
+        numerics["precision"] = precision
+    score_params = dict(numerics)
+    if adaptive_tol is not None:
+        score_params["adaptive_tol"] = adaptive_tol
+    score_cache = open_result_cache(
+        result_cache,
+        "esm_pseudo_perplexity",
+        model_location,
+        no_cache=no_cache,
+        method=method,
+        truncation=TRUNCATION_SEQ_LENGTH,
+        **score_params,
+    )
+    embedding_cache = None
+    if embeddings_path is not None:
+        embedding_cache = open_embedding_cache(
+            result_cache,
+            model_location,
+            layer=EMBEDDING_LAYER,
+            truncation=TRUNCATION_SEQ_LENGTH,
+            no_cache=no_cache,
+            **numerics,
+        )
+    try:
+        scored = _cached_scores(
+            sequences,
+            score,
+            score_cache=score_cache,
+            embedding_cache=embedding_cache,
+            decode_score=_score_decoder(method, adaptive_tol is not None),
+        )
+    finally:
+        for cache in (score_cache, embedding_cache):
+            if cache is not None:
+                cache.close()
 
     rows = []
     for ident, s in zip(identifiers, scored):
@@ -180,6 +473,7 @@ def compute_pseudo_perplexity(
                 "esm_pseudo_perplexity": ppl,
                 "esm_mean_pll": mean_pll,
                 "n_residues": s["n_residues"],
+                "n_masked": s["n_masked"],
             }
         )
     df = pd.DataFrame(rows, columns=COLUMNS)
@@ -189,4 +483,14 @@ def compute_pseudo_perplexity(
         save_path = partial + "_esm_pseudo_perplexity.csv"
     df.to_csv(save_path, index=False)
     print(f"Wrote {len(df)} rows to {save_path}")
+
+    if embeddings_path is not None:
+        matrix = np.stack([s["embedding"] for s in scored]) if scored else np.zeros((0, 0))
+        store_path = save_embedding_store(embeddings_path, identifiers, matrix)
+        print(f"Saved {len(scored)} embeddings to {store_path}")
     return df
+
+
+def default_embeddings_path(fasta_path: str) -> str:
+    """``<fasta>_embedding_esm1b.npy`` — the esm_embedding tool's output name."""
+    return os.path.splitext(fasta_path)[0] + "_embedding_esm1b.npy"
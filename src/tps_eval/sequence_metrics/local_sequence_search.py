@@ -39,6 +39,7 @@ as NaN. Identity is the PRIMARY field and is available from BOTH backends; simil
 DIAMOND-only extra. Output CSV is keyed by ``ID``: ``<input>_local_sequence_search.csv``.
 """
 
+import json
 import os
 import shutil
 import subprocess
@@ -52,7 +53,13 @@ import pandas as pd
 
 CURRENT_DIR = Path(__file__).resolve().parent
 
+from tps_eval.data.alignment_cache import (  # noqa: E402
+    AlignmentCache,
+    records_key,
+    sequence_key,
+)
 from tps_eval.data.sequences import load_fasta_sequences, separate_identifiers  # noqa: E402
+from tps_eval.data.topk import TOPK_COLUMNS, topk_from_hits, write_topk  # noqa: E402
 
 
 BACKENDS = ("mmseqs2", "diamond")
@@ -66,8 +73,6 @@ METRIC_COLUMNS = [
     "local_coverage",
 ]
 
-TOPK_COLUMNS = ["query_id", "rank", "neighbour_id", "score"]
-
 # Internal normalized hit columns produced by each backend's parser.
 # identity/similarity/coverage are PERCENT in [0, 100]; score = identity %.
 _HIT_COLUMNS = ["qseqid", "sseqid", "identity", "similarity", "coverage", "score"]
@@ -77,6 +82,48 @@ def _first_token(value: str) -> str:
     return str(value).split(" ", 1)[0].split("\t", 1)[0]
 
 
+# ---------------------------------------------------------------------------
+# Persistent per-query hit cache
+# ---------------------------------------------------------------------------
+# A backend's hit list for one query depends only on the query sequence, the
+# reference set and the search parameters — not on the other queries in the batch.
+# So the cache (tps_eval.data.alignment_cache) stores each query's normalized hit
+# rows under (sequence_key(query), records_key(reference)); a re-run searches only
+# the queries it has not seen against that exact reference.
+#
+# Limitation — self mode: the reference IS the query FASTA, so adding or editing one
+# sequence changes records_key(reference) and every query misses on the rerun. This
+# is deliberate: a query's hit list is not the union of per-reference-sequence hits
+# (e-values scale with the database size and the backend keeps only the best
+# max_hits), so keying self-mode hits per reference sequence would return hits a
+# fresh search would not. The cache pays off for identical self-mode reruns and for
+# growing query batches against a FIXED reference (--train_path).
+_CACHED_HIT_FIELDS = ["sseqid", "identity", "similarity", "coverage", "_bits"]
+
+
+def _cache_params(backend: str, sensitivity: Optional[str], max_hits: int) -> str:
+    return f"local_sequence_search:{backend}:sensitivity={sensitivity}:max_hits={max_hits}:v1"
+
+
+def _encode_hits(group: pd.DataFrame) -> bytes:
+    rows = group[_CACHED_HIT_FIELDS].values.tolist() if not group.empty else []
+    return json.dumps(rows).encode("utf-8")
+
+
+def _decode_hits(blob: bytes, qid: str) -> pd.DataFrame:
+    rows = json.loads(blob.decode("utf-8"))
+    hits = pd.DataFrame(rows, columns=_CACHED_HIT_FIELDS)
+    hits.insert(0, "qseqid", qid)
+    hits["score"] = hits["identity"]
+    return hits
+
+
+def _write_fasta(records: List[tuple], path: str) -> None:
+    with open(path, "w") as fh:
+        for record_id, seq in records:
+            fh.write(f">{record_id}\n{seq}\n")
+
+
 # ---------------------------------------------------------------------------
 # Backend: MMseqs2 (easy-search)
 # ---------------------------------------------------------------------------
@@ -206,34 +253,19 @@ def _best_hits(hits: pd.DataFrame, *, self_mode: bool) -> pd.DataFrame:
 def _topk_neighbours(hits: pd.DataFrame, query_ids: List[str], top_k: int, *,
                      self_mode: bool) -> pd.DataFrame:
     """Tidy top-k neighbours per query, ranked by score (identity %, descending)."""
-    rows: List[dict] = []
-    if not hits.empty:
-        if self_mode:
-            hits = hits[hits["qseqid"] != hits["sseqid"]]
-        # Deduplicate to one row per (query, neighbour) keeping the best bitscore,
-        # then rank by score (identity %), tie-break on bitscore then subject id.
-        hits = hits.sort_values(
-            ["qseqid", "_bits"], ascending=[True, False]
-        ).drop_duplicates(["qseqid", "sseqid"], keep="first")
-        by_query = {q: g for q, g in hits.groupby("qseqid", sort=False)}
-    else:
-        by_query = {}
-
-    for qid in query_ids:
-        group = by_query.get(qid)
-        if group is None:
-            continue
-        group = group.sort_values(
-            ["score", "_bits", "sseqid"], ascending=[False, False, True]
-        ).head(top_k)
-        for rank, (_, row) in enumerate(group.iterrows(), start=1):
-            rows.append({
-                "query_id": qid,
-                "rank": rank,
-                "neighbour_id": row["sseqid"],
-                "score": float(row["score"]),
-            })
-    return pd.DataFrame(rows, columns=TOPK_COLUMNS)
+    if hits.empty:
+        return pd.DataFrame(columns=TOPK_COLUMNS)
+    if self_mode:
+        hits = hits[hits["qseqid"] != hits["sseqid"]]
+    # Deduplicate to one row per (query, neighbour) keeping the best bitscore,
+    # then rank by score (identity %), tie-break on bitscore then subject id.
+    hits = hits.sort_values(
+        ["qseqid", "_bits"], ascending=[True, False]
+    ).drop_duplicates(["qseqid", "sseqid"], keep="first")
+    return topk_from_hits(
+        hits, top_k, query="qseqid", neighbour="sseqid", score="score",
+        tiebreak=[("_bits", False), ("sseqid", True)], query_order=query_ids,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -259,6 +291,7 @@ def local_sequence_search(
     sensitivity: Optional[str] = None,
     save_path: Optional[str] = None,
     topk_save_path: Optional[str] = None,
+    alignment_cache: Optional[str] = None,
 ) -> pd.DataFrame:
     """Run a local identity/similarity search of ``fasta_path`` vs a reference.
 
@@ -272,6 +305,12 @@ def local_sequence_search(
         sensitivity: Backend sensitivity knob (mmseqs2 ``-s`` value, e.g. 7.5; diamond
             flag name, e.g. very-sensitive). None -> backend default.
         save_path / topk_save_path: Output paths (defaults derived from fasta_path).
+        alignment_cache: Optional persistent cache file (see
+            :mod:`tps_eval.data.alignment_cache`). Queries whose sequence was already
+            searched against the same reference with the same parameters reuse their
+            stored hits; only the remaining queries are sent to the backend. In self
+            mode the reference is the whole query FASTA, so any change to it misses
+            every query (see the cache notes above).
     """
     if backend not in BACKENDS:
         raise ValueError(f"Unknown backend {backend!r}; choose from {BACKENDS}.")
@@ -279,7 +318,7 @@ def local_sequence_search(
     self_mode = train_path is None
     ref_fasta = fasta_path if self_mode else train_path
 
-    query_identifiers, _seqs = separate_identifiers(
+    query_identifiers, query_seqs = separate_identifiers(
         load_fasta_sequences(fasta_path, load_identifiers=True)
     )
     query_ids = [_first_token(i) for i in query_identifiers]
@@ -287,15 +326,58 @@ def local_sequence_search(
     runner = _BACKEND_RUNNERS[backend]
     effective_top_k = top_k if (top_k and top_k >= 1) else 1
 
+    cache = None
+    cached_hits: List[pd.DataFrame] = []
+    search_fasta = fasta_path
+    pending = list(zip(query_ids, query_seqs))
+    if alignment_cache is not None:
+        cache = AlignmentCache(
+            alignment_cache,
+            _cache_params(backend, sensitivity, max(effective_top_k, 1) * 5 + 50),
+        )
+        ref_key = records_key(
+            (_first_token(i), s)
+            for i, s in load_fasta_sequences(ref_fasta, load_identifiers=True)
+        )
+        pending = []
+        for qid, seq in zip(query_ids, query_seqs):
+            blob = cache.get(sequence_key(seq), ref_key)
+            if blob is None:
+                pending.append((qid, seq))
+            else:
+                cached_hits.append(_decode_hits(blob, qid))
+        print(f"[{backend}] alignment cache: {len(query_ids) - len(pending)}/"
+              f"{len(query_ids)} queries reused, {len(pending)} to search")
+
     work_dir = tempfile.mkdtemp(prefix=f"local_seq_search_{backend}_")
     try:
-        hits = runner(
-            fasta_path, ref_fasta, work_dir,
-            top_k=effective_top_k, threads=threads, sensitivity=sensitivity,
-        )
+        if cache is not None and pending:
+            search_fasta = os.path.join(work_dir, "pending_queries.fasta")
+            _write_fasta(pending, search_fasta)
+        if pending:
+            hits = runner(
+                search_fasta, ref_fasta, work_dir,
+                top_k=effective_top_k, threads=threads, sensitivity=sensitivity,
+            )
+        else:
+            hits = pd.DataFrame(columns=_HIT_COLUMNS + ["_bits"])
     finally:
         shutil.rmtree(work_dir, ignore_errors=True)
 
+    if cache is not None:
+        by_query = {q: g for q, g in hits.groupby("qseqid", sort=False)} if not hits.empty else {}
+        empty = pd.DataFrame(columns=_CACHED_HIT_FIELDS)
+        try:
+            cache.put_many(
+                (sequence_key(seq), ref_key, _encode_hits(by_query.get(qid, empty)))
+                for qid, seq in pending
+            )
+        finally:
+            cache.close()
+        frames = [f for f in [*cached_hits, hits] if not f.empty]
+        if frames:
+            hits = pd.concat(frames, ignore_index=True)
+
     best = _best_hits(hits, self_mode=self_mode)
     best_by_query = {row["qseqid"]: row for _, row in best.iterrows()} if not best.empty else {}
 
@@ -336,7 +418,7 @@ def local_sequence_search(
         topk_df = _topk_neighbours(hits, query_ids, top_k, self_mode=self_mode)
         if topk_save_path is None:
             topk_save_path = _default_topk_save_path(fasta_path)
-        topk_df.to_csv(topk_save_path, index=False)
+        write_topk(topk_df, topk_save_path)
         print(f"[{backend}] top-{top_k} neighbours: {len(topk_df)} rows -> {topk_save_path}")
 
     return df
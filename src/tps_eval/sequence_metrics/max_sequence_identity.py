@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from concurrent.futures import ProcessPoolExecutor
-from typing import List, Optional, Sequence, Tuple
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import os
 import numpy as np
@@ -13,7 +14,14 @@ from pathlib import Path
 
 CURRENT_DIR = Path(__file__).resolve().parent
 
+from tps_eval.data.alignment_cache import (
+    AlignmentCache,
+    pack_floats,
+    sequence_key,
+    unpack_floats,
+)
 from tps_eval.data.sequences import load_fasta_sequences, separate_identifiers
+from tps_eval.data.topk import topk_from_lists, write_topk
 
 
 SUBSTITUTION_MATRIX = substitution_matrices.load("BLOSUM62")
@@ -39,6 +47,91 @@ def _build_blosum_lut(matrix) -> np.ndarray:
 _BLOSUM_LUT = _build_blosum_lut(SUBSTITUTION_MATRIX)
 _GAP_BYTE = ord("-")
 
+# Alignment-cache namespaces: each names every parameter that changes _pair_metrics'
+# output. Bump them whenever the aligner, the scoring or the metric definitions change.
+# Entries are ordered: (key1, key2) holds _pair_metrics(seq1, seq2) in that argument
+# order (gen-vs-train: query first; self mode: the lower list position first).
+PAIR_METRICS_CACHE_PARAMS = (
+    "max_sequence_identity/_pair_metrics:nw:BLOSUM62:open=-11:extend=-1:query-order:v1"
+)
+
+
+def _open_pair_cache(path: str, *, readonly: bool = False) -> AlignmentCache:
+    return AlignmentCache(path, PAIR_METRICS_CACHE_PARAMS, readonly=readonly)
+
+
+# --- Optional k-mer prefilter ------------------------------------------------
+# Exact all-vs-all NW is O(N*M*L^2). In --prefilter mode each query is globally
+# aligned only against the PREFILTER_CANDIDATES train sequences sharing the largest
+# fraction of distinct k-mers with it (an inverted index over the train set, like
+# the seeding stage of BLAST/MMseqs2). Scores of the aligned candidates are exact
+# NW scores; the approximation is only which pairs get aligned, so the reported
+# max/top-k can miss a true best hit that shares few k-mers. Measure the trade-off
+# on a sample with prefilter_recall() (--recall_sample).
+PREFILTER_KMER = 3
+PREFILTER_CANDIDATES = 50
+
+
+def _kmer_codes(seq: str, k: int) -> np.ndarray:
+    """Sorted distinct k-mer codes of ``seq`` (5 bits per residue letter)."""
+    arr = np.frombuffer(seq.upper().encode("ascii"), dtype=np.uint8).astype(np.int64) & 31
+    if len(arr) < k:
+        return np.empty(0, dtype=np.int64)
+    codes = np.zeros(len(arr) - k + 1, dtype=np.int64)
+    for offset in range(k):
+        codes = (codes << 5) | arr[offset : offset + len(codes)]
+    return np.unique(codes)
+
+
+class KmerIndex:
+    """Inverted k-mer index over a sequence set: code -> ids of sequences containing it.
+
+    Postings are stored CSR-style (``_codes`` sorted, ``_starts`` offsets into
+    ``_ids``) so a query's candidate scores are one vectorised gather + bincount.
+    """
+
+    def __init__(self, sequences: Sequence[str], k: int = PREFILTER_KMER):
+        self.k = k
+        self.n = len(sequences)
+        per_seq = [_kmer_codes(str(seq), k) for seq in sequences]
+        self._sizes = np.array([len(c) for c in per_seq], dtype=np.int64)
+        codes = np.concatenate(per_seq) if per_seq else np.empty(0, dtype=np.int64)
+        ids = np.repeat(np.arange(self.n, dtype=np.int64), self._sizes)
+        order = np.argsort(codes, kind="stable")
+        codes, self._ids = codes[order], ids[order]
+        self._codes, self._starts = np.unique(codes, return_index=True)
+        self._ends = np.append(self._starts[1:], len(codes))
+
+    def shared_fraction(self, seq: str) -> np.ndarray:
+        """Per indexed sequence: shared distinct k-mers / max(distinct k-mers of either)."""
+        query = _kmer_codes(str(seq), self.k)
+        pos = np.searchsorted(self._codes, query)
+        found = pos < len(self._codes)
+        found[found] = self._codes[pos[found]] == query[found]
+        pos = pos[found]
+        starts, ends = self._starts[pos], self._ends[pos]
+        lengths = ends - starts
+        if lengths.sum() == 0:
+            return np.zeros(self.n)
+        # Flatten the selected posting ranges without a Python loop.
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        hits = self._ids[offsets + np.arange(lengths.sum())]
+        shared = np.bincount(hits, minlength=self.n).astype(float)
+        return shared / np.maximum(np.maximum(self._sizes, len(query)), 1)
+
+    def candidates(self, seq: str, n_candidates: int, *, exclude: Optional[int] = None) -> List[int]:
+        """Ascending indices of the ``n_candidates`` best-scoring sequences (ties on
+        the lower index), never including ``exclude``."""
+        scores = self.shared_fraction(seq)
+        if exclude is not None and 0 <= exclude < self.n:
+            scores[exclude] = -1.0
+        limit = self.n - (1 if exclude is not None and 0 <= exclude < self.n else 0)
+        n_candidates = min(n_candidates, limit)
+        if n_candidates <= 0:
+            return []
+        order = np.lexsort((np.arange(self.n), -scores))[:n_candidates]
+        return sorted(int(j) for j in order)
+
 
 # --- Parallel execution across CPU cores -------------------------------------
 # Bio.Align.PairwiseAligner is GIL-bound (C-impl that does not release the GIL),
@@ -49,6 +142,15 @@ _GAP_BYTE = ord("-")
 # spawn (or inherited on fork) — either way they exist at module import.
 _WORKER_TRAIN: Optional[List[str]] = None
 _WORKER_SELF: bool = False
+_WORKER_TOP_K: Optional[int] = None
+# Optional persistent alignment cache: each worker opens its own read-only handle
+# (SQLite connections must not cross a fork); new results go back to the parent,
+# the single writer. _WORKER_KEYS are the content keys of _WORKER_TRAIN.
+_WORKER_CACHE: Optional[AlignmentCache] = None
+_WORKER_KEYS: Optional[List[bytes]] = None
+# Prefilter mode: the train k-mer index + candidates per query (None = exact).
+_WORKER_INDEX: Optional[KmerIndex] = None
+_WORKER_CANDIDATES: int = PREFILTER_CANDIDATES
 
 # Pin to a fork context: workers inherit the parent's sys.path + the aligner/LUT
 # module globals (no re-import, no per-task repickling of the train set). This is
@@ -63,6 +165,12 @@ except ValueError:  # pragma: no cover - non-fork platforms
     _MP_CONTEXT = None
 
 
+# Rows/columns per upper-triangle tile in self mode. Each tile is one pool task of
+# at most SELF_TILE_SIZE**2 alignments: large enough to amortise the IPC of its
+# partial row states, small enough to keep every core busy near the tail.
+SELF_TILE_SIZE = 64
+
+
 def _available_cpus() -> int:
     """CPUs actually allocated to this process (respects SLURM/PBS cpusets)."""
     try:
@@ -71,51 +179,173 @@ def _available_cpus() -> int:
         return max(1, os.cpu_count() or 1)
 
 
-def _init_identity_worker(train: List[str], self_comparison: bool) -> None:
-    global _WORKER_TRAIN, _WORKER_SELF
+def _init_identity_worker(
+    train: List[str],
+    self_comparison: bool,
+    top_k: Optional[int] = None,
+    cache_path: Optional[str] = None,
+    index: Optional[KmerIndex] = None,
+    n_candidates: int = PREFILTER_CANDIDATES,
+) -> None:
+    global _WORKER_TRAIN, _WORKER_SELF, _WORKER_TOP_K, _WORKER_CACHE, _WORKER_KEYS
+    global _WORKER_INDEX, _WORKER_CANDIDATES
+    _WORKER_INDEX = index
+    _WORKER_CANDIDATES = n_candidates
     _WORKER_TRAIN = train
     _WORKER_SELF = self_comparison
+    _WORKER_TOP_K = top_k if top_k is not None and top_k >= 1 else None
+    if cache_path is None:
+        _WORKER_CACHE = None
+        _WORKER_KEYS = None
+    else:
+        _WORKER_CACHE = _open_pair_cache(cache_path, readonly=True)
+        _WORKER_KEYS = [sequence_key(seq) for seq in train]
+
+
+# Per-row running state shared by the rectangular and the triangular schedulers:
+# [max_identity, max_identity_idx, max_similarity, max_similarity_idx, topk_heap].
+# The max starts at (0.0, index 0) and is only replaced by a strictly positive
+# score; among equal maxima the LOWEST train index wins, so the reduction gives the
+# same hit whatever order the pairs arrive in (ascending scan or arbitrary tiles).
+def _new_row_state() -> list:
+    return [0.0, 0, 0.0, 0, []]
+
+
+def _offer_hit(state: list, j: int, identity: float, similarity: float, top_k: Optional[int]) -> None:
+    if identity > state[0] or (identity == state[0] and identity > 0.0 and j < state[1]):
+        state[0] = identity
+        state[1] = j
+    if similarity > state[2] or (similarity == state[2] and similarity > 0.0 and j < state[3]):
+        state[2] = similarity
+        state[3] = j
+    if top_k is not None:
+        # Bounded min-heap keyed on (identity, -j): ties keep the lower train index,
+        # identical to a full sort by (identity desc, index asc) truncated to top_k.
+        heap = state[4]
+        entry = (identity, -j)
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+
+def _merge_row_state(state: list, partial: list, top_k: Optional[int]) -> None:
+    """Fold a worker's partial row state (same layout) into the running one."""
+    for field_idx, idx_idx in ((0, 1), (2, 3)):
+        value, j = partial[field_idx], partial[idx_idx]
+        if value > state[field_idx] or (
+            value == state[field_idx] and value > 0.0 and j < state[idx_idx]
+        ):
+            state[field_idx] = value
+            state[idx_idx] = j
+    if top_k is not None:
+        heap = state[4]
+        for entry in partial[4]:
+            if len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+
+def _ranked_topk(heap: List[Tuple[float, int]]) -> List[Tuple[int, float]]:
+    # Emit identity as PERCENT (native metric for this tool's top-k contract).
+    return [(-neg_j, identity * 100.0) for identity, neg_j in sorted(heap, reverse=True)]
+
 
+def _worker_scan(item: Tuple[int, str, Optional[int]]):
+    """Per-query max identity/similarity AND top-k hits in one pass over the train set.
 
-def _worker_max(item: Tuple[int, str]):
-    """Per-query max identity/similarity against the worker's shared train set."""
-    i, generated_seq = item
-    local_max_identity = 0.0
-    local_max_similarity = 0.0
-    local_max_identity_idx = 0
-    local_max_similarity_idx = 0
-    for j, train_seq in enumerate(_WORKER_TRAIN):
-        if _WORKER_SELF and i == j:
+    Every (query, train) pair is aligned exactly once; the same ``_pair_metrics``
+    result feeds the running max and (when ``top_k`` is set) the bounded top-k heap.
+    In prefilter mode only the query's k-mer candidates are visited. ``item`` is
+    (position, sequence[, train index to exclude]); the exclusion defaults to the
+    position itself in self mode.
+    """
+    i, generated_seq = item[:2]
+    exclude = item[2] if len(item) > 2 else (i if _WORKER_SELF else None)
+    top_k = _WORKER_TOP_K
+    state = _new_row_state()
+    new_entries: List[Tuple[bytes, bytes, bytes]] = []
+    if _WORKER_CACHE is not None:
+        query_key = sequence_key(generated_seq)
+        cached = _WORKER_CACHE.partners(query_key)
+    if _WORKER_INDEX is None:
+        train_indices = range(len(_WORKER_TRAIN))
+    else:
+        train_indices = _WORKER_INDEX.candidates(
+            generated_seq, _WORKER_CANDIDATES, exclude=exclude
+        )
+    for j in train_indices:
+        if j == exclude:
             continue
-        sequence_identity, sequence_similarity = _pair_metrics(generated_seq, train_seq)
-        if sequence_identity > local_max_identity:
-            local_max_identity = sequence_identity
-            local_max_identity_idx = j
-        if sequence_similarity > local_max_similarity:
-            local_max_similarity = sequence_similarity
-            local_max_similarity_idx = j
-    return (
-        i,
-        local_max_identity,
-        local_max_similarity,
-        local_max_identity_idx,
-        local_max_similarity_idx,
-    )
+        train_seq = _WORKER_TRAIN[j]
+        if _WORKER_CACHE is None:
+            sequence_identity, sequence_similarity = _pair_metrics(generated_seq, train_seq)
+        else:
+            blob = cached.get(_WORKER_KEYS[j])
+            if blob is None:
+                sequence_identity, sequence_similarity = _pair_metrics(generated_seq, train_seq)
+                blob = pack_floats(sequence_identity, sequence_similarity)
+                cached[_WORKER_KEYS[j]] = blob
+                new_entries.append((query_key, _WORKER_KEYS[j], blob))
+            else:
+                sequence_identity, sequence_similarity = unpack_floats(blob)
+        _offer_hit(state, j, sequence_identity, sequence_similarity, top_k)
+    return i, state, new_entries
+
+
+def _worker_tile(tile: Tuple[int, int, int, int]):
+    """Self mode: align each unordered pair of one upper-triangle tile exactly once.
+
+    ``tile`` is (row_start, row_end, col_start, col_end) over the shared sequence
+    list with row_start <= col_start; on a diagonal tile only j > i is visited.
+    Each pair is aligned in its stored (i, j) order and its (identity, similarity)
+    feeds BOTH rows' partial states, which the parent folds together with
+    :func:`_merge_row_state`.
+    """
+    row_start, row_end, col_start, col_end = tile
+    top_k = _WORKER_TOP_K
+    seqs = _WORKER_TRAIN
+    keys = _WORKER_KEYS
+    states = {}
+    new_entries: List[Tuple[bytes, bytes, bytes]] = []
+    if _WORKER_CACHE is not None:
+        cached = _WORKER_CACHE.among(
+            keys[row_start:row_end] + keys[col_start:col_end]
+        )
+    for i in range(row_start, row_end):
+        state_i = states.setdefault(i, _new_row_state())
+        for j in range(max(col_start, i + 1), col_end):
+            if _WORKER_CACHE is None:
+                sequence_identity, sequence_similarity = _pair_metrics(seqs[i], seqs[j])
+            else:
+                pair = (keys[i], keys[j])
+                blob = cached.get(pair)
+                if blob is None:
+                    sequence_identity, sequence_similarity = _pair_metrics(seqs[i], seqs[j])
+                    blob = pack_floats(sequence_identity, sequence_similarity)
+                    cached[pair] = blob
+                    new_entries.append((pair[0], pair[1], blob))
+                else:
+                    sequence_identity, sequence_similarity = unpack_floats(blob)
+            _offer_hit(state_i, j, sequence_identity, sequence_similarity, top_k)
+            _offer_hit(
+                states.setdefault(j, _new_row_state()),
+                i,
+                sequence_identity,
+                sequence_similarity,
+                top_k,
+            )
+    return list(states.items()), new_entries
 
 
-def _worker_topk(item: Tuple[int, str, int]):
-    """Per-query top-k reference hits (identity desc) against the shared train set."""
-    i, generated_seq, top_k = item
-    scored = []
-    for j, train_seq in enumerate(_WORKER_TRAIN):
-        if _WORKER_SELF and i == j:
-            continue
-        sequence_identity, _ = _pair_metrics(generated_seq, train_seq)
-        scored.append((sequence_identity, j))
-    # Sort by identity desc; tie-break on train index asc for determinism.
-    scored.sort(key=lambda t: (-t[0], t[1]))
-    # Emit identity as PERCENT (native metric for this tool's top-k contract).
-    return i, [(j, identity * 100.0) for identity, j in scored[:top_k]]
+def _triangle_tiles(n: int, tile_size: int) -> List[Tuple[int, int, int, int]]:
+    starts = list(range(0, n, tile_size))
+    return [
+        (r, min(r + tile_size, n), c, min(c + tile_size, n))
+        for bi, r in enumerate(starts)
+        for c in starts[bi:]
+    ]
 
 
 def evaluate_max_sequence_identity(
@@ -128,6 +358,9 @@ def evaluate_max_sequence_identity(
     return_second_max: bool = False,
     top_k: Optional[int] = None,
     topk_save_path: Optional[str] = None,
+    alignment_cache: Optional[str] = None,
+    prefilter: bool = False,
+    prefilter_candidates: int = PREFILTER_CANDIDATES,
 ):
     """Compute top identity/similarity hits for each generated sequence.
 
@@ -144,16 +377,30 @@ def evaluate_max_sequence_identity(
             closer), i.e. 100 * the fraction stored in the default CSV's
             ``sequence_identity`` column.
         topk_save_path: Path for the top-k CSV (required when ``top_k`` is set).
+        alignment_cache: Optional path of a persistent alignment cache
+            (:mod:`tps_eval.data.alignment_cache`). Pairs already in it are not
+            re-aligned; newly aligned pairs are added to it.
+        prefilter: Align each query only against its ``prefilter_candidates``
+            best k-mer matches instead of the whole reference set (approximate;
+            same output columns).
     """
+    want_topk = top_k is not None and top_k >= 1 and topk_save_path is not None
+    # One alignment pass serves both outputs: the top-k lists come from the same
+    # per-pair scores as the max, so requesting --top_k costs no extra alignments.
     (
         max_sequence_identity,
         max_sequence_similarity,
         max_sequence_identity_index,
         max_sequence_similarity_index,
-    ) = get_max_sequence_identity(
+        topk,
+    ) = get_sequence_identity_hits(
         train,
         generated,
         self_comparison=return_second_max,
+        top_k=top_k if want_topk else None,
+        alignment_cache=alignment_cache,
+        prefilter=prefilter,
+        prefilter_candidates=prefilter_candidates,
     )
 
     max_sequence_identity_hit = [train_identifiers[idx] for idx in max_sequence_identity_index]
@@ -171,13 +418,7 @@ def evaluate_max_sequence_identity(
         )
         df.to_csv(save_path, index=False)
 
-    if top_k is not None and top_k >= 1 and topk_save_path is not None:
-        topk = get_topk_sequence_identity(
-            train,
-            generated,
-            top_k,
-            self_comparison=return_second_max,
-        )
+    if want_topk:
         _write_topk(
             topk,
             generated_identifiers,
@@ -206,44 +447,16 @@ def get_topk_sequence_identity(
     highest identity first, at most ``top_k`` long. In self mode the query's own
     index is excluded from its neighbour list.
     """
-    train = [str(seq) for seq in train]
-    generated = [str(seq) for seq in generated]
-
-    results = [[] for _ in generated]
-    if not generated:
-        return results
-
-    max_workers = max(1, min(len(generated), _available_cpus()))
-    items = [(i, seq, top_k) for i, seq in enumerate(generated)]
-    with ProcessPoolExecutor(
-        max_workers=max_workers,
-        mp_context=_MP_CONTEXT,
-        initializer=_init_identity_worker,
-        initargs=(train, self_comparison),
-    ) as executor:
-        for i, ranked in executor.map(_worker_topk, items, chunksize=8):
-            results[i] = ranked
-
-    return results
+    return get_sequence_identity_hits(
+        train,
+        generated,
+        self_comparison=self_comparison,
+        top_k=top_k,
+    )[4]
 
 
 def _write_topk(topk, generated_identifiers, train_identifiers, save_path: str) -> None:
-    rows = []
-    for query_idx, ranked in enumerate(topk):
-        query_id = str(generated_identifiers[query_idx]).split()[0] if generated_identifiers[query_idx] else generated_identifiers[query_idx]
-        for rank, (train_idx, score) in enumerate(ranked, start=1):
-            neighbour_id = str(train_identifiers[train_idx]).split()[0]
-            rows.append(
-                {
-                    "query_id": query_id,
-                    "rank": rank,
-                    "neighbour_id": neighbour_id,
-                    "score": score,
-                }
-            )
-    pd.DataFrame(rows, columns=["query_id", "rank", "neighbour_id", "score"]).to_csv(
-        save_path, index=False
-    )
+    write_topk(topk_from_lists(generated_identifiers, train_identifiers, topk), save_path)
 
 
 def _pair_metrics(seq1: str, seq2: str) -> Tuple[float, float]:
@@ -260,6 +473,9 @@ def _pair_metrics(seq1: str, seq2: str) -> Tuple[float, float]:
     pick a different traceback than pairwise2 did, leading to per-pair differences in
     identity/similarity of up to ~2 percentage points (alignment scores are identical).
     Aggregate statistics (mean/median over many pairs) are unaffected to ~5 decimals.
+
+    The traceback choice also depends on argument order, so callers keep a fixed
+    one: (query, reference) in gen-vs-train, (i, j) with i < j in self mode.
     """
     alignment = _ALIGNER.align(seq1, seq2)[0]
     aligned_seq_1 = str(alignment[0])
@@ -297,6 +513,37 @@ def get_max_sequence_identity_two_sets(
     *,
     self_comparison: bool = False,
 ):
+    return get_sequence_identity_hits(
+        train,
+        generated,
+        self_comparison=self_comparison,
+    )[:4]
+
+
+def get_sequence_identity_hits(
+    train: Sequence[str],
+    generated: Sequence[str],
+    *,
+    self_comparison: bool = False,
+    top_k: Optional[int] = None,
+    alignment_cache: Optional[str] = None,
+    prefilter: bool = False,
+    prefilter_candidates: int = PREFILTER_CANDIDATES,
+    prefilter_kmer: int = PREFILTER_KMER,
+    query_indices: Optional[Sequence[int]] = None,
+):
+    """Max identity/similarity (+ hit indices) and optional top-k hits in one pass.
+
+    Returns ``(identity, similarity, identity_index, similarity_index, topk)``;
+    ``topk`` is a per-query list of (train_index, identity PERCENT) tuples as in
+    :func:`get_topk_sequence_identity`, or empty lists when ``top_k`` is unset.
+    With ``alignment_cache`` (a path), cached pairs are reused and new ones stored.
+    With ``prefilter``, each query is aligned only against its
+    ``prefilter_candidates`` best k-mer matches (see :class:`KmerIndex`); the
+    candidate count is raised to ``top_k`` if smaller. ``query_indices`` (self mode
+    only) gives each query's own train index when ``generated`` is a subset of
+    ``train``; by default a query's position is its train index.
+    """
     train = [str(seq) for seq in train]
     generated = [str(seq) for seq in generated]
 
@@ -304,6 +551,7 @@ def get_max_sequence_identity_two_sets(
     max_sequence_similarity = [0.0 for _ in generated]
     max_sequence_identity_index = [0 for _ in generated]
     max_sequence_similarity_index = [0 for _ in generated]
+    topk = [[] for _ in generated]
 
     if not generated:
         return (
@@ -311,34 +559,147 @@ def get_max_sequence_identity_two_sets(
             max_sequence_similarity,
             max_sequence_identity_index,
             max_sequence_similarity_index,
+            topk,
         )
 
+    top_k = top_k if top_k is not None and top_k >= 1 else None
     max_workers = max(1, min(len(generated), _available_cpus()))
-    items = list(enumerate(generated))
-    with ProcessPoolExecutor(
-        max_workers=max_workers,
-        mp_context=_MP_CONTEXT,
-        initializer=_init_identity_worker,
-        initargs=(train, self_comparison),
-    ) as executor:
-        for (
-            i,
-            local_max_identity,
-            local_max_similarity,
-            local_max_identity_idx,
-            local_max_similarity_idx,
-        ) in executor.map(_worker_max, items, chunksize=8):
-            max_sequence_identity[i] = local_max_identity
-            max_sequence_similarity[i] = local_max_similarity
-            max_sequence_identity_index[i] = local_max_identity_idx
-            max_sequence_similarity_index[i] = local_max_similarity_idx
+    # The parent is the cache's only writer; opening it first also creates the
+    # schema the workers' read-only handles expect.
+    cache = (
+        _open_pair_cache(alignment_cache)
+        if alignment_cache is not None
+        else None
+    )
+    n_new = 0
+    index = None
+    if prefilter:
+        index = KmerIndex(train, prefilter_kmer)
+        prefilter_candidates = max(prefilter_candidates, top_k or 1)
+    try:
+        if self_comparison and train == generated and index is None and query_indices is None:
+            # Self mode: schedule tiles of the upper triangle, align each pair once in
+            # its stored (i, j) order and let it feed both rows — half the work.
+            states = [_new_row_state() for _ in generated]
+            tiles = _triangle_tiles(len(generated), SELF_TILE_SIZE)
+            n_pairs = len(generated) * (len(generated) - 1) // 2
+            with ProcessPoolExecutor(
+                max_workers=max(1, min(len(tiles), max_workers)),
+                mp_context=_MP_CONTEXT,
+                initializer=_init_identity_worker,
+                initargs=(generated, True, top_k, alignment_cache),
+            ) as executor:
+                for partials, new_entries in executor.map(_worker_tile, tiles):
+                    for i, partial in partials:
+                        _merge_row_state(states[i], partial, top_k)
+                    if cache is not None:
+                        n_new += cache.put_many(new_entries)
+            results = enumerate(states)
+        else:
+            results = []
+            n_pairs = len(generated) * len(train) - (len(generated) if self_comparison else 0)
+            if index is not None:
+                n_pairs = len(generated) * min(prefilter_candidates, len(train))
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=_MP_CONTEXT,
+                initializer=_init_identity_worker,
+                initargs=(
+                    train,
+                    self_comparison,
+                    top_k,
+                    alignment_cache,
+                    index,
+                    prefilter_candidates,
+                ),
+            ) as executor:
+                if not self_comparison:
+                    items = [(i, seq, None) for i, seq in enumerate(generated)]
+                elif query_indices is None:
+                    items = [(i, seq, i) for i, seq in enumerate(generated)]
+                else:
+                    items = [(i, seq, int(query_indices[i])) for i, seq in enumerate(generated)]
+                for i, state, new_entries in executor.map(_worker_scan, items, chunksize=8):
+                    results.append((i, state))
+                    if cache is not None:
+                        n_new += cache.put_many(new_entries)
+    finally:
+        if cache is not None:
+            cache.close()
+    if cache is not None:
+        print(
+            f"Alignment cache {alignment_cache}: aligned {n_new} new pair(s), "
+            f"reused up to {max(n_pairs - n_new, 0)} of {n_pairs}."
+        )
+
+    for i, state in results:
+        max_sequence_identity[i] = state[0]
+        max_sequence_identity_index[i] = state[1]
+        max_sequence_similarity[i] = state[2]
+        max_sequence_similarity_index[i] = state[3]
+        topk[i] = _ranked_topk(state[4])
 
     return (
         max_sequence_identity,
         max_sequence_similarity,
         max_sequence_identity_index,
         max_sequence_similarity_index,
+        topk,
+    )
+
+
+def prefilter_recall(
+    train: Sequence[str],
+    generated: Sequence[str],
+    *,
+    self_comparison: bool = False,
+    sample: Optional[int] = 200,
+    top_k: Optional[int] = None,
+    prefilter_candidates: int = PREFILTER_CANDIDATES,
+    prefilter_kmer: int = PREFILTER_KMER,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Recall of ``--prefilter`` against exact mode on a random query sample.
+
+    Runs both modes on the same ``sample`` queries (all when None) and reports:
+    ``max_identity_recall`` / ``max_similarity_recall`` — fraction of queries whose
+    prefiltered max equals the exact max; ``topk_recall`` — mean fraction of the
+    exact top-k neighbours (by train index) also returned by the prefilter (NaN
+    without ``top_k``).
+    """
+    generated = [str(seq) for seq in generated]
+    n = len(generated)
+    if sample is None or sample >= n:
+        picks = list(range(n))
+    else:
+        rng = np.random.default_rng(seed)
+        picks = sorted(int(p) for p in rng.choice(n, size=sample, replace=False))
+    queries = [generated[i] for i in picks]
+    common = dict(
+        self_comparison=self_comparison,
+        top_k=top_k,
+        query_indices=picks if self_comparison else None,
+    )
+    exact = get_sequence_identity_hits(train, queries, **common)
+    approx = get_sequence_identity_hits(
+        train,
+        queries,
+        prefilter=True,
+        prefilter_candidates=prefilter_candidates,
+        prefilter_kmer=prefilter_kmer,
+        **common,
     )
+    report: Dict[str, float] = {"n_queries": float(len(queries))}
+    for name, field in (("max_identity_recall", 0), ("max_similarity_recall", 1)):
+        hits = [a >= e - 1e-12 for a, e in zip(approx[field], exact[field])]
+        report[name] = float(np.mean(hits)) if hits else float("nan")
+    overlaps = []
+    for exact_ranked, approx_ranked in zip(exact[4], approx[4]):
+        wanted = {j for j, _ in exact_ranked}
+        if wanted:
+            overlaps.append(len(wanted & {j for j, _ in approx_ranked}) / len(wanted))
+    report["topk_recall"] = float(np.mean(overlaps)) if overlaps else float("nan")
+    return report
 
 
 def _get_save_path(data_path: str, *, save_suffix: Optional[str] = None) -> str:
@@ -359,14 +720,61 @@ def max_sequence_identity(
     *,
     train_path: Optional[str] = None,
     top_k: Optional[int] = None,
+    alignment_cache: Optional[str] = None,
+    prefilter: bool = False,
+    prefilter_candidates: int = PREFILTER_CANDIDATES,
+    recall_sample: Optional[int] = None,
 ):
+    options = dict(
+        top_k=top_k,
+        alignment_cache=alignment_cache,
+        prefilter=prefilter,
+        prefilter_candidates=prefilter_candidates,
+        recall_sample=recall_sample,
+    )
     if train_path is None:
-        main_train_sequences(fasta_path, top_k=top_k)
+        main_train_sequences(fasta_path, **options)
     else:
-        main_generated_sequences(fasta_path=fasta_path, train_path=train_path, top_k=top_k)
+        main_generated_sequences(fasta_path=fasta_path, train_path=train_path, **options)
+
+
+def _report_prefilter_recall(
+    train: Sequence[str],
+    generated: Sequence[str],
+    *,
+    self_comparison: bool,
+    recall_sample: int,
+    top_k: Optional[int],
+    prefilter_candidates: int,
+) -> Dict[str, float]:
+    report = prefilter_recall(
+        train,
+        generated,
+        self_comparison=self_comparison,
+        sample=recall_sample,
+        top_k=top_k,
+        prefilter_candidates=prefilter_candidates,
+    )
+    print(
+        f"Prefilter recall vs exact on {int(report['n_queries'])} sampled queries "
+        f"(candidates={prefilter_candidates}): "
+        f"max identity {report['max_identity_recall']:.3f}, "
+        f"max similarity {report['max_similarity_recall']:.3f}, "
+        f"top-k {report['topk_recall']:.3f}"
+    )
+    return report
 
 
-def main_generated_sequences(*, fasta_path: str, train_path: str, top_k: Optional[int] = None):
+def main_generated_sequences(
+    *,
+    fasta_path: str,
+    train_path: str,
+    top_k: Optional[int] = None,
+    alignment_cache: Optional[str] = None,
+    prefilter: bool = False,
+    prefilter_candidates: int = PREFILTER_CANDIDATES,
+    recall_sample: Optional[int] = None,
+):
     generated_identifiers, generated = separate_identifiers(
         load_fasta_sequences(fasta_path, load_identifiers=True)
     )
@@ -382,17 +790,56 @@ def main_generated_sequences(*, fasta_path: str, train_path: str, top_k: Optiona
         save_path=save_path,
         top_k=top_k,
         topk_save_path=_get_topk_save_path(fasta_path),
+        alignment_cache=alignment_cache,
+        prefilter=prefilter,
+        prefilter_candidates=prefilter_candidates,
     )
+    if prefilter and recall_sample:
+        _report_prefilter_recall(
+            train,
+            generated,
+            self_comparison=False,
+            recall_sample=recall_sample,
+            top_k=top_k,
+            prefilter_candidates=prefilter_candidates,
+        )
 
 
-def main_train_sequences(train_path: str, *, top_k: Optional[int] = None):
+def main_train_sequences(
+    train_path: str,
+    *,
+    top_k: Optional[int] = None,
+    alignment_cache: Optional[str] = None,
+    prefilter: bool = False,
+    prefilter_candidates: int = PREFILTER_CANDIDATES,
+    recall_sample: Optional[int] = None,
+):
     train_identifiers, train = separate_identifiers(
         load_fasta_sequences(train_path, load_identifiers=True)
     )
-    _main_train_sequences(train_path, train, train_identifiers, top_k=top_k)
+    _main_train_sequences(
+        train_path,
+        train,
+        train_identifiers,
+        top_k=top_k,
+        alignment_cache=alignment_cache,
+        prefilter=prefilter,
+        prefilter_candidates=prefilter_candidates,
+        recall_sample=recall_sample,
+    )
 
 
-def _main_train_sequences(train_path: str, train, train_identifiers, *, top_k: Optional[int] = None):
+def _main_train_sequences(
+    train_path: str,
+    train,
+    train_identifiers,
+    *,
+    top_k: Optional[int] = None,
+    alignment_cache: Optional[str] = None,
+    prefilter: bool = False,
+    prefilter_candidates: int = PREFILTER_CANDIDATES,
+    recall_sample: Optional[int] = None,
+):
     save_path = _get_save_path(train_path, save_suffix="self")
     evaluate_max_sequence_identity(
         train,
@@ -403,4 +850,16 @@ def _main_train_sequences(train_path: str, train, train_identifiers, *, top_k: O
         return_second_max=True,
         top_k=top_k,
         topk_save_path=_get_topk_save_path(train_path),
+        alignment_cache=alignment_cache,
+        prefilter=prefilter,
+        prefilter_candidates=prefilter_candidates,
     )
+    if prefilter and recall_sample:
+        _report_prefilter_recall(
+            train,
+            train,
+            self_comparison=True,
+            recall_sample=recall_sample,
+            top_k=top_k,
+            prefilter_candidates=prefilter_candidates,
+        )
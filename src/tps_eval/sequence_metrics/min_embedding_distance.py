@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -10,15 +11,129 @@ from pathlib import Path
 
 
 from tps_eval.data.embeddings import load_embeddings
+from tps_eval.data.topk import topk_indices, topk_table, write_topk
+
+# Rows/columns per distance tile in the streaming engine: one tile is
+# block_size x block_size float64 (8 MiB at the default), whatever N and M are.
+DEFAULT_BLOCK_SIZE = 1024
+
+# Relative slack on the BLAS squared distances (|a|^2 + |b|^2 - 2ab) when picking
+# the candidates whose distance is then recomputed exactly; far above the
+# identity's rounding error, so near-ties are always settled on exact values.
+_CANDIDATE_RTOL = 1e-9
 
 
 def preprocess_embeddings(embeddings_df: pd.DataFrame) -> np.ndarray:
     return np.array(embeddings_df["embedding"].tolist(), dtype=float)
 
 
-def get_distances(embeddings1: np.ndarray, embeddings2: np.ndarray) -> np.ndarray:
-    diffs = embeddings1[:, None, :] - embeddings2[None, :, :]
-    return np.linalg.norm(diffs, axis=2)
+def _merge_topk(best_d, best_j, rows, cand_d, cand_j) -> None:
+    """Merge (row, distance, index) candidates into the running per-row k best,
+    in place; order is distance ascending, then reference index ascending."""
+    n, k = best_d.shape
+    all_r = np.concatenate([np.repeat(np.arange(n), k), rows])
+    all_d = np.concatenate([best_d.ravel(), cand_d])
+    all_j = np.concatenate([best_j.ravel(), cand_j])
+    valid = all_j >= 0
+    all_r, all_d, all_j = all_r[valid], all_d[valid], all_j[valid]
+    order = np.lexsort((all_j, all_d, all_r))
+    all_r, all_d, all_j = all_r[order], all_d[order], all_j[order]
+    rank = np.arange(len(all_r)) - np.searchsorted(all_r, all_r, side="left")
+    keep = rank < k
+    best_d.fill(np.inf)
+    best_j.fill(-1)
+    best_d[all_r[keep], rank[keep]] = all_d[keep]
+    best_j[all_r[keep], rank[keep]] = all_j[keep]
+
+
+def _scan_query_block(
+    queries: np.ndarray,
+    query_norms: np.ndarray,
+    references: np.ndarray,
+    reference_norms: np.ndarray,
+    k: int,
+    block_size: int,
+    self_offset: Optional[int],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """k nearest references for one block of queries, streaming reference tiles.
+
+    ``self_offset`` (self mode) is the block's first query index in
+    ``references``; that reference is excluded for each query.
+    """
+    n = queries.shape[0]
+    best_d = np.full((n, k), np.inf)
+    best_j = np.full((n, k), -1, dtype=np.int64)
+    slack = _CANDIDATE_RTOL * (query_norms + reference_norms.max(initial=0.0))
+    for r0 in range(0, references.shape[0], block_size):
+        tile = references[r0 : r0 + block_size]
+        sq = query_norms[:, None] + reference_norms[None, r0 : r0 + block_size] - 2.0 * (queries @ tile.T)
+        if self_offset is not None:
+            local = np.arange(n) + self_offset - r0
+            inside = (local >= 0) & (local < tile.shape[0])
+            sq[np.nonzero(inside)[0], local[inside]] = np.inf
+        kk = min(k, tile.shape[0])
+        tile_kth = np.partition(sq, kk - 1, axis=1)[:, kk - 1]
+        bound = np.minimum(tile_kth, best_d[:, -1] ** 2) + slack
+        rows, cols = np.nonzero((sq <= bound[:, None]) & np.isfinite(sq))
+        for c0 in range(0, len(rows), block_size):
+            r, c = rows[c0 : c0 + block_size], cols[c0 : c0 + block_size]
+            exact = np.linalg.norm(queries[r] - tile[c], axis=1)
+            _merge_topk(best_d, best_j, r, exact, c + r0)
+    return best_d, best_j
+
+
+def nearest_embedding_neighbours(
+    queries: np.ndarray,
+    references: np.ndarray,
+    *,
+    top_k: int = 1,
+    exclude_self: bool = False,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    threads: int = 1,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k nearest references (L2) per query without the full distance matrix.
+
+    Distances are screened tile by tile with the BLAS identity
+    ``|a|^2 + |b|^2 - 2ab`` and only a running top-k is kept per query; the
+    surviving candidates are re-measured as ``norm(a - b)``, so values and
+    tie-breaking (lower reference index first) match a dense ``norm(a - b)``
+    matrix + a stable sort. ``exclude_self`` (self mode, ``queries is references``) drops
+    each query's own index. Query blocks run on ``threads`` threads.
+
+    Returns ``(distances, indices)``, both (n_queries, min(top_k, n_references));
+    missing slots are ``inf`` / ``-1`` (e.g. the excluded self).
+    """
+    queries = np.ascontiguousarray(queries, dtype=float)
+    references = np.ascontiguousarray(references, dtype=float)
+    n = queries.shape[0]
+    k = max(1, min(int(top_k), references.shape[0]))
+    block_size = max(1, int(block_size))
+    if n == 0 or references.shape[0] == 0:
+        return np.full((n, k), np.inf), np.full((n, k), -1, dtype=np.int64)
+    query_norms = np.einsum("ij,ij->i", queries, queries)
+    reference_norms = np.einsum("ij,ij->i", references, references)
+
+    def run(q0: int):
+        return _scan_query_block(
+            queries[q0 : q0 + block_size],
+            query_norms[q0 : q0 + block_size],
+            references,
+            reference_norms,
+            k,
+            block_size,
+            q0 if exclude_self else None,
+        )
+
+    starts = range(0, n, block_size)
+    if threads > 1 and len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            blocks = list(executor.map(run, starts))
+    else:
+        blocks = [run(q0) for q0 in starts]
+    return (
+        np.concatenate([d for d, _ in blocks]),
+        np.concatenate([j for _, j in blocks]),
+    )
 
 
 def get_min_distances(distances: np.ndarray):
@@ -27,6 +142,21 @@ def get_min_distances(distances: np.ndarray):
     return values, indices
 
 
+def write_topk_neighbours(
+    query_ids,
+    train_ids,
+    topk_distances: np.ndarray,
+    topk_indices: np.ndarray,
+    save_path: str,
+) -> None:
+    """Write ranked neighbours from :func:`nearest_embedding_neighbours` output.
+
+    Tidy CSV (Parquet for a ``.parquet`` path) with columns
+    query_id,rank,neighbour_id,score; empty (``-1`` / non-finite) slots are skipped.
+    """
+    write_topk(topk_table(query_ids, train_ids, topk_distances, topk_indices), save_path)
+
+
 def write_topk_distances(
     query_ids,
     train_ids,
@@ -39,33 +169,18 @@ def write_topk_distances(
     Tidy CSV with columns query_id,rank,neighbour_id,score. ``score`` is the
     ESM-embedding L2 distance (SMALLER = closer). Self-exclusion is expected to
     be already applied to ``distances`` (e.g. diagonal set to inf in self mode).
+    For inputs too large for a dense matrix use :func:`nearest_embedding_neighbours`
+    + :func:`write_topk_neighbours`.
     """
-    k = min(top_k, distances.shape[1])
-    train_ids = list(train_ids)
-    rows = []
-    for q in range(distances.shape[0]):
-        row = distances[q]
-        # Ascending by distance; np.argsort is stable so ties break on train index.
-        order = np.argsort(row, kind="stable")
-        rank = 0
-        for j in order:
-            score = row[j]
-            if not np.isfinite(score):
-                continue  # excluded (e.g. self in self mode)
-            rank += 1
-            rows.append(
-                {
-                    "query_id": str(query_ids[q]).split()[0] if str(query_ids[q]) else query_ids[q],
-                    "rank": rank,
-                    "neighbour_id": str(train_ids[j]).split()[0],
-                    "score": float(score),
-                }
-            )
-            if rank >= k:
-                break
-    pd.DataFrame(rows, columns=["query_id", "rank", "neighbour_id", "score"]).to_csv(
-        save_path, index=False
-    )
+    # Partitioned per block of queries; ties break on train index like a stable sort.
+    topk_distances, order = topk_indices(distances, top_k)
+    write_topk_neighbours(query_ids, train_ids, topk_distances, order, save_path)
+
+
+def _min_from_topk(topk_distances: np.ndarray, topk_indices: np.ndarray):
+    """Rank-1 column as (values, indices); a query with no eligible reference
+    (self mode on a single sequence) keeps inf and index 0, like ``argmin``."""
+    return topk_distances[:, 0], np.maximum(topk_indices[:, 0], 0)
 
 
 def save_embeddings(
@@ -91,12 +206,27 @@ def _min_embedding_distance(
     save_path: Optional[str] = None,
     top_k: Optional[int] = None,
     topk_save_path: Optional[str] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    threads: int = 1,
+    neighbour_search: Optional[Callable[[np.ndarray, int], Tuple[np.ndarray, np.ndarray]]] = None,
 ):
+    """``neighbour_search(queries, top_k) -> (distances, indices)`` replaces the
+    exhaustive scan (e.g. a prebuilt reference index); ``train_df`` then only needs
+    the ``ID`` column, in the order its indices refer to."""
     generated_embeddings = preprocess_embeddings(generated_df)
-    train_embeddings = preprocess_embeddings(train_df)
 
-    distances = get_distances(generated_embeddings, train_embeddings)
-    min_dist, min_dist_index = get_min_distances(distances)
+    want_topk = top_k is not None and top_k >= 1 and topk_save_path is not None
+    if neighbour_search is not None:
+        topk_dist, topk_index = neighbour_search(generated_embeddings, top_k if want_topk else 1)
+    else:
+        topk_dist, topk_index = nearest_embedding_neighbours(
+            generated_embeddings,
+            preprocess_embeddings(train_df),
+            top_k=top_k if want_topk else 1,
+            block_size=block_size,
+            threads=threads,
+        )
+    min_dist, min_dist_index = _min_from_topk(topk_dist, topk_index)
     min_dist_hits = train_df.iloc[min_dist_index]["ID"].tolist()
 
     if save_path is not None:
@@ -107,12 +237,12 @@ def _min_embedding_distance(
             save_path,
         )
 
-    if top_k is not None and top_k >= 1 and topk_save_path is not None:
-        write_topk_distances(
+    if want_topk:
+        write_topk_neighbours(
             generated_df["ID"].tolist(),
             train_df["ID"].tolist(),
-            distances,
-            top_k,
+            topk_dist,
+            topk_index,
             topk_save_path,
         )
 
@@ -125,12 +255,21 @@ def _min_embedding_distance_self(
     save_path: Optional[str] = None,
     top_k: Optional[int] = None,
     topk_save_path: Optional[str] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    threads: int = 1,
 ):
     train_embeddings = preprocess_embeddings(train_df)
-    distances = get_distances(train_embeddings, train_embeddings)
-    np.fill_diagonal(distances, np.inf)
+    want_topk = top_k is not None and top_k >= 1 and topk_save_path is not None
+    topk_dist, topk_index = nearest_embedding_neighbours(
+        train_embeddings,
+        train_embeddings,
+        top_k=top_k if want_topk else 1,
+        exclude_self=True,
+        block_size=block_size,
+        threads=threads,
+    )
 
-    min_dist, min_dist_index = get_min_distances(distances)
+    min_dist, min_dist_index = _min_from_topk(topk_dist, topk_index)
     min_dist_hits = train_df.iloc[min_dist_index]["ID"].tolist()
 
     if save_path is not None:
@@ -141,13 +280,13 @@ def _min_embedding_distance_self(
             save_path,
         )
 
-    if top_k is not None and top_k >= 1 and topk_save_path is not None:
-        # Diagonal is inf -> self excluded from each query's neighbour list.
-        write_topk_distances(
+    if want_topk:
+        # exclude_self -> self never appears in a query's neighbour list.
+        write_topk_neighbours(
             train_df["ID"].tolist(),
             train_df["ID"].tolist(),
-            distances,
-            top_k,
+            topk_dist,
+            topk_index,
             topk_save_path,
         )
 
@@ -173,6 +312,11 @@ def min_embedding_distance(
     train_embeddings_path: Optional[str] = None,
     save: bool = True,
     top_k: Optional[int] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    threads: int = 1,
+    index_path: Optional[str] = None,
+    nprobe: Optional[int] = None,
+    exact_rerank: bool = True,
 ):
     """Compute per-sequence minimum embedding distance.
 
@@ -184,23 +328,59 @@ def min_embedding_distance(
             (columns query_id,rank,neighbour_id,score). ``score`` is the ESM-
             embedding L2 distance (SMALLER = closer). In self mode each query
             excludes itself.
+        block_size: Queries/references per distance tile; peak memory is about
+            ``block_size**2`` float64 values plus the (n, top_k) running best.
+        threads: Threads working on query blocks in parallel.
+        index_path: Prebuilt reference index (``run_build_embedding_index``); the
+            queries are searched against it instead of ``train_embeddings_path``
+            (approximate; gen-vs-train mode only).
+        nprobe: Index cells visited per query (recall/speed knob; default
+            ``embedding_index.DEFAULT_NPROBE``).
+        exact_rerank: Re-measure the index's screened candidates exactly.
     """
-    if train_embeddings_path is None:
-        main_train_sequences(embeddings_path, save=save, top_k=top_k)
+    options = dict(save=save, top_k=top_k, block_size=block_size, threads=threads)
+    if train_embeddings_path is None and index_path is None:
+        main_train_sequences(embeddings_path, **options)
     else:
         main_generated_sequences(
-            embeddings_path, train_embeddings_path, save=save, top_k=top_k
+            embeddings_path,
+            train_embeddings_path,
+            index_path=index_path,
+            nprobe=nprobe,
+            exact_rerank=exact_rerank,
+            **options,
         )
 
 
 def main_generated_sequences(
     generated_embeddings_path: str,
-    train_embeddings_path: str,
+    train_embeddings_path: Optional[str],
     *,
     save: bool = True,
     top_k: Optional[int] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    threads: int = 1,
+    index_path: Optional[str] = None,
+    nprobe: Optional[int] = None,
+    exact_rerank: bool = True,
 ):
-    train_df = load_embeddings(train_embeddings_path)
+    neighbour_search = None
+    if index_path is not None:
+        from tps_eval.sequence_metrics.embedding_index import DEFAULT_NPROBE, EmbeddingIndex
+
+        index = EmbeddingIndex.load(index_path)
+        train_df = pd.DataFrame({"ID": index.ids})
+
+        def neighbour_search(queries, k):
+            return index.search(
+                queries,
+                top_k=k,
+                nprobe=DEFAULT_NPROBE if nprobe is None else nprobe,
+                exact_rerank=exact_rerank,
+            )
+
+    else:
+        train_df = load_embeddings(train_embeddings_path)
     generated_df = load_embeddings(generated_embeddings_path)
 
     save_path = _get_save_path(generated_embeddings_path)
@@ -210,6 +390,9 @@ def main_generated_sequences(
         save_path=save_path if save else None,
         top_k=top_k,
         topk_save_path=_get_topk_save_path(generated_embeddings_path),
+        block_size=block_size,
+        threads=threads,
+        neighbour_search=neighbour_search,
     )
 
 
@@ -220,6 +403,8 @@ def main_train_sequences(
     save_path: Optional[str] = None,
     top_k: Optional[int] = None,
     topk_save_path: Optional[str] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    threads: int = 1,
 ):
     if isinstance(embeddings_path, pd.DataFrame):
         train_df = embeddings_path
@@ -228,6 +413,8 @@ def main_train_sequences(
             save_path=save_path,
             top_k=top_k,
             topk_save_path=topk_save_path,
+            block_size=block_size,
+            threads=threads,
         )
         return
 
@@ -238,4 +425,6 @@ def main_train_sequences(
         save_path=resolved_save_path if save else None,
         top_k=top_k,
         topk_save_path=_get_topk_save_path(embeddings_path),
+        block_size=block_size,
+        threads=threads,
     )
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+
+import numpy as np
+
+from tps_eval.data.embeddings import load_embeddings
+from tps_eval.sequence_metrics.embedding_index import (
+    DEFAULT_NPROBE,
+    EmbeddingIndex,
+    default_index_path,
+    index_recall,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build the IVF nearest-neighbour index over a reference embedding "
+        "set (e.g. the MARTS-DB ESM-1b store) once, for run_min_embedding_distance "
+        "--index. Writes <reference>_ivf.npz unless --out is given."
+    )
+    parser.add_argument("reference_embeddings_path", help="Reference embeddings (.npy store or CSV).")
+    parser.add_argument("--out", default=None, help="Index path (default <reference stem>_ivf.npz).")
+    parser.add_argument(
+        "--n_lists",
+        type=int,
+        default=None,
+        help="k-means cells (default ~sqrt(number of references)).",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--recall_sample",
+        type=int,
+        default=200,
+        help="Report top-10 recall at --nprobe on this many reference rows as queries (0 = skip).",
+    )
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    args = parser.parse_args()
+
+    df = load_embeddings(args.reference_embeddings_path)
+    embeddings = np.array(df["embedding"].tolist(), dtype=float)
+    index = EmbeddingIndex.build(
+        df["ID"].tolist(),
+        embeddings,
+        n_lists=args.n_lists,
+        seed=args.seed,
+        source=str(args.reference_embeddings_path),
+    )
+    out = index.save(args.out or default_index_path(args.reference_embeddings_path))
+    print(f"Indexed {len(index)} embeddings into {index.n_lists} cells: {out}")
+
+    if args.recall_sample:
+        rng = np.random.default_rng(args.seed)
+        picks = rng.choice(len(index), size=min(args.recall_sample, len(index)), replace=False)
+        recall = index_recall(index, embeddings[picks], top_k=10, nprobe=args.nprobe)
+        print(f"Top-10 recall at nprobe={args.nprobe} on {len(picks)} reference queries: {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
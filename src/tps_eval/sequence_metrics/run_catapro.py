@@ -47,6 +47,18 @@ def main() -> None:
         default=None,
         help="Output CSV path (default: <fasta_stem>_<out_suffix>.csv beside the FASTA).",
     )
+    parser.add_argument(
+        "--result_cache",
+        default=None,
+        help="Optional persistent result-cache file (SQLite). Sequences already "
+        "scored against the same substrate SMILES and model are not re-predicted.",
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        help="Ignore --result_cache and predict every sequence.",
+    )
     args = parser.parse_args()
 
     score_fasta(
@@ -58,6 +70,8 @@ def main() -> None:
         batch_size=args.batch_size,
         out_suffix=args.out_suffix,
         save_path=args.save_path,
+        result_cache=args.result_cache,
+        no_cache=args.no_cache,
     )
 
 
@@ -2,7 +2,12 @@ from __future__ import annotations
 
 import argparse
 
-from tps_eval.sequence_metrics.esm_pseudo_perplexity import DEFAULT_MODEL, compute_pseudo_perplexity
+from tps_eval.sequence_metrics.esm_pseudo_perplexity import (
+    DEFAULT_MODEL,
+    PRECISIONS,
+    compute_pseudo_perplexity,
+    default_embeddings_path,
+)
 
 
 def main() -> None:
@@ -30,10 +35,62 @@ def main() -> None:
         help="'swoop' = One Fell Swoop single-pass approximation (fast, default); "
         "'masked' = exact masked-marginal pseudo-perplexity (O(L) forwards/seq, slow).",
     )
-    parser.add_argument("--toks_per_batch", type=int, default=4096, help="Max batch token budget (swoop).")
+    parser.add_argument(
+        "--toks_per_batch",
+        type=int,
+        default=4096,
+        help="Max batch token budget (swoop sequences / masked copies).",
+    )
     parser.add_argument("--nogpu", action="store_true", help="Do not use GPU even if available.")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="Torch CPU threads (default: torch's own choice).",
+    )
+    parser.add_argument(
+        "--precision",
+        choices=PRECISIONS,
+        default="float32",
+        help="Forward-pass numerics: float32 (default), bfloat16 autocast, or int8 "
+        "dynamic quantisation of the Linear layers (CPU only). Approximate when not float32.",
+    )
+    parser.add_argument(
+        "--adaptive_tol",
+        type=float,
+        default=None,
+        help="Masked method only: mask positions in random rounds and stop a sequence "
+        "once the 95%% CI half-width of its mean PLL is <= this many nats (e.g. 0.05).",
+    )
+    parser.add_argument(
+        "--with_embeddings",
+        action="store_true",
+        help="Fused mode (swoop only): also write the esm_embedding store "
+        "<fasta>_embedding_esm1b.npy (+ _ids.txt) from the same forward pass.",
+    )
+    parser.add_argument(
+        "--embeddings_path",
+        default=None,
+        help="Store path for --with_embeddings (default: <fasta>_embedding_esm1b.npy).",
+    )
+    parser.add_argument(
+        "--result_cache",
+        default=None,
+        help="Optional persistent result-cache file (SQLite). Sequences already "
+        "scored (and, with --with_embeddings, embedded) by this model are not re-run.",
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        help="Ignore --result_cache and score every sequence.",
+    )
     args = parser.parse_args()
 
+    embeddings_path = None
+    if args.with_embeddings or args.embeddings_path:
+        embeddings_path = args.embeddings_path or default_embeddings_path(args.fasta_path)
+
     compute_pseudo_perplexity(
         args.fasta_path,
         save_path=args.save_path,
@@ -41,6 +98,12 @@ def main() -> None:
         method=args.method,
         toks_per_batch=args.toks_per_batch,
         nogpu=args.nogpu,
+        embeddings_path=embeddings_path,
+        result_cache=args.result_cache,
+        no_cache=args.no_cache,
+        threads=args.threads,
+        precision=args.precision,
+        adaptive_tol=args.adaptive_tol,
     )
 
 
@@ -44,6 +44,14 @@ def main() -> None:
     )
     parser.add_argument("--save_path", default=None, help="Metric CSV path.")
     parser.add_argument("--topk_save_path", default=None, help="Top-k CSV path.")
+    parser.add_argument(
+        "--alignment_cache",
+        default=None,
+        help="Optional persistent alignment-cache file (SQLite). Queries already "
+        "searched against the same reference/parameters reuse their stored hits. "
+        "In self mode (no --train_path) the reference is the query FASTA itself, "
+        "so adding a sequence misses every query.",
+    )
     args = parser.parse_args()
 
     local_sequence_search(
@@ -55,6 +63,7 @@ def main() -> None:
         sensitivity=args.sensitivity,
         save_path=args.save_path,
         topk_save_path=args.topk_save_path,
+        alignment_cache=args.alignment_cache,
     )
 
 
@@ -2,7 +2,10 @@ from __future__ import annotations
 
 import argparse
 
-from tps_eval.sequence_metrics.max_sequence_identity import max_sequence_identity
+from tps_eval.sequence_metrics.max_sequence_identity import (
+    PREFILTER_CANDIDATES,
+    max_sequence_identity,
+)
 
 
 def main() -> None:
@@ -26,12 +29,41 @@ def main() -> None:
         default=None,
         help="If >= 1, also emit the top-k nearest reference hits per query.",
     )
+    parser.add_argument(
+        "--alignment_cache",
+        default=None,
+        help="Optional persistent alignment-cache file (SQLite). Pairs already in it "
+        "are reused; newly aligned pairs are added. Safe to share across runs.",
+    )
+    parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="Approximate mode for large batches: globally align each query only "
+        "against the train sequences sharing the most 3-mers with it. Same columns.",
+    )
+    parser.add_argument(
+        "--prefilter_candidates",
+        type=int,
+        default=PREFILTER_CANDIDATES,
+        help=f"Candidates aligned per query in --prefilter mode (default {PREFILTER_CANDIDATES}).",
+    )
+    parser.add_argument(
+        "--recall_sample",
+        type=int,
+        default=None,
+        help="With --prefilter: also run exact mode on this many random queries and "
+        "print the prefilter's recall (max hit / top-k) against it.",
+    )
     args = parser.parse_args()
 
     max_sequence_identity(
         args.fasta_path,
         train_path=args.train_path,
         top_k=args.top_k,
+        alignment_cache=args.alignment_cache,
+        prefilter=args.prefilter,
+        prefilter_candidates=args.prefilter_candidates,
+        recall_sample=args.recall_sample,
     )
 
 
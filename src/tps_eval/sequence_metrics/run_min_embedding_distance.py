@@ -2,7 +2,10 @@ from __future__ import annotations
 
 import argparse
 
-from tps_eval.sequence_metrics.min_embedding_distance import min_embedding_distance
+from tps_eval.sequence_metrics.min_embedding_distance import (
+    DEFAULT_BLOCK_SIZE,
+    min_embedding_distance,
+)
 
 
 def main() -> None:
@@ -12,12 +15,12 @@ def main() -> None:
         "(columns query_id,rank,neighbour_id,score) where score is the ESM-embedding "
         "L2 distance (SMALLER = closer). Default single-best output is unchanged."
     )
-    parser.add_argument("embeddings_path", help="CSV with the embeddings to evaluate.")
+    parser.add_argument("embeddings_path", help="Embeddings to evaluate (.npy store or CSV).")
     parser.add_argument(
         "train_embeddings_path",
         nargs="?",
         default=None,
-        help="Optional reference embeddings CSV. If omitted, self mode "
+        help="Optional reference embeddings (.npy store or CSV). If omitted, self mode "
         "(each query's neighbours exclude itself).",
     )
     parser.add_argument(
@@ -26,6 +29,38 @@ def main() -> None:
         default=None,
         help="If >= 1, also emit the top-k nearest reference neighbours per query.",
     )
+    parser.add_argument(
+        "--block_size",
+        type=int,
+        default=DEFAULT_BLOCK_SIZE,
+        help="Queries/references per distance tile (memory bound: ~block_size^2 "
+        f"float64 per thread; default {DEFAULT_BLOCK_SIZE}).",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="Threads computing query blocks in parallel (default 1; BLAS may "
+        "already use several cores per block).",
+    )
+    parser.add_argument(
+        "--index",
+        default=None,
+        help="Prebuilt reference index (run_build_embedding_index output). Searches "
+        "it instead of train_embeddings_path: approximate gen-vs-train mode.",
+    )
+    parser.add_argument(
+        "--nprobe",
+        type=int,
+        default=None,
+        help="With --index: cells visited per query (higher = better recall, slower).",
+    )
+    parser.add_argument(
+        "--no_exact_rerank",
+        action="store_true",
+        help="With --index: report the float32 screening distances instead of "
+        "re-measuring the candidates exactly.",
+    )
     args = parser.parse_args()
 
     min_embedding_distance(
@@ -33,6 +68,11 @@ def main() -> None:
         train_embeddings_path=args.train_embeddings_path,
         save=True,
         top_k=args.top_k,
+        block_size=args.block_size,
+        threads=args.threads,
+        index_path=args.index,
+        nprobe=args.nprobe,
+        exact_rerank=not args.no_exact_rerank,
     )
 
 
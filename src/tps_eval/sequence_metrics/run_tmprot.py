@@ -24,12 +24,26 @@ def main() -> None:
         default="tmprot",
         help="Output filename suffix (default: tmprot -> <input>_tmprot.csv).",
     )
+    parser.add_argument(
+        "--result_cache",
+        default=None,
+        help="Optional persistent result-cache file (SQLite). Sequences already "
+        "scored by this TmProt version are not re-predicted.",
+    )
+    parser.add_argument(
+        "--no_cache",
+        "--no-cache",
+        action="store_true",
+        help="Ignore --result_cache and predict every sequence.",
+    )
     args = parser.parse_args()
 
     score_fasta(
         args.fasta_path,
         out_suffix=args.out_suffix,
         device=args.device,
+        result_cache=args.result_cache,
+        no_cache=args.no_cache,
     )
 
 
@@ -198,6 +198,59 @@ def test_missing_output_raises(monkeypatch):
             raise AssertionError("expected RuntimeError when output file is missing")
 
 
+def test_result_cache_is_keyed_by_sequence_and_smiles(monkeypatch):
+    fake_run, captured = _fake_run_writing_native()
+    calls = []
+
+    def counting_run(cmd, **kwargs):
+        calls.append(len(pd.read_csv(cmd[cmd.index("-inp_fpath") + 1])))
+        return fake_run(cmd, **kwargs)
+
+    monkeypatch.setattr(catapro.subprocess, "run", counting_run)
+    with tempfile.TemporaryDirectory() as d:
+        cache = os.path.join(d, "results.sqlite")
+        fasta = os.path.join(d, "designs.fasta")
+        _write_fasta(fasta, ["d1", "d2"])  # identical sequences -> scored once
+        score_fasta(fasta, "FPP", result_cache=cache)
+        _write_fasta(fasta, ["e1", "e2", "e3"])
+        df = score_fasta(fasta, "FPP", result_cache=cache)
+        assert calls == [1]
+        assert list(df["ID"]) == ["e1", "e2", "e3"]
+        _approx(float(df["catapro_kcat"].iloc[2]), 100.0)
+        score_fasta(fasta, "GPP", result_cache=cache)  # other SMILES, other namespace
+        assert calls == [1, 1]
+
+
+
+def test_result_cache_does_not_keep_dropped_rows(monkeypatch):
+    """A row CataPro dropped is NaN in the output but not cached: the next run
+    sends it again and caches it once CataPro scores it."""
+    calls = []
+
+    def run_skipping(skip_ids):
+        fake_run, _ = _fake_run_writing_native(skip_ids=skip_ids)
+
+        def counting_run(cmd, **kwargs):
+            calls.append(len(pd.read_csv(cmd[cmd.index("-inp_fpath") + 1])))
+            return fake_run(cmd, **kwargs)
+
+        monkeypatch.setattr(catapro.subprocess, "run", counting_run)
+
+    with tempfile.TemporaryDirectory() as d:
+        cache = os.path.join(d, "results.sqlite")
+        fasta = os.path.join(d, "designs.fasta")
+        with open(fasta, "w") as f:
+            f.write(">d1\nMKAILVTDPRSTQW\n>d2\nMKAILVTDPRSTQWACDEF\n")
+        run_skipping(("seq1",))  # the cached path names its batch seq0, seq1, ...
+        df = score_fasta(fasta, "FPP", result_cache=cache)
+        assert np.isnan(df["catapro_kcat"].iloc[1])
+        run_skipping(())
+        df = score_fasta(fasta, "FPP", result_cache=cache)
+        _approx(float(df["catapro_kcat"].iloc[1]), 100.0)
+        score_fasta(fasta, "FPP", result_cache=cache)
+        assert calls == [2, 1]
+
+
 def main():
     import inspect
 
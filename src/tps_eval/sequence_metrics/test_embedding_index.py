@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+"""Self-contained tests for embedding_index.py (IVF reference index).
+
+Run from the repo root:
+    python -m pytest src/tps_eval/sequence_metrics/test_embedding_index.py -q
+
+Synthetic clustered float32 embeddings only. Covers: an exhaustive probe
+(nprobe == n_lists) reproducing the exact engine bit for bit, k-means with more
+cells than distinct points (no empty cell, no NaN centroid), save/load
+round-trip, recall reporting, the no-rerank screening mode, and
+min_embedding_distance's --index path writing the same CSVs as the exact path.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from tps_eval.data.embeddings import save_embedding_store
+from tps_eval.sequence_metrics.embedding_index import (
+    EmbeddingIndex,
+    default_index_path,
+    index_recall,
+)
+from tps_eval.sequence_metrics.min_embedding_distance import (
+    min_embedding_distance,
+    nearest_embedding_neighbours,
+)
+
+
+def _clustered(seed=0, n=120, dim=8, clusters=6):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)) * 5
+    return (centers[rng.integers(0, clusters, n)] + rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_exhaustive_probe_matches_exact_engine():
+    refs, queries = _clustered(0), _clustered(1, n=30)
+    index = EmbeddingIndex.build([f"r{i}" for i in range(len(refs))], refs, n_lists=7)
+    assert index.n_lists == 7 and len(index) == len(refs)
+    dist, idx = index.search(queries, top_k=5, nprobe=index.n_lists)
+    exact_d, exact_i = nearest_embedding_neighbours(queries, refs, top_k=5)
+    assert np.array_equal(idx, exact_i)
+    assert np.array_equal(dist, exact_d)
+
+
+def test_more_cells_than_distinct_points():
+    # 3 distinct vectors, 6 cells: re-seeding an empty cell must never empty another.
+    rng = np.random.default_rng(4)
+    refs = np.repeat(rng.normal(size=(3, 4)), 4, axis=0).astype(np.float32)
+    index = EmbeddingIndex.build([f"r{i}" for i in range(len(refs))], refs, n_lists=6)
+    assert (np.diff(index.offsets) > 0).all() and np.isfinite(index.centroids).all()
+    dist, _ = index.search(refs, top_k=1, nprobe=1)
+    assert np.array_equal(dist, nearest_embedding_neighbours(refs, refs, top_k=1)[0])
+
+
+def test_save_load_roundtrip_and_recall():
+    refs = _clustered(2)
+    index = EmbeddingIndex.build([f"r{i}" for i in range(len(refs))], refs, source="x.npy")
+    with tempfile.TemporaryDirectory() as d:
+        path = index.save(default_index_path(os.path.join(d, "ref_embedding_esm1b.npy")))
+        assert path.endswith("ref_embedding_esm1b_ivf.npz")
+        loaded = EmbeddingIndex.load(path)
+    assert loaded.ids == index.ids and loaded.meta["source"] == "x.npy"
+    queries = _clustered(3, n=20)
+    assert np.array_equal(loaded.search(queries, top_k=3)[1], index.search(queries, top_k=3)[1])
+    low = index_recall(index, queries, top_k=5, nprobe=1)
+    full = index_recall(index, queries, top_k=5, nprobe=index.n_lists)
+    assert 0.0 <= low <= full == 1.0
+
+
+def test_screening_mode_returns_sorted_neighbours():
+    refs = _clustered(4)
+    index = EmbeddingIndex.build([str(i) for i in range(len(refs))], refs, n_lists=4)
+    dist, idx = index.search(refs[:10], top_k=3, nprobe=4, exact_rerank=False)
+    assert (idx[:, 0] == np.arange(10)).all()  # each reference finds itself first
+    assert (np.diff(dist, axis=1) >= 0).all()
+
+
+def test_min_embedding_distance_with_index_matches_exact():
+    refs, queries = _clustered(5, n=40), _clustered(6, n=12)
+    with tempfile.TemporaryDirectory() as d:
+        train = save_embedding_store(os.path.join(d, "t_embedding_esm1b.npy"),
+                                     [f"t{i}" for i in range(len(refs))], refs)
+        gen = save_embedding_store(os.path.join(d, "g_embedding_esm1b.npy"),
+                                   [f"g{i}" for i in range(len(queries))], queries)
+        out = os.path.join(d, "g_embedding_esm1b_min_embedding_distance.csv")
+        topk = os.path.join(d, "g_embedding_esm1b_min_embedding_distance_topk.csv")
+        min_embedding_distance(gen, train_embeddings_path=train, top_k=3)
+        expected = pd.read_csv(out), pd.read_csv(topk)
+        index = EmbeddingIndex.build([f"t{i}" for i in range(len(refs))], refs, n_lists=5)
+        index_path = index.save(default_index_path(train))
+        os.remove(out)
+        min_embedding_distance(gen, index_path=index_path, nprobe=5, top_k=3)
+        pd.testing.assert_frame_equal(pd.read_csv(out), expected[0])
+        pd.testing.assert_frame_equal(pd.read_csv(topk), expected[1])
+
+
+def main():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,9 +17,16 @@ What IS tested locally (torch is importable here): the pure per-position
 log-probability primitive `_per_position_log_probs` (a numerically-known
 log-softmax over the vocab axis) and the module's declared constants. This at
 least guarantees the module imports and its scoring math primitive is correct.
+The fused swoop + embedding pass is checked against a tiny deterministic stand-in
+model (real ESM-1b alphabet, synthetic logits/representations): one forward per
+batch, PLL and mean-pooled embeddings in input order, store written. The packed
+masked engine is checked against a naive one-forward-per-position reference, and
+adaptive masking against the exact score.
 """
 
 import math
+import os
+import tempfile
 
 # torch + fair-esm are only present in an ESM-capable env (e.g. the `esmfold`
 # conda env, torch 2.5.1). Where they're missing/broken, skip gracefully instead
@@ -67,7 +74,7 @@ def test_per_position_log_probs_normalizes_over_last_axis():
 
 
 def test_constants():
-    assert COLUMNS == ["ID", "esm_pseudo_perplexity", "esm_mean_pll", "n_residues"]
+    assert COLUMNS == ["ID", "esm_pseudo_perplexity", "esm_mean_pll", "n_residues", "n_masked"]
     assert DEFAULT_MODEL == "esm1b_t33_650M_UR50S"
     assert TRUNCATION_SEQ_LENGTH == 1022
 
@@ -79,6 +86,220 @@ def test_unknown_method_raises_without_model():
     assert callable(epp.compute_pseudo_perplexity)
 
 
+class _TinyModel:
+    """Deterministic stand-in for ESM-1b: logits and layer representations are
+    fixed functions of the token ids; counts forward calls."""
+
+    def __init__(self, vocab, dim=4):
+        self.vocab, self.dim, self.calls = vocab, dim, 0
+
+    def eval(self):
+        return self
+
+    def __call__(self, toks, repr_layers=()):
+        self.calls += 1
+        feats = toks.to(torch.float32).unsqueeze(-1)
+        logits = torch.sin(feats * torch.arange(1, self.vocab + 1, dtype=torch.float32))
+        out = {"logits": logits}
+        out["representations"] = {
+            layer: torch.cos(feats * torch.arange(1, self.dim + 1, dtype=torch.float32))
+            for layer in repr_layers
+        }
+        return out
+
+
+def test_fused_swoop_returns_pll_and_mean_embeddings():
+    from esm import Alphabet
+
+    alphabet = Alphabet.from_architecture("ESM-1b")
+    model = _TinyModel(len(alphabet))
+    seqs = ["MKTAYIAK", "MK", "ACDEFGHIKL"]
+    plain = epp._score_swoop(model, alphabet, "cpu", seqs, toks_per_batch=4096)
+    calls = model.calls
+    fused = epp._score_swoop(model, alphabet, "cpu", seqs, toks_per_batch=4096,
+                             embedding_layer=epp.EMBEDDING_LAYER)
+    assert model.calls - calls == calls == 1  # one batch -> one forward either way
+    for i, seq in enumerate(seqs):
+        assert fused[i]["mean_pll"] == plain[i]["mean_pll"]
+        toks = torch.tensor([alphabet.get_idx(c) for c in seq], dtype=torch.float32)
+        expected = torch.cos(toks[:, None] * torch.arange(1, 5, dtype=torch.float32)).mean(0)
+        assert fused[i]["embedding"].shape == (4,)
+        assert torch.allclose(torch.from_numpy(fused[i]["embedding"]), expected)
+    assert "embedding" not in plain[0]
+
+
+def test_fused_compute_writes_csv_and_embedding_store():
+    from esm import Alphabet
+
+    from tps_eval.data.embeddings import load_embedding_store
+
+    alphabet = Alphabet.from_architecture("ESM-1b")
+    model = _TinyModel(len(alphabet))
+    saved = epp.pretrained.load_model_and_alphabet
+    epp.pretrained.load_model_and_alphabet = lambda location: (model, alphabet)
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            fasta = os.path.join(d, "gen.fasta")
+            with open(fasta, "w") as handle:
+                handle.write(">a desc\nMKTAYIAK\n>b\nMK\n")
+            df = epp.compute_pseudo_perplexity(
+                fasta, nogpu=True, embeddings_path=epp.default_embeddings_path(fasta)
+            )
+            assert model.calls == 1
+            assert list(df["ID"]) == ["a", "b"]
+            assert os.path.isfile(os.path.join(d, "gen_esm_pseudo_perplexity.csv"))
+            ids, matrix = load_embedding_store(os.path.join(d, "gen_embedding_esm1b.npy"))
+            assert ids == ["a", "b"] and matrix.shape == (2, 4)
+    finally:
+        epp.pretrained.load_model_and_alphabet = saved
+
+
+def _naive_masked_pll(model, alphabet, seq):
+    """Reference: one masked copy per position, one forward each."""
+    _, _, toks = alphabet.get_batch_converter()([("x", seq)])
+    values = []
+    for p in range(len(seq)):
+        masked = toks.clone()
+        masked[0, p + 1] = alphabet.mask_idx
+        lp = torch.log_softmax(model(masked)["logits"][0, p + 1], -1)
+        values.append(float(lp[toks[0, p + 1]]))
+    return sum(values) / len(values)
+
+
+def test_masked_engine_packs_sequences_and_matches_reference():
+    from esm import Alphabet
+
+    alphabet = Alphabet.from_architecture("ESM-1b")
+    model = _TinyModel(len(alphabet))
+    seqs = ["MKTAYIAKQRQISFVK", "MK", "ACDEFGHIKLMNPQRSTVWY"]
+    got = epp._score_masked(model, alphabet, "cpu", seqs, toks_per_batch=4096)
+    assert model.calls == 1  # all 38 masked copies of 3 sequences in one forward
+    small = epp._score_masked(model, alphabet, "cpu", seqs, toks_per_batch=200)
+    assert model.calls - 1 == 4  # 200-token batches: 38 rows of width 4-22
+    assert [r["mean_pll"] for r in small] == [r["mean_pll"] for r in got]
+    for seq, result in zip(seqs, got):
+        _approx(result["mean_pll"], _naive_masked_pll(model, alphabet, seq))
+        assert result["n_residues"] == result["n_masked"] == len(seq)
+
+
+def test_adaptive_masking_stops_early_within_tolerance():
+    from esm import Alphabet
+
+    alphabet = Alphabet.from_architecture("ESM-1b")
+    model = _TinyModel(len(alphabet))
+    seq = "MKTAYIAKQRQISFVK" * 8
+    exact = epp._score_masked(model, alphabet, "cpu", [seq])[0]["mean_pll"]
+    tol = 0.5
+    approx = epp._score_masked(model, alphabet, "cpu", [seq], adaptive_tol=tol)[0]
+    assert approx["n_masked"] == epp.ADAPTIVE_ROUND < len(seq)
+    assert abs(approx["mean_pll"] - exact) <= tol
+    # A tight tolerance degrades to the exact score.
+    full = epp._score_masked(model, alphabet, "cpu", [seq], adaptive_tol=1e-12)[0]
+    assert full["n_masked"] == len(seq)
+    _approx(full["mean_pll"], exact)
+
+
+def test_n_masked_column_in_every_mode_and_through_the_cache():
+    from esm import Alphabet
+
+    alphabet = Alphabet.from_architecture("ESM-1b")
+    model = _TinyModel(len(alphabet))
+    seq = "MKTAYIAKQRQISFVK" * 8
+    saved = epp.pretrained.load_model_and_alphabet
+    epp.pretrained.load_model_and_alphabet = lambda location: (model, alphabet)
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            cache = os.path.join(d, "results.sqlite")
+            fasta = os.path.join(d, "gen.fasta")
+            with open(fasta, "w") as handle:
+                handle.write(f">a\n{seq}\n>b\nMK\n")
+            for kwargs, expected in (
+                ({}, [0, 0]),
+                ({"method": "masked"}, [len(seq), 2]),
+                ({"method": "masked", "adaptive_tol": 0.5}, [epp.ADAPTIVE_ROUND, 2]),
+            ):
+                for _ in range(2):  # fresh, then from the cache
+                    df = epp.compute_pseudo_perplexity(
+                        fasta, nogpu=True, result_cache=cache, **kwargs
+                    )
+                    assert list(df.columns) == COLUMNS
+                    assert list(df["n_masked"]) == expected
+    finally:
+        epp.pretrained.load_model_and_alphabet = saved
+    # Entries cached before n_masked was stored.
+    legacy = epp.pack_floats(-1.5, 10)
+    assert epp._score_decoder("swoop", False)(legacy)["n_masked"] == 0
+    assert epp._score_decoder("masked", False)(legacy)["n_masked"] == 10
+    assert math.isnan(epp._score_decoder("masked", True)(legacy)["n_masked"])
+
+
+def test_precision_and_adaptive_options_are_validated():
+    for kwargs in ({"precision": "fp8"}, {"adaptive_tol": 0.1}):
+        try:
+            epp.compute_pseudo_perplexity("unused.fasta", **kwargs)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{kwargs} should be rejected")
+    try:
+        epp._prepare_model(None, "cuda", "int8")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("int8 quantisation must be CPU-only")
+
+
+def test_result_cache_skips_model_for_seen_sequences():
+    from esm import Alphabet
+
+    from tps_eval.data.embeddings import load_embedding_store
+
+    alphabet = Alphabet.from_architecture("ESM-1b")
+    model = _TinyModel(len(alphabet))
+    loads = []
+    saved = epp.pretrained.load_model_and_alphabet
+    epp.pretrained.load_model_and_alphabet = lambda location: loads.append(1) or (model, alphabet)
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            cache = os.path.join(d, "results.sqlite")
+            fasta = os.path.join(d, "gen.fasta")
+            store = epp.default_embeddings_path(fasta)
+            with open(fasta, "w") as handle:
+                handle.write(">a\nMKTAYIAK\n>b\nMK\n")
+            first = epp.compute_pseudo_perplexity(fasta, nogpu=True, result_cache=cache)
+            # Fused re-run: scores are cached but embeddings are not -> one pass.
+            fused = epp.compute_pseudo_perplexity(
+                fasta, nogpu=True, embeddings_path=store, result_cache=cache
+            )
+            assert model.calls == 2 and len(loads) == 2
+            assert list(fused["esm_mean_pll"]) == list(first["esm_mean_pll"])
+            _, reference = load_embedding_store(store, mmap=False)
+            with open(fasta, "w") as handle:
+                handle.write(">c\nMK\n>d\nMKTAYIAK\n")
+            again = epp.compute_pseudo_perplexity(
+                fasta, nogpu=True, embeddings_path=store, result_cache=cache
+            )
+            assert model.calls == 2 and len(loads) == 2  # model never loaded
+            assert list(again["esm_mean_pll"]) == list(first["esm_mean_pll"])[::-1]
+            _, matrix = load_embedding_store(store)
+            assert (matrix == reference[::-1]).all()
+    finally:
+        epp.pretrained.load_model_and_alphabet = saved
+
+
+def test_fused_mode_rejects_masked_method():
+    try:
+        epp.compute_pseudo_perplexity("unused.fasta", method="masked",
+                                      embeddings_path="unused.npy")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("fused embeddings must require the swoop method")
+    assert epp.default_embeddings_path(os.path.join("d", "gen.fasta")) == os.path.join(
+        "d", "gen_embedding_esm1b.npy"
+    )
+
+
 def main():
     if _IMPORT_ERROR is not None:
         print(f"SKIPPED (torch/esm unavailable in this env): {_IMPORT_ERROR!r}")
@@ -18,9 +18,13 @@ guard, empty-hits robustness, and the `<input>_local_sequence_search*.csv` save
 paths. All inputs are synthetic in-memory hit DataFrames.
 """
 
+import os
+import tempfile
+
 import numpy as np
 import pandas as pd
 
+import tps_eval.sequence_metrics.local_sequence_search as lss
 from tps_eval.sequence_metrics.local_sequence_search import (
     BACKENDS,
     TOPK_COLUMNS,
@@ -114,6 +118,49 @@ def test_topk_neighbours_empty():
     assert len(out) == 0
 
 
+def test_alignment_cache_searches_only_new_queries():
+    # A fake backend that records which queries it was asked to search and emits
+    # one deterministic hit per query against every reference sequence.
+    searched = []
+
+    def fake_runner(fasta_path, ref_fasta, work_dir, *, top_k, threads, sensitivity):
+        queries = [line[1:].strip() for line in open(fasta_path) if line.startswith(">")]
+        refs = [line[1:].strip() for line in open(ref_fasta) if line.startswith(">")]
+        searched.append(queries)
+        rows = [[q, r, 50.0 + k, np.nan, 90.0, 50.0 + k, 100.0 + k]
+                for q in queries for k, r in enumerate(refs)]
+        return _hits(rows)
+
+    saved = lss._BACKEND_RUNNERS["mmseqs2"]
+    lss._BACKEND_RUNNERS["mmseqs2"] = fake_runner
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            ref = os.path.join(d, "ref.fasta")
+            with open(ref, "w") as fh:
+                fh.write(">r1\nMMMM\n>r2\nKKKK\n")
+            q1 = os.path.join(d, "q1.fasta")
+            with open(q1, "w") as fh:
+                fh.write(">a\nACDE\n>b\nFGHI\n")
+            q2 = os.path.join(d, "q2.fasta")
+            with open(q2, "w") as fh:  # renamed 'a', unchanged 'b', new 'c'
+                fh.write(">a2\nACDE\n>b\nFGHI\n>c\nWWWW\n")
+            cache = os.path.join(d, "aln.sqlite")
+
+            first = local_sequence_search(q1, train_path=ref, top_k=2, alignment_cache=cache)
+            topk_first = pd.read_csv(os.path.join(d, "q1_local_sequence_search_topk.csv"))
+            again = local_sequence_search(q1, train_path=ref, top_k=2, alignment_cache=cache)
+            topk_again = pd.read_csv(os.path.join(d, "q1_local_sequence_search_topk.csv"))
+            second = local_sequence_search(q2, train_path=ref, top_k=2, alignment_cache=cache)
+    finally:
+        lss._BACKEND_RUNNERS["mmseqs2"] = saved
+
+    assert searched == [["a", "b"], ["c"]]  # the re-run searched nothing
+    pd.testing.assert_frame_equal(first, again)
+    pd.testing.assert_frame_equal(topk_first, topk_again)
+    assert list(second["ID"]) == ["a2", "b", "c"]
+    assert list(second["local_sequence_identity_hit"]) == ["r2", "r2", "r2"]
+
+
 def test_save_path_naming():
     assert _default_save_path("designs.fasta") == "designs_local_sequence_search.csv"
     assert (
@@ -29,11 +29,14 @@ from tps_eval.sequence_metrics.max_sequence_identity import (
     evaluate_max_sequence_identity,
     get_max_sequence_identity,
     get_max_sequence_identity_two_sets,
+    get_sequence_identity_hits,
     get_topk_sequence_identity,
 )
 
 import pandas as pd
 
+import tps_eval.sequence_metrics.max_sequence_identity as msi
+
 
 def _approx(a, b, tol=1e-9):
     assert abs(a - b) <= tol, f"{a} != {b}"
@@ -88,6 +91,84 @@ def test_topk_percent_scores_and_order():
     assert score0 >= score1
 
 
+def test_single_pass_topk_matches_full_sort():
+    # The bounded heap must reproduce a full sort by (identity desc, index asc),
+    # including ties (train[1] and train[3] are identical), and the max columns
+    # must come out of the same pass unchanged.
+    train = ["ACDEFGHIK", "ACDEFGHIL", "MMMMMMMMM", "ACDEFGHIL", "ACDEFGWWW"]
+    generated = ["ACDEFGHIK", "ACDEFGHIL"]
+    ident, sim, ident_idx, sim_idx, topk = get_sequence_identity_hits(
+        train, generated, top_k=3
+    )
+    for q, query in enumerate(generated):
+        scored = sorted(
+            ((_pair_metrics(query, t)[0], j) for j, t in enumerate(train)),
+            key=lambda t: (-t[0], t[1]),
+        )
+        assert [j for j, _ in topk[q]] == [j for _, j in scored[:3]]
+        for (_, score), (identity, _) in zip(topk[q], scored[:3]):
+            _approx(score, identity * 100.0, tol=1e-6)
+    assert (ident, sim, ident_idx, sim_idx) == get_max_sequence_identity_two_sets(
+        train, generated
+    )
+    assert ident_idx == [0, 1]
+
+
+def test_gen_vs_train_keeps_query_order():
+    # Gen-vs-train must align each (query, reference) pair exactly as the plain
+    # directional call does, so its numbers stay bit-identical to CSVs/reference
+    # stats written before. This pair has order-dependent tracebacks.
+    query, ref = "LRYQQNWGKYFV", "LIWRYQNWGKYDV"
+    assert _pair_metrics(query, ref) != _pair_metrics(ref, query)
+    ident, sim, *_ = get_sequence_identity_hits([ref], [query])
+    assert (ident[0], sim[0]) == _pair_metrics(query, ref)
+    with tempfile.TemporaryDirectory() as d:
+        cache_path = os.path.join(d, "aln.sqlite")
+        for _ in range(2):  # cold, then served from the cache
+            ident, sim, *_ = get_sequence_identity_hits([ref], [query], alignment_cache=cache_path)
+            assert (ident[0], sim[0]) == _pair_metrics(query, ref)
+
+
+def test_self_mode_aligns_pairs_in_stored_order():
+    # Each unordered pair is aligned once as (seqs[i], seqs[j]) with i < j, whatever
+    # the lexicographic order of the sequences; this pair's traceback depends on it.
+    query, ref = "LRYQQNWGKYFV", "LIWRYQNWGKYDV"
+    for seqs in ([query, ref], [ref, query]):
+        ident, sim, *_ = get_sequence_identity_hits(seqs, seqs, self_comparison=True)
+        assert list(zip(ident, sim)) == [_pair_metrics(seqs[0], seqs[1])] * 2
+        with tempfile.TemporaryDirectory() as d:
+            cached = get_sequence_identity_hits(
+                seqs, seqs, self_comparison=True, alignment_cache=os.path.join(d, "aln.sqlite")
+            )
+        assert cached[:2] == (ident, sim)
+
+
+def test_self_mode_triangular_tiles_match_full_scan():
+    # Several tiles (tile size 2 over 7 sequences), ties (two identical pairs) and
+    # an all-dissimilar row: the triangular scheduler must reproduce the row-by-row
+    # scan exactly, hit indices and top-k order included.
+    seqs = ["ACDEFGHIK", "ACDEFGHIL", "MMMMMMMMM", "ACDEFGHIK",
+            "ACDEFGWWW", "ACDEFGHIL", "WWWWW"]
+    saved = msi.SELF_TILE_SIZE
+    msi.SELF_TILE_SIZE = 2
+    try:
+        got = get_sequence_identity_hits(seqs, seqs, self_comparison=True, top_k=3)
+    finally:
+        msi.SELF_TILE_SIZE = saved
+    msi._init_identity_worker(seqs, True, 3)
+    for i, seq in enumerate(seqs):
+        _, state, _new = msi._worker_scan((i, seq))
+        assert (got[0][i], got[1][i], got[2][i], got[3][i]) == (
+            state[0], state[2], state[1], state[3]
+        )
+        assert got[4][i] == msi._ranked_topk(state[4])
+
+
+def test_hits_without_topk_returns_empty_lists():
+    *_maxes, topk = get_sequence_identity_hits(["ACDE", "MMMM"], ["ACDE"])
+    assert topk == [[]]
+
+
 def test_evaluate_writes_csv_keyed_by_id():
     train = ["MMMMMMMMM", "ACDEFGHIK"]
     generated = ["ACDEFGHIK", "MMMMMMMMM"]
@@ -133,6 +214,72 @@ def test_topk_csv_written():
         _approx(float(topk.iloc[0]["score"]), 100.0, tol=1e-6)
 
 
+def test_alignment_cache_reuses_pairs_and_matches_uncached():
+    from tps_eval.data.alignment_cache import AlignmentCache
+
+    train = ["ACDEFGHIK", "MMMMMMMMM", "ACDEFGHIL"]
+    generated = ["ACDEFGHIK", "ACDEFGWWW"]
+    expected = get_sequence_identity_hits(train, generated, top_k=2)
+    with tempfile.TemporaryDirectory() as d:
+        cache_path = os.path.join(d, "aln.sqlite")
+        first = get_sequence_identity_hits(train, generated, top_k=2, alignment_cache=cache_path)
+        second = get_sequence_identity_hits(train, generated, top_k=2, alignment_cache=cache_path)
+        assert first == expected and second == expected
+        with AlignmentCache(cache_path, msi.PAIR_METRICS_CACHE_PARAMS) as c:
+            # 2 x 3 (query, reference) pairs, stored in query order.
+            assert len(c) == 6
+        # Self mode stores its (i, j), i < j, pairs in the same ordered namespace;
+        # generated[0] == train[0], so (train[0], train[1|2]) are already there.
+        seqs = train + ["WWWWWWW"]
+        got = get_sequence_identity_hits(seqs, seqs, self_comparison=True, alignment_cache=cache_path)
+        assert got == get_sequence_identity_hits(seqs, seqs, self_comparison=True)
+        with AlignmentCache(cache_path, msi.PAIR_METRICS_CACHE_PARAMS) as c:
+            assert len(c) == 6 + 4  # 4 * 3 / 2 unordered pairs, 2 of them cached
+        # Only pairs not yet seen are added on an overlapping self-mode rerun.
+        more = seqs + ["ACDEFGHIKW"]
+        assert get_sequence_identity_hits(
+            more, more, self_comparison=True, alignment_cache=cache_path
+        ) == get_sequence_identity_hits(more, more, self_comparison=True)
+        with AlignmentCache(cache_path, msi.PAIR_METRICS_CACHE_PARAMS) as c:
+            assert len(c) == 6 + 4 + 4
+
+
+def test_kmer_index_ranks_by_shared_fraction():
+    index = msi.KmerIndex(["ACDEFG", "WWWWWW", "ACDEWW", "MMMMMM", "ACDEFGHI"], k=3)
+    frac = index.shared_fraction("ACDEFG")
+    assert frac[0] == 1.0 and frac[1] == 0.0 and frac[3] == 0.0
+    # Candidates come back in ascending train order; ties keep the lower index.
+    assert index.candidates("ACDEFG", 2) == [0, 4]
+    assert index.candidates("ACDEFG", 2, exclude=0) == [2, 4]
+    assert index.candidates("ACDEFG", 10) == [0, 1, 2, 3, 4]
+
+
+def test_prefilter_with_all_candidates_matches_exact():
+    train = ["ACDEFGHIK", "ACDEFGHIL", "MMMMMMMMM", "ACDEFGHIL", "ACDEFGWWW"]
+    generated = ["ACDEFGHIK", "ACDEFGWWW", "WWWWW"]
+    for self_mode, gen in ((False, generated), (True, train)):
+        exact = get_sequence_identity_hits(train, gen, self_comparison=self_mode, top_k=2)
+        approx = get_sequence_identity_hits(
+            train, gen, self_comparison=self_mode, top_k=2,
+            prefilter=True, prefilter_candidates=len(train),
+        )
+        assert approx == exact
+
+
+def test_prefilter_recall_report():
+    train = ["ACDEFGHIK", "ACDEFGHIL", "MMMMMMMMM", "ACDEFGWWW", "WWWWWWWWW"]
+    report = msi.prefilter_recall(
+        train, train, self_comparison=True, sample=3, top_k=2, prefilter_candidates=2
+    )
+    assert report["n_queries"] == 3.0
+    for name in ("max_identity_recall", "max_similarity_recall", "topk_recall"):
+        assert 0.0 <= report[name] <= 1.0
+    full = msi.prefilter_recall(
+        train, ["ACDEFGHIK"], sample=None, top_k=1, prefilter_candidates=len(train)
+    )
+    assert full["max_identity_recall"] == 1.0 and full["topk_recall"] == 1.0
+
+
 def test_save_path_naming():
     assert _get_save_path("designs.fasta") == "designs_max_sequence_identity.csv"
     assert _get_save_path("designs.fasta", save_suffix="self") == (
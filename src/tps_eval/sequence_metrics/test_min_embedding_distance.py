@@ -9,11 +9,12 @@ or under pytest:
     cd src/sequence_metrics && python -m pytest test_min_embedding_distance.py -q
 
 No torch/ESM needed — this tool consumes precomputed embedding CSVs. Tests use
-closed-form L2 distances on tiny 2-D synthetic embeddings: pairwise distance
-matrix, argmin nearest-neighbour selection + hit ID, self mode (diagonal masked
+closed-form L2 distances on tiny 2-D synthetic embeddings: nearest distances,
+argmin nearest-neighbour selection + hit ID, self mode (diagonal masked
 to +inf so a sequence never matches itself), the tidy top-k neighbours CSV
 (ascending distance, self excluded), the `_min_embedding_distance*.csv` save
-paths, and a load_embeddings CSV round-trip.
+paths, a load_embeddings CSV round-trip, the binary .npy store input, and the
+streaming tiled engine reproducing the dense matrix bit for bit (ties included).
 """
 
 import os
@@ -22,14 +23,16 @@ import tempfile
 import numpy as np
 import pandas as pd
 
+from tps_eval.data.embeddings import save_embedding_store
 from tps_eval.sequence_metrics.min_embedding_distance import (
     _get_save_path,
     _get_topk_save_path,
     _min_embedding_distance,
     _min_embedding_distance_self,
-    get_distances,
     get_min_distances,
+    main_generated_sequences,
     main_train_sequences,
+    nearest_embedding_neighbours,
     preprocess_embeddings,
     save_embeddings,
     write_topk_distances,
@@ -40,11 +43,18 @@ def _emb_df(ids, vectors):
     return pd.DataFrame({"ID": list(ids), "embedding": [list(v) for v in vectors]})
 
 
-def test_get_distances_closed_form():
+def _dense_distances(embeddings1: np.ndarray, embeddings2: np.ndarray) -> np.ndarray:
+    """Brute-force reference: the full (N, M) L2 matrix via an (N, M, D) broadcast.
+    Test-only; the module never materialises it."""
+    diffs = embeddings1[:, None, :] - embeddings2[None, :, :]
+    return np.linalg.norm(diffs, axis=2)
+
+
+def test_nearest_distances_closed_form():
     e1 = np.array([[0.0, 0.0], [1.0, 0.0]])
     e2 = np.array([[3.0, 4.0]])
-    d = get_distances(e1, e2)
-    assert d.shape == (2, 1)
+    d, idx = nearest_embedding_neighbours(e1, e2, top_k=1)
+    assert d.shape == (2, 1) and idx.tolist() == [[0], [0]]
     np.testing.assert_allclose(d[:, 0], [5.0, np.hypot(2.0, 4.0)])
 
 
@@ -141,6 +151,44 @@ def test_main_train_sequences_dataframe_path():
         assert out.loc["a", "min_embedding_distance_hit"] == "b"
 
 
+def test_streaming_engine_matches_dense_matrix():
+    rng = np.random.default_rng(0)
+    refs = rng.normal(size=(23, 6))
+    refs[5] = refs[11] = refs[17]  # exact ties must break on the lower index
+    queries = np.vstack([rng.normal(size=(9, 6)), refs[17:18]])
+    for q, exclude_self in ((queries, False), (refs, True)):
+        dense = _dense_distances(q, refs)
+        if exclude_self:
+            np.fill_diagonal(dense, np.inf)
+        order = np.argsort(dense, axis=1, kind="stable")[:, :4]
+        for block_size, threads in ((1, 1), (4, 3), (1024, 1)):
+            dist, idx = nearest_embedding_neighbours(
+                q, refs, top_k=4, exclude_self=exclude_self,
+                block_size=block_size, threads=threads,
+            )
+            assert np.array_equal(idx, order)
+            assert np.array_equal(dist, np.take_along_axis(dense, order, axis=1))
+
+
+def test_self_mode_single_sequence_has_no_neighbour():
+    dist, idx = nearest_embedding_neighbours(np.zeros((1, 2)), np.zeros((1, 2)),
+                                             top_k=3, exclude_self=True)
+    assert idx.tolist() == [[-1]] and np.isinf(dist[0, 0])
+
+
+def test_binary_store_input_matches_csv_naming():
+    # Store paths keep the `<input>_min_embedding_distance.csv` output names.
+    with tempfile.TemporaryDirectory() as d:
+        train = save_embedding_store(os.path.join(d, "t_embedding_esm1b.npy"), ["t0", "t1"],
+                                     np.array([[0.0, 0.0], [10.0, 0.0]]))
+        gen = save_embedding_store(os.path.join(d, "g_embedding_esm1b.npy"), ["g0"],
+                                   np.array([[9.0, 0.0]]))
+        main_generated_sequences(gen, train)
+        out = pd.read_csv(os.path.join(d, "g_embedding_esm1b_min_embedding_distance.csv"))
+        assert list(out["min_embedding_distance_hit"]) == ["t1"]
+        assert abs(float(out["min_embedding_distance"][0]) - 1.0) < 1e-6
+
+
 def main():
     tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
     for t in tests:
@@ -169,6 +169,46 @@ def test_score_fasta_all_skipped_is_all_nan(monkeypatch):
     assert df["tm"].isna().all()
 
 
+def test_score_fasta_result_cache_predicts_only_new_sequences(monkeypatch):
+    """With a result cache, a re-run sends only unseen sequences to TmProt; a
+    skipped sequence is NOT cached (re-sent, still NaN); --no-cache predicts
+    everything again."""
+    seen = []
+
+    class _Proc:
+        returncode, stdout, stderr = 0, "ok", ""
+
+    def fake_run(cmd, capture_output=True, text=True, env=None):
+        in_fasta = cmd[cmd.index("-i") + 1]
+        out_dir = cmd[cmd.index("-o") + 1]
+        with open(in_fasta) as f:
+            lines = [line.strip() for line in f if line.strip()]
+        records = list(zip([h[1:] for h in lines[::2]], lines[1::2]))
+        seen.append([seq for _, seq in records])
+        stem = os.path.splitext(os.path.basename(in_fasta))[0]
+        with open(os.path.join(out_dir, stem + ".csv"), "w") as f:
+            f.write("Rank,ID,Predicted Tm [°C],Thermostable\n")
+            for rank, (identifier, seq) in enumerate(records, 1):
+                if len(seq) >= 5:
+                    f.write(f"{rank},{identifier},{float(len(seq))},No\n")
+        return _Proc()
+
+    monkeypatch.setattr(tmprot.subprocess, "run", fake_run)
+    with tempfile.TemporaryDirectory() as d:
+        cache = os.path.join(d, "results.sqlite")
+        fasta = os.path.join(d, "designs.fasta")
+        _write_fasta(fasta, [("seqA", "MKTAYIAK"), ("seqB", "MKT")])
+        score_fasta(fasta, result_cache=cache)
+        _write_fasta(fasta, [("x", "MKTAYIAK"), ("y", "MKT"), ("z", "MKTAYIAKQR")])
+        df = score_fasta(fasta, result_cache=cache).set_index("ID")
+        assert seen == [["MKTAYIAK", "MKT"], ["MKT", "MKTAYIAKQR"]]
+        _approx(float(df.loc["x", "tm"]), 8.0)
+        _approx(float(df.loc["z", "tm"]), 10.0)
+        assert np.isnan(df.loc["y", "tm"])
+        score_fasta(fasta, result_cache=cache, no_cache=True)
+        assert len(seen) == 3 and len(seen[-1]) == 3
+
+
 def main():
     import inspect
 
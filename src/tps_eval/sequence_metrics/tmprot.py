@@ -20,6 +20,11 @@ from __future__ import annotations
 # output. We reindex to the full input FASTA ID set so every input gets a row,
 # with NaN where TmProt produced no prediction. ID = FASTA record id (matches the
 # other sequence-branch tools).
+#
+# With a result cache (tps_eval.data.result_cache) only sequences never scored by
+# this TmProt version are written to a temporary FASTA and sent to the CLI. Skipped
+# sequences are NOT cached (a failed or interrupted run must not pin a NaN); they
+# are re-sent next time, which is cheap since TmProt rejects them up front.
 
 import os
 import subprocess
@@ -33,10 +38,15 @@ import pandas as pd
 
 CURRENT_DIR = Path(__file__).resolve().parent
 
+from tps_eval.data.alignment_cache import pack_floats, unpack_floats
+from tps_eval.data.result_cache import cached_results, open_result_cache
 from tps_eval.data.sequences import load_fasta_sequences, separate_identifiers
 
 COLUMNS = ["ID", "tm"]
 
+# Result-cache model version: bump when the vendored TmProt release changes.
+TMPROT_MODEL = "tmprot-1.0"
+
 # Native column in TmProt's output CSV holding the predicted melting temperature.
 _TMPROT_TM_COLUMN = "Predicted Tm [°C]"
 _TMPROT_ID_COLUMN = "ID"
@@ -101,6 +111,26 @@ def _read_tmprot_output(out_csv: str) -> dict:
     }
 
 
+def _predict_sequences(
+    sequences: List[str],
+    *,
+    device: Optional[str] = None,
+    tmprot_executable: str = "tmprot",
+) -> List[float]:
+    """Tm for each sequence (NaN where TmProt skipped it), via a temporary FASTA."""
+    with tempfile.TemporaryDirectory(prefix="tmprot_") as tmp:
+        fasta_path = os.path.join(tmp, "misses.fasta")
+        with open(fasta_path, "w") as handle:
+            handle.writelines(f">seq{i}\n{seq}\n" for i, seq in enumerate(sequences))
+        out_csv = run_tmprot_cli(
+            fasta_path, tmp, device=device, tmprot_executable=tmprot_executable
+        )
+        tm_by_id = _read_tmprot_output(out_csv)
+    # None (not NaN) for skipped sequences: cached_results does not cache them.
+    tms = [tm_by_id.get(f"seq{i}") for i in range(len(sequences))]
+    return [None if tm is None or np.isnan(tm) else tm for tm in tms]
+
+
 def score_fasta(
     fasta_path: str,
     *,
@@ -108,25 +138,43 @@ def score_fasta(
     out_suffix: str = "tmprot",
     device: Optional[str] = None,
     tmprot_executable: str = "tmprot",
+    result_cache: Optional[str] = None,
+    no_cache: bool = False,
 ) -> pd.DataFrame:
     """Predict Tm for every sequence in a FASTA, writing a CSV keyed by ID.
 
     The output has one row per input FASTA record (reindexed to the full ID set,
     NaN where TmProt skipped the sequence), sorted by ID, with the RAW `tm` column.
+    ``result_cache`` (a path) reuses predictions for sequences scored before;
+    ``no_cache`` ignores it.
     """
     fasta_path = os.fspath(fasta_path)
     records = load_fasta_sequences(fasta_path, load_identifiers=True)
-    identifiers, _ = separate_identifiers(records)
-
-    with tempfile.TemporaryDirectory(prefix="tmprot_") as tmp:
-        out_csv = run_tmprot_cli(
-            fasta_path, tmp, device=device, tmprot_executable=tmprot_executable
-        )
-        tm_by_id = _read_tmprot_output(out_csv)
+    identifiers, sequences = separate_identifiers(records)
+
+    cache = open_result_cache(result_cache, "tmprot", TMPROT_MODEL, no_cache=no_cache)
+    if cache is None:
+        with tempfile.TemporaryDirectory(prefix="tmprot_") as tmp:
+            out_csv = run_tmprot_cli(
+                fasta_path, tmp, device=device, tmprot_executable=tmprot_executable
+            )
+            tm_by_id = _read_tmprot_output(out_csv)
+        tms = [tm_by_id.get(identifier, np.nan) for identifier in identifiers]
+    else:
+        with cache:
+            tms = cached_results(
+                sequences,
+                lambda batch: _predict_sequences(
+                    batch, device=device, tmprot_executable=tmprot_executable
+                ),
+                cache=cache,
+                encode=pack_floats,
+                decode=lambda blob: unpack_floats(blob)[0],
+            )
+        tms = [np.nan if tm is None else tm for tm in tms]
 
     rows: List[dict] = [
-        {"ID": identifier, "tm": tm_by_id.get(identifier, np.nan)}
-        for identifier in identifiers
+        {"ID": identifier, "tm": tm} for identifier, tm in zip(identifiers, tms)
     ]
     df = pd.DataFrame(rows, columns=COLUMNS).sort_values("ID").reset_index(drop=True)
 
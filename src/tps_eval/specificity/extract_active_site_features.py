@@ -116,6 +116,7 @@ from tps_eval.structure_metrics.active_site_geometry import (  # noqa: E402
     _collect_structures,
     _coordinating_oxygens,
 )
+from tps_eval.structure_metrics.parallel import map_structures  # noqa: E402
 
 DEFAULT_RADIUS = 12.0
 INNER_AROMATIC_RADIUS = 8.0
@@ -279,10 +280,12 @@ def active_site_features_dir(
     save_path: Optional[str] = None,
     radius: float = DEFAULT_RADIUS,
     id_filter: Optional[set] = None,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Active-site feature vectors for every structure in ``structs_dir``;
     CSV keyed by ``id`` (filename stem). ``id_filter`` (a set of IDs) restricts
-    processing to those stems when given (e.g. the MARTS-DB enzyme set)."""
+    processing to those stems when given (e.g. the MARTS-DB enzyme set). Structures
+    are processed on ``workers`` processes (default: all allocated CPUs)."""
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -296,26 +299,25 @@ def active_site_features_dir(
     print(f"Detected {mode} layout: {len(structures)} structure(s) to process in {structs_dir}")
     print(f"Active-site shell radius: {radius} A")
 
-    rows: List[Dict[str, float]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = active_site_features(path, radius=radius)
-        except Exception as exc:  # malformed/unparsable -> NaN row, keep going
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = {
-                "metal_point_found": False,
-                "n_shell_residues": 0,
-                "n_residues": 0,
-                "radius_A": radius,
-            }
-            stats.update(_nan_features())
-            n_failed += 1
-        stats["id"] = str(stem).strip()
-        rows.append(stats)
-        if i % 100 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    def _failed() -> Dict[str, float]:
+        stats = {
+            "metal_point_found": False,
+            "n_shell_residues": 0,
+            "n_residues": 0,
+            "radius_A": radius,
+        }
+        stats.update(_nan_features())
+        return stats
+
+    # Malformed/unparsable -> NaN row, keep going.
+    rows, n_failed = map_structures(
+        lambda stem, path: active_site_features(path, radius=radius),
+        structures,
+        _failed,
+        workers=workers,
+        id_column="id",
+        progress_every=100,
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("id").reset_index(drop=True)
 
@@ -107,6 +107,12 @@ def main(argv=None) -> int:
         help="Optional path to also dump the raw structure-keyed feature CSV "
         "(before the MARTS-DB class merge / filter).",
     )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job; 1 = serial).",
+    )
     args = p.parse_args(argv)
 
     meta = _class_metadata(args.marts_csv)
@@ -124,6 +130,7 @@ def main(argv=None) -> int:
         save_path=args.features_only_csv,
         radius=args.radius,
         id_filter=enzyme_ids,
+        workers=args.workers,
     )
 
     merged = meta.merge(feat, on="id", how="inner")
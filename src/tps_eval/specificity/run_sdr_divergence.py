@@ -70,6 +70,18 @@ def main() -> None:
         "--save_path", default=None,
         help="Output CSV path (default <structs_dir>_sdr_divergence.csv next to the dir).",
     )
+    parser.add_argument(
+        "--alignment_cache", default=None,
+        help="Optional persistent alignment-cache file (SQLite) for the design/neighbour "
+        "anchor alignments; shared with max_sequence_identity/local_sequence_search.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
 
     sdr_divergence_dir(
@@ -83,6 +95,8 @@ def main() -> None:
         tau_high=args.tau_high,
         tau_low=args.tau_low,
         save_path=args.save_path,
+        alignment_cache=args.alignment_cache,
+        workers=args.workers,
     )
 
 
@@ -57,24 +57,25 @@ import glob
 import math
 import os
 import sys
-import warnings
 from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-from Bio.PDB import MMCIFParser, PDBParser, Superimposer
+from Bio.PDB import Superimposer
 from Bio.PDB.Atom import Atom
-from Bio.PDB.Polypeptide import index_to_one, three_to_index
-from Bio.PDB.PDBExceptions import PDBConstructionWarning
 
 # Reuse the sibling structure-metrics + sequence-metrics modules (single source of
 # truth for the metal-point geometry, motif localization, and chain-suffix strip).
 
+from tps_eval.data.alignment_cache import AlignmentCache, sequence_key  # noqa: E402
+from tps_eval.data.topk import read_topk  # noqa: E402
 from tps_eval.structure_metrics.active_site_geometry import (  # noqa: E402
     metal_point as _cage_metal_point,
 )
+from tps_eval.structure_metrics.parallel import map_structures  # noqa: E402
+from tps_eval.structure_metrics.structure_index import load_structure  # noqa: E402
 try:
     # Reuse the k-NN tool's chain-suffix strip when it's present (single source of
     # truth). It is built in parallel and may not be checked out yet, so fall back to
@@ -102,8 +103,6 @@ except Exception:  # pragma: no cover - exercised only when knn is absent
                 return stem
         return nid
 
-_PDB_PARSER = PDBParser(QUIET=True)
-_CIF_PARSER = MMCIFParser(QUIET=True)
 
 # --------------------------------------------------------------------------- #
 # tau defaults (documented; grounded in the TEAS/HPS literature)
@@ -145,17 +144,6 @@ COLUMNS = [
 ]
 
 
-def _parser_for(path: str):
-    return _CIF_PARSER if path.lower().endswith((".cif", ".mmcif")) else _PDB_PARSER
-
-
-def _three_to_one(resname: str) -> str:
-    try:
-        return index_to_one(three_to_index(resname))
-    except KeyError:
-        return "X"
-
-
 # --------------------------------------------------------------------------- #
 # Structure collection (mirrors plddt/active_site_geometry)
 # --------------------------------------------------------------------------- #
@@ -196,45 +184,30 @@ class ResidueInfo:
     Index-aligned lists (by 0-based protein-residue order, the same order
     ``structure_sequence_residues_atoms`` returns):
       seq          1-letter sequence (HETATM skipped)
-      residues     Biopython Residue objects
+      residues     residue views (``structure_index.IndexedResidue``)
       ca           (N,3) Cα coords (NaN row if a residue has no CA)
       heavy        list of (n_i,3) arrays of that residue's heavy-atom coords
       resnums      author residue numbers (int; for panel anchoring / reporting)
     """
 
     def __init__(self, structure_path: str):
-        parser = _parser_for(structure_path)
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", PDBConstructionWarning)
-            structure = parser.get_structure("s", structure_path)
-        model = next(iter(structure))
-        seq_chars: List[str] = []
-        residues: list = []
-        ca: List[np.ndarray] = []
+        structure = load_structure(structure_path)
+        polymer = np.flatnonzero(structure.polymer)
+        coords = structure.coords.astype(float)
+        offsets = structure.residue_offsets
+        not_h = structure.elements != "H"
+        ca_index = structure.atom_index("CA")[polymer]
+        ca = np.full((len(polymer), 3), np.nan)
+        ca[ca_index >= 0] = coords[ca_index[ca_index >= 0]]
         heavy: List[np.ndarray] = []
-        resnums: List[int] = []
-        for chain in model:
-            for residue in chain:
-                if residue.id[0] != " ":
-                    continue
-                seq_chars.append(_three_to_one(residue.get_resname()))
-                residues.append(residue)
-                resnums.append(int(residue.id[1]))
-                if "CA" in residue:
-                    ca.append(np.asarray(residue["CA"].get_coord(), dtype=float))
-                else:
-                    ca.append(np.full(3, np.nan))
-                pts = [
-                    np.asarray(a.get_coord(), dtype=float)
-                    for a in residue
-                    if a.element != "H"
-                ]
-                heavy.append(np.vstack(pts) if pts else np.empty((0, 3)))
-        self.seq = "".join(seq_chars)
-        self.residues = residues
-        self.ca = np.vstack(ca) if ca else np.empty((0, 3))
+        for r in polymer:
+            lo, hi = offsets[r], offsets[r + 1]
+            heavy.append(coords[lo:hi][not_h[lo:hi]])
+        self.seq = structure.polymer_sequence()
+        self.residues = structure.residues()
+        self.ca = ca
         self.heavy = heavy
-        self.resnums = resnums
+        self.resnums = [int(n) for n in structure.resseqs[polymer]]
 
 
 # --------------------------------------------------------------------------- #
@@ -364,15 +337,33 @@ class Panel:
 # --------------------------------------------------------------------------- #
 # Superposition + position mapping
 # --------------------------------------------------------------------------- #
+# Alignment-cache namespace for _seq_anchor_pairs (ORDERED: design, neighbour). Bump
+# when the aligner parameters below change.
+ANCHOR_PAIRS_CACHE_PARAMS = (
+    "sdr_divergence/_seq_anchor_pairs:nw:match=2:mismatch=-1:open=-10:extend=-0.5:v1"
+)
+
+
 def _seq_anchor_pairs(
-    design: ResidueInfo, neighbour: ResidueInfo
+    design: ResidueInfo,
+    neighbour: ResidueInfo,
+    alignment_cache: Optional[AlignmentCache] = None,
 ) -> List[Tuple[int, int]]:
     """Anchor (design_idx, neighbour_idx) pairs for superposition via a global
     sequence alignment of the two sequences (Cα atoms of aligned, identical-or-not
     positions). Uses Biopython's PairwiseAligner; falls back to a positional 1:1 map
-    on equal-length sequences if the aligner is unavailable."""
+    on equal-length sequences if the aligner is unavailable.
+
+    With ``alignment_cache`` (opened on ``ANCHOR_PAIRS_CACHE_PARAMS``) the aligned
+    blocks are looked up by sequence content first and stored after a miss."""
     ds, ns = design.seq, neighbour.seq
     try:
+        if alignment_cache is not None:
+            keys = (sequence_key(ds), sequence_key(ns))
+            blob = alignment_cache.get(*keys)
+            if blob is not None:
+                return _blocks_to_pairs(np.frombuffer(blob, dtype="<i4").reshape(-1, 4))
+
         from Bio.Align import PairwiseAligner
 
         aligner = PairwiseAligner()
@@ -382,16 +373,27 @@ def _seq_anchor_pairs(
         aligner.match_score = 2
         aligner.mismatch_score = -1
         aln = aligner.align(ds, ns)[0]
-        pairs: List[Tuple[int, int]] = []
-        for (d0, d1), (n0, n1) in zip(aln.aligned[0], aln.aligned[1]):
-            for off in range(d1 - d0):
-                pairs.append((d0 + off, n0 + off))
-        return pairs
+        # (d0, d1, n0, n1) per aligned block.
+        blocks = np.asarray(
+            [(d0, d1, n0, n1) for (d0, d1), (n0, n1) in zip(aln.aligned[0], aln.aligned[1])],
+            dtype="<i4",
+        ).reshape(-1, 4)
+        if alignment_cache is not None:
+            alignment_cache.put(*keys, blocks.tobytes())
+        return _blocks_to_pairs(blocks)
     except Exception:
         n = min(len(ds), len(ns))
         return [(i, i) for i in range(n)]
 
 
+def _blocks_to_pairs(blocks: np.ndarray) -> List[Tuple[int, int]]:
+    pairs: List[Tuple[int, int]] = []
+    for d0, d1, n0, _n1 in blocks.tolist():
+        for off in range(d1 - d0):
+            pairs.append((d0 + off, n0 + off))
+    return pairs
+
+
 def _superpose(
     design: ResidueInfo, neighbour: ResidueInfo, pairs: Sequence[Tuple[int, int]]
 ) -> Optional[Superimposer]:
@@ -468,6 +470,7 @@ def sdr_divergence_one(
     map_tolerance: float = DEFAULT_MAP_TOLERANCE,
     tau_high: float = DEFAULT_TAU_HIGH,
     tau_low: float = DEFAULT_TAU_LOW,
+    alignment_cache: Optional[AlignmentCache] = None,
 ) -> Dict[str, object]:
     """SDR divergence of one design against its nearest neighbour.
 
@@ -492,7 +495,7 @@ def sdr_divergence_one(
         return row  # no panel positions -> can't map -> NaN
 
     # Structurally align design onto neighbour and map the SDR residues.
-    pairs = _seq_anchor_pairs(design_info, neighbour_info)
+    pairs = _seq_anchor_pairs(design_info, neighbour_info, alignment_cache)
     sup = _superpose(design_info, neighbour_info, pairs)
     if sup is None:
         return row
@@ -545,7 +548,7 @@ def _rank1_neighbours(
     def _ingest(path: Optional[str], space: str, prefer: bool) -> None:
         if not path:
             return
-        df = pd.read_csv(path)
+        df = read_topk(path)
         df = df.sort_values(["query_id", "rank"], kind="stable")
         for qid, grp in df.groupby("query_id", sort=False):
             top = grp.iloc[0]
@@ -568,11 +571,58 @@ def _rank1_neighbours(
 # --------------------------------------------------------------------------- #
 # Directory driver
 # --------------------------------------------------------------------------- #
+def _no_comparison_row(
+    nid: str = "", sim: float = np.nan, space: str = ""
+) -> Dict[str, object]:
+    """Row for a design that is not compared (no neighbour, below ``tau_high``, or
+    an unparsable design / neighbour)."""
+    return {
+        "nearest_neighbour_id": nid,
+        "nearest_neighbour_similarity": float(sim),
+        "similarity_space": space,
+        "n_sdr_positions": 0,
+        "sdr_identity": np.nan,
+        "n_sdr_mismatches": np.nan,
+        "specificity_divergence": False,
+        "divergent_positions": "",
+    }
+
+
 def _default_save_path(structs_dir: str) -> str:
     d = structs_dir.rstrip(os.sep)
     return os.path.join(os.path.dirname(d), os.path.basename(d) + "_sdr_divergence.csv")
 
 
+class _WorkerAnchorCache:
+    """The anchor-pair cache as seen from the ``sdr_divergence_dir`` worker pool:
+    lookups go through a read-only handle opened lazily for one design and closed
+    by :meth:`close` when that design is done (SQLite connections must not cross a
+    fork, and pool workers live for the whole run); new entries are buffered and
+    handed back to the parent, the cache's single writer."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._cache: Optional[AlignmentCache] = None
+        self._pending: List[Tuple[bytes, bytes, bytes]] = []
+
+    def get(self, key1: bytes, key2: bytes) -> Optional[bytes]:
+        if self._cache is None:
+            self._cache = AlignmentCache(self.path, ANCHOR_PAIRS_CACHE_PARAMS, readonly=True)
+        return self._cache.get(key1, key2)
+
+    def close(self) -> None:
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+
+    def put(self, key1: bytes, key2: bytes, value: bytes) -> None:
+        self._pending.append((key1, key2, value))
+
+    def drain(self) -> List[Tuple[bytes, bytes, bytes]]:
+        pending, self._pending = self._pending, []
+        return pending
+
+
 def sdr_divergence_dir(
     structs_dir: str,
     known_structs_dir: str,
@@ -585,12 +635,16 @@ def sdr_divergence_dir(
     tau_high: float = DEFAULT_TAU_HIGH,
     tau_low: float = DEFAULT_TAU_LOW,
     save_path: Optional[str] = None,
+    alignment_cache: Optional[str] = None,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """SDR divergence for every design in ``structs_dir`` against its nearest
     known-TPS neighbour (rank-1 from the top-k CSVs), written to a CSV keyed by ID.
 
     Requires at least one of ``structural_topk`` / ``sequence_topk``. ``known_structs_dir``
-    supplies the reference structures the neighbour ids resolve to."""
+    supplies the reference structures the neighbour ids resolve to. ``alignment_cache``
+    optionally names a persistent cache file for the design/neighbour anchor alignments.
+    Designs are processed on ``workers`` processes (default: all allocated CPUs)."""
     if not structural_topk and not sequence_topk:
         raise ValueError(
             "Provide at least one of structural_topk / sequence_topk to identify the "
@@ -632,36 +686,32 @@ def sdr_divergence_dir(
         neighbour_cache[nid] = info
         return info
 
-    rows: List[Dict[str, object]] = []
-    n = len(designs)
-    for i, (stem, path) in enumerate(designs.items(), start=1):
-        row: Dict[str, object] = {"ID": stem}
+    # Parse every neighbour a design will be compared against up front, so the
+    # worker processes inherit them instead of each re-parsing its own copies.
+    for stem in designs:
+        nn_entry = nn.get(stem)
+        if nn_entry is not None and nn_entry[1] >= tau_high:
+            _neighbour_info(nn_entry[0])
+
+    # The parent opens the cache first (creating its schema) and stays its only
+    # writer; the rows come back with the anchor entries their workers computed.
+    anchor_cache = (
+        AlignmentCache(alignment_cache, ANCHOR_PAIRS_CACHE_PARAMS)
+        if alignment_cache is not None
+        else None
+    )
+    worker_cache = _WorkerAnchorCache(alignment_cache) if alignment_cache is not None else None
+
+    def _design_row(stem: str, path: str) -> Tuple[Dict[str, object], list]:
+        row: Dict[str, object] = {}
         nn_entry = nn.get(stem)
         if nn_entry is None:
-            row.update({
-                "nearest_neighbour_id": "",
-                "nearest_neighbour_similarity": np.nan,
-                "similarity_space": "",
-                "n_sdr_positions": 0,
-                "sdr_identity": np.nan,
-                "n_sdr_mismatches": np.nan,
-                "specificity_divergence": False,
-                "divergent_positions": "",
-            })
+            row.update(_no_comparison_row())
         else:
             nid, sim, space = nn_entry
             if sim < tau_high:
                 # Below the global floor: not the failure mode this metric targets.
-                row.update({
-                    "nearest_neighbour_id": nid,
-                    "nearest_neighbour_similarity": float(sim),
-                    "similarity_space": space,
-                    "n_sdr_positions": 0,
-                    "sdr_identity": np.nan,
-                    "n_sdr_mismatches": np.nan,
-                    "specificity_divergence": False,
-                    "divergent_positions": "",
-                })
+                row.update(_no_comparison_row(nid, sim, space))
             else:
                 nbr_info = _neighbour_info(nid)
                 try:
@@ -670,26 +720,37 @@ def sdr_divergence_dir(
                     print(f"  [warn] could not parse design '{stem}': {exc}")
                     design_info = None
                 if nbr_info is None or design_info is None:
-                    row.update({
-                        "nearest_neighbour_id": nid,
-                        "nearest_neighbour_similarity": float(sim),
-                        "similarity_space": space,
-                        "n_sdr_positions": 0,
-                        "sdr_identity": np.nan,
-                        "n_sdr_mismatches": np.nan,
-                        "specificity_divergence": False,
-                        "divergent_positions": "",
-                    })
+                    row.update(_no_comparison_row(nid, sim, space))
                 else:
-                    row.update(sdr_divergence_one(
-                        design_info, nid, nbr_info, sim, space,
-                        panel=panel, panel_cutoff=panel_cutoff,
-                        map_tolerance=map_tolerance,
-                        tau_high=tau_high, tau_low=tau_low,
-                    ))
+                    try:
+                        row.update(sdr_divergence_one(
+                            design_info, nid, nbr_info, sim, space,
+                            panel=panel, panel_cutoff=panel_cutoff,
+                            map_tolerance=map_tolerance,
+                            tau_high=tau_high, tau_low=tau_low,
+                            alignment_cache=worker_cache,
+                        ))
+                    finally:
+                        if worker_cache is not None:
+                            worker_cache.close()
+        return row, (worker_cache.drain() if worker_cache is not None else [])
+
+    results, _ = map_structures(
+        _design_row,
+        designs,
+        lambda: (_no_comparison_row(), []),
+        workers=workers,
+        id_column=None,
+        failure="SDR comparison failed for",
+    )
+    rows: List[Dict[str, object]] = []
+    for stem, (row, new_anchors) in zip(designs, results):
+        row["ID"] = stem
         rows.append(row)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+        if anchor_cache is not None:
+            anchor_cache.put_many(new_anchors)
+    if anchor_cache is not None:
+        anchor_cache.close()
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
     if save_path is None:
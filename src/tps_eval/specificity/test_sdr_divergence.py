@@ -16,10 +16,14 @@ import numpy as np
 import pandas as pd
 
 
+from tps_eval.data.alignment_cache import AlignmentCache
 from tps_eval.specificity.sdr_divergence import (
+    ANCHOR_PAIRS_CACHE_PARAMS,
     Panel,
     ResidueInfo,
     _rank1_neighbours,
+    _WorkerAnchorCache,
+    _seq_anchor_pairs,
     _strip_chain_suffix,
     _to_similarity,
     load_panel,
@@ -244,6 +248,42 @@ def test_structure_derived_panel_geometry():
     print("ok structure-derived panel geometry (cutoff)")
 
 
+def test_seq_anchor_pairs_alignment_cache():
+    with tempfile.TemporaryDirectory() as d:
+        dp, npth = os.path.join(d, "design.pdb"), os.path.join(d, "nbr.pdb")
+        _write_pdb(dp, "ACDEFGHIKL", [(float(i), 0.0, 0.0) for i in range(10)])
+        _write_pdb(npth, "ACDEGHIKLM", [(float(i), 1.0, 0.0) for i in range(10)])
+        design, nbr = ResidueInfo(dp), ResidueInfo(npth)
+        expected = _seq_anchor_pairs(design, nbr)
+        cache_path = os.path.join(d, "aln.sqlite")
+        with AlignmentCache(cache_path, ANCHOR_PAIRS_CACHE_PARAMS) as cache:
+            assert _seq_anchor_pairs(design, nbr, cache) == expected  # miss -> stored
+            assert len(cache) == 1
+            assert _seq_anchor_pairs(design, nbr, cache) == expected  # hit
+            assert len(cache) == 1
+    print("ok anchor-pair alignment cache")
+
+
+def test_worker_anchor_cache_closes_its_handle():
+    with tempfile.TemporaryDirectory() as d:
+        dp, npth = os.path.join(d, "design.pdb"), os.path.join(d, "nbr.pdb")
+        _write_pdb(dp, "ACDEFGHIKL", [(float(i), 0.0, 0.0) for i in range(10)])
+        _write_pdb(npth, "ACDEGHIKLM", [(float(i), 1.0, 0.0) for i in range(10)])
+        design, nbr = ResidueInfo(dp), ResidueInfo(npth)
+        cache_path = os.path.join(d, "aln.sqlite")
+        with AlignmentCache(cache_path, ANCHOR_PAIRS_CACHE_PARAMS) as cache:
+            expected = _seq_anchor_pairs(design, nbr, cache)
+        worker = _WorkerAnchorCache(cache_path)
+        assert _seq_anchor_pairs(design, nbr, worker) == expected   # served read-only
+        assert worker._cache is not None and worker.drain() == []
+        worker.close()
+        assert worker._cache is None
+        worker.close()                                              # idempotent
+        assert _seq_anchor_pairs(design, nbr, worker) == expected   # reopens on demand
+        worker.close()
+    print("ok worker anchor cache handle lifetime")
+
+
 if __name__ == "__main__":
     test_to_similarity()
     test_panel_match_and_indices()
@@ -253,4 +293,6 @@ if __name__ == "__main__":
     test_load_panel_skips_comments()
     test_strip_chain_suffix()
     test_structure_derived_panel_geometry()
+    test_seq_anchor_pairs_alignment_cache()
+    test_worker_anchor_cache_closes_its_handle()
     print("\nAll SDR-divergence tests passed.")
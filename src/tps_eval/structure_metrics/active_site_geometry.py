@@ -11,8 +11,9 @@ metals or substrate need be modelled).
 
 For each structure we
 
-1. parse it with Biopython (reusing the af_output/flat auto-detection and the
-   ID-stem convention from the neighbouring structure tools),
+1. load it (from the directory's structure index when present, else parsed with
+   Biopython; reusing the af_output/flat auto-detection and the ID-stem
+   convention from the neighbouring structure tools),
 2. derive the 1-letter sequence + per-residue atom access,
 3. run the SHARED motif localizer (``sequence_metrics.motif_localization``) to
    find the DDXXD-family and NSE/DTE motifs and their metal-coordinating residue
@@ -55,29 +56,26 @@ import argparse
 import glob
 import os
 import sys
-import warnings
 from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from Bio.PDB import MMCIFParser, PDBParser, Superimposer
-from Bio.PDB.Polypeptide import three_to_index, index_to_one
-from Bio.PDB.PDBExceptions import PDBConstructionWarning
+from Bio.PDB import Superimposer
 
 # Reuse the sequence-metrics shared motif localization (single source of truth).
 
 from tps_eval.sequence_metrics.motif_localization import (  # noqa: E402
     DDXXD_COORDINATING_OFFSETS,
     NSE_DTE_COORDINATING_OFFSETS,
+    MotifMatch,
     coordinating_indices,
     locate_ddxxd,
     locate_nse_dte,
 )
-
-_PDB_PARSER = PDBParser(QUIET=True)
-_CIF_PARSER = MMCIFParser(QUIET=True)
+from tps_eval.structure_metrics.parallel import map_structures
+from tps_eval.structure_metrics.structure_index import load_structure
 
 COLUMNS = [
     "ID",
@@ -106,18 +104,6 @@ COORDINATING_OXYGEN_ATOMS: Dict[str, Tuple[str, ...]] = {
 }
 
 
-def _parser_for(path: str):
-    return _CIF_PARSER if path.lower().endswith((".cif", ".mmcif")) else _PDB_PARSER
-
-
-def _three_to_one(resname: str) -> str:
-    """3-letter residue name -> 1-letter code, 'X' for anything non-standard."""
-    try:
-        return index_to_one(three_to_index(resname))
-    except KeyError:
-        return "X"
-
-
 def structure_sequence_residues_atoms(
     structure_path: str,
 ) -> Tuple[str, list, np.ndarray]:
@@ -126,30 +112,21 @@ def structure_sequence_residues_atoms(
     * ``sequence`` — 1-letter sequence of the protein residues of the first model,
       in chain order (HETATM ions/ligands/water skipped), matching the other
       structure tools' sequence derivation.
-    * ``residues`` — the index-aligned list of Biopython ``Residue`` objects (so
-      we can reach into their side-chain atoms by name).
+    * ``residues`` — the index-aligned list of residue views
+      (``structure_index.IndexedResidue``, Biopython ``Residue`` accessors) so we
+      can reach into their side-chain atoms by name.
     * ``all_atom_coords`` — (N, 3) array of every PROTEIN atom coordinate in the
       first model (used for the metal-point-void clearance check).
+
+    HETATM ions/ligands/water are skipped. The structure comes from the
+    directory's structure index when one is fresh, else it is parsed.
     """
-    parser = _parser_for(structure_path)
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", PDBConstructionWarning)
-        structure = parser.get_structure("s", structure_path)
-    model = next(iter(structure))  # first model only (predicted structs write one)
-
-    seq_chars: List[str] = []
-    residues: list = []
-    all_atom_coords: List[np.ndarray] = []
-    for chain in model:
-        for residue in chain:
-            if residue.id[0] != " ":  # skip HETATM (ions/ligands/water)
-                continue
-            seq_chars.append(_three_to_one(residue.get_resname()))
-            residues.append(residue)
-            for atom in residue:
-                all_atom_coords.append(np.asarray(atom.get_coord(), dtype=float))
-    coords = np.vstack(all_atom_coords) if all_atom_coords else np.empty((0, 3))
-    return "".join(seq_chars), residues, coords
+    structure = load_structure(structure_path)  # first model only (predicted structs write one)
+    return (
+        structure.polymer_sequence(),
+        structure.residues(),
+        structure.polymer_atom_coords(),
+    )
 
 
 def _coordinating_oxygens(indices: List[int], residues: list) -> np.ndarray:
@@ -185,16 +162,37 @@ def coordinating_indices_relaxed(sequence: str) -> Optional[List[int]]:
     them and treat NSE/DTE as an optional refinement.
 
     Returns None only when DDXXD is absent."""
-    ddxxd = locate_ddxxd(sequence)
+    return coordinating_indices_from_matches(locate_ddxxd(sequence), locate_nse_dte(sequence))
+
+
+def coordinating_indices_from_matches(
+    ddxxd: Optional[MotifMatch], nse: Optional[MotifMatch]
+) -> Optional[List[int]]:
+    """``coordinating_indices_relaxed`` for already-localized motifs (None = absent)."""
     if ddxxd is None:
         return None
     idx = coordinating_indices(ddxxd, DDXXD_COORDINATING_OFFSETS)
-    nse = locate_nse_dte(sequence)
     if nse is not None:
         idx = idx + coordinating_indices(nse, NSE_DTE_COORDINATING_OFFSETS)
     return idx
 
 
+def cage_oxygens(sequence: str, residues: list) -> Optional[np.ndarray]:
+    """(n, 3) side-chain oxygens of the relaxed coordinating residues (the cage the
+    metal point is the centroid of); None when DDXXD is absent, possibly empty."""
+    idx = coordinating_indices_relaxed(sequence)
+    if idx is None:
+        return None
+    return _coordinating_oxygens(idx, residues)
+
+
+def metal_point_from_oxygens(oxygens: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Centroid of ``cage_oxygens``' result; None when there is nothing to average."""
+    if oxygens is None or len(oxygens) == 0:
+        return None
+    return oxygens.mean(axis=0)
+
+
 def metal_point(sequence: str, residues: list) -> Optional[np.ndarray]:
     """CANONICAL carboxylate-cage metal point: the centroid of the relaxed
     coordinating-residue side-chain oxygens (DDXXD + NSE/DTE-when-matched). Single
@@ -203,13 +201,7 @@ def metal_point(sequence: str, residues: list) -> Optional[np.ndarray]:
 
     None when DDXXD is absent or no coordinating oxygen is found. For a both-motif
     structure this is identical to the centroid of the strict both-motif oxygens."""
-    idx = coordinating_indices_relaxed(sequence)
-    if idx is None:
-        return None
-    oxygens = _coordinating_oxygens(idx, residues)
-    if len(oxygens) == 0:
-        return None
-    return oxygens.mean(axis=0)
+    return metal_point_from_oxygens(cage_oxygens(sequence, residues))
 
 
 def _coordinating_indices_both(sequence: str) -> Optional[List[int]]:
@@ -303,6 +295,32 @@ def active_site_geometry(
     motif is absent or no coordinating oxygen is found. If ``templates`` is given,
     also reports the best catalytic-constellation RMSD and the winning template."""
     sequence, residues, all_atom_coords = structure_sequence_residues_atoms(structure_path)
+    return active_site_geometry_from_parts(
+        sequence, residues, all_atom_coords, cage_oxygens(sequence, residues), templates=templates
+    )
+
+
+def failed_row() -> Dict[str, float]:
+    """Row recorded for a structure that could not be parsed."""
+    return {
+        "carboxylate_convergence_radius": np.nan,
+        "n_coordinating_oxygens": 0,
+        "metal_point_void": np.nan,
+        "catalytic_constellation_rmsd": np.nan,
+        "best_template": "",
+        "n_residues": 0,
+    }
+
+
+def active_site_geometry_from_parts(
+    sequence: str,
+    residues: list,
+    all_atom_coords: np.ndarray,
+    oxygens: Optional[np.ndarray],
+    templates: Optional["OrderedDict[str, OrderedDict[Tuple[int, str], np.ndarray]]"] = None,
+) -> Dict[str, float]:
+    """``active_site_geometry`` on an already-loaded structure: ``oxygens`` is the
+    ``cage_oxygens`` result for it (None when DDXXD is absent)."""
     result: Dict[str, float] = {
         "carboxylate_convergence_radius": np.nan,
         "n_coordinating_oxygens": 0,
@@ -317,11 +335,9 @@ def active_site_geometry(
     # the cage all-NaN on real DDXXD-only TPS (e.g. TEAS/5EAT). For a both-motif
     # structure this set is identical to the strict one, so both-motif metrics are
     # unchanged (the relaxation is a strict superset).
-    idx = coordinating_indices_relaxed(sequence)
-    if idx is None:
+    if oxygens is None:
         return result  # DDXXD absent -> nothing to anchor on
 
-    oxygens = _coordinating_oxygens(idx, residues)
     result["n_coordinating_oxygens"] = int(len(oxygens))
     if len(oxygens) == 0:
         return result
@@ -396,11 +412,13 @@ def active_site_geometry_dir(
     *,
     save_path: Optional[str] = None,
     template_ids: Optional[List[str]] = None,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Carboxylate-cage geometry for every structure in ``structs_dir``; CSV keyed by ID.
 
     If ``template_ids`` is given, also computes the catalytic-constellation RMSD of
-    every structure against templates built from those reference IDs."""
+    every structure against templates built from those reference IDs (built once in
+    the parent; the ``workers`` processes inherit them)."""
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -418,27 +436,13 @@ def active_site_geometry_dir(
         else:
             print("[warn] no usable templates built; catalytic_constellation_rmsd will be NaN")
 
-    rows: List[Dict[str, float]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = active_site_geometry(path, templates=templates)
-        except Exception as exc:  # malformed/unparsable -> NaN row, keep going
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = {
-                "carboxylate_convergence_radius": np.nan,
-                "n_coordinating_oxygens": 0,
-                "metal_point_void": np.nan,
-                "catalytic_constellation_rmsd": np.nan,
-                "best_template": "",
-                "n_residues": 0,
-            }
-            n_failed += 1
-        stats["ID"] = str(stem).strip()
-        rows.append(stats)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    # Malformed/unparsable -> NaN row, keep going.
+    rows, n_failed = map_structures(
+        lambda stem, path: active_site_geometry(path, templates=templates),
+        structures,
+        failed_row,
+        workers=workers,
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
 
@@ -26,13 +26,14 @@ import glob
 import os
 import shutil
 import subprocess
-import sys
 import tempfile
 import warnings
 
 import numpy as np
 import pandas as pd
 
+from tps_eval.structure_metrics.parallel import map_structures
+
 # Output column order (ID first, then the filtration metrics).
 COLUMNS = [
     "ID",
@@ -193,14 +194,44 @@ def _default_save_path(structs_dir):
     return os.path.join(os.path.dirname(d), os.path.basename(d) + "_aggregation.csv")
 
 
+def record_a3d_fixtures(structs_dir, fixtures_dir):
+    """Record A3D static-mode outputs as parity fixtures for ``aggregation_native``:
+    per structure, the cleaned PDB A3D scored (``<ID>.pdb``) and its per-residue
+    ``A3D.csv`` (``<ID>.a3d.csv``). Needs the ``aggrescan`` binary. Returns the IDs
+    recorded; structures A3D fails on are reported and skipped."""
+    structures, _ = _collect_structures(structs_dir)
+    if not os.path.isdir(fixtures_dir):
+        os.makedirs(fixtures_dir)
+    recorded = []
+    for stem, path in structures:
+        pdb_path = os.path.join(fixtures_dir, stem + ".pdb")
+        work_dir = tempfile.mkdtemp(prefix="a3d_")
+        try:
+            _prepare_pdb(path, pdb_path)
+            shutil.copyfile(_run_a3d_static(pdb_path, os.path.join(work_dir, "run")),
+                            os.path.join(fixtures_dir, stem + ".a3d.csv"))
+            recorded.append(stem)
+        except Exception as exc:
+            print("A3D failed for %s: %s" % (stem, exc))
+            if os.path.exists(pdb_path):
+                os.remove(pdb_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    print("Recorded %d A3D fixture(s) in %s" % (len(recorded), fixtures_dir))
+    return recorded
+
+
 def extract_aggregation_dir(structs_dir, save_path=None, save_residue_scores=False,
-                            residue_scores_dir=None):
+                            residue_scores_dir=None, workers=None):
     """Run A3D (static mode) on every structure in `structs_dir` and write a CSV
     keyed by ID with per-structure aggregation-propensity scalars.
 
     save_residue_scores: if True, also dump each structure's per-residue A3D
     score array to `residue_scores_dir` (one ``<ID>.csv`` per structure) for
     hotspot visualization. Default off.
+
+    workers: number of A3D runs in flight at once (default: every CPU allocated
+    to the job); each structure is scored in its own temp dir.
     """
     structures, mode = _collect_structures(structs_dir)
     if not structures:
@@ -221,10 +252,7 @@ def extract_aggregation_dir(structs_dir, save_path=None, save_residue_scores=Fal
             os.makedirs(residue_scores_dir)
         print("Per-residue scores -> %s" % residue_scores_dir)
 
-    rows = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures, start=1):
+    def _score(stem, path):
         tmp_root = tempfile.mkdtemp(prefix="a3d_")
         try:
             # Always normalize through Biopython (handles cif->pdb AND strips the
@@ -234,22 +262,24 @@ def extract_aggregation_dir(structs_dir, save_path=None, save_residue_scores=Fal
             work_dir = os.path.join(tmp_root, "run")
             csv_path = _run_a3d_static(pdb_path, work_dir)
             scores = _parse_a3d_csv(csv_path)
-            stats = _summarize(scores)
             if save_residue_scores and scores.size:
                 np.savetxt(
                     os.path.join(residue_scores_dir, stem + ".csv"),
                     scores, fmt="%.4f", delimiter=",",
                 )
-        except Exception as exc:  # A3D failure -> NaN row, keep going
-            print("  [warn] A3D failed for %s: %s" % (os.path.basename(path), exc))
-            stats = _summarize(np.asarray([], dtype=float))
-            n_failed += 1
+            return _summarize(scores)
         finally:
             shutil.rmtree(tmp_root, ignore_errors=True)
-        stats["ID"] = stem
-        rows.append(stats)
-        print("  processed %d/%d (%s)" % (i, n, stem))
-        sys.stdout.flush()
+
+    # A3D failure -> NaN row, keep going.
+    rows, n_failed = map_structures(
+        _score,
+        structures,
+        lambda: _summarize(np.asarray([], dtype=float)),
+        workers=workers,
+        failure="A3D failed for",
+        progress_every=1,
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
 
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""In-process re-implementation of the Aggrescan3D STATIC score (numpy only).
+
+EXPERIMENTAL and NOT wired into ``aggregation.py``: the metric is still scored by
+the ``aggrescan`` subprocess until this module passes the parity test below.
+
+``aggregation.py`` scores each structure by writing a cleaned PDB, starting an
+``aggrescan`` subprocess (a fresh Python 2.7 interpreter + freesasa) and parsing
+its result files. At tens of thousands of structures the startup and file I/O,
+not the scoring, dominate. This module computes the same kind of per-residue
+score directly from the parsed coordinates, so a worker process scores structure
+after structure without leaving Python:
+
+1. Relative solvent accessibility per residue: a vectorised Shrake-Rupley SASA
+   (golden-spiral test points, naccess-style atomic radii, 1.4 A probe), summed
+   per residue and divided by the naccess Ala-X-Ala reference area of its type.
+   Hydrogens, waters/heteroatoms and the terminal ``OXT`` are ignored, as in the
+   cleaned PDB the subprocess path feeds to A3D.
+2. Intrinsic aggregation propensity: the AGGRESCAN a3v scale, applied to the
+   residues at least ``EXPOSURE_CUTOFF`` exposed (buried residues contribute
+   nothing and score 0).
+3. Structural smoothing: every exposed residue's score is the sum of
+   ``a3v * RSA`` over the exposed residues whose side-chain centres lie within
+   ``SPHERE_RADIUS_A`` of its own, weighted by a Gaussian in that distance --
+   one residue x residue neighbour matrix product per structure.
+
+The radius, exposure cut-off and Gaussian width are module constants taken from
+the published A3D static-mode description; they still have to be calibrated
+against real A3D output. The parity workflow:
+
+1. ``python -m tps_eval.structure_metrics.aggregation_native record <structs_dir>``
+   in the ``aggrescan3d`` env runs A3D on a few fixture structures and writes the
+   cleaned PDB + A3D.csv of each to ``PARITY_FIXTURES_DIR`` (check them in).
+2. ``... aggregation_native calibrate`` grid-searches the three constants against
+   the recorded scores and prints the best setting and its per-residue error.
+3. ``test_aggregation_native.test_parity_with_recorded_a3d_outputs`` asserts every
+   recorded residue agrees within ``PARITY_TOLERANCE``.
+
+IMPORTANT: like ``aggregation.py`` this may be imported in the PYTHON 2.7
+``aggrescan3d`` env. Keep it Python-2.7 compatible: no f-strings, no py3-only
+typing, no ``from __future__ import annotations``.
+"""
+
+import argparse
+import csv
+import itertools
+import math
+import os
+import warnings
+
+import numpy as np
+
+# AGGRESCAN intrinsic aggregation-propensity scale (a3v; Conchillo-Sole et al. 2007).
+A3V_SCALE = {
+    "ILE": 1.822, "PHE": 1.754, "VAL": 1.594, "LEU": 1.380, "TYR": 1.159,
+    "TRP": 1.037, "MET": 0.910, "CYS": 0.604, "ALA": -0.036, "THR": -0.159,
+    "SER": -0.294, "PRO": -0.334, "GLY": -0.535, "LYS": -0.931, "HIS": -1.033,
+    "GLN": -1.231, "ARG": -1.240, "ASN": -1.302, "GLU": -1.412, "ASP": -1.836,
+}
+
+# naccess all-atom reference areas (A^2) of residue X in an Ala-X-Ala tripeptide.
+REFERENCE_SASA = {
+    "ALA": 107.95, "ARG": 238.76, "ASN": 143.94, "ASP": 140.39, "CYS": 134.28,
+    "GLN": 178.50, "GLU": 172.25, "GLY": 80.10, "HIS": 182.88, "ILE": 175.12,
+    "LEU": 178.63, "LYS": 200.81, "MET": 194.15, "PHE": 199.48, "PRO": 136.13,
+    "SER": 116.50, "THR": 139.27, "TRP": 249.36, "TYR": 212.76, "VAL": 151.44,
+}
+
+PROBE_RADIUS_A = 1.4
+N_SPHERE_POINTS = 100
+SPHERE_RADIUS_A = 10.0
+EXPOSURE_CUTOFF = 0.10
+# Gaussian distance weight exp(-d^2 / (2 sigma^2)) inside the sphere.
+WEIGHT_SIGMA_A = 5.0
+
+# naccess radii: N 1.65, O 1.40, S 1.85; carbon 1.87 (aliphatic) or 1.76 (carbonyl /
+# aromatic / guanidinium carbons listed below).
+_ELEMENT_RADIUS = {"N": 1.65, "O": 1.40, "S": 1.85, "SE": 1.85, "C": 1.87}
+_SP2_CARBONS = {
+    "PHE": ("CG", "CD1", "CD2", "CE1", "CE2", "CZ"),
+    "TYR": ("CG", "CD1", "CD2", "CE1", "CE2", "CZ"),
+    "TRP": ("CG", "CD1", "CD2", "CE2", "CE3", "CZ2", "CZ3", "CH2"),
+    "HIS": ("CG", "CD2", "CE1"),
+    "ASP": ("CG",), "GLU": ("CD",), "ASN": ("CG",), "GLN": ("CD",), "ARG": ("CZ",),
+}
+_BACKBONE = ("N", "CA", "C", "O")
+
+# Atoms per block in the SASA neighbour search (bounds the block x n_atoms matrix).
+_ATOM_BLOCK = 256
+
+# Recorded A3D outputs (<ID>.pdb + <ID>.a3d.csv) the parity test compares against,
+# and the largest per-residue |native - A3D| it accepts (A3D static scores span
+# roughly -5..+5 per residue).
+PARITY_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "a3d_parity_fixtures")
+PARITY_TOLERANCE = 0.1
+
+# Grid ``calibrate`` searches by default.
+CALIBRATION_RADII_A = tuple(np.arange(6.0, 14.5, 1.0))
+CALIBRATION_CUTOFFS = tuple(np.arange(0.0, 0.301, 0.025))
+CALIBRATION_SIGMAS_A = tuple(np.arange(2.0, 10.5, 1.0)) + (float("inf"),)
+
+
+def atom_radius(residue_name, atom_name, element):
+    """naccess-style van der Waals radius of one heavy atom."""
+    element = (element or atom_name[:1]).upper()
+    if element == "C":
+        if atom_name == "C" or atom_name in _SP2_CARBONS.get(residue_name, ()):
+            return 1.76
+        return 1.87
+    return _ELEMENT_RADIUS.get(element, 1.80)
+
+
+def sphere_points(n=N_SPHERE_POINTS):
+    """``n`` near-uniform unit vectors (golden-section spiral)."""
+    k = np.arange(n, dtype=float) + 0.5
+    z = 1.0 - 2.0 * k / n
+    r = np.sqrt(1.0 - z * z)
+    phi = k * math.pi * (3.0 - math.sqrt(5.0))
+    return np.column_stack([r * np.cos(phi), r * np.sin(phi), z])
+
+
+def shrake_rupley(coords, radii, probe=PROBE_RADIUS_A, n_points=N_SPHERE_POINTS):
+    """Per-atom solvent-accessible surface area (A^2), Shrake-Rupley.
+
+    Each atom's expanded sphere (radius + probe) carries ``n_points`` test points;
+    a point is buried if it lies inside any neighbour's expanded sphere. Neighbours
+    and points are handled a block of atoms at a time with padded neighbour arrays,
+    so memory stays at block x n_atoms + block x points x max_neighbours."""
+    coords = np.asarray(coords, dtype=float)
+    expanded = np.asarray(radii, dtype=float) + probe
+    n = len(coords)
+    area = np.zeros(n)
+    if n == 0:
+        return area
+    unit = sphere_points(n_points)
+    for b0 in range(0, n, _ATOM_BLOCK):
+        block = np.arange(b0, min(n, b0 + _ATOM_BLOCK))
+        d2 = ((coords[block, None, :] - coords[None, :, :]) ** 2).sum(axis=2)
+        reach = (expanded[block, None] + expanded[None, :]) ** 2
+        close = d2 < reach
+        close[np.arange(len(block)), block] = False
+        counts = close.sum(axis=1)
+        width = max(1, int(counts.max()))
+        # Padded neighbour table; padding points at an unreachable atom.
+        table = np.full((len(block), width), -1, dtype=int)
+        rows, cols = np.nonzero(close)
+        slot = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        table[rows, slot] = cols
+        valid = table >= 0
+        safe = np.where(valid, table, 0)
+        nb_xyz = coords[safe]                                  # (B, K, 3)
+        nb_r2 = np.where(valid, expanded[safe] ** 2, -1.0)     # (B, K)
+        points = coords[block, None, :] + expanded[block, None, None] * unit[None, :, :]
+        pd2 = ((points[:, :, None, :] - nb_xyz[:, None, :, :]) ** 2).sum(axis=3)
+        buried = (pd2 < nb_r2[:, None, :]).any(axis=2)         # (B, P)
+        exposed_fraction = 1.0 - buried.mean(axis=1)
+        area[block] = 4.0 * math.pi * expanded[block] ** 2 * exposed_fraction
+    return area
+
+
+def residues_from_structure(structure):
+    """Standard residues of the first model as a list of
+    ``(chain_id, residue_label, residue_name, atom_coords, atom_radii, centre)``;
+    the label is the residue number plus any insertion code, as in A3D.csv.
+
+    Heavy atoms only, ``OXT`` dropped; the centre is the side-chain centroid (CA for
+    glycine or a residue without side-chain atoms)."""
+    model = next(iter(structure))
+    out = []
+    for chain in model:
+        for residue in chain:
+            name = residue.get_resname().strip().upper()
+            if residue.id[0] != " " or name not in A3V_SCALE:
+                continue
+            xyz, radii, side = [], [], []
+            ca = None
+            for atom in residue:
+                element = (atom.element or "").strip().upper()
+                atom_name = atom.get_name().strip()
+                if element in ("H", "D") or atom_name == "OXT":
+                    continue
+                xyz.append(atom.get_coord())
+                radii.append(atom_radius(name, atom_name, element))
+                if atom_name == "CA":
+                    ca = atom.get_coord()
+                elif atom_name not in _BACKBONE:
+                    side.append(atom.get_coord())
+            if not xyz:
+                continue
+            if side:
+                centre = np.mean(np.asarray(side, dtype=float), axis=0)
+            elif ca is not None:
+                centre = np.asarray(ca, dtype=float)
+            else:
+                centre = np.mean(np.asarray(xyz, dtype=float), axis=0)
+            label = "%d%s" % (residue.id[1], residue.id[2].strip())
+            out.append((chain.id, label, name, np.asarray(xyz, dtype=float),
+                        np.asarray(radii, dtype=float), centre))
+    return out
+
+
+def relative_sasa(residues):
+    """Relative (all-atom) SASA per residue: Shrake-Rupley area over the naccess
+    reference area of the residue type (can exceed 1 at termini / loops)."""
+    if not residues:
+        return np.zeros(0)
+    coords = np.concatenate([r[3] for r in residues])
+    radii = np.concatenate([r[4] for r in residues])
+    owner = np.repeat(np.arange(len(residues)), [len(r[3]) for r in residues])
+    per_residue = np.bincount(owner, weights=shrake_rupley(coords, radii),
+                              minlength=len(residues))
+    reference = np.asarray([REFERENCE_SASA[r[2]] for r in residues])
+    return per_residue / reference
+
+
+def smoothed_scores(names, rsa, centres, radius=SPHERE_RADIUS_A, cutoff=EXPOSURE_CUTOFF,
+                    sigma=WEIGHT_SIGMA_A):
+    """Per-residue static score from the residue types, their RSA and centres
+    (``sigma`` = inf weighs every neighbour in the sphere equally)."""
+    rsa = np.asarray(rsa, dtype=float)
+    centres = np.asarray(centres, dtype=float).reshape(-1, 3)
+    exposed = rsa >= cutoff
+    contribution = np.where(exposed, np.asarray([A3V_SCALE[n] for n in names]) * rsa, 0.0)
+    d2 = ((centres[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2)
+    weights = np.exp(-d2 / (2.0 * sigma ** 2)) * (d2 <= radius ** 2)
+    return np.where(exposed, weights.dot(contribution), 0.0)
+
+
+def load_structure(path):
+    from Bio.PDB import MMCIFParser, PDBParser
+    from Bio.PDB.PDBExceptions import PDBConstructionWarning
+
+    lower = path.lower()
+    parser = MMCIFParser(QUIET=True) if lower.endswith((".cif", ".mmcif")) else PDBParser(QUIET=True)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", PDBConstructionWarning)
+        return parser.get_structure("s", path)
+
+
+def residue_scores(path):
+    """Per-residue native static scores of one structure file (.pdb / .cif), in
+    chain/residue order -- the analogue of the score column of A3D.csv."""
+    residues = residues_from_structure(load_structure(path))
+    if not residues:
+        return np.zeros(0)
+    return smoothed_scores([r[2] for r in residues], relative_sasa(residues),
+                           np.asarray([r[5] for r in residues]))
+
+
+# --------------------------------------------------------------------------- #
+# Parity against recorded A3D outputs                                         #
+# --------------------------------------------------------------------------- #
+def read_a3d_csv(csv_path):
+    """``[((chain, residue_label), score)]`` from an A3D.csv
+    (protein,chain,residue,residue_name,score)."""
+    rows = []
+    with open(csv_path, "r") as fh:
+        reader = csv.reader(fh)
+        next(reader, None)
+        for row in reader:
+            if len(row) < 5:
+                continue
+            try:
+                rows.append(((row[1].strip(), row[2].strip()), float(row[4])))
+            except ValueError:
+                continue
+    return rows
+
+
+def load_parity_fixtures(fixtures_dir=PARITY_FIXTURES_DIR):
+    """``[(ID, pdb_path, [((chain, label), A3D score)])]`` for every ``<ID>.pdb``
+    with a recorded ``<ID>.a3d.csv`` (empty if none are recorded)."""
+    if not os.path.isdir(fixtures_dir):
+        return []
+    fixtures = []
+    for name in sorted(os.listdir(fixtures_dir)):
+        if not name.endswith(".a3d.csv"):
+            continue
+        stem = name[:-len(".a3d.csv")]
+        pdb_path = os.path.join(fixtures_dir, stem + ".pdb")
+        if os.path.isfile(pdb_path):
+            fixtures.append((stem, pdb_path, read_a3d_csv(os.path.join(fixtures_dir, name))))
+    return fixtures
+
+
+def _prepared_fixtures(fixtures):
+    """Constant-independent inputs per fixture: (ID, names, RSA, centres, index of
+    each recorded residue in the native residue list or -1, recorded scores)."""
+    prepared = []
+    for stem, pdb_path, recorded in fixtures:
+        residues = residues_from_structure(load_structure(pdb_path))
+        position = dict(((r[0], r[1]), i) for i, r in enumerate(residues))
+        index = np.asarray([position.get(key, -1) for key, _ in recorded], dtype=int)
+        prepared.append((stem, [r[2] for r in residues], relative_sasa(residues),
+                         np.asarray([r[5] for r in residues]).reshape(-1, 3), index,
+                         np.asarray([score for _, score in recorded], dtype=float)))
+    return prepared
+
+
+def _parity(prepared, radius, cutoff, sigma):
+    """``{ID: (max |native - A3D|, n_residues, n_unmatched)}``; a recorded residue
+    the native parser does not see counts as unmatched (and as an infinite error)."""
+    report = {}
+    for stem, names, rsa, centres, index, reference in prepared:
+        scores = smoothed_scores(names, rsa, centres, radius, cutoff, sigma) if names else np.zeros(0)
+        matched = index >= 0
+        diff = np.abs(scores[index[matched]] - reference[matched])
+        n_unmatched = int((~matched).sum())
+        worst = float("inf") if n_unmatched else (float(diff.max()) if diff.size else 0.0)
+        report[stem] = (worst, int(index.size), n_unmatched)
+    return report
+
+
+def parity(fixtures, radius=SPHERE_RADIUS_A, cutoff=EXPOSURE_CUTOFF, sigma=WEIGHT_SIGMA_A):
+    """Per-fixture agreement of the native score with the recorded A3D scores:
+    ``{ID: (max |native - A3D|, n_residues, n_unmatched)}``."""
+    return _parity(_prepared_fixtures(fixtures), radius, cutoff, sigma)
+
+
+def calibrate(fixtures, radii=CALIBRATION_RADII_A, cutoffs=CALIBRATION_CUTOFFS,
+              sigmas=CALIBRATION_SIGMAS_A):
+    """Grid search of (radius, cutoff, sigma) minimising the largest per-residue
+    |native - A3D| over all fixtures; returns ``(worst error, radius, cutoff, sigma)``."""
+    prepared = _prepared_fixtures(fixtures)
+    best = None
+    for radius, cutoff, sigma in itertools.product(radii, cutoffs, sigmas):
+        report = _parity(prepared, radius, cutoff, sigma)
+        worst = max([v[0] for v in report.values()] or [0.0])
+        if best is None or worst < best[0]:
+            best = (worst, float(radius), float(cutoff), float(sigma))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record A3D parity fixtures, calibrate "
+                                     "the native static score against them, or check it.")
+    sub = parser.add_subparsers(dest="command")
+    record = sub.add_parser("record", help="Run A3D (aggrescan3d env) on a structs dir "
+                            "and store each cleaned PDB + A3D.csv as a fixture.")
+    record.add_argument("structs_dir")
+    for command in ("record", "calibrate", "check"):
+        p = record if command == "record" else sub.add_parser(command)
+        p.add_argument("--fixtures_dir", default=PARITY_FIXTURES_DIR)
+    args = parser.parse_args()
+    if args.command is None:
+        parser.error("a command is required")
+
+    if args.command == "record":
+        from tps_eval.structure_metrics.aggregation import record_a3d_fixtures
+
+        record_a3d_fixtures(args.structs_dir, args.fixtures_dir)
+        return
+    fixtures = load_parity_fixtures(args.fixtures_dir)
+    if not fixtures:
+        parser.error("no recorded A3D fixtures in %s" % args.fixtures_dir)
+    if args.command == "calibrate":
+        worst, radius, cutoff, sigma = calibrate(fixtures)
+        print("best: SPHERE_RADIUS_A=%g EXPOSURE_CUTOFF=%g WEIGHT_SIGMA_A=%g -> max "
+              "|native - A3D| = %.4f (tolerance %g)" % (radius, cutoff, sigma, worst,
+                                                        PARITY_TOLERANCE))
+        return
+    for stem, (worst, n, n_unmatched) in sorted(parity(fixtures).items()):
+        print("%s: max |native - A3D| = %.4f over %d residues (%d unmatched)"
+              % (stem, worst, n, n_unmatched))
+
+
+if __name__ == "__main__":
+    main()
@@ -100,6 +100,7 @@ from tps_eval.structure_metrics.active_site_geometry import (
     metal_point as _cage_metal_point,
     structure_sequence_residues_atoms,
 )
+from tps_eval.structure_metrics.parallel import map_structures
 from tps_eval.structure_metrics.plddt import _collect_structures
 
 # Defaults (CLI-overridable). Cutoff is the pocket-shell radius; the cation-pi
@@ -205,6 +206,45 @@ def aromatic_lining(
     """Aromatic / cation-pi pocket-lining metrics for one structure. Counts are NaN
     and ``metal_point_found`` False when the metal point can't be placed."""
     sequence, residues, _ = structure_sequence_residues_atoms(structure_path)
+    return aromatic_lining_from_parts(
+        sequence,
+        residues,
+        _cage_metal_point(sequence, residues),
+        cutoff=cutoff,
+        cation_pi_min=cation_pi_min,
+        cation_pi_max=cation_pi_max,
+        face_angle_deg=face_angle_deg,
+    )
+
+
+def failed_row() -> Dict[str, float]:
+    """Row recorded for a structure that could not be parsed (a red-flag row)."""
+    return {
+        "metal_point_found": False,
+        "n_pocket_residues": np.nan,
+        "n_pocket_aromatics": np.nan,
+        "n_trp": np.nan,
+        "n_tyr": np.nan,
+        "n_phe": np.nan,
+        "n_his": np.nan,
+        "aromatic_fraction": np.nan,
+        "n_inward_facing_aromatics": np.nan,
+        "n_residues": 0,
+    }
+
+
+def aromatic_lining_from_parts(
+    sequence: str,
+    residues: list,
+    metal_point: Optional[np.ndarray],
+    *,
+    cutoff: float = DEFAULT_CUTOFF,
+    cation_pi_min: float = DEFAULT_CATION_PI_MIN,
+    cation_pi_max: float = DEFAULT_CATION_PI_MAX,
+    face_angle_deg: float = DEFAULT_FACE_ANGLE_DEG,
+) -> Dict[str, float]:
+    """``aromatic_lining`` on an already-loaded structure whose cage metal point
+    (None when it can't be placed) is already known."""
     result: Dict[str, float] = {
         "metal_point_found": False,
         "n_pocket_residues": np.nan,
@@ -218,7 +258,6 @@ def aromatic_lining(
         "n_residues": len(sequence),
     }
 
-    metal_point = _cage_metal_point(sequence, residues)
     if metal_point is None:
         return result
     result["metal_point_found"] = True
@@ -279,11 +318,13 @@ def aromatic_lining_dir(
     cation_pi_min: float = DEFAULT_CATION_PI_MIN,
     cation_pi_max: float = DEFAULT_CATION_PI_MAX,
     face_angle_deg: float = DEFAULT_FACE_ANGLE_DEG,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Aromatic / cation-pi pocket-lining for every structure in ``structs_dir``;
     CSV keyed by ID (filename stem / af3 job name). Every structure gets one row;
     structures with no locatable metal point are kept with ``metal_point_found``
-    False and NaN counts (a recorded red flag)."""
+    False and NaN counts (a recorded red flag). Structures are processed on
+    ``workers`` processes (default: all allocated CPUs)."""
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -296,37 +337,19 @@ def aromatic_lining_dir(
         f"face angle <= {face_angle_deg} deg."
     )
 
-    rows: List[Dict[str, float]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = aromatic_lining(
-                path,
-                cutoff=cutoff,
-                cation_pi_min=cation_pi_min,
-                cation_pi_max=cation_pi_max,
-                face_angle_deg=face_angle_deg,
-            )
-        except Exception as exc:  # malformed/unparsable -> red-flag row, keep going
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = {
-                "metal_point_found": False,
-                "n_pocket_residues": np.nan,
-                "n_pocket_aromatics": np.nan,
-                "n_trp": np.nan,
-                "n_tyr": np.nan,
-                "n_phe": np.nan,
-                "n_his": np.nan,
-                "aromatic_fraction": np.nan,
-                "n_inward_facing_aromatics": np.nan,
-                "n_residues": 0,
-            }
-            n_failed += 1
-        stats["ID"] = str(stem).strip()
-        rows.append(stats)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    # Malformed/unparsable -> red-flag row, keep going.
+    rows, n_failed = map_structures(
+        lambda stem, path: aromatic_lining(
+            path,
+            cutoff=cutoff,
+            cation_pi_min=cation_pi_min,
+            cation_pi_max=cation_pi_max,
+            face_angle_deg=face_angle_deg,
+        ),
+        structures,
+        failed_row,
+        workers=workers,
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
 
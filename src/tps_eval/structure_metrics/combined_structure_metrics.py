@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+"""Single-pass runner for the cheap per-structure geometry metrics.
+
+``plddt``, ``radius_of_gyration``, ``motif_structural_distance``,
+``active_site_geometry``, ``aromatic_lining``, ``diphosphate_sensor`` and
+``ion_site_check`` are each a few milliseconds of numpy per structure, yet run as
+separate jobs that each walk and load the same structures directory. This runner
+walks it ONCE: per structure it loads the structure a single time (from the
+directory's structure index when fresh, else parsed), derives the shared state —
+sequence, residue views, the DDXXD / NSE-DTE motif matches, the cage coordinating
+oxygens and the metal point — on first use, and evaluates the selected metric
+plugins on it.
+
+Each plugin is the standalone tool's own per-structure function (its
+``*_from_parts`` split), so every metric still writes its usual
+``<structs_dir>_<metric>.csv`` with the same rows and columns as the standalone
+tool; downstream merges cannot tell the difference. A structure that fails to load
+gets each tool's unparsable row; a plugin that fails on one structure only affects
+that metric's row.
+"""
+
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from tps_eval.sequence_metrics.motif_localization import MotifMatch, locate_ddxxd, locate_nse_dte
+from tps_eval.structure_metrics import (
+    active_site_geometry,
+    aromatic_lining,
+    diphosphate_sensor,
+    ion_site_check,
+    motif_structural_distance,
+    plddt,
+    radius_of_gyration,
+)
+from tps_eval.structure_metrics.parallel import map_structures
+from tps_eval.structure_metrics.structure_index import ParsedStructure, load_structure
+
+# Per-metric options (CLI-overridable), defaulting to the standalone tools' defaults.
+DEFAULT_PARAMS: Dict[str, object] = {
+    "confident_threshold": plddt.CONFIDENT_THRESHOLD,
+    "templates": None,
+    "aromatic_cutoff": aromatic_lining.DEFAULT_CUTOFF,
+    "cation_pi_min": aromatic_lining.DEFAULT_CATION_PI_MIN,
+    "cation_pi_max": aromatic_lining.DEFAULT_CATION_PI_MAX,
+    "face_angle_deg": aromatic_lining.DEFAULT_FACE_ANGLE_DEG,
+    "diphosphate_cutoff": diphosphate_sensor.DEFAULT_CUTOFF,
+    "ry_dist": diphosphate_sensor.DEFAULT_RY_DIST,
+    "site_radius": ion_site_check.DEFAULT_SITE_RADIUS,
+    "coord_cutoff": ion_site_check.DEFAULT_COORD_CUTOFF,
+    "min_coord_contacts": ion_site_check.DEFAULT_MIN_COORD_CONTACTS,
+    "ion_resnames": ion_site_check.DEFAULT_ION_RESNAMES,
+    "diphosphate_resnames": ion_site_check.DEFAULT_DIPHOSPHATE_RESNAMES,
+}
+
+
+class StructureSite:
+    """One structure plus the state the metric plugins share, each derived once on
+    first use (a plugin set without active-site metrics never localizes motifs)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @cached_property
+    def structure(self) -> ParsedStructure:
+        return load_structure(self.path)
+
+    @cached_property
+    def sequence(self) -> str:
+        return self.structure.polymer_sequence()
+
+    @cached_property
+    def residues(self) -> list:
+        return self.structure.residues()
+
+    @cached_property
+    def polymer_atom_coords(self) -> np.ndarray:
+        return self.structure.polymer_atom_coords()
+
+    @cached_property
+    def motifs(self) -> Tuple[Optional[MotifMatch], Optional[MotifMatch]]:
+        """(DDXXD-family, NSE/DTE) first matches; None when absent."""
+        return locate_ddxxd(self.sequence), locate_nse_dte(self.sequence)
+
+    @cached_property
+    def cage_oxygens(self) -> Optional[np.ndarray]:
+        """``active_site_geometry.cage_oxygens`` from the shared motif matches."""
+        idx = active_site_geometry.coordinating_indices_from_matches(*self.motifs)
+        if idx is None:
+            return None
+        return active_site_geometry._coordinating_oxygens(idx, self.residues)
+
+    @cached_property
+    def metal_point(self) -> Optional[np.ndarray]:
+        return active_site_geometry.metal_point_from_oxygens(self.cage_oxygens)
+
+
+def _plddt(site: StructureSite, params: dict) -> Dict[str, object]:
+    return plddt.summarize(plddt.structure_plddts(site.structure), params["confident_threshold"])
+
+
+def _radius_of_gyration(site: StructureSite, params: dict) -> Dict[str, object]:
+    return radius_of_gyration.gyration_metrics(
+        radius_of_gyration.structure_ca_coordinates(site.structure)
+    )
+
+
+def _motif_structural_distance(site: StructureSite, params: dict) -> Dict[str, object]:
+    sequence, ca_coords = motif_structural_distance.sequence_and_ca(site.structure)
+    return motif_structural_distance.motif_distances_from_parts(sequence, ca_coords, *site.motifs)
+
+
+def _active_site_geometry(site: StructureSite, params: dict) -> Dict[str, object]:
+    return active_site_geometry.active_site_geometry_from_parts(
+        site.sequence,
+        site.residues,
+        site.polymer_atom_coords,
+        site.cage_oxygens,
+        templates=params["templates"],
+    )
+
+
+def _aromatic_lining(site: StructureSite, params: dict) -> Dict[str, object]:
+    return aromatic_lining.aromatic_lining_from_parts(
+        site.sequence,
+        site.residues,
+        site.metal_point,
+        cutoff=params["aromatic_cutoff"],
+        cation_pi_min=params["cation_pi_min"],
+        cation_pi_max=params["cation_pi_max"],
+        face_angle_deg=params["face_angle_deg"],
+    )
+
+
+def _diphosphate_sensor(site: StructureSite, params: dict) -> Dict[str, object]:
+    return diphosphate_sensor.diphosphate_sensor_from_parts(
+        site.sequence,
+        site.residues,
+        site.metal_point,
+        cutoff=params["diphosphate_cutoff"],
+        ry_dist=params["ry_dist"],
+    )
+
+
+def _ion_site_check(site: StructureSite, params: dict) -> Dict[str, object]:
+    ion_coords, diphos_coords = ion_site_check.ion_hetatms(
+        site.structure,
+        ion_resnames=tuple(params["ion_resnames"]),
+        diphosphate_resnames=tuple(params["diphosphate_resnames"]),
+    )
+    return ion_site_check.ion_site_check_from_parts(
+        site.sequence,
+        site.residues,
+        ion_coords,
+        diphos_coords,
+        site.cage_oxygens,
+        site_radius=params["site_radius"],
+        coord_cutoff=params["coord_cutoff"],
+        min_coord_contacts=params["min_coord_contacts"],
+    )
+
+
+@dataclass(frozen=True)
+class MetricPlugin:
+    """One metric: its row function on a ``StructureSite``, the standalone tool's
+    output columns / unparsable row, and its default CSV path."""
+
+    compute: Callable[[StructureSite, dict], Dict[str, object]]
+    columns: List[str]
+    failed_row: Callable[[], Dict[str, object]]
+    default_save_path: Callable[[str], str]
+
+
+# Metric name (== the standalone tool / CSV suffix) -> plugin, in output order.
+METRICS: "OrderedDict[str, MetricPlugin]" = OrderedDict(
+    [
+        ("plddt", MetricPlugin(
+            _plddt, plddt.COLUMNS, lambda: plddt.summarize([]), plddt._default_save_path)),
+        ("radius_of_gyration", MetricPlugin(
+            _radius_of_gyration, radius_of_gyration.COLUMNS,
+            lambda: radius_of_gyration.gyration_metrics(np.empty((0, 3))),
+            radius_of_gyration._default_save_path)),
+        ("motif_structural_distance", MetricPlugin(
+            _motif_structural_distance, motif_structural_distance.COLUMNS,
+            motif_structural_distance.failed_row, motif_structural_distance._default_save_path)),
+        ("active_site_geometry", MetricPlugin(
+            _active_site_geometry, active_site_geometry.COLUMNS,
+            active_site_geometry.failed_row, active_site_geometry._default_save_path)),
+        ("aromatic_lining", MetricPlugin(
+            _aromatic_lining, aromatic_lining.COLUMNS,
+            aromatic_lining.failed_row, aromatic_lining._default_save_path)),
+        ("diphosphate_sensor", MetricPlugin(
+            _diphosphate_sensor, diphosphate_sensor.COLUMNS,
+            diphosphate_sensor.failed_row, diphosphate_sensor._default_save_path)),
+        ("ion_site_check", MetricPlugin(
+            _ion_site_check, ion_site_check.COLUMNS,
+            ion_site_check.failed_row, ion_site_check._default_save_path)),
+    ]
+)
+
+
+def combined_structure_metrics_dir(
+    structs_dir: str,
+    *,
+    metrics: Optional[Iterable[str]] = None,
+    save_dir: Optional[str] = None,
+    workers: Optional[int] = None,
+    **params,
+) -> Dict[str, pd.DataFrame]:
+    """Evaluate ``metrics`` (default: all of ``METRICS``) on every structure in
+    ``structs_dir`` in one pass and write each one's CSV (next to the directory,
+    or into ``save_dir`` under the same file name). Options not given in
+    ``params`` take ``DEFAULT_PARAMS``; ``templates`` is a list of reference IDs
+    for ``active_site_geometry``'s constellation RMSD. Structures are processed on
+    ``workers`` processes (default: all allocated CPUs). Returns metric -> frame."""
+    names = list(METRICS) if metrics is None else list(metrics)
+    unknown = [m for m in names if m not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metric(s) {unknown}; choose from {list(METRICS)}")
+    bad_params = sorted(set(params) - set(DEFAULT_PARAMS))
+    if bad_params:
+        raise TypeError(f"Unknown option(s) {bad_params}")
+    params = {**DEFAULT_PARAMS, **params}
+
+    structures, mode = plddt._collect_structures(structs_dir)
+    if not structures:
+        raise ValueError(
+            f"No structures found in {structs_dir} (expected an AlphaFold3 af_output "
+            "dir with <job>/<job>_model.cif subfolders, or a flat dir of .pdb/.cif)."
+        )
+    print(f"Detected {mode} layout: {len(structures)} structure(s) in {structs_dir}")
+    print(f"Metrics: {', '.join(names)}")
+
+    if "active_site_geometry" in names and params["templates"]:
+        templates = active_site_geometry.build_templates(structs_dir, list(params["templates"]))
+        if templates:
+            print(f"Built {len(templates)} catalytic-constellation template(s): "
+                  f"{', '.join(templates)}")
+        else:
+            print("[warn] no usable templates built; catalytic_constellation_rmsd will be NaN")
+        params["templates"] = templates or None
+
+    def _site_rows(stem: str, path: str) -> Tuple[Dict[str, Dict[str, object]], List[str]]:
+        site = StructureSite(path)
+        site.structure  # malformed/unparsable -> raises -> every metric's NaN row
+        by_metric: Dict[str, Dict[str, object]] = {}
+        failed: List[str] = []
+        for name in names:
+            plugin = METRICS[name]
+            try:
+                by_metric[name] = plugin.compute(site, params)
+            except Exception as exc:  # one metric failing keeps the others
+                print(f"  [warn] {name} failed on {os.path.basename(path)}: {exc}")
+                by_metric[name] = plugin.failed_row()
+                failed.append(name)
+        return by_metric, failed
+
+    results, _ = map_structures(
+        _site_rows,
+        structures,
+        lambda: ({name: METRICS[name].failed_row() for name in names}, list(names)),
+        workers=workers,
+        id_column=None,
+    )
+    rows: Dict[str, List[Dict[str, object]]] = {m: [] for m in names}
+    n_failed: Dict[str, int] = {m: 0 for m in names}
+    for stem, (by_metric, failed) in zip(structures, results):
+        for name in names:
+            by_metric[name]["ID"] = str(stem).strip()
+            rows[name].append(by_metric[name])
+        for name in failed:
+            n_failed[name] += 1
+
+    frames: Dict[str, pd.DataFrame] = {}
+    for name in names:
+        plugin = METRICS[name]
+        df = pd.DataFrame(rows[name])[plugin.columns].sort_values("ID").reset_index(drop=True)
+        if name == "plddt":
+            plddt.warn_zero_plddt(df)
+        save_path = plugin.default_save_path(structs_dir)
+        if save_dir is not None:
+            save_path = os.path.join(save_dir, os.path.basename(save_path))
+        df.to_csv(save_path, index=False)
+        print(f"Wrote {len(df)} rows to {save_path}"
+              + (f" ({n_failed[name]} unparsable)" if n_failed[name] else ""))
+        frames[name] = df
+    return frames
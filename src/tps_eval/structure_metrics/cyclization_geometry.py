@@ -53,6 +53,7 @@ import pandas as pd
 
 from tps_eval.structure_metrics.active_site_geometry import structure_sequence_residues_atoms
 from tps_eval.structure_metrics.substrate_positioning import read_substrate_ligand
+from tps_eval.structure_metrics.parallel import map_structures
 from tps_eval.structure_metrics.plddt import _collect_structures
 
 # Aromatic ring atoms whose centroid defines the cation-pi face (Biopython names).
@@ -185,10 +186,12 @@ def cyclization_geometry_dir(
     ion_resnames: Tuple[str, ...] = ("MG", "MN"),
     min_substrate_carbons: int = 5,
     substrate_resname: Optional[str] = None,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Cyclization-relevant geometry for every structure in structs_dir; CSV keyed by ID.
     Auto-detects an AF3 af_output dir vs a flat .pdb/.cif dir (plddt._collect_structures);
-    writes <structs_dir>_cyclization_geometry.csv by default. No-substrate -> NaN row."""
+    writes <structs_dir>_cyclization_geometry.csv by default. No-substrate -> NaN row.
+    Structures are processed on ``workers`` processes (default: all allocated CPUs)."""
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -199,26 +202,18 @@ def cyclization_geometry_dir(
           f"min substrate carbons {min_substrate_carbons}"
           + (f"; forced substrate resname {substrate_resname}" if substrate_resname else ""))
 
-    rows: List[Dict[str, object]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = cyclization_geometry(
-                path, aromatic_cutoff=aromatic_cutoff, farchain_bonds=farchain_bonds,
-                ion_resnames=ion_resnames, min_substrate_carbons=min_substrate_carbons,
-                substrate_resname=substrate_resname)
-        except Exception as exc:
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = {c: (False if c == "substrate_present"
-                         else 0 if c in ("n_substrate_carbons", "n_aromatic_carbon_contacts",
-                                         "n_aromatics_lining", "n_residues")
-                         else np.nan) for c in COLUMNS if c != "ID"}
-            n_failed += 1
-        stats["ID"] = str(stem).strip()
-        rows.append(stats)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    rows, n_failed = map_structures(
+        lambda stem, path: cyclization_geometry(
+            path, aromatic_cutoff=aromatic_cutoff, farchain_bonds=farchain_bonds,
+            ion_resnames=ion_resnames, min_substrate_carbons=min_substrate_carbons,
+            substrate_resname=substrate_resname),
+        structures,
+        lambda: {c: (False if c == "substrate_present"
+                     else 0 if c in ("n_substrate_carbons", "n_aromatic_carbon_contacts",
+                                     "n_aromatics_lining", "n_residues")
+                     else np.nan) for c in COLUMNS if c != "ID"},
+        workers=workers,
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
     if save_path is None:
@@ -78,6 +78,7 @@ from tps_eval.specificity.sdr_divergence import (  # noqa: E402
     collect_structures,
 )
 from tps_eval.structure_metrics.active_site_geometry import metal_point  # noqa: E402
+from tps_eval.structure_metrics.parallel import map_structures  # noqa: E402
 
 # --------------------------------------------------------------------------- #
 # Defaults (documented; apo-robust where possible)
@@ -140,6 +141,35 @@ def diphosphate_sensor_one(
     ``active_site_geometry.metal_point``), counts the Arg/Lys whose terminal N atoms are
     within ``cutoff`` of it AND point toward it, and detects RY (sensor-Arg / Tyr)
     pairs. Returns the row dict (without ID)."""
+    return diphosphate_sensor_from_parts(
+        info.seq, info.residues, metal_point(info.seq, info.residues),
+        cutoff=cutoff, ry_dist=ry_dist,
+    )
+
+
+def failed_row() -> Dict[str, object]:
+    """Row recorded for a structure that could not be parsed."""
+    return {
+        "metal_point_found": False,
+        "n_diphosphate_basic_residues": 0,
+        "n_arg": 0,
+        "n_lys": 0,
+        "has_RY_pair": False,
+        "n_RY_pairs": 0,
+        "n_residues": 0,
+    }
+
+
+def diphosphate_sensor_from_parts(
+    sequence: str,
+    residues: list,
+    mp: Optional[np.ndarray],
+    *,
+    cutoff: float = DEFAULT_CUTOFF,
+    ry_dist: float = DEFAULT_RY_DIST,
+) -> Dict[str, object]:
+    """``diphosphate_sensor_one`` on a residue list whose cage metal point ``mp``
+    (None when it can't be located) is already known."""
     row: Dict[str, object] = {
         "metal_point_found": False,
         "n_diphosphate_basic_residues": 0,
@@ -147,10 +177,9 @@ def diphosphate_sensor_one(
         "n_lys": 0,
         "has_RY_pair": False,
         "n_RY_pairs": 0,
-        "n_residues": len(info.seq),
+        "n_residues": len(sequence),
     }
 
-    mp = metal_point(info.seq, info.residues)
     if mp is None:
         return row  # site not locatable -> all-zero / False, metal_point_found stays False
     row["metal_point_found"] = True
@@ -163,7 +192,7 @@ def diphosphate_sensor_one(
     arg_hits: List[Dict[str, object]] = []  # {idx, guanidinium_centroid}
     n_arg = 0
     n_lys = 0
-    for i, residue in enumerate(info.residues):
+    for i, residue in enumerate(residues):
         resname = residue.get_resname()
         if resname == "ARG":
             terminal = _atom_coords(residue, ARG_TERMINAL_N)
@@ -207,7 +236,7 @@ def diphosphate_sensor_one(
         ai = int(hit["idx"])
         centroid = hit["centroid"]
         paired = False
-        for j, residue in enumerate(info.residues):
+        for j, residue in enumerate(residues):
             if residue.get_resname() != "TYR":
                 continue
             oh = _atom_coords(residue, ("OH",))
@@ -240,12 +269,14 @@ def diphosphate_sensor_dir(
     save_path: Optional[str] = None,
     cutoff: float = DEFAULT_CUTOFF,
     ry_dist: float = DEFAULT_RY_DIST,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Diphosphate-sensor metric for every structure in ``structs_dir``; CSV keyed by ID.
 
     Mirrors the other structure-branch tools: auto-detects an AF3 ``af_output`` dir
     vs a flat dir of .pdb/.cif (via ``sdr_divergence.collect_structures``), writes
-    ``<structs_dir>_diphosphate_sensor.csv`` by default, one row per structure."""
+    ``<structs_dir>_diphosphate_sensor.csv`` by default, one row per structure,
+    processing structures on ``workers`` processes (default: all allocated CPUs)."""
     structures, mode = collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -254,31 +285,14 @@ def diphosphate_sensor_dir(
         )
     print(f"Detected {mode} layout: {len(structures)} structure(s) in {structs_dir}")
 
-    rows: List[Dict[str, object]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                info = ResidueInfo(path)
-            stats = diphosphate_sensor_one(info, cutoff=cutoff, ry_dist=ry_dist)
-        except Exception as exc:  # malformed/unparsable -> NaN/0 row, keep going
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = {
-                "metal_point_found": False,
-                "n_diphosphate_basic_residues": 0,
-                "n_arg": 0,
-                "n_lys": 0,
-                "has_RY_pair": False,
-                "n_RY_pairs": 0,
-                "n_residues": 0,
-            }
-            n_failed += 1
-        stats["ID"] = str(stem).strip()
-        rows.append(stats)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    def _one(stem: str, path: str) -> Dict[str, object]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            info = ResidueInfo(path)
+        return diphosphate_sensor_one(info, cutoff=cutoff, ry_dist=ry_dist)
+
+    # Malformed/unparsable -> NaN/0 row, keep going.
+    rows, n_failed = map_structures(_one, structures, failed_row, workers=workers)
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
 
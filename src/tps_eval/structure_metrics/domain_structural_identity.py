@@ -277,6 +277,7 @@ def extract_domain_structural_identity_dir(
     n_iters: int = 3,
     keep_detected_domains: Optional[str] = None,
     exclude_self: bool = False,
+    db_cache: Optional[str] = None,
 ) -> pd.DataFrame:
     """Domain-level structural identity for every design in `structs_dir`.
 
@@ -288,6 +289,10 @@ def extract_domain_structural_identity_dir(
     hits to a reference domain originating from the query's own source structure, so
     a domain set searched against itself yields the nearest OTHER known-TPS domain
     instead of the trivial self-match TM~1.0. Defaults OFF (gen-vs-reference runs).
+
+    `db_cache`: directory of prebuilt foldseek DBs (``tps_eval.foldseek.databases``);
+    the reference-domain DB + index is then built once and reused across runs (the
+    detected domains are a per-run set and are not cached).
     """
     if not os.path.isdir(known_domain_structures_root):
         raise NotADirectoryError(
@@ -342,6 +347,8 @@ def extract_domain_structural_identity_dir(
                     output_root=tmp_align,
                     store_intermediate_results=True,  # keep raw per-hit table
                     random_run_id=False,
+                    db_cache=db_cache,
+                    cache_query=False,  # this run's temporary domain set
                 )
             )
             raw_hits = os.path.join(tmp_align, "domain_alignments.csv")
@@ -64,13 +64,11 @@ from __future__ import annotations
 
 import argparse
 import os
-import warnings
 from collections import OrderedDict
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from Bio.PDB.PDBExceptions import PDBConstructionWarning
 
 # Reuse the shared structure loader + the carboxylate-cage machinery (single source
 # of truth for the metal point) from the neighbouring structure tools. Do NOT
@@ -79,11 +77,12 @@ from tps_eval.structure_metrics.active_site_geometry import (
     COORDINATING_OXYGEN_ATOMS,
     _coordinating_oxygens,
     coordinating_indices_relaxed,
-    metal_point as _cage_metal_point,
+    metal_point_from_oxygens,
     structure_sequence_residues_atoms,
-    _parser_for,
 )
+from tps_eval.structure_metrics.parallel import map_structures
 from tps_eval.structure_metrics.plddt import _collect_structures
+from tps_eval.structure_metrics.structure_index import ParsedStructure, load_structure
 from tps_eval.sequence_metrics.motif_localization import (
     DDXXD_PATTERN,
     NSE_DTE_PATTERN,
@@ -158,31 +157,35 @@ def read_ion_hetatms(
 
     Residue-name matching is case-insensitive and whitespace-stripped (PDB pads atom/
     residue names). Only the first model is read (predicted structures write one)."""
+    return ion_hetatms(
+        load_structure(structure_path),  # first model only
+        ion_resnames=ion_resnames,
+        diphosphate_resnames=diphosphate_resnames,
+    )
+
+
+def ion_hetatms(
+    structure: ParsedStructure,
+    ion_resnames: Tuple[str, ...] = DEFAULT_ION_RESNAMES,
+    diphosphate_resnames: Tuple[str, ...] = DEFAULT_DIPHOSPHATE_RESNAMES,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """``read_ion_hetatms`` on an already-loaded structure."""
     ion_set = {r.strip().upper() for r in ion_resnames}
     diphos_set = {r.strip().upper() for r in diphosphate_resnames}
 
-    parser = _parser_for(structure_path)
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", PDBConstructionWarning)
-        structure = parser.get_structure("s", structure_path)
-    model = next(iter(structure))  # first model only
-
     ions: List[np.ndarray] = []
     diphos: List[np.ndarray] = []
-    for chain in model:
-        for residue in chain:
-            # HETATM only (hetflag != " "); protein residues are handled by the apo
-            # parser elsewhere.
-            if residue.id[0] == " ":
-                continue
-            resname = residue.get_resname().strip().upper()
-            atom_els = [(a.element or "").strip().upper() for a in residue]
-            if (resname in ion_set) or (atom_els and all(el in ION_ELEMENTS for el in atom_els)):
-                for atom in residue:                      # element-based: AF3 'MG' & Boltz2 'LIG2'
-                    ions.append(np.asarray(atom.get_coord(), dtype=float))
-            elif resname in diphos_set:
-                for atom in residue:
-                    diphos.append(np.asarray(atom.get_coord(), dtype=float))
+    # HETATM only (hetflag != " "); protein residues are handled by the apo
+    # parser elsewhere.
+    for residue in structure.residues(polymer=False):
+        resname = residue.get_resname().strip().upper()
+        atom_els = [(a.element or "").strip().upper() for a in residue]
+        if (resname in ion_set) or (atom_els and all(el in ION_ELEMENTS for el in atom_els)):
+            for atom in residue:                      # element-based: AF3 'MG' & Boltz2 'LIG2'
+                ions.append(np.asarray(atom.get_coord(), dtype=float))
+        elif resname in diphos_set:
+            for atom in residue:
+                diphos.append(np.asarray(atom.get_coord(), dtype=float))
     ion_arr = np.vstack(ions) if ions else np.empty((0, 3))
     diphos_arr = np.vstack(diphos) if diphos else np.empty((0, 3))
     return ion_arr, diphos_arr
@@ -245,6 +248,58 @@ def ion_site_check(
     """Ion-placement metrics for one structure. Apo / ESMFold (no ions) -> a graceful
     not-applicable row (n_ions_modelled=0, distances NaN, bools False)."""
     sequence, residues, _ = structure_sequence_residues_atoms(structure_path)
+    ion_coords, diphos_coords = read_ion_hetatms(
+        structure_path, ion_resnames=ion_resnames, diphosphate_resnames=diphosphate_resnames
+    )
+    idx = coordinating_indices_relaxed(sequence)
+    oxygens = _coordinating_oxygens(idx, residues) if idx is not None else None
+    return ion_site_check_from_parts(
+        sequence,
+        residues,
+        ion_coords,
+        diphos_coords,
+        oxygens,
+        site_radius=site_radius,
+        coord_cutoff=coord_cutoff,
+        min_coord_contacts=min_coord_contacts,
+    )
+
+
+def failed_row() -> Dict[str, object]:
+    """Row recorded for a structure that could not be parsed (not-applicable)."""
+    return {
+        "metal_point_found": False,
+        "n_ions_modelled": 0,
+        "min_ion_to_cage_dist": np.nan,
+        "n_ions_in_site": 0,
+        "ion_in_site": False,
+        "max_coordinating_contacts": 0,
+        "n_ions_coordinated": 0,
+        "well_placed": False,
+        "mg_canonical_motif_coordination": False,
+        "n_motif_coord_asp": 0,
+        "n_motif_coord_nse": 0,
+        "mg_to_motif_dist": np.nan,
+        "n_diphosphate_atoms": 0,
+        "diphosphate_to_cage_dist": np.nan,
+        "n_residues": 0,
+    }
+
+
+def ion_site_check_from_parts(
+    sequence: str,
+    residues: list,
+    ion_coords: np.ndarray,
+    diphos_coords: np.ndarray,
+    cage_oxygens: Optional[np.ndarray],
+    *,
+    site_radius: float = DEFAULT_SITE_RADIUS,
+    coord_cutoff: float = DEFAULT_COORD_CUTOFF,
+    min_coord_contacts: int = DEFAULT_MIN_COORD_CONTACTS,
+) -> Dict[str, object]:
+    """``ion_site_check`` on an already-loaded structure: ``cage_oxygens`` are the
+    relaxed coordinating oxygens (``active_site_geometry.cage_oxygens``; None when
+    DDXXD is absent) the cage point is the centroid of."""
     result: Dict[str, object] = {
         "metal_point_found": False,
         "n_ions_modelled": 0,
@@ -263,9 +318,6 @@ def ion_site_check(
         "n_residues": len(sequence),
     }
 
-    ion_coords, diphos_coords = read_ion_hetatms(
-        structure_path, ion_resnames=ion_resnames, diphosphate_resnames=diphosphate_resnames
-    )
     result["n_ions_modelled"] = int(len(ion_coords))
     result["n_diphosphate_atoms"] = int(len(diphos_coords))
 
@@ -273,19 +325,15 @@ def ion_site_check(
     # carboxylates (computed regardless of the apo metal_point, which can mislocalize).
     result.update(_motif_coordination(sequence, residues, ion_coords, coord_cutoff))
 
-    # Expected apo cage point (canonical relaxed coordinating-oxygen centroid).
-    cage = _cage_metal_point(sequence, residues)
+    # Expected apo cage point (canonical relaxed coordinating-oxygen centroid). The
+    # same oxygens give the Mg-O contact count below.
+    cage = metal_point_from_oxygens(cage_oxygens)
     if cage is None:
         # No anchor: distances to the cage are undefined (stay NaN). Ion counts are
         # still recorded above (a holo structure with no DDXXD is itself a red flag).
         return result
     result["metal_point_found"] = True
 
-    # Gather the cage coordinating oxygens once (for the Mg-O contact count). This is
-    # the SAME relaxed set the centroid was built from.
-    idx = coordinating_indices_relaxed(sequence)
-    cage_oxygens = _coordinating_oxygens(idx, residues) if idx is not None else np.empty((0, 3))
-
     if len(ion_coords):
         d_to_cage = np.sqrt(((ion_coords - cage) ** 2).sum(axis=1))
         result["min_ion_to_cage_dist"] = float(d_to_cage.min())
@@ -326,6 +374,7 @@ def ion_site_check_dir(
     min_coord_contacts: int = DEFAULT_MIN_COORD_CONTACTS,
     ion_resnames: Tuple[str, ...] = DEFAULT_ION_RESNAMES,
     diphosphate_resnames: Tuple[str, ...] = DEFAULT_DIPHOSPHATE_RESNAMES,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Ion-placement check for every structure in ``structs_dir``; CSV keyed by ID.
 
@@ -333,7 +382,8 @@ def ion_site_check_dir(
     a flat dir of .pdb/.cif (via ``plddt._collect_structures``), writes
     ``<structs_dir>_ion_site_check.csv`` by default, one row per structure. Apo /
     ESMFold structures (no ions) get a graceful not-applicable row — the CSV is still
-    written in full."""
+    written in full. Structures are processed on ``workers`` processes (default: all
+    allocated CPUs)."""
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -347,43 +397,20 @@ def ion_site_check_dir(
         f"diphosphate {sorted({r.upper() for r in diphosphate_resnames})}."
     )
 
-    rows: List[Dict[str, object]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = ion_site_check(
-                path,
-                site_radius=site_radius,
-                coord_cutoff=coord_cutoff,
-                min_coord_contacts=min_coord_contacts,
-                ion_resnames=ion_resnames,
-                diphosphate_resnames=diphosphate_resnames,
-            )
-        except Exception as exc:  # malformed/unparsable -> not-applicable row, keep going
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = {
-                "metal_point_found": False,
-                "n_ions_modelled": 0,
-                "min_ion_to_cage_dist": np.nan,
-                "n_ions_in_site": 0,
-                "ion_in_site": False,
-                "max_coordinating_contacts": 0,
-                "n_ions_coordinated": 0,
-                "well_placed": False,
-                "mg_canonical_motif_coordination": False,
-                "n_motif_coord_asp": 0,
-                "n_motif_coord_nse": 0,
-                "mg_to_motif_dist": np.nan,
-                "n_diphosphate_atoms": 0,
-                "diphosphate_to_cage_dist": np.nan,
-                "n_residues": 0,
-            }
-            n_failed += 1
-        stats["ID"] = str(stem).strip()
-        rows.append(stats)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    # Malformed/unparsable -> not-applicable row, keep going.
+    rows, n_failed = map_structures(
+        lambda stem, path: ion_site_check(
+            path,
+            site_radius=site_radius,
+            coord_cutoff=coord_cutoff,
+            min_coord_contacts=min_coord_contacts,
+            ion_resnames=ion_resnames,
+            diphosphate_resnames=diphosphate_resnames,
+        ),
+        structures,
+        failed_row,
+        workers=workers,
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
 
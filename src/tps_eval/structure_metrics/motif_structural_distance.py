@@ -5,8 +5,8 @@ from __future__ import annotations
 Fold-agnostic: operates on a directory of structures (.pdb/.cif), so it works for
 BOTH AlphaFold and ESMFold output with the same code. For each structure we
 
-1. read the residue chain with Biopython (reusing plddt.py's parser selection and
-   af_output/flat auto-detection),
+1. read the residue chain (from the directory's structure index when present,
+   else with Biopython; reusing plddt.py's af_output/flat auto-detection),
 2. derive the 1-letter sequence from the residues,
 3. run the SHARED motif-localization helper on that sequence to find the
    DDXXD-family and NSE/DTE motifs, and
@@ -31,66 +31,43 @@ sequence. ``n_residues`` reports the modelled residue count for context.
 import argparse
 import os
 import sys
-import warnings
 from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from Bio.PDB import MMCIFParser, PDBParser
-from Bio.PDB.Polypeptide import three_to_index, index_to_one
-from Bio.PDB.PDBExceptions import PDBConstructionWarning
 
 # Reuse the sequence-metrics shared motif localization (single source of truth).
 
 from tps_eval.sequence_metrics.motif_localization import (  # noqa: E402
     DDXXD_COORDINATING_OFFSETS,
     NSE_DTE_COORDINATING_OFFSETS,
+    MotifMatch,
     coordinating_indices,
     locate_ddxxd,
     locate_nse_dte,
 )
-
-_PDB_PARSER = PDBParser(QUIET=True)
-_CIF_PARSER = MMCIFParser(QUIET=True)
+from tps_eval.structure_metrics.parallel import map_structures
+from tps_eval.structure_metrics.structure_index import ParsedStructure, load_structure
 
 COLUMNS = ["ID", "motif_centroid_distance", "motif_min_ca_distance", "n_residues"]
 
 
-def _parser_for(path: str):
-    return _CIF_PARSER if path.lower().endswith((".cif", ".mmcif")) else _PDB_PARSER
-
-
-def _three_to_one(resname: str) -> str:
-    """3-letter residue name -> 1-letter code, 'X' for anything non-standard."""
-    try:
-        return index_to_one(three_to_index(resname))
-    except KeyError:
-        return "X"
-
-
 def structure_sequence_and_ca(structure_path: str) -> Tuple[str, List[Optional[np.ndarray]]]:
     """Return (1-letter sequence, list of CA xyz arrays) for the protein residues
     of the first model, in chain order. The two lists are index-aligned: position i
     in the sequence has CA coordinate ``ca_coords[i]`` (None if that residue lacks a
     CA). HETATM ligands/ions/water are skipped — matching plddt.residue_plddts."""
-    parser = _parser_for(structure_path)
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", PDBConstructionWarning)
-        structure = parser.get_structure("s", structure_path)
-    model = next(iter(structure))  # first model only (predicted structs write one)
-    seq_chars: List[str] = []
-    ca_coords: List[Optional[np.ndarray]] = []
-    for chain in model:
-        for residue in chain:
-            if residue.id[0] != " ":  # skip HETATM (ions/ligands/water)
-                continue
-            seq_chars.append(_three_to_one(residue.get_resname()))
-            ca_coords.append(
-                np.asarray(residue["CA"].get_coord(), dtype=float) if "CA" in residue else None
-            )
-    return "".join(seq_chars), ca_coords
+    return sequence_and_ca(load_structure(structure_path))  # first model only
+
+
+def sequence_and_ca(structure: ParsedStructure) -> Tuple[str, List[Optional[np.ndarray]]]:
+    """``structure_sequence_and_ca`` on an already-loaded structure."""
+    ca = structure.atom_index("CA")[structure.polymer]  # skip HETATM (ions/ligands/water)
+    coords = structure.coords.astype(float)
+    ca_coords: List[Optional[np.ndarray]] = [coords[i] if i >= 0 else None for i in ca]
+    return structure.polymer_sequence(), ca_coords
 
 
 def _coord_matrix(indices: List[int], ca_coords: List[Optional[np.ndarray]]) -> Optional[np.ndarray]:
@@ -104,6 +81,24 @@ def motif_distances(structure_path: str) -> Dict[str, float]:
     """Centroid and min CA-CA distance between the DDXXD and NSE/DTE motifs of one
     structure; NaN distances when a motif is absent or has no usable CA."""
     sequence, ca_coords = structure_sequence_and_ca(structure_path)
+    return motif_distances_from_parts(
+        sequence, ca_coords, locate_ddxxd(sequence), locate_nse_dte(sequence)
+    )
+
+
+def failed_row() -> Dict[str, float]:
+    """Row recorded for a structure that could not be parsed."""
+    return {"motif_centroid_distance": np.nan, "motif_min_ca_distance": np.nan, "n_residues": 0}
+
+
+def motif_distances_from_parts(
+    sequence: str,
+    ca_coords: List[Optional[np.ndarray]],
+    ddxxd: Optional[MotifMatch],
+    nse: Optional[MotifMatch],
+) -> Dict[str, float]:
+    """``motif_distances`` on an already-loaded ``(sequence, ca_coords)`` pair with
+    its motifs already localized (None = absent)."""
     n_residues = len(sequence)
     result = {
         "motif_centroid_distance": np.nan,
@@ -111,8 +106,6 @@ def motif_distances(structure_path: str) -> Dict[str, float]:
         "n_residues": n_residues,
     }
 
-    ddxxd = locate_ddxxd(sequence)
-    nse = locate_nse_dte(sequence)
     if ddxxd is None or nse is None:
         return result
 
@@ -166,8 +159,10 @@ def motif_structural_distance_dir(
     structs_dir: str,
     *,
     save_path: Optional[str] = None,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
-    """Inter-motif 3D distance for every structure in ``structs_dir``; CSV keyed by ID."""
+    """Inter-motif 3D distance for every structure in ``structs_dir``; CSV keyed by ID.
+    Structures are processed on ``workers`` processes (default: all allocated CPUs)."""
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -176,21 +171,10 @@ def motif_structural_distance_dir(
         )
     print(f"Detected {mode} layout: {len(structures)} structure(s) in {structs_dir}")
 
-    rows: List[Dict[str, float]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = motif_distances(path)
-        except Exception as exc:  # malformed/unparsable -> NaN row, keep going
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = {"motif_centroid_distance": np.nan, "motif_min_ca_distance": np.nan,
-                     "n_residues": 0}
-            n_failed += 1
-        stats["ID"] = str(stem).strip()
-        rows.append(stats)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    # Malformed/unparsable -> NaN row, keep going.
+    rows, n_failed = map_structures(
+        lambda stem, path: motif_distances(path), structures, failed_row, workers=workers
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
 
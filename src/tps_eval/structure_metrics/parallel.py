@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Process-pool map across structures for the structure ``*_dir`` drivers.
+
+Every structure-directory tool walks ``{ID: path}`` and turns each structure into
+one CSV row, independently of all others. ``map_structures`` runs that per-structure
+function over a pool of worker processes (one per CPU allocated to the job by
+default) and keeps the serial loop's contract:
+
+* rows come back in input order;
+* an exception on one structure is caught IN the worker, reported as
+  ``[warn] <failure> <file>: <exc>`` and replaced by the tool's failed row, so one
+  malformed structure never takes the batch down;
+* progress is printed every ``progress_every`` structures (and on the last one).
+
+Workers are forked, so the per-structure function may be a closure over the
+driver's parameters (templates, panels, caches opened lazily in the worker) — only
+``(ID, path)`` items and result rows cross the process boundary. Where fork is
+unavailable the map runs serially. ``workers=1`` also runs serially, in-process.
+
+IMPORTANT: ``aggregation.py`` runs in the PYTHON 2.7 ``aggrescan3d`` env and uses
+this module. Keep this file Python-2.7 compatible: no f-strings, no py3-only
+typing, no ``from __future__ import annotations``.
+"""
+
+import multiprocessing
+import os
+import sys
+
+# Fork explicitly: the workers inherit the per-structure closure and whatever the
+# driver prepared (templates, parsed references) without pickling. Python 2 has no
+# contexts, but fork is its only start method on POSIX.
+try:
+    _MP_CONTEXT = multiprocessing.get_context("fork")
+except AttributeError:  # Python 2.7
+    _MP_CONTEXT = multiprocessing
+except ValueError:  # pragma: no cover - non-fork platforms run serially
+    _MP_CONTEXT = None
+
+# Per-worker state, set once by the pool initializer.
+_WORKER_FN = None
+
+
+def available_cpus():
+    """CPUs actually allocated to this process (respects SLURM/PBS cpusets)."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:  # not available on all platforms (macOS, Python 2)
+        return max(1, multiprocessing.cpu_count() or 1)
+
+
+def resolve_workers(workers, n_items):
+    """``workers`` (None / <= 0 -> every available CPU), capped at ``n_items``."""
+    if workers is None or workers <= 0:
+        workers = available_cpus()
+    return max(1, min(int(workers), n_items))
+
+
+def _init_worker(fn):
+    global _WORKER_FN
+    _WORKER_FN = fn
+
+
+def _apply(fn, item):
+    stem, path = item
+    try:
+        return True, fn(stem, path)
+    except Exception as exc:  # isolated per structure; the parent substitutes the failed row
+        return False, str(exc)
+
+
+def _apply_in_worker(item):
+    return _apply(_WORKER_FN, item)
+
+
+def map_structures(
+    fn,
+    structures,
+    failed_row,
+    workers=None,
+    id_column="ID",
+    failure="failed to parse",
+    progress_every=50,
+    chunksize=None,
+    on_row=None,
+):
+    """Apply ``fn(stem, path) -> row`` to every item of ``structures`` (an ordered
+    ``{ID: path}`` mapping or a list of ``(ID, path)`` pairs) on ``workers``
+    processes; returns ``(rows, n_failed)``.
+
+    Rows are in input order. A structure whose ``fn`` raises gets ``failed_row()``
+    (and counts towards ``n_failed``). With ``id_column`` set, each row gets the
+    stripped ID under that key. ``progress_every=1`` reports every structure by ID.
+    ``on_row(stem, row)``, when given, sees each row as it is collected (e.g. to
+    stream finished rows to disk before the whole map is done).
+    """
+    items = list(structures.items()) if hasattr(structures, "items") else list(structures)
+    n = len(items)
+    workers = resolve_workers(workers, n) if _MP_CONTEXT is not None else 1
+    if workers > 1:
+        print("  using %d worker processes" % workers)
+
+    def _collect(results):
+        rows = []
+        n_failed = 0
+        for i, ((stem, path), (ok, value)) in enumerate(zip(items, results), start=1):
+            if ok:
+                row = value
+            else:
+                print("  [warn] %s %s: %s" % (failure, os.path.basename(path), value))
+                row = failed_row()
+                n_failed += 1
+            if id_column is not None:
+                row[id_column] = str(stem).strip()
+            rows.append(row)
+            if on_row is not None:
+                on_row(stem, row)
+            if progress_every == 1:
+                print("  processed %d/%d: %s" % (i, n, stem))
+            elif i % progress_every == 0 or i == n:
+                print("  processed %d/%d" % (i, n))
+            sys.stdout.flush()
+        return rows, n_failed
+
+    if workers == 1:
+        return _collect(_apply(fn, item) for item in items)
+
+    if chunksize is None:
+        # Several chunks per worker keep the tail balanced; chunks of one for the
+        # slow subprocess-backed tools, larger ones amortise IPC for the cheap ones.
+        chunksize = max(1, n // (workers * 8))
+    pool = _MP_CONTEXT.Pool(workers, initializer=_init_worker, initargs=(fn,))
+    try:
+        result = _collect(pool.imap(_apply_in_worker, items, chunksize))
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return result
@@ -2,14 +2,14 @@ from __future__ import annotations
 
 import glob
 import os
-import warnings
 from collections import OrderedDict
 from typing import Dict, List, Optional
 
 import numpy as np
 import pandas as pd
-from Bio.PDB import MMCIFParser, PDBParser
-from Bio.PDB.PDBExceptions import PDBConstructionWarning
+
+from tps_eval.structure_metrics.parallel import map_structures
+from tps_eval.structure_metrics.structure_index import ParsedStructure, load_structure
 
 # AlphaFold stores per-residue pLDDT (0-100) in the B-factor field of both PDB
 # (cols 61-66) and mmCIF (_atom_site.B_iso_or_equiv). pLDDT >= 70 is the common
@@ -22,37 +22,26 @@ from Bio.PDB.PDBExceptions import PDBConstructionWarning
 # are meaningless. Point this at a directory of predicted structures only.
 CONFIDENT_THRESHOLD = 70.0
 
-_PDB_PARSER = PDBParser(QUIET=True)
-_CIF_PARSER = MMCIFParser(QUIET=True)
-
 # Output column order (ID first, then the filtration metrics).
 COLUMNS = ["ID", "mean_plddt", "median_plddt", "min_plddt", "frac_plddt_confident", "n_residues"]
 
 
-def _parser_for(path: str):
-    return _CIF_PARSER if path.lower().endswith((".cif", ".mmcif")) else _PDB_PARSER
-
-
 def residue_plddts(structure_path: str) -> List[float]:
     """Per-residue pLDDT for a structure: the CA B-factor of every residue that
-    has one, across all chains of the first model. Works for both .pdb and .cif."""
-    parser = _parser_for(structure_path)
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", PDBConstructionWarning)
-        structure = parser.get_structure("s", structure_path)
-    model = next(iter(structure))  # first model only (AlphaFold writes one)
-    plddts: List[float] = []
-    for chain in model:
-        for residue in chain:
-            # Standard polymer (protein/nucleic) residues only. Skip HETATM
-            # ligands/ions/water (hetflag != " "): otherwise a kept ion whose atom
-            # is named "CA" (e.g. a calcium ion) would be miscounted as a residue's
-            # pLDDT. (No-op for protein-only structures.)
-            if residue.id[0] != " ":
-                continue
-            if "CA" in residue:
-                plddts.append(float(residue["CA"].get_bfactor()))
-    return plddts
+    has one, across all chains of the first model. Works for both .pdb and .cif
+    (read from the directory's structure index when one is fresh)."""
+    return structure_plddts(load_structure(structure_path))  # first model only (AlphaFold writes one)
+
+
+def structure_plddts(structure: ParsedStructure) -> List[float]:
+    """``residue_plddts`` on an already-loaded structure."""
+    ca = structure.atom_index("CA")
+    # Standard polymer (protein/nucleic) residues only. Skip HETATM
+    # ligands/ions/water (hetflag != " "): otherwise a kept ion whose atom
+    # is named "CA" (e.g. a calcium ion) would be miscounted as a residue's
+    # pLDDT. (No-op for protein-only structures.)
+    ca = ca[structure.polymer & (ca >= 0)]
+    return structure.bfactors[ca].tolist()
 
 
 def summarize(plddts: List[float], confident_threshold: float = CONFIDENT_THRESHOLD) -> Dict[str, float]:
@@ -118,6 +107,20 @@ def _collect_structures(structs_dir: str):
     return OrderedDict(sorted(chosen.items())), "flat"
 
 
+def warn_zero_plddt(df: pd.DataFrame) -> None:
+    """All-zero pLDDT on residues that DID parse means the B-factor was never
+    populated — typically structs/*.pdb extracted by the old Open Babel
+    cif->pdb converter. Flag it loudly so the result isn't trusted as real pLDDT."""
+    n_zero = int(((df["n_residues"] > 0) & (df["mean_plddt"] == 0.0)).sum())
+    if n_zero:
+        print(
+            f"  [warn] {n_zero}/{len(df)} structures have all-zero pLDDT — their B-factor "
+            "looks unpopulated (e.g. structs/ extracted by the old obabel cif->pdb "
+            "converter). Re-extract with the patched vendor/cif_to_pdb, or run on the "
+            "AF3 af_output directory instead."
+        )
+
+
 def _default_save_path(structs_dir: str) -> str:
     d = structs_dir.rstrip(os.sep)
     return os.path.join(os.path.dirname(d), os.path.basename(d) + "_plddt.csv")
@@ -128,10 +131,12 @@ def extract_plddt_dir(
     *,
     save_path: Optional[str] = None,
     confident_threshold: float = CONFIDENT_THRESHOLD,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Extract per-structure pLDDT summaries for every structure in `structs_dir`
     and write a CSV (keyed by ID) usable as a filtration criterion alongside the
-    other tps_eval metrics."""
+    other tps_eval metrics. Structures are processed on ``workers`` processes
+    (default: every CPU allocated to the job)."""
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -141,34 +146,16 @@ def extract_plddt_dir(
         )
     print(f"Detected {mode} layout: {len(structures)} structure(s) in {structs_dir}")
 
-    rows: List[Dict[str, float]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = summarize(residue_plddts(path), confident_threshold)
-        except Exception as exc:  # malformed/unparsable structure -> NaN row, keep going
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = summarize([], confident_threshold)
-            n_failed += 1
-        stats["ID"] = stem
-        rows.append(stats)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    # Malformed/unparsable structure -> NaN row, keep going.
+    rows, n_failed = map_structures(
+        lambda stem, path: summarize(residue_plddts(path), confident_threshold),
+        structures,
+        lambda: summarize([], confident_threshold),
+        workers=workers,
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
-
-    # All-zero pLDDT on residues that DID parse means the B-factor was never
-    # populated — typically structs/*.pdb extracted by the old Open Babel
-    # cif->pdb converter. Flag it loudly so the result isn't trusted as real pLDDT.
-    n_zero = int(((df["n_residues"] > 0) & (df["mean_plddt"] == 0.0)).sum())
-    if n_zero:
-        print(
-            f"  [warn] {n_zero}/{len(df)} structures have all-zero pLDDT — their B-factor "
-            "looks unpopulated (e.g. structs/ extracted by the old obabel cif->pdb "
-            "converter). Re-extract with the patched vendor/cif_to_pdb, or run on the "
-            "AF3 af_output directory instead."
-        )
+    warn_zero_plddt(df)
 
     if save_path is None:
         save_path = _default_save_path(structs_dir)
@@ -14,7 +14,7 @@ cluster and the prenyl-diphosphate substrate. By selecting the detected pocket t
 encloses / is nearest the metal point we report descriptors for the *catalytic*
 pocket specifically, not the largest or top-ranked one.
 
-Two engines, run per structure:
+Two engines:
 
 * **fpocket** (geometric, Voronoi alpha-spheres). We pick the fpocket pocket whose
   alpha-spheres enclose the metal point (point inside the alpha-sphere cloud) or,
@@ -45,6 +45,9 @@ Two engines, run per structure:
     - ``p2rank_catalytic_pocket_rank`` — its 1-based rank among P2Rank's pockets
       (1 = P2Rank's top-ranked pocket). Independent confirmation that the catalytic
       cavity is a real ligand-binding site.
+  The directory driver runs P2Rank in BATCHES over the staged PDBs (one JVM start
+  and model load per batch, ``-threads`` proteins in parallel) rather than once per
+  structure; the nearest-pocket selection per structure is the same.
 
 RAW numbers only — no bands (the reference-stats pipeline supplies the natural
 band). When NO detected pocket coincides with the metal point (within a generous
@@ -58,6 +61,7 @@ CLI/dir conventions (af3-vs-flat detection, ID = filename stem,
 """
 
 import argparse
+import csv
 import glob
 import math
 import os
@@ -83,6 +87,7 @@ from tps_eval.structure_metrics.active_site_geometry import (  # noqa: E402
     metal_point as _cage_metal_point,
     structure_sequence_residues_atoms,
 )
+from tps_eval.structure_metrics.parallel import map_structures, resolve_workers  # noqa: E402
 
 _PDB_PARSER = PDBParser(QUIET=True)
 _CIF_PARSER = MMCIFParser(QUIET=True)
@@ -112,6 +117,11 @@ COLUMNS = [
 # generous cutoff. Beyond this we treat the catalytic pocket as not found (NaN).
 METAL_POINT_CUTOFF_A = 12.0
 
+# fpocket's per-structure work dirs (converted PDB + ``<stem>_out/`` tree, dozens of
+# small files each) go to RAM-backed /dev/shm when it is available, so concurrent
+# runs don't churn the (often network) file system behind $TMPDIR.
+SCRATCH_DIR = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+
 # Mapping of fpocket per-pocket descriptor labels (as printed in fpocket 4.0's
 # *_info.txt block) to our column names, matched case-insensitively as a substring
 # of the label text BEFORE the ':'. Order matters: more specific needles first so
@@ -203,6 +213,39 @@ def _parse_fpocket_alpha_spheres(vert_pqr: str) -> np.ndarray:
     return np.asarray(pts, dtype=float) if pts else np.empty((0, 3))
 
 
+def _parse_fpocket_stp(out_pdb: str) -> Optional[Dict[int, np.ndarray]]:
+    """Alpha-sphere centres per pocket from the STP records of fpocket's
+    ``<stem>_out.pdb`` (residue number = pocket number): every pocket's cloud in ONE
+    file. None when the file is unreadable."""
+    pts: Dict[int, List[List[float]]] = {}
+    try:
+        with open(out_pdb) as fh:
+            for line in fh:
+                if line.startswith(("ATOM", "HETATM")) and line[17:20].strip() == "STP":
+                    pts.setdefault(int(line[22:26]), []).append(
+                        [float(line[30:38]), float(line[38:46]), float(line[46:54])]
+                    )
+    except (OSError, ValueError):
+        return None
+    return {num: np.asarray(p, dtype=float) for num, p in pts.items()}
+
+
+def _candidate_pockets(clouds: Dict[int, np.ndarray], point: np.ndarray) -> set:
+    """Pockets that could be chosen as catalytic: those enclosing the metal point or
+    with an alpha sphere within the cutoff. Every other pocket loses the selection
+    in ``fpocket_catalytic`` (or is rejected by its cutoff), so only these need their
+    vertex files parsed."""
+    return {
+        num
+        for num, cloud in clouds.items()
+        if len(cloud)
+        and (
+            _point_inside_cloud(point, cloud)
+            or float(np.sqrt(((cloud - point) ** 2).sum(axis=1)).min()) <= METAL_POINT_CUTOFF_A
+        )
+    }
+
+
 def _parse_fpocket_info(info_path: str) -> Dict[int, Dict[str, float]]:
     """Parse fpocket's ``*_info.txt`` into {pocket_number: {descriptor: value}}."""
     pockets: Dict[int, Dict[str, float]] = {}
@@ -295,6 +338,10 @@ def fpocket_catalytic(
     info = _parse_fpocket_info(os.path.join(out_dir, stem + "_info.txt"))
     pockets_dir = os.path.join(out_dir, "pockets")
     pocket_verts = sorted(glob.glob(os.path.join(pockets_dir, "pocket*_vert.pqr")))
+    # One scan of <stem>_out.pdb finds the pockets that can win; only their vertex
+    # files are parsed (all of them if the scan is unavailable).
+    clouds = _parse_fpocket_stp(os.path.join(out_dir, stem + "_out.pdb"))
+    candidates = _candidate_pockets(clouds, point) if clouds is not None else None
 
     best_num: Optional[int] = None
     best_dist = math.inf
@@ -306,6 +353,8 @@ def fpocket_catalytic(
             num = int(name.replace("pocket", "").split("_")[0])
         except ValueError:
             continue
+        if candidates is not None and num not in candidates:
+            continue
         cloud = _parse_fpocket_alpha_spheres(vpqr)
         if len(cloud) == 0:
             continue
@@ -340,6 +389,11 @@ def fpocket_catalytic(
 # --------------------------------------------------------------------------- #
 # P2Rank                                                                      #
 # --------------------------------------------------------------------------- #
+# Structures per P2Rank batch run: one JVM start + model load per batch instead of
+# per structure, while a crashed run only costs its own batch.
+P2RANK_BATCH_SIZE = 500
+
+
 def run_p2rank(pdb_path: str, workdir: str, p2rank_bin: str) -> Optional[str]:
     """Run P2Rank ``predict -f <pdb>`` into ``workdir/p2rank_out``; return the path
     to the predictions CSV ``<name>.pdb_predictions.csv`` or None on failure."""
@@ -366,6 +420,42 @@ def run_p2rank(pdb_path: str, workdir: str, p2rank_bin: str) -> Optional[str]:
     return hits[0] if hits else None
 
 
+def run_p2rank_batch(
+    pdb_paths: List[str], out_dir: str, p2rank_bin: str, *, threads: int = 1
+) -> Dict[str, Optional[str]]:
+    """Run ONE P2Rank ``predict <dataset.ds>`` over ``pdb_paths`` (all in one
+    directory) with ``-threads`` proteins in flight; return pdb path -> its
+    predictions CSV, or None for a structure P2Rank produced no predictions for."""
+    stage_dir = os.path.dirname(os.path.abspath(pdb_paths[0]))
+    os.makedirs(out_dir, exist_ok=True)
+    # P2Rank resolves dataset entries relative to the .ds file.
+    dataset = os.path.join(stage_dir, os.path.basename(out_dir.rstrip(os.sep)) + ".ds")
+    with open(dataset, "w") as fh:
+        fh.writelines(os.path.relpath(os.path.abspath(p), stage_dir) + "\n" for p in pdb_paths)
+    try:
+        subprocess.run(
+            [p2rank_bin, "predict", dataset, "-o", out_dir,
+             "-threads", str(threads), "-visualizations", "0"],
+            cwd=stage_dir,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError) as exc:
+        stderr = getattr(exc, "stderr", b"") or b""
+        print(f"  [warn] P2Rank batch of {len(pdb_paths)} failed: {exc} "
+              f"{stderr.decode(errors='replace')[:300]}")
+    # Whatever predictions were written (all of them after a clean run) still count.
+    predictions: Dict[str, Optional[str]] = {}
+    for p in pdb_paths:
+        base = os.path.basename(p)
+        # P2Rank may strip the extension in the output name (as in run_p2rank).
+        candidates = (base + "_predictions.csv", os.path.splitext(base)[0] + "_predictions.csv")
+        hits = [os.path.join(out_dir, c) for c in candidates if os.path.isfile(os.path.join(out_dir, c))]
+        predictions[p] = hits[0] if hits else None
+    return predictions
+
+
 def _parse_p2rank_predictions(pred_csv: str) -> List[Dict[str, float]]:
     """Parse P2Rank predictions CSV into a list of pockets (in file order, i.e. by
     descending score = rank). Columns are whitespace-padded; we read center_x/y/z
@@ -400,12 +490,19 @@ def p2rank_catalytic(
     """Run P2Rank and return the predicted pocket nearest the metal point: its
     ligandability score and 1-based rank. NaN/False when P2Rank finds no pocket
     within the cutoff."""
+    return p2rank_catalytic_from_predictions(run_p2rank(pdb_path, workdir, p2rank_bin), point)
+
+
+def p2rank_catalytic_from_predictions(
+    pred_csv: Optional[str], point: np.ndarray
+) -> Dict[str, float]:
+    """``p2rank_catalytic`` on an existing predictions CSV (None -> not found), e.g.
+    one written by ``run_p2rank_batch``."""
     res: Dict[str, float] = {
         "p2rank_catalytic_site_score": np.nan,
         "p2rank_catalytic_pocket_rank": np.nan,
         "p2rank_catalytic_pocket_found": False,
     }
-    pred_csv = run_p2rank(pdb_path, workdir, p2rank_bin)
     if pred_csv is None:
         return res
     pockets = _parse_p2rank_predictions(pred_csv)
@@ -433,15 +530,30 @@ def pocket_descriptors(
     """fpocket + (optional) P2Rank catalytic-pocket descriptors for one structure,
     anchored on the active-site metal point. P2Rank is skipped (its columns stay
     NaN) when ``p2rank_bin`` is None."""
+    return _pocket_descriptors(structure_path, fpocket_bin=fpocket_bin, p2rank_bin=p2rank_bin)[0]
+
+
+def _pocket_descriptors(
+    structure_path: str,
+    *,
+    fpocket_bin: str = "fpocket",
+    p2rank_bin: Optional[str] = None,
+    p2rank_stage_pdb: Optional[str] = None,
+) -> Tuple[Dict[str, float], Optional[np.ndarray]]:
+    """``pocket_descriptors`` plus the metal point. With ``p2rank_stage_pdb`` the
+    converted PDB is copied there for a later ``run_p2rank_batch`` instead of
+    running P2Rank on this structure alone."""
     point, n_residues = metal_point(structure_path)
     result = _nan_result(n_residues)
     if point is None:
-        return result  # metal point not locatable -> all descriptors NaN
+        return result, None  # metal point not locatable -> all descriptors NaN
     result["metal_point_found"] = True
 
-    workdir = tempfile.mkdtemp(prefix="pocket_")
+    workdir = tempfile.mkdtemp(prefix="pocket_", dir=SCRATCH_DIR)
     try:
         pdb_path = _ensure_pdb(structure_path, workdir)
+        if p2rank_stage_pdb is not None:
+            shutil.copyfile(pdb_path, p2rank_stage_pdb)
         result.update(fpocket_catalytic(pdb_path, point, workdir, fpocket_bin=fpocket_bin))
         if p2rank_bin:
             result.update(p2rank_catalytic(pdb_path, point, workdir, p2rank_bin))
@@ -456,7 +568,7 @@ def pocket_descriptors(
     result["pocket_sasa_per_volume"] = (
         float(a / v) if (np.isfinite(v) and np.isfinite(a) and v > 0) else np.nan
     )
-    return result
+    return result, point
 
 
 def _collect_structures(structs_dir: str) -> Tuple["OrderedDict[str, str]", str]:
@@ -496,10 +608,18 @@ def pocket_descriptors_dir(
     save_path: Optional[str] = None,
     fpocket_bin: str = "fpocket",
     p2rank_bin: Optional[str] = None,
+    workers: Optional[int] = None,
+    p2rank_batch_size: int = P2RANK_BATCH_SIZE,
 ) -> pd.DataFrame:
     """fpocket (+ optional P2Rank) catalytic-pocket descriptors for every structure
     in ``structs_dir``; CSV keyed by ID. The catalytic pocket is the detected pocket
     enclosing / nearest the active-site metal point (DDXXD+NSE/DTE oxygen centroid).
+    fpocket runs on ``workers`` processes at once (default: all allocated CPUs),
+    each in its own scratch dir (``SCRATCH_DIR``); finished rows stream to
+    ``<save_path>.partial`` as they arrive, replaced by the sorted CSV at the end
+    (the p2rank_* columns are only filled in the final CSV). P2Rank runs once per ``p2rank_batch_size`` structures
+    over the staged PDBs with ``workers`` threads (``run_p2rank_batch``) rather
+    than paying a JVM start and model load per structure.
     """
     structures, mode = _collect_structures(structs_dir)
     if not structures:
@@ -514,25 +634,74 @@ def pocket_descriptors_dir(
         print("[note] no P2Rank binary given (P2RANK_PATH unset); "
               "p2rank_* columns will be NaN.")
 
-    rows: List[Dict[str, float]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = pocket_descriptors(path, fpocket_bin=fpocket_bin, p2rank_bin=p2rank_bin)
-        except Exception as exc:  # malformed/unparsable -> NaN row, keep going
-            print(f"  [warn] failed on {os.path.basename(path)}: {exc}")
-            stats = _nan_result(0)
-            n_failed += 1
-        stats["ID"] = str(stem).strip()
-        rows.append(stats)
-        print(f"  processed {i}/{n}: {stem}")
-
-    df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
-
     if save_path is None:
         save_path = _default_save_path(structs_dir)
+    partial_path = save_path + ".partial"
+
+    # Each structure's converted PDB is staged as <index>.pdb (IDs need not be
+    # file-name safe) for the batched P2Rank pass.
+    stage_dir = tempfile.mkdtemp(prefix="p2rank_stage_") if p2rank_bin else None
+    staged = (
+        {stem: os.path.join(stage_dir, f"{i:06d}.pdb") for i, stem in enumerate(structures)}
+        if stage_dir is not None
+        else {}
+    )
+    partial_fh = open(partial_path, "w", newline="")
+    try:
+        partial = csv.DictWriter(partial_fh, fieldnames=COLUMNS, extrasaction="ignore")
+        partial.writeheader()
+
+        def _stream(stem, result):
+            partial.writerow(dict(result[0], ID=str(stem).strip()))
+            partial_fh.flush()
+
+        # Malformed/unparsable -> NaN row, keep going.
+        results, n_failed = map_structures(
+            lambda stem, path: _pocket_descriptors(
+                path, fpocket_bin=fpocket_bin, p2rank_stage_pdb=staged.get(stem)
+            ),
+            structures,
+            lambda: (_nan_result(0), None),
+            workers=workers,
+            id_column=None,
+            failure="failed on",
+            progress_every=1,
+            on_row=_stream,
+        )
+        points = {stem: point for stem, (_, point) in zip(structures, results)}
+        rows: List[Dict[str, float]] = []
+        for stem, (row, _) in zip(structures, results):
+            row["ID"] = str(stem).strip()
+            rows.append(row)
+
+        if stage_dir is not None:
+            todo = [stem for stem in structures if points[stem] is not None]
+            batches = [todo[i:i + p2rank_batch_size] for i in range(0, len(todo), p2rank_batch_size)]
+            threads = resolve_workers(workers, p2rank_batch_size)
+            print(f"Running P2Rank on {len(todo)} structure(s) in {len(batches)} batch(es) "
+                  f"with {threads} thread(s)")
+            predictions: Dict[str, Optional[str]] = {}
+            for k, batch in enumerate(batches, start=1):
+                predictions.update(run_p2rank_batch(
+                    [staged[stem] for stem in batch],
+                    os.path.join(stage_dir, f"p2rank_out_{k}"),
+                    p2rank_bin,
+                    threads=threads,
+                ))
+                print(f"  P2Rank batch {k}/{len(batches)} done")
+            for stem, row in zip(structures, rows):
+                if points[stem] is not None:
+                    row.update(p2rank_catalytic_from_predictions(
+                        predictions.get(staged[stem]), points[stem]
+                    ))
+    finally:
+        partial_fh.close()
+        if stage_dir is not None:
+            shutil.rmtree(stage_dir, ignore_errors=True)
+
+    df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
     df.to_csv(save_path, index=False)
+    os.remove(partial_path)
 
     n_no_metal = int((~df["metal_point_found"]).sum())
     n_no_pocket = int((df["metal_point_found"] & ~df["fpocket_catalytic_pocket_found"]).sum())
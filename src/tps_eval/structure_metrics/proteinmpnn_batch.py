@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+# Resident, batched ProteinMPNN — one model load for a whole structure set.
+#
+# proteinmpnn_score / self_consistency used to launch `protein_mpnn_run.py` once per
+# structure: every design paid a fresh interpreter, a torch import, a checkpoint
+# load and a featurisation from scratch. Here the vendored `ProteinMPNN` network is
+# built and loaded ONCE and structures go through it in length-bucketed batches:
+#
+#   * featurize()     — backbone (N, CA, C, O) coordinates, sequence tokens, chain
+#     encoding and residue index straight from the parsed first model
+#     (structure_index.load_structure, so .cif works without a PDB round trip),
+#     with the same positions as the vendored `parse_PDB` (MSE read as MET, chains
+#     in its chain-alphabet order, residue-number gaps as masked X positions) and
+#     the `tied_featurize` conventions for an everything-designed input: missing
+#     atoms -> NaN -> masked, residue_idx 100 * chain + position, chains numbered
+#     from 1.
+#   * length_buckets() — structures sorted by length and packed so that
+#     batch rows x longest chain stays under `token_budget` padded residues.
+#   * score()   — the `--score_only` NLLs (`proteinmpnn_nll` = global_score,
+#     `proteinmpnn_score_designed` = score), averaged over `num_passes` decoding
+#     orders. Each structure's decoding-order noise comes from its own generator
+#     seeded with `seed`, so a structure's score does not depend on which bucket it
+#     landed in.
+#   * sample()  — N sequences per structure at a temperature (the
+#     self-consistency input), rows tiled N times per structure inside a bucket;
+#     'X' is omitted as in the vendored run script's default.
+#
+# Runs on CPU (`device="cpu"`) or CUDA. Tests drive BatchedProteinMPNN with a tiny
+# randomly initialised model; `load()` builds the real one from
+# vendor/ProteinMPNN/vanilla_model_weights/<model_name>.pt.
+
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from tps_eval.repo_paths import VENDOR_DIR
+from tps_eval.structure_metrics.structure_index import _three_to_one, load_structure
+
+PROTEINMPNN_DIR = VENDOR_DIR / "ProteinMPNN"
+
+# ProteinMPNN's token alphabet (index 20 = unknown / non-standard).
+ALPHABET = "ACDEFGHIKLMNPQRSTVWYX"
+BACKBONE_ATOMS = ("N", "CA", "C", "O")
+# Architecture of the released vanilla models (protein_mpnn_run.py).
+HIDDEN_DIM = 128
+NUM_LAYERS = 3
+# Padded residues (batch rows x longest chain in the bucket) per forward pass.
+DEFAULT_TOKEN_BUDGET = 8192
+
+_TOKEN = {aa: i for i, aa in enumerate(ALPHABET)}
+
+# protein_mpnn_utils.parse_PDB's chain alphabet: the order its chains are concatenated.
+CHAIN_ALPHABET = (
+    [chr(c) for c in range(ord("A"), ord("Z") + 1)]
+    + [chr(c) for c in range(ord("a"), ord("z") + 1)]
+    + [str(i) for i in range(300)]
+)
+
+
+def _chain_order(chain_ids: Sequence[str], chains: Optional[Sequence[str]]) -> List[str]:
+    """Chains in the order parse_PDB visits them: ``chains`` as given, else its chain
+    alphabet (A-Z, a-z, then "0".."299"). Chain ids outside that alphabet, which
+    parse_PDB would skip, are appended in file order rather than dropped."""
+    present = list(dict.fromkeys(str(c) for c in chain_ids))
+    if chains is not None:
+        return [c for c in chains if c in present]
+    rank = {c: i for i, c in enumerate(CHAIN_ALPHABET)}
+    known = sorted((c for c in present if c in rank), key=rank.__getitem__)
+    return known + [c for c in present if c not in rank]
+
+
+def featurize(structure_path: str, chains: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """One structure's ProteinMPNN inputs (unpadded): ``X`` (L, 4, 3) float32 with
+    NaN for missing backbone atoms, ``S`` (L,) tokens, ``chain_encoding`` (L,) from
+    1, ``residue_idx`` (L,), plus ``sequence``. Only the polymer residues of
+    ``chains`` (default: all chains) are kept.
+
+    Positions follow the vendored ``parse_PDB``: HETATM selenomethionine (MSE) is
+    read as MET; chains are concatenated in its chain-alphabet order; within a chain
+    every residue number from the first to the last is a position (insertion codes
+    in sorted order), and a number with no residue is an ``X`` with NaN coordinates,
+    i.e. masked."""
+    parsed = load_structure(structure_path)
+    is_mse = parsed.het_flags == "H_MSE"
+    keep = np.flatnonzero(parsed.polymer | is_mse)
+    atoms = np.stack([parsed.atom_index(name) for name in BACKBONE_ATOMS], axis=1)
+    rows: List[Tuple[int, int, str]] = []  # (chain number, residue row or -1, one-letter)
+    for number, chain in enumerate(_chain_order(parsed.chain_ids[keep], chains), start=1):
+        in_chain = keep[parsed.chain_ids[keep] == chain]
+        by_number: Dict[int, List[int]] = {}
+        for r in in_chain:
+            by_number.setdefault(int(parsed.resseqs[r]), []).append(int(r))
+        for resseq in range(min(by_number), max(by_number) + 1):
+            residues = sorted(by_number.get(resseq, []), key=lambda r: parsed.icodes[r].strip())
+            if not residues:
+                rows.append((number, -1, "X"))
+            for r in residues:
+                rows.append((number, r, "M" if is_mse[r] else _three_to_one(parsed.resnames[r])))
+    X = np.full((len(rows), len(BACKBONE_ATOMS), 3), np.nan, dtype=np.float32)
+    residue_rows = np.asarray([r for _, r, _ in rows], dtype=np.int64)
+    present = residue_rows >= 0
+    idx = atoms[residue_rows[present]]
+    block = X[present]
+    block[idx >= 0] = parsed.coords[idx[idx >= 0]]
+    X[present] = block
+    sequence = "".join(aa for _, _, aa in rows)
+    chain_encoding = np.asarray([c for c, _, _ in rows], dtype=np.int64)
+    return {
+        "X": X,
+        "S": np.asarray([_TOKEN.get(a, 20) for a in sequence], dtype=np.int64),
+        "chain_encoding": chain_encoding,
+        "residue_idx": 100 * (chain_encoding - 1) + np.arange(len(rows), dtype=np.int64),
+        "sequence": sequence,
+    }
+
+
+def length_buckets(lengths: Sequence[int], token_budget: int = DEFAULT_TOKEN_BUDGET,
+                   rows_per_item: int = 1) -> List[List[int]]:
+    """Indices grouped into batches of similar length: sorted by length, each batch
+    grown while (items x ``rows_per_item``) x its longest length fits ``token_budget``
+    (a single over-budget item still gets its own batch)."""
+    order = np.argsort(np.asarray(lengths, dtype=np.int64), kind="stable")
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for i in order:
+        longest = max(int(lengths[i]), 1)
+        if current and (len(current) + 1) * rows_per_item * longest > token_budget:
+            batches.append(current)
+            current = []
+        current.append(int(i))
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _scores(S, log_probs, mask):
+    """Mean negative log-likelihood of ``S`` over ``mask`` (protein_mpnn_utils._scores)."""
+    loss = -torch.gather(log_probs, 2, S.unsqueeze(-1)).squeeze(-1)
+    return torch.sum(loss * mask, dim=-1) / torch.sum(mask, dim=-1)
+
+
+class BatchedProteinMPNN:
+    """A loaded ProteinMPNN model plus the batching around it (see module header).
+
+    ``model`` is any module with the vendored ``ProteinMPNN`` ``forward`` / ``sample``
+    signatures. ``seed`` 0 means random, as in protein_mpnn_run.py."""
+
+    def __init__(self, model, *, device: str = "cpu", seed: int = 0,
+                 token_budget: int = DEFAULT_TOKEN_BUDGET):
+        self.model = model.to(device).eval()
+        self.device = device
+        self.seed = seed if seed else int(np.random.randint(0, 999))
+        self.token_budget = token_budget
+
+    @classmethod
+    def load(cls, model_name: str = "v_48_020", *, device: Optional[str] = None,
+             backbone_noise: float = 0.0, seed: int = 0,
+             token_budget: int = DEFAULT_TOKEN_BUDGET) -> "BatchedProteinMPNN":
+        """Build the vendored ProteinMPNN and load ``vanilla_model_weights/<model_name>.pt``."""
+        if device is None:
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        if str(PROTEINMPNN_DIR) not in sys.path:
+            sys.path.insert(0, str(PROTEINMPNN_DIR))
+        from protein_mpnn_utils import ProteinMPNN
+
+        checkpoint_path = PROTEINMPNN_DIR / "vanilla_model_weights" / f"{model_name}.pt"
+        print(f"Loading ProteinMPNN {model_name} onto {device} ...")
+        checkpoint = torch.load(checkpoint_path, map_location=device)
+        model = ProteinMPNN(
+            ca_only=False, num_letters=21, node_features=HIDDEN_DIM, edge_features=HIDDEN_DIM,
+            hidden_dim=HIDDEN_DIM, num_encoder_layers=NUM_LAYERS, num_decoder_layers=NUM_LAYERS,
+            augment_eps=backbone_noise, k_neighbors=checkpoint["num_edges"],
+        )
+        model.load_state_dict(checkpoint["model_state_dict"])
+        return cls(model, device=device, seed=seed, token_budget=token_budget)
+
+    def _collate(self, items: Sequence[Dict[str, np.ndarray]], repeats: int = 1):
+        """Pad a bucket into batch tensors (each item tiled ``repeats`` times)."""
+        rows = [item for item in items for _ in range(repeats)]
+        B, L = len(rows), max(len(item["S"]) for item in rows)
+        X = np.zeros((B, L, len(BACKBONE_ATOMS), 3), dtype=np.float32)
+        S = np.zeros((B, L), dtype=np.int64)
+        mask = np.zeros((B, L), dtype=np.float32)
+        chain_M = np.zeros((B, L), dtype=np.float32)
+        residue_idx = np.full((B, L), -100, dtype=np.int64)
+        chain_encoding = np.zeros((B, L), dtype=np.int64)
+        for b, item in enumerate(rows):
+            n = len(item["S"])
+            finite = np.isfinite(item["X"].sum(axis=(1, 2)))
+            X[b, :n] = np.nan_to_num(item["X"], nan=0.0)
+            S[b, :n] = item["S"]
+            mask[b, :n] = finite
+            chain_M[b, :n] = 1.0
+            residue_idx[b, :n] = item["residue_idx"]
+            chain_encoding[b, :n] = item["chain_encoding"]
+        to = lambda a: torch.from_numpy(a).to(self.device)  # noqa: E731
+        return to(X), to(S), to(mask), to(chain_M), to(residue_idx), to(chain_encoding)
+
+    def _decoding_noise(self, items, repeats: int, L: int, generators) -> torch.Tensor:
+        randn = torch.zeros((len(items) * repeats, L))
+        for b, item in enumerate(items):
+            for r in range(repeats):
+                randn[b * repeats + r, : len(item["S"])] = torch.randn(
+                    len(item["S"]), generator=generators[b])
+        return randn.to(self.device)
+
+    def score(self, items: Sequence[Dict[str, np.ndarray]], *,
+              num_passes: int = 1) -> List[Dict[str, float]]:
+        """Native-sequence NLLs of every featurized structure, in input order."""
+        out: List[Optional[Dict[str, float]]] = [None] * len(items)
+        lengths = [len(item["S"]) for item in items]
+        with torch.no_grad():
+            for bucket in length_buckets(lengths, self.token_budget):
+                batch = [items[i] for i in bucket]
+                X, S, mask, chain_M, residue_idx, chain_encoding = self._collate(batch)
+                generators = [torch.Generator().manual_seed(self.seed) for _ in batch]
+                designed = np.zeros(len(batch))
+                global_ = np.zeros(len(batch))
+                for _ in range(num_passes):
+                    randn = self._decoding_noise(batch, 1, S.shape[1], generators)
+                    log_probs = self.model(X, S, mask, chain_M, residue_idx, chain_encoding, randn)
+                    designed += _scores(S, log_probs, mask * chain_M).cpu().numpy()
+                    global_ += _scores(S, log_probs, mask).cpu().numpy()
+                for k, i in enumerate(bucket):
+                    out[i] = {
+                        "proteinmpnn_nll": float(global_[k] / num_passes),
+                        "proteinmpnn_score_designed": float(designed[k] / num_passes),
+                    }
+        return out  # type: ignore[return-value]
+
+    def sample(self, items: Sequence[Dict[str, np.ndarray]], *, num_seqs: int,
+               temperature: float = 0.1, omit_aas: str = "X") -> List[List[str]]:
+        """``num_seqs`` sampled sequences per featurized structure, in input order
+        (chains concatenated, as the self-consistency refold input)."""
+        out: List[List[str]] = [[] for _ in items]
+        lengths = [len(item["S"]) for item in items]
+        torch.manual_seed(self.seed)
+        omit = np.asarray([aa in omit_aas for aa in ALPHABET], dtype=np.float32)
+        bias = np.zeros(len(ALPHABET), dtype=np.float32)
+        with torch.no_grad():
+            for bucket in length_buckets(lengths, self.token_budget, rows_per_item=num_seqs):
+                batch = [items[i] for i in bucket]
+                X, S, mask, chain_M, residue_idx, chain_encoding = self._collate(batch, num_seqs)
+                B, L = S.shape
+                generators = [torch.Generator().manual_seed(self.seed) for _ in batch]
+                randn = self._decoding_noise(batch, num_seqs, L, generators)
+                zeros = torch.zeros((B, L, len(ALPHABET)), device=self.device)
+                sampled = self.model.sample(
+                    X, randn, S, chain_M, chain_encoding, residue_idx, mask=mask,
+                    temperature=temperature, omit_AAs_np=omit, bias_AAs_np=bias,
+                    chain_M_pos=torch.ones_like(chain_M), omit_AA_mask=None,
+                    pssm_coef=torch.zeros((B, L), device=self.device), pssm_bias=zeros,
+                    pssm_multi=0.0, pssm_log_odds_flag=False,
+                    pssm_log_odds_mask=torch.ones_like(zeros), pssm_bias_flag=False,
+                    bias_by_res=zeros,
+                )["S"].cpu().numpy()
+                for b, i in enumerate(bucket):
+                    n = lengths[i]
+                    out[i] = ["".join(ALPHABET[t] for t in sampled[b * num_seqs + r, :n])
+                              for r in range(num_seqs)]
+        return out
+
+
+def featurize_all(paths: Sequence[Tuple[str, str]], chains: Optional[Dict[str, str]] = None):
+    """Featurize ``(ID, path)`` pairs; returns ``(features, failures)`` where failures
+    maps ID -> the exception (the caller's NaN row)."""
+    features: Dict[str, Dict[str, np.ndarray]] = {}
+    failures: Dict[str, Exception] = {}
+    for stem, path in paths:
+        try:
+            chain = (chains or {}).get(stem)
+            item = featurize(path, None if chain is None else [chain])
+            if not len(item["S"]):
+                raise ValueError("no polymer residues")
+            features[stem] = item
+        except Exception as exc:  # noqa: BLE001
+            failures[stem] = exc
+    return features, failures
+
+
+def throughput(n_structures: int, seconds: float) -> str:
+    """``"<n> structure(s) in <t> s (<rate> structures/s)"`` for the run logs."""
+    rate = n_structures / seconds if seconds > 0 else float("inf")
+    return f"{n_structures} structure(s) in {seconds:.1f} s ({rate:.2f} structures/s)"
+
+
+def timed(fn, *args, **kwargs):
+    """``(fn(*args, **kwargs), elapsed seconds)``."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
@@ -16,6 +16,12 @@ from __future__ import annotations
 # per structure with --score_only 1, which writes score_only/<stem>_pdb.npz with
 # arrays `score` and `global_score` (shape (NUM_BATCHES,)). We average and read
 # back. ID = structure filename stem (matches plddt / structural_identity keys).
+#
+# engine="batched" instead loads the model once in this process and scores the
+# structures in length-bucketed batches (proteinmpnn_batch); same columns, no
+# per-structure subprocess or checkpoint load. engine="subprocess" (the per-structure
+# protein_mpnn_run.py path) stays the default until the batched engine has been
+# checked against it on the real weights.
 
 import glob
 import os
@@ -36,6 +42,8 @@ PROTEINMPNN_DIR = VENDOR_DIR / "ProteinMPNN"
 
 COLUMNS = ["ID", "proteinmpnn_nll", "proteinmpnn_score_designed"]
 
+ENGINES = ("batched", "subprocess")
+
 
 def _collect_structures(structs_dir: str):
     """Map ID -> structure file. Mirrors plddt.py's af3-vs-flat detection.
@@ -113,6 +121,37 @@ def score_pdb(
     }
 
 
+def _failed_row() -> Dict[str, float]:
+    return {"proteinmpnn_nll": np.nan, "proteinmpnn_score_designed": np.nan}
+
+
+def _score_subprocess(structures, tmp: str, **kwargs) -> List[Dict[str, float]]:
+    rows: List[Dict[str, float]] = []
+    n = len(structures)
+    for i, (stem, path) in enumerate(structures.items(), start=1):
+        try:
+            if is_cif(path):
+                path = write_pdb_copy(path, os.path.join(tmp, "inputs", stem + ".pdb"))
+            stats = score_pdb(path, tmp, **kwargs)
+        except Exception as exc:  # noqa: BLE001
+            print(f"  [warn] failed on {stem}: {exc}")
+            stats = _failed_row()
+        stats["ID"] = stem
+        rows.append(stats)
+        print(f"  [{i}/{n}] {stem}: nll={stats['proteinmpnn_nll']:.4f}")
+    return rows
+
+
+def _score_batched(structures, engine, *, num_passes: int = 1) -> List[Dict[str, float]]:
+    from tps_eval.structure_metrics.proteinmpnn_batch import featurize_all
+
+    features, failures = featurize_all(list(structures.items()))
+    for stem, exc in failures.items():
+        print(f"  [warn] failed on {stem}: {exc}")
+    scored = dict(zip(features, engine.score(list(features.values()), num_passes=num_passes)))
+    return [dict(scored.get(stem) or _failed_row(), ID=stem) for stem in structures]
+
+
 def score_dir(
     structs_dir: str,
     *,
@@ -120,9 +159,20 @@ def score_dir(
     model_name: str = "v_48_020",
     seed: int = 0,
     backbone_noise: float = 0.0,
+    engine: str = "subprocess",
+    device: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    model=None,
 ) -> pd.DataFrame:
     """Score every structure's native sequence with ProteinMPNN, writing a CSV
-    keyed by ID (proteinmpnn_nll = mean per-residue NLL; lower = fold-compatible)."""
+    keyed by ID (proteinmpnn_nll = mean per-residue NLL; lower = fold-compatible).
+
+    engine: "batched" (one resident model, length-bucketed batches of at most
+    `token_budget` padded residues on `device`) or "subprocess" (one
+    protein_mpnn_run.py per structure). `model` is an already-built
+    BatchedProteinMPNN to reuse instead of loading `model_name`."""
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -130,22 +180,26 @@ def score_dir(
         )
     print(f"Detected {mode} layout: {len(structures)} structure(s) in {structs_dir}")
 
-    rows: List[Dict[str, float]] = []
-    n = len(structures)
-    with tempfile.TemporaryDirectory(prefix="proteinmpnn_score_") as tmp:
-        for i, (stem, path) in enumerate(structures.items(), start=1):
-            try:
-                if is_cif(path):
-                    path = write_pdb_copy(path, os.path.join(tmp, "inputs", stem + ".pdb"))
-                stats = score_pdb(
-                    path, tmp, model_name=model_name, seed=seed, backbone_noise=backbone_noise
-                )
-            except Exception as exc:  # noqa: BLE001
-                print(f"  [warn] failed on {stem}: {exc}")
-                stats = {"proteinmpnn_nll": np.nan, "proteinmpnn_score_designed": np.nan}
-            stats["ID"] = stem
-            rows.append(stats)
-            print(f"  [{i}/{n}] {stem}: nll={stats['proteinmpnn_nll']:.4f}")
+    if engine == "batched":
+        from tps_eval.structure_metrics.proteinmpnn_batch import (
+            DEFAULT_TOKEN_BUDGET,
+            BatchedProteinMPNN,
+            throughput,
+            timed,
+        )
+
+        if model is None:
+            model = BatchedProteinMPNN.load(
+                model_name, device=device, backbone_noise=backbone_noise, seed=seed,
+                token_budget=token_budget or DEFAULT_TOKEN_BUDGET,
+            )
+        rows, seconds = timed(_score_batched, structures, model)
+        print(f"Scored {throughput(len(structures), seconds)}")
+    else:
+        with tempfile.TemporaryDirectory(prefix="proteinmpnn_score_") as tmp:
+            rows = _score_subprocess(
+                structures, tmp, model_name=model_name, seed=seed, backbone_noise=backbone_noise
+            )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
 
@@ -154,3 +208,44 @@ def score_dir(
     df.to_csv(save_path, index=False)
     print(f"Wrote {len(df)} rows to {save_path}")
     return df
+
+
+def benchmark_dir(
+    structs_dir: str,
+    *,
+    limit: Optional[int] = None,
+    subprocess_limit: int = 0,
+    model_name: str = "v_48_020",
+    device: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Throughput (structures/s) of the batched engine on the first `limit`
+    structures, and of the subprocess engine on the first `subprocess_limit`
+    (0 = skip; it is slow). Model loading is excluded from the batched rate and
+    reported separately. Nothing is written."""
+    from tps_eval.structure_metrics.proteinmpnn_batch import (
+        DEFAULT_TOKEN_BUDGET,
+        BatchedProteinMPNN,
+        throughput,
+        timed,
+    )
+
+    structures, _ = _collect_structures(structs_dir)
+    if not structures:
+        raise ValueError(f"No structures found in {structs_dir}.")
+    subset = OrderedDict(list(structures.items())[:limit])
+    model, load_seconds = timed(
+        BatchedProteinMPNN.load, model_name, device=device, seed=seed,
+        token_budget=token_budget or DEFAULT_TOKEN_BUDGET,
+    )
+    _, seconds = timed(_score_batched, subset, model)
+    result = {"model_load_s": load_seconds, "batched_structures_per_s": len(subset) / seconds}
+    print(f"[benchmark] model load {load_seconds:.1f} s; batched: {throughput(len(subset), seconds)}")
+    if subprocess_limit:
+        sub = OrderedDict(list(structures.items())[:subprocess_limit])
+        with tempfile.TemporaryDirectory(prefix="proteinmpnn_bench_") as tmp:
+            _, seconds = timed(_score_subprocess, sub, tmp, model_name=model_name, seed=seed)
+        result["subprocess_structures_per_s"] = len(sub) / seconds
+        print(f"[benchmark] subprocess: {throughput(len(sub), seconds)}")
+    return result
@@ -36,17 +36,14 @@ interpretable.
 
 import glob
 import os
-import warnings
 from collections import OrderedDict
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from Bio.PDB import MMCIFParser, PDBParser
-from Bio.PDB.PDBExceptions import PDBConstructionWarning
 
-_PDB_PARSER = PDBParser(QUIET=True)
-_CIF_PARSER = MMCIFParser(QUIET=True)
+from tps_eval.structure_metrics.parallel import map_structures
+from tps_eval.structure_metrics.structure_index import ParsedStructure, load_structure
 
 # Output column order (ID first, then the raw geometric metrics).
 COLUMNS = [
@@ -61,27 +58,18 @@ COLUMNS = [
 ]
 
 
-def _parser_for(path: str):
-    return _CIF_PARSER if path.lower().endswith((".cif", ".mmcif")) else _PDB_PARSER
-
-
 def ca_coordinates(structure_path: str) -> np.ndarray:
     """(N, 3) array of Cα coordinates: the CA atom of every protein residue that
     has one, across all chains of the first model. HETATM ions/ligands/water are
     skipped (hetflag != ' '), mirroring ``plddt.py``. Works for .pdb and .cif."""
-    parser = _parser_for(structure_path)
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", PDBConstructionWarning)
-        structure = parser.get_structure("s", structure_path)
-    model = next(iter(structure))  # first model only (predicted structs write one)
-    coords: List[np.ndarray] = []
-    for chain in model:
-        for residue in chain:
-            if residue.id[0] != " ":  # skip HETATM (ions/ligands/water)
-                continue
-            if "CA" in residue:
-                coords.append(np.asarray(residue["CA"].get_coord(), dtype=float))
-    return np.vstack(coords) if coords else np.empty((0, 3))
+    return structure_ca_coordinates(load_structure(structure_path))  # first model only
+
+
+def structure_ca_coordinates(structure: ParsedStructure) -> np.ndarray:
+    """``ca_coordinates`` on an already-loaded structure."""
+    ca = structure.atom_index("CA")
+    ca = ca[structure.polymer & (ca >= 0)]  # skip HETATM (ions/ligands/water)
+    return structure.coords[ca].astype(float)
 
 
 def gyration_metrics(coords: np.ndarray) -> Dict[str, float]:
@@ -165,9 +153,11 @@ def radius_of_gyration_dir(
     structs_dir: str,
     *,
     save_path: Optional[str] = None,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Raw radius-of-gyration / compactness metrics for every structure in
-    ``structs_dir``; CSV keyed by ID. Unparsable structures yield a NaN row."""
+    ``structs_dir``; CSV keyed by ID. Unparsable structures yield a NaN row.
+    Structures are processed on ``workers`` processes (default: all allocated CPUs)."""
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -176,20 +166,13 @@ def radius_of_gyration_dir(
         )
     print(f"Detected {mode} layout: {len(structures)} structure(s) in {structs_dir}")
 
-    rows: List[Dict[str, float]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = radius_of_gyration(path)
-        except Exception as exc:  # malformed/unparsable -> NaN row, keep going
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = gyration_metrics(np.empty((0, 3)))
-            n_failed += 1
-        stats["ID"] = str(stem).strip()
-        rows.append(stats)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    # Malformed/unparsable -> NaN row, keep going.
+    rows, n_failed = map_structures(
+        lambda stem, path: radius_of_gyration(path),
+        structures,
+        lambda: gyration_metrics(np.empty((0, 3))),
+        workers=workers,
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
 
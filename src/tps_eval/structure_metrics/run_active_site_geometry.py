@@ -37,9 +37,18 @@ def main() -> None:
         "the catalytic_constellation_rmsd / best_template columns are populated; "
         "otherwise they are NaN.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
     template_ids = [t.strip() for t in args.templates.split(",") if t.strip()] if args.templates else None
-    active_site_geometry_dir(args.structs_dir, save_path=args.save_path, template_ids=template_ids)
+    active_site_geometry_dir(
+        args.structs_dir, save_path=args.save_path, template_ids=template_ids, workers=args.workers
+    )
 
 
 if __name__ == "__main__":
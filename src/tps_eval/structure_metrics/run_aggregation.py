@@ -42,12 +42,20 @@ def main():
         help="Directory for the per-residue score files when --save_residue_scores "
         "is set (default: <structs_dir>_aggregation_residue_scores).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
     extract_aggregation_dir(
         args.structs_dir,
         save_path=args.save_path,
         save_residue_scores=args.save_residue_scores,
         residue_scores_dir=args.residue_scores_dir,
+        workers=args.workers,
     )
 
 
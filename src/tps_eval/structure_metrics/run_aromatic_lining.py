@@ -59,6 +59,13 @@ def main() -> None:
         help="Max angle (deg) between the ring normal and the centroid->locus vector "
         f"for a face-on (inward) hit (default {DEFAULT_FACE_ANGLE_DEG}).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
     aromatic_lining_dir(
         args.structs_dir,
@@ -67,6 +74,7 @@ def main() -> None:
         cation_pi_min=args.cation_pi_min,
         cation_pi_max=args.cation_pi_max,
         face_angle_deg=args.face_angle_deg,
+        workers=args.workers,
     )
 
 
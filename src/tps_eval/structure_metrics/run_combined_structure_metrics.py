@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import argparse
+
+from tps_eval.structure_metrics.combined_structure_metrics import (
+    DEFAULT_PARAMS,
+    METRICS,
+    combined_structure_metrics_dir,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compute the cheap per-structure geometry metrics (pLDDT, radius of "
+        "gyration, motif structural distance, active-site geometry, aromatic lining, "
+        "diphosphate sensor, ion-site check) in ONE pass over a structures directory: "
+        "each structure is loaded once and its motifs / metal point are localized once "
+        "for all selected metrics. Writes the same <structs_dir>_<metric>.csv files "
+        "as the standalone tools."
+    )
+    parser.add_argument(
+        "structs_dir",
+        help="Either an AlphaFold3 af_output directory (per-job subfolders with "
+        "<job>/<job>_model.cif; ID = job name) OR a flat directory of .pdb/.cif "
+        "structures (ID = filename stem).",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=",".join(METRICS),
+        help=f"Comma-separated metrics to compute (default: all of {', '.join(METRICS)}).",
+    )
+    parser.add_argument(
+        "--save_dir",
+        default=None,
+        help="Directory for the CSVs (default: next to structs_dir, where the "
+        "standalone tools write them).",
+    )
+    parser.add_argument(
+        "--confident_threshold",
+        type=float,
+        default=DEFAULT_PARAMS["confident_threshold"],
+        help="plddt: cutoff for frac_plddt_confident (default %(default)s).",
+    )
+    parser.add_argument(
+        "--templates",
+        default=None,
+        help="active_site_geometry: comma-separated reference IDs in structs_dir for "
+        "the catalytic-constellation RMSD (default: none -> NaN columns).",
+    )
+    parser.add_argument(
+        "--aromatic_cutoff",
+        type=float,
+        default=DEFAULT_PARAMS["aromatic_cutoff"],
+        help="aromatic_lining: pocket shell radius (A) around the metal point (default %(default)s).",
+    )
+    parser.add_argument(
+        "--cation_pi_min",
+        type=float,
+        default=DEFAULT_PARAMS["cation_pi_min"],
+        help="aromatic_lining: min ring-centroid->locus distance (default %(default)s).",
+    )
+    parser.add_argument(
+        "--cation_pi_max",
+        type=float,
+        default=DEFAULT_PARAMS["cation_pi_max"],
+        help="aromatic_lining: max ring-centroid->locus distance (default %(default)s).",
+    )
+    parser.add_argument(
+        "--face_angle_deg",
+        type=float,
+        default=DEFAULT_PARAMS["face_angle_deg"],
+        help="aromatic_lining: max ring-normal angle for a face-on hit (default %(default)s).",
+    )
+    parser.add_argument(
+        "--diphosphate_cutoff",
+        type=float,
+        default=DEFAULT_PARAMS["diphosphate_cutoff"],
+        help="diphosphate_sensor: terminal-N distance (A) from the metal point (default %(default)s).",
+    )
+    parser.add_argument(
+        "--ry_dist",
+        type=float,
+        default=DEFAULT_PARAMS["ry_dist"],
+        help="diphosphate_sensor: spatial RY-pair distance (A) (default %(default)s).",
+    )
+    parser.add_argument(
+        "--site_radius",
+        type=float,
+        default=DEFAULT_PARAMS["site_radius"],
+        help="ion_site_check: in-site radius (A) around the cage centroid (default %(default)s).",
+    )
+    parser.add_argument(
+        "--coord_cutoff",
+        type=float,
+        default=DEFAULT_PARAMS["coord_cutoff"],
+        help="ion_site_check: Mg-O coordination cutoff (A) (default %(default)s).",
+    )
+    parser.add_argument(
+        "--min_coord_contacts",
+        type=int,
+        default=DEFAULT_PARAMS["min_coord_contacts"],
+        help="ion_site_check: min coordinating-O contacts for a well-placed ion (default %(default)s).",
+    )
+    parser.add_argument(
+        "--ion_resnames",
+        nargs="+",
+        default=list(DEFAULT_PARAMS["ion_resnames"]),
+        help="ion_site_check: ion HETATM residue names (default %(default)s).",
+    )
+    parser.add_argument(
+        "--diphosphate_resnames",
+        nargs="+",
+        default=list(DEFAULT_PARAMS["diphosphate_resnames"]),
+        help="ion_site_check: diphosphate HETATM residue names (default %(default)s).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
+    args = parser.parse_args()
+    metrics = [m.strip() for m in args.metrics.split(",") if m.strip()]
+    templates = [t.strip() for t in args.templates.split(",") if t.strip()] if args.templates else None
+    combined_structure_metrics_dir(
+        args.structs_dir,
+        metrics=metrics,
+        save_dir=args.save_dir,
+        confident_threshold=args.confident_threshold,
+        templates=templates,
+        aromatic_cutoff=args.aromatic_cutoff,
+        cation_pi_min=args.cation_pi_min,
+        cation_pi_max=args.cation_pi_max,
+        face_angle_deg=args.face_angle_deg,
+        diphosphate_cutoff=args.diphosphate_cutoff,
+        ry_dist=args.ry_dist,
+        site_radius=args.site_radius,
+        coord_cutoff=args.coord_cutoff,
+        min_coord_contacts=args.min_coord_contacts,
+        ion_resnames=tuple(args.ion_resnames),
+        diphosphate_resnames=tuple(args.diphosphate_resnames),
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -47,6 +47,13 @@ def main() -> None:
         "--substrate_resname", default=None,
         help="Force a specific ligand residue name as the substrate (default: auto-detect).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
     cyclization_geometry_dir(
         args.structs_dir,
@@ -56,6 +63,7 @@ def main() -> None:
         ion_resnames=tuple(args.ion_resnames),
         min_substrate_carbons=args.min_substrate_carbons,
         substrate_resname=args.substrate_resname,
+        workers=args.workers,
     )
 
 
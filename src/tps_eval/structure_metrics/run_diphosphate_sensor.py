@@ -46,12 +46,20 @@ def main() -> None:
         help=f"Distance (A) for the spatial RY-pair criterion: a Tyr OH within this of "
         f"a sensor Arg's guanidinium centroid (default {DEFAULT_RY_DIST}).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
     diphosphate_sensor_dir(
         args.structs_dir,
         save_path=args.save_path,
         cutoff=args.cutoff,
         ry_dist=args.ry_dist,
+        workers=args.workers,
     )
 
 
@@ -48,6 +48,12 @@ def main() -> None:
         "reduction, so each design's best hit is its nearest OTHER known-TPS domain "
         "(leave-one-out) instead of the trivial self-match TM~1.0.",
     )
+    parser.add_argument(
+        "--db_cache",
+        default=None,
+        help="Directory of prebuilt foldseek DBs: the reference-domain DB + index is "
+        "built once and reused across runs (default: built for this run only).",
+    )
     args = parser.parse_args()
 
     extract_domain_structural_identity_dir(
@@ -58,6 +64,7 @@ def main() -> None:
         n_iters=args.n_iters,
         keep_detected_domains=args.keep_detected_domains,
         exclude_self=args.self_mode,
+        db_cache=args.db_cache,
     )
 
 
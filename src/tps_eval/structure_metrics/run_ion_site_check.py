@@ -70,6 +70,13 @@ def main() -> None:
         help=f"Diphosphate HETATM residue names to read for the mg_ppi case "
         f"(default {' '.join(DEFAULT_DIPHOSPHATE_RESNAMES)}).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
     ion_site_check_dir(
         args.structs_dir,
@@ -79,6 +86,7 @@ def main() -> None:
         min_coord_contacts=args.min_coord_contacts,
         ion_resnames=tuple(args.ion_resnames),
         diphosphate_resnames=tuple(args.diphosphate_resnames),
+        workers=args.workers,
     )
 
 
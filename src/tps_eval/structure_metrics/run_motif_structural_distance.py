@@ -27,8 +27,15 @@ def main() -> None:
         help="Output CSV path (default: <structs_dir>_motif_structural_distance.csv "
         "next to the directory).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
-    motif_structural_distance_dir(args.structs_dir, save_path=args.save_path)
+    motif_structural_distance_dir(args.structs_dir, save_path=args.save_path, workers=args.workers)
 
 
 if __name__ == "__main__":
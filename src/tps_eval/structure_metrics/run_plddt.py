@@ -34,11 +34,19 @@ def main() -> None:
         default=CONFIDENT_THRESHOLD,
         help=f"pLDDT cutoff for frac_plddt_confident (default: {CONFIDENT_THRESHOLD}).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
     extract_plddt_dir(
         args.structs_dir,
         save_path=args.save_path,
         confident_threshold=args.confident_threshold,
+        workers=args.workers,
     )
 
 
@@ -2,7 +2,10 @@ from __future__ import annotations
 
 import argparse
 
-from tps_eval.structure_metrics.pocket_descriptors import pocket_descriptors_dir
+from tps_eval.structure_metrics.pocket_descriptors import (
+    P2RANK_BATCH_SIZE,
+    pocket_descriptors_dir,
+)
 
 
 def main() -> None:
@@ -41,12 +44,28 @@ def main() -> None:
         help="P2Rank 'prank' executable (e.g. $P2RANK_PATH/prank). When omitted the "
         "P2Rank cross-check is skipped and its columns are NaN.",
     )
+    parser.add_argument(
+        "--p2rank_batch_size",
+        type=int,
+        default=P2RANK_BATCH_SIZE,
+        help="Structures per P2Rank run (one JVM start + model load per batch; "
+        "default %(default)s).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes for fpocket and P2Rank threads per batch (default: "
+        "every CPU allocated to the job, via os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
     pocket_descriptors_dir(
         args.structs_dir,
         save_path=args.save_path,
         fpocket_bin=args.fpocket_bin,
         p2rank_bin=args.p2rank_bin,
+        workers=args.workers,
+        p2rank_batch_size=args.p2rank_batch_size,
     )
 
 
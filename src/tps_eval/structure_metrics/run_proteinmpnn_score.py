@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import argparse
 
-from tps_eval.structure_metrics.proteinmpnn_score import score_dir
+from tps_eval.structure_metrics.proteinmpnn_score import benchmark_dir, score_dir
 
 
 def main() -> None:
@@ -31,14 +31,52 @@ def main() -> None:
         "--backbone_noise", type=float, default=0.0,
         help="Std of Gaussian noise added to backbone atoms when scoring (default 0).",
     )
+    parser.add_argument(
+        "--engine", choices=("batched", "subprocess"), default="subprocess",
+        help="subprocess = one protein_mpnn_run.py per structure (default); batched = "
+        "load ProteinMPNN once and score length-bucketed batches in this process.",
+    )
+    parser.add_argument("--device", default=None,
+                        help="Torch device for the batched engine (default: cuda if available, else cpu).")
+    parser.add_argument(
+        "--token_budget", type=int, default=None,
+        help="Batched engine: padded residues (batch rows x longest chain) per forward "
+        "pass (default 8192).",
+    )
+    parser.add_argument(
+        "--benchmark", action="store_true",
+        help="Report the batched engine's throughput (structures/s) instead of writing "
+        "the CSV; --limit / --benchmark_subprocess choose the structures timed.",
+    )
+    parser.add_argument("--limit", type=int, default=None,
+                        help="With --benchmark: time only the first N structures.")
+    parser.add_argument(
+        "--benchmark_subprocess", type=int, default=0,
+        help="With --benchmark: also time the subprocess engine on the first N "
+        "structures (default 0 = skip).",
+    )
     args = parser.parse_args()
 
+    if args.benchmark:
+        benchmark_dir(
+            args.structs_dir,
+            limit=args.limit,
+            subprocess_limit=args.benchmark_subprocess,
+            model_name=args.model_name,
+            device=args.device,
+            token_budget=args.token_budget,
+            seed=args.seed,
+        )
+        return
     score_dir(
         args.structs_dir,
         save_path=args.save_path,
         model_name=args.model_name,
         seed=args.seed,
         backbone_noise=args.backbone_noise,
+        engine=args.engine,
+        device=args.device,
+        token_budget=args.token_budget,
     )
 
 
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import argparse
 
-from tps_eval.structure_metrics.self_consistency import self_consistency_dir
+from tps_eval.structure_metrics.self_consistency import DEFAULT_RMSD_THRESHOLD, self_consistency_dir
 
 
 def main() -> None:
@@ -36,6 +36,26 @@ def main() -> None:
     parser.add_argument("--chain", default=None,
                         help="For multi-chain structures, the single design chain to score "
                         "(default: first chain). scRMSD is a single-chain designability metric.")
+    parser.add_argument(
+        "--mpnn_engine", choices=("batched", "subprocess"), default="subprocess",
+        help="subprocess = one protein_mpnn_run.py per structure (default); batched = "
+        "sample every structure's sequences with one resident ProteinMPNN in length-bucketed batches.",
+    )
+    parser.add_argument(
+        "--early_stop_k", type=int, default=None,
+        help="Stop refolding a design once this many samples are under --rmsd_threshold, "
+        "or once too few samples remain for that (default: refold all --num_seqs). "
+        "min/mean/n_samples then cover the evaluated samples (n_samples_evaluated).",
+    )
+    parser.add_argument(
+        "--rmsd_threshold", type=float, default=DEFAULT_RMSD_THRESHOLD,
+        help=f"scRMSD (A) counted as a pass for --early_stop_k (default {DEFAULT_RMSD_THRESHOLD}).",
+    )
+    parser.add_argument(
+        "--toks_per_batch", type=int, default=None,
+        help="Padded residues per batched ESMFold refold (default: the esmfold default; "
+        "1 = one sequence per pass).",
+    )
     args = parser.parse_args()
 
     self_consistency_dir(
@@ -49,6 +69,10 @@ def main() -> None:
         limit=args.limit,
         device=args.device,
         chain=args.chain,
+        mpnn_engine=args.mpnn_engine,
+        early_stop_k=args.early_stop_k,
+        rmsd_threshold=args.rmsd_threshold,
+        toks_per_batch=args.toks_per_batch,
     )
 
 
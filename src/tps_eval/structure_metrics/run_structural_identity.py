@@ -6,12 +6,20 @@ import shutil
 import sys
 import tempfile
 from pathlib import Path
+from typing import Dict, Optional
 
+import numpy as np
 import pandas as pd
 
 CURRENT_DIR = Path(__file__).resolve().parent
 
-from tps_eval.foldseek.structure_alignment import main as _structure_alignment  # noqa: E402
+from tps_eval.data.topk import topk_from_hits, write_topk  # noqa: E402
+from tps_eval.foldseek.databases import structure_files  # noqa: E402
+from tps_eval.foldseek.structure_alignment import (  # noqa: E402
+    PRESETS,
+    TWO_STAGE_CANDIDATES,
+    main as _structure_alignment,
+)
 
 # foldseek best-hit columns -> pipeline metric names (keyed by ID), the structural
 # analog of max_sequence_identity: per generated structure, the best (max) TM-score
@@ -46,38 +54,101 @@ def _stem(name: str) -> str:
     return base
 
 
-def _write_topk(raw_csv_path: str, top_k: int, save_path: str) -> None:
+def _topk_frame(raw_csv_path: str, top_k: int) -> pd.DataFrame:
     """Top-k targets per query by alntmscore (LARGER = closer), from foldseek hits.
 
-    Tidy CSV with columns query_id,rank,neighbour_id,score where score is the
+    Tidy frame (the _topk.csv) with columns query_id,rank,neighbour_id,score where score is the
     foldseek alntmscore (TM-score) and neighbour_id is the target structure stem.
     foldseek returns many hits per query; we keep the k highest by alntmscore.
     Self-hits (target stem == query stem) are excluded so the same contract holds
     when a structure set is searched against itself (leave-one-out).
     """
     hits = pd.read_csv(raw_csv_path)
-    rows = []
-    for query, grp in hits.groupby("query", sort=True):
-        query_id = str(query).split(" ", 1)[0]
-        query_stem = _stem(query)
-        grp = grp.copy()
-        grp["__nid"] = grp["target"].map(_stem)
-        # Exclude self-hits (handles self-search leave-one-out).
-        grp = grp[grp["__nid"] != query_stem]
-        # Highest alntmscore first; stable sort keeps foldseek's order on ties.
-        grp = grp.sort_values("alntmscore", ascending=False, kind="stable")
-        for rank, (_, row) in enumerate(grp.head(top_k).iterrows(), start=1):
-            rows.append(
-                {
-                    "query_id": query_id,
-                    "rank": rank,
-                    "neighbour_id": row["__nid"],
-                    "score": float(row["alntmscore"]),
-                }
-            )
-    pd.DataFrame(rows, columns=["query_id", "rank", "neighbour_id", "score"]).to_csv(
-        save_path, index=False
+    hits = hits.assign(
+        query_id=hits["query"].astype(str).str.split(" ", n=1).str[0],
+        neighbour_id=hits["target"].map(_stem),
     )
+    # Exclude self-hits (handles self-search leave-one-out).
+    hits = hits[hits["neighbour_id"] != hits["query"].map(_stem)]
+    # Highest alntmscore first; the stable sort keeps foldseek's order on ties.
+    return topk_from_hits(
+        hits, top_k, query="query_id", neighbour="neighbour_id", score="alntmscore"
+    )
+
+
+def topk_recall(exact: pd.DataFrame, approx: pd.DataFrame) -> Dict[str, float]:
+    """Agreement of an approximate top-k table with the exhaustive one (both in the
+    ``query_id,rank,neighbour_id,score`` layout), over the queries ``exact`` has
+    neighbours for: ``top1_recall`` — fraction whose nearest neighbour matches;
+    ``topk_recall`` — mean fraction of the exact top-k neighbours also returned;
+    ``topk_identical`` — fraction whose ranked neighbour list is identical (what
+    ``knn_label_transfer`` needs to give the same labels)."""
+    def _ranked(df):
+        df = df.sort_values(["query_id", "rank"], kind="stable")
+        return {q: list(g["neighbour_id"]) for q, g in df.groupby("query_id", sort=False)}
+
+    truth, found = _ranked(exact), _ranked(approx)
+    top1, overlap, identical = [], [], []
+    for query, want in truth.items():
+        got = found.get(query, [])
+        top1.append(bool(got) and got[0] == want[0])
+        overlap.append(len(set(want) & set(got)) / len(want))
+        identical.append(got == want)
+    report: Dict[str, float] = {"n_queries": float(len(truth))}
+    for name, values in (("top1_recall", top1), ("topk_recall", overlap),
+                         ("topk_identical", identical)):
+        report[name] = float(np.mean(values)) if values else float("nan")
+    return report
+
+
+def _report_topk_recall(
+    structs_dir: str,
+    known_structs_dir: str,
+    approx: pd.DataFrame,
+    *,
+    top_k: int,
+    recall_sample: int,
+    preset: str,
+    self_mode: bool,
+    db_cache: Optional[str],
+    seed: int = 0,
+) -> Dict[str, float]:
+    """Rerun ``recall_sample`` random queries with the exhaustive preset and print
+    how much of their exhaustive top-k the ``preset`` run kept."""
+    files = structure_files(structs_dir)
+    if recall_sample < len(files):
+        rng = np.random.default_rng(seed)
+        files = [files[i] for i in sorted(rng.choice(len(files), size=recall_sample, replace=False))]
+    tmp = tempfile.mkdtemp(prefix="structural_identity_recall_")
+    try:
+        sample_dir = os.path.join(tmp, "sample")
+        for rel in files:
+            link = os.path.join(sample_dir, rel)
+            os.makedirs(os.path.dirname(link), exist_ok=True)
+            os.symlink(os.path.abspath(os.path.join(structs_dir, rel)), link)
+        out = os.path.join(tmp, "out")
+        _structure_alignment(argparse.Namespace(
+            structures_root=sample_dir,
+            known_structures_root=known_structs_dir,
+            output_root=out,
+            store_intermediate_results=True,
+            random_run_id=False,
+            exclude_self=self_mode,
+            db_cache=db_cache,
+            cache_query=False,  # a random sample, never reused
+            preset="exhaustive",
+        ))
+        exact = _topk_frame(os.path.join(out, "structure_alignments.csv"), top_k)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    report = topk_recall(exact, approx[approx["query_id"].isin(set(exact["query_id"]))])
+    print(
+        f"Top-{top_k} recall of preset {preset} vs exhaustive on "
+        f"{int(report['n_queries'])} sampled queries: "
+        f"top-1 {report['top1_recall']:.3f}, top-k {report['topk_recall']:.3f}, "
+        f"identical top-k {report['topk_identical']:.3f}"
+    )
+    return report
 
 
 def main() -> None:
@@ -102,6 +173,22 @@ def main() -> None:
                         "each query's best hit is its nearest OTHER neighbour (leave-one-out) "
                         "instead of the trivial self-match TM~1.0. The top-k path already "
                         "excludes self-hits unconditionally.")
+    parser.add_argument("--preset", choices=PRESETS, default="exhaustive",
+                        help="foldseek search preset: exhaustive (default; every query vs "
+                        "every reference), sensitive, fast (prefiltered), or two_stage "
+                        "(fast first pass, then the --candidates best hits per query "
+                        "realigned with the exhaustive alignment parameters).")
+    parser.add_argument("--candidates", type=int, default=TWO_STAGE_CANDIDATES,
+                        help="two_stage: first-pass hits per query to realign (default %(default)s).")
+    parser.add_argument("--recall_sample", type=int, default=None,
+                        help="With --top_k and a non-exhaustive --preset: rerun N random "
+                        "queries exhaustively and print the top-1 / top-k recall and the "
+                        "fraction of identical top-k lists, to pick the cheapest preset "
+                        "that leaves the _topk.csv unchanged.")
+    parser.add_argument("--db_cache", default=None,
+                        help="Directory of prebuilt foldseek DBs: the query and reference "
+                        "DBs (+ reference index) are built once and reused across runs and "
+                        "by the other foldseek tools (default: built for this run only).")
     args = parser.parse_args()
 
     want_topk = args.top_k is not None and args.top_k >= 1
@@ -116,14 +203,29 @@ def main() -> None:
             store_intermediate_results=want_topk,
             random_run_id=False,
             exclude_self=args.self_mode,
+            db_cache=args.db_cache,
+            preset=args.preset,
+            candidates=args.candidates,
         ))
         scores = pd.read_csv(os.path.join(tmp, "structure_alignment_scores.csv"))
 
         if want_topk:
             raw_csv = os.path.join(tmp, "structure_alignments.csv")
             topk_save_path = _default_topk_save_path(args.structs_dir)
-            _write_topk(raw_csv, args.top_k, topk_save_path)
+            topk = _topk_frame(raw_csv, args.top_k)
+            write_topk(topk, topk_save_path)
             print(f"Wrote top-{args.top_k} neighbours to {topk_save_path}")
+            if args.recall_sample and args.preset != "exhaustive":
+                _report_topk_recall(
+                    args.structs_dir,
+                    args.known_structs_dir,
+                    topk,
+                    top_k=args.top_k,
+                    recall_sample=args.recall_sample,
+                    preset=args.preset,
+                    self_mode=args.self_mode,
+                    db_cache=args.db_cache,
+                )
     finally:
         shutil.rmtree(tmp, ignore_errors=True)
 
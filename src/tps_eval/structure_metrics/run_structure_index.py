@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import argparse
+
+from tps_eval.structure_metrics.structure_index import build_structure_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Parse every structure (.pdb/.cif) in a directory ONCE into a "
+        "columnar, memory-mapped structure index (<structs_dir>_structure_index/) "
+        "that the structure tools (plddt, radius_of_gyration, active_site_geometry, "
+        "aromatic_lining, sdr_divergence, ...) read instead of re-parsing each file. "
+        "Re-running only parses new or changed structures; tools fall back to "
+        "parsing any structure the index does not hold."
+    )
+    parser.add_argument(
+        "structs_dir",
+        help="Either an AlphaFold3 af_output directory (per-job subfolders with "
+        "<job>/<job>_model.cif) OR a flat directory of .pdb/.cif structures — the "
+        "same layouts the structure tools auto-detect.",
+    )
+    parser.add_argument(
+        "--index_dir",
+        default=None,
+        help="Index directory (default: <structs_dir>_structure_index next to the "
+        "directory, where the tools look for it).",
+    )
+    args = parser.parse_args()
+    build_structure_index(args.structs_dir, index_dir=args.index_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -51,6 +51,13 @@ def main() -> None:
         help="Force a specific ligand residue name as the substrate (default: auto-detect by "
         "composition).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: every CPU allocated to the job, via "
+        "os.sched_getaffinity; 1 = serial).",
+    )
     args = parser.parse_args()
     substrate_positioning_dir(
         args.structs_dir,
@@ -59,6 +66,7 @@ def main() -> None:
         ion_resnames=tuple(args.ion_resnames),
         min_substrate_carbons=args.min_substrate_carbons,
         substrate_resname=args.substrate_resname,
+        workers=args.workers,
     )
 
 
@@ -4,9 +4,10 @@ from __future__ import annotations
 #
 # For each design backbone:
 #   1. Sample N sequences from the backbone with ProteinMPNN (default N=8).
-#   2. Refold each sampled sequence with ESMFold (reuses src/esmfold).
-#   3. Cα-align each refold back to the ORIGINAL design structure (Biopython
-#      Superimposer) and record the RMSD.
+#   2. Refold each sampled sequence with ESMFold (reuses src/esmfold), in padded
+#      length batches shared across designs.
+#   3. Cα-align each refold back to the ORIGINAL design structure (numpy Kabsch)
+#      and record the RMSD.
 # Report sc_rmsd_min (best of N) and sc_rmsd_mean. A design is "self-consistent"
 # / designable when sc_rmsd_min < ~2 Angstrom: there exists a sequence that both
 # ProteinMPNN likes for this fold AND that ESMFold folds back to the same shape.
@@ -17,50 +18,56 @@ from __future__ import annotations
 # Biopython); ProteinMPNN is shelled out with the SAME python so no extra env.
 #
 # Output (CSV keyed by ID): sc_rmsd_min, sc_rmsd_mean, n_samples (folds that
-# succeeded). ID = structure filename stem (matches plddt / proteinmpnn_score).
+# succeeded), n_samples_evaluated (sampled sequences refolded). ID = structure
+# filename stem (matches plddt / proteinmpnn_score).
+#
+# Early exit (`early_stop_k`, off by default): a design's verdict is "designable"
+# once k of its samples refold under `rmsd_threshold`. Samples are refolded in
+# rounds, and a design stops as soon as k samples have passed or too few remain
+# for k to pass; min/mean/n_samples then cover the evaluated samples only. The
+# cut is taken at the first sample that fixes the verdict, so results do not
+# depend on how the rounds were batched.
+#
+# mpnn_engine="batched" samples every structure's sequences up front with one
+# resident ProteinMPNN in length-bucketed batches (proteinmpnn_batch), then refolds;
+# "subprocess" (default, until the batched engine has been checked against it on the
+# real weights) keeps one protein_mpnn_run.py per structure.
 
 import glob
 import os
 import subprocess
 import sys
 import tempfile
-import warnings
 from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
-from Bio.PDB import MMCIFParser, PDBParser, Superimposer
-from Bio.PDB.PDBExceptions import PDBConstructionWarning
 
 from tps_eval.repo_paths import VENDOR_DIR
 from tps_eval.structure_metrics.structure_conversion import is_cif, write_pdb_copy
+from tps_eval.structure_metrics.structure_index import load_structure
 
 PROTEINMPNN_DIR = VENDOR_DIR / "ProteinMPNN"
 
 
-COLUMNS = ["ID", "sc_rmsd_min", "sc_rmsd_mean", "n_samples"]
-
-_PDB_PARSER = PDBParser(QUIET=True)
-_CIF_PARSER = MMCIFParser(QUIET=True)
+COLUMNS = ["ID", "sc_rmsd_min", "sc_rmsd_mean", "n_samples", "n_samples_evaluated"]
 
+MPNN_ENGINES = ("batched", "subprocess")
 
-def _parser_for(path: str):
-    return _CIF_PARSER if path.lower().endswith((".cif", ".mmcif")) else _PDB_PARSER
+# scRMSD (Angstrom) under which a refold counts as self-consistent (early exit).
+DEFAULT_RMSD_THRESHOLD = 2.0
 
 
 def _chain_ids(structure_path: str) -> List[str]:
     """Chain IDs (first model) that contain at least one standard polymer residue."""
-    parser = _parser_for(structure_path)
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", PDBConstructionWarning)
-        structure = parser.get_structure("s", structure_path)
-    model = next(iter(structure))
-    ids = []
-    for chain in model:
-        if any(res.id[0] == " " and "CA" in res for res in chain):
-            ids.append(chain.id)
+    structure = load_structure(structure_path)
+    with_ca = structure.polymer & (structure.atom_index("CA") >= 0)
+    ids: List[str] = []
+    for chain_id in structure.chain_ids[with_ca]:
+        if chain_id not in ids:
+            ids.append(str(chain_id))
     return ids
 
 
@@ -75,36 +82,63 @@ def _write_single_chain(structure_path: str, chain_id: str, out_path: str) -> No
 
 def _ca_atoms(structure_path: str):
     """Ordered list of Cα atoms (first model, standard residues, all chains)."""
-    parser = _parser_for(structure_path)
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", PDBConstructionWarning)
-        structure = parser.get_structure("s", structure_path)
-    model = next(iter(structure))
-    cas = []
-    for chain in model:
-        for residue in chain:
-            if residue.id[0] != " ":
-                continue
-            if "CA" in residue:
-                cas.append(residue["CA"])
-    return cas
-
-
-def _ca_rmsd(ref_path: str, mobile_path: str) -> float:
-    """Cα-RMSD of `mobile` superimposed onto `ref`. Requires equal residue counts
+    structure = load_structure(structure_path)
+    return [residue["CA"] for residue in structure.residues() if "CA" in residue]
+
+
+def _ca_coords(structure_path: str) -> np.ndarray:
+    """(n, 3) Cα coordinates (first model, standard residues, all chains) — the
+    atoms of :func:`_ca_atoms`, as an array."""
+    structure = load_structure(structure_path)
+    ca = structure.atom_index("CA")
+    return structure.coords[ca[structure.polymer & (ca >= 0)]].astype(float)
+
+
+def _ca_coords_from_pdb(pdb_str: str) -> np.ndarray:
+    """(n, 3) Cα coordinates of a PDB string's first model (ATOM records, file
+    order) — an ESMFold refold, read without writing it to disk."""
+    coords = []
+    for line in pdb_str.splitlines():
+        if line.startswith("ENDMDL"):
+            break
+        if line.startswith("ATOM") and line[12:16].strip() == "CA":
+            coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+    return np.asarray(coords, dtype=float).reshape(-1, 3)
+
+
+def kabsch_rmsd(ref: np.ndarray, mobile: np.ndarray) -> np.ndarray:
+    """RMSD after optimal superposition (Kabsch) of `mobile` onto `ref`.
+
+    ``ref`` is (n, 3); ``mobile`` is (n, 3) or a stack (m, n, 3) of structures of
+    the same length, giving a scalar or an (m,) array."""
+    ref = np.asarray(ref, dtype=float)
+    mobile = np.asarray(mobile, dtype=float)
+    ref_c = ref - ref.mean(axis=-2, keepdims=True)
+    mob_c = mobile - mobile.mean(axis=-2, keepdims=True)
+    u, _, vt = np.linalg.svd(np.swapaxes(mob_c, -1, -2) @ ref_c)
+    # Reflection guard: flip the last singular vector when det(U V^T) < 0.
+    d = np.sign(np.linalg.det(u @ vt))
+    u[..., :, -1] *= d[..., None]
+    diff = mob_c @ (u @ vt) - ref_c
+    return np.sqrt((diff ** 2).sum(axis=-1).mean(axis=-1))
+
+
+def _aligned_rmsd(ref: np.ndarray, mob: np.ndarray) -> float:
+    """Cα-RMSD of `mob` superimposed onto `ref`. Requires equal residue counts
     (true for a refold of a backbone-derived sequence); if they differ we align
     the leading min(len) atoms and warn."""
-    ref = _ca_atoms(ref_path)
-    mob = _ca_atoms(mobile_path)
-    if not ref or not mob:
+    if not len(ref) or not len(mob):
         return float("nan")
     if len(ref) != len(mob):
         n = min(len(ref), len(mob))
         print(f"  [warn] residue count mismatch ({len(ref)} vs {len(mob)}); aligning first {n}")
         ref, mob = ref[:n], mob[:n]
-    sup = Superimposer()
-    sup.set_atoms(ref, mob)
-    return float(sup.rms)
+    return float(kabsch_rmsd(ref, mob))
+
+
+def _ca_rmsd(ref_path: str, mobile_path: str) -> float:
+    """Cα-RMSD of the structure at `mobile_path` superimposed onto `ref_path`."""
+    return _aligned_rmsd(_ca_coords(ref_path), _ca_coords(mobile_path))
 
 
 def _collect_structures(structs_dir: str):
@@ -192,18 +226,14 @@ def _sample_sequences(
     return sampled
 
 
-def self_consistency_for_structure(
-    pdb_path: str,
-    *,
-    fold_fn,
-    num_seqs: int,
-    sampling_temp: float,
-    model_name: str,
-    seed: int,
-    workdir: str,
-    chain: Optional[str] = None,
-) -> Dict[str, float]:
-    """scRMSD for a single design: sample -> refold -> Cα-RMSD to original.
+def _nan_row() -> Dict[str, float]:
+    return {"sc_rmsd_min": float("nan"), "sc_rmsd_mean": float("nan"), "n_samples": 0,
+            "n_samples_evaluated": 0}
+
+
+def _design_input(pdb_path: str, workdir: str, chain: Optional[str] = None):
+    """The single-chain reference for one design: ``(ref_path, pdb_path_chains)``,
+    or None when the structure has no polymer chain.
 
     scRMSD is a single-chain (monomer) designability metric. If the structure has
     multiple chains we restrict to ONE design chain (`chain`, default = first):
@@ -211,55 +241,235 @@ def self_consistency_for_structure(
     and the Cα-RMSD compares to that same chain. (Comparing a multi-chain complex
     to a folded-as-monomer concatenation otherwise gives a meaningless RMSD.)"""
     stem = os.path.splitext(os.path.basename(pdb_path))[0]
-    mpnn_out = os.path.join(workdir, "mpnn", stem)
-    os.makedirs(mpnn_out, exist_ok=True)
-
     chains = _chain_ids(pdb_path)
     if not chains:
-        return {"sc_rmsd_min": float("nan"), "sc_rmsd_mean": float("nan"), "n_samples": 0}
+        return None
     design_chain = chain if (chain and chain in chains) else chains[0]
     if len(chains) > 1:
         print(f"  [note] {stem}: {len(chains)} chains {chains}; scoring single chain "
               f"'{design_chain}' (monomer designability).")
         ref_path = os.path.join(workdir, f"{stem}_chain_{design_chain}.pdb")
         _write_single_chain(pdb_path, design_chain, ref_path)
-        pdb_chains_arg = design_chain
-    elif is_cif(pdb_path):
+        return ref_path, design_chain
+    if is_cif(pdb_path):
         # ProteinMPNN parses PDB by fixed column offsets and CANNOT read mmCIF —
         # AF3's af_output/<job>/<job>_model.cif went straight to it and every
         # structure failed into a NaN row. Materialize a PDB first.
         ref_path = os.path.join(workdir, f"{stem}_chain_{design_chain}.pdb")
         _write_single_chain(pdb_path, design_chain, ref_path)
-        pdb_chains_arg = None
+        return ref_path, None
+    return pdb_path, None
+
+
+# fold_batches(sequences) yields (indices, pdb strings) per folded batch; an entry
+# is the exception when that sequence could not be folded.
+FoldBatches = Callable[[Sequence[str]], Iterable[Tuple[List[int], List[object]]]]
+
+
+def serial_fold_batches(fold_fn) -> FoldBatches:
+    """A FoldBatches that folds one sequence at a time with ``fold_fn(seq) -> pdb``."""
+
+    def fold_batches(sequences):
+        for i, seq in enumerate(sequences):
+            try:
+                yield [i], [fold_fn(seq)]
+            except Exception as exc:  # noqa: BLE001 - reported per sample
+                yield [i], [exc]
+
+    return fold_batches
+
+
+def _decided_at(rmsds: Sequence[float], n_total: int, k: int,
+                threshold: float) -> Optional[int]:
+    """Number of leading samples after which the k-of-N verdict can no longer
+    change (k passed, or too few left for k to pass); None while it still can."""
+    n_pass = 0
+    for i, rmsd in enumerate(rmsds, start=1):
+        n_pass += bool(rmsd < threshold)  # NaN (failed refold) never passes
+        if n_pass >= k or n_pass + (n_total - i) < k:
+            return i
+    return None
+
+
+def _summarise(rmsds: Sequence[float]) -> Dict[str, float]:
+    arr = np.asarray(rmsds, dtype=float)
+    finite = arr[np.isfinite(arr)]
+    if not finite.size:
+        row = _nan_row()
     else:
-        ref_path = pdb_path
-        pdb_chains_arg = None
+        row = {"sc_rmsd_min": float(finite.min()), "sc_rmsd_mean": float(finite.mean()),
+               "n_samples": int(finite.size)}
+    row["n_samples_evaluated"] = int(arr.size)
+    return row
+
+
+def refold_designs(
+    designs: "OrderedDict[str, Tuple[str, List[str]]]",
+    fold_batches: FoldBatches,
+    *,
+    early_stop_k: Optional[int] = None,
+    rmsd_threshold: float = DEFAULT_RMSD_THRESHOLD,
+) -> Dict[str, Dict[str, float]]:
+    """ID -> scRMSD summary for ``designs`` (ID -> ``(ref_path, sampled sequences)``).
+
+    Every round folds the next samples of all still-open designs together through
+    ``fold_batches`` and superimposes each refold on its reference as it arrives.
+    Without `early_stop_k` one round folds everything. With it, a design offers
+    ``k - passes`` samples per round (the fewest that could settle it) and closes
+    once its verdict is fixed (see _decided_at). A design whose reference cannot be
+    read gets a NaN row."""
+    refs: Dict[str, np.ndarray] = {}
+    failed: Dict[str, Dict[str, float]] = {}
+    for stem, (ref_path, _) in designs.items():
+        try:
+            refs[stem] = _ca_coords(ref_path)
+        except Exception as exc:  # noqa: BLE001
+            print(f"  [warn] failed on {stem}: {exc}")
+            failed[stem] = _nan_row()
+    rmsds: Dict[str, List[float]] = {stem: [] for stem in refs}
+    open_ids = [stem for stem in refs if designs[stem][1]]
+    while open_ids:
+        requests = []
+        for stem in open_ids:
+            seqs, done = designs[stem][1], len(rmsds[stem])
+            take = len(seqs) - done
+            if early_stop_k is not None:
+                n_pass = sum(r < rmsd_threshold for r in rmsds[stem])
+                take = min(take, max(1, early_stop_k - n_pass))
+            requests.extend((stem, j) for j in range(done, done + take))
+        outcomes: Dict[Tuple[str, int], float] = {}
+        for indices, pdbs in fold_batches([designs[s][1][j] for s, j in requests]):
+            for i, pdb_str in zip(indices, pdbs):
+                stem, j = requests[i]
+                try:
+                    if isinstance(pdb_str, Exception):
+                        raise pdb_str
+                    rmsd = _aligned_rmsd(refs[stem], _ca_coords_from_pdb(pdb_str))
+                except Exception as exc:  # noqa: BLE001
+                    print(f"  [warn] refold/RMSD failed for {stem} sample {j}: {exc}")
+                    rmsd = float("nan")
+                else:
+                    print(f"  {stem} sample {j}: scRMSD = {rmsd:.3f} A")
+                outcomes[stem, j] = rmsd
+        still_open = []
+        for stem in open_ids:
+            j = len(rmsds[stem])
+            while (stem, j) in outcomes:
+                rmsds[stem].append(outcomes[stem, j])
+                j += 1
+            n_total = len(designs[stem][1])
+            if early_stop_k is not None:
+                cut = _decided_at(rmsds[stem], n_total, early_stop_k, rmsd_threshold)
+                if cut is not None:
+                    del rmsds[stem][cut:]
+                    continue
+            if len(rmsds[stem]) < n_total:
+                still_open.append(stem)
+        open_ids = still_open
+    summaries = {stem: _summarise(values) for stem, values in rmsds.items()}
+    summaries.update(failed)
+    return summaries
+
+
+def _sample_with_subprocess(
+    pdb_path: str, *, num_seqs: int, sampling_temp: float, model_name: str, seed: int,
+    workdir: str, chain: Optional[str] = None,
+):
+    """``(ref_path, sampled sequences)`` for one design from a protein_mpnn_run.py
+    subprocess, or None when it has no polymer chain (see _design_input)."""
+    stem = os.path.splitext(os.path.basename(pdb_path))[0]
+    mpnn_out = os.path.join(workdir, "mpnn", stem)
+    os.makedirs(mpnn_out, exist_ok=True)
 
+    design = _design_input(pdb_path, workdir, chain)
+    if design is None:
+        return None
+    ref_path, pdb_chains_arg = design
     sequences = _sample_sequences(
         ref_path, mpnn_out, num_seqs=num_seqs, sampling_temp=sampling_temp,
         model_name=model_name, seed=seed, pdb_path_chains=pdb_chains_arg,
     )
-    rmsds: List[float] = []
-    for k, seq in enumerate(sequences):
-        refold_path = os.path.join(workdir, f"{stem}_refold_{k}.pdb")
+    return ref_path, sequences
+
+
+def self_consistency_for_structure(
+    pdb_path: str,
+    *,
+    fold_fn,
+    num_seqs: int,
+    sampling_temp: float,
+    model_name: str,
+    seed: int,
+    workdir: str,
+    chain: Optional[str] = None,
+    early_stop_k: Optional[int] = None,
+    rmsd_threshold: float = DEFAULT_RMSD_THRESHOLD,
+) -> Dict[str, float]:
+    """scRMSD for a single design: sample (ProteinMPNN subprocess) -> refold one
+    sequence at a time with ``fold_fn(seq) -> pdb`` -> Cα-RMSD to original, on the
+    single design chain (see _design_input)."""
+    stem = os.path.splitext(os.path.basename(pdb_path))[0]
+    design = _sample_with_subprocess(
+        pdb_path, num_seqs=num_seqs, sampling_temp=sampling_temp, model_name=model_name,
+        seed=seed, workdir=workdir, chain=chain,
+    )
+    if design is None:
+        return _nan_row()
+    return refold_designs(OrderedDict([(stem, design)]), serial_fold_batches(fold_fn),
+                          early_stop_k=early_stop_k, rmsd_threshold=rmsd_threshold)[stem]
+
+
+def sample_subprocess(
+    structures: "OrderedDict[str, str]",
+    *,
+    num_seqs: int,
+    sampling_temp: float,
+    model_name: str,
+    seed: int,
+    workdir: str,
+    chain: Optional[str] = None,
+) -> Dict[str, object]:
+    """Like :func:`sample_batched`, with one protein_mpnn_run.py per structure."""
+    out: Dict[str, object] = {}
+    for stem, path in structures.items():
         try:
-            pdb_str = fold_fn(seq)
-            with open(refold_path, "w") as fh:
-                fh.write(pdb_str)
-            rmsd = _ca_rmsd(ref_path, refold_path)
+            out[stem] = _sample_with_subprocess(
+                path, num_seqs=num_seqs, sampling_temp=sampling_temp, model_name=model_name,
+                seed=seed, workdir=workdir, chain=chain,
+            )
         except Exception as exc:  # noqa: BLE001
-            print(f"  [warn] refold/RMSD failed for {stem} sample {k}: {exc}")
-            continue
-        rmsds.append(rmsd)
-        print(f"  {stem} sample {k}: scRMSD = {rmsd:.3f} A")
-    if not rmsds:
-        return {"sc_rmsd_min": float("nan"), "sc_rmsd_mean": float("nan"), "n_samples": 0}
-    arr = np.asarray(rmsds, dtype=float)
-    return {
-        "sc_rmsd_min": float(np.nanmin(arr)),
-        "sc_rmsd_mean": float(np.nanmean(arr)),
-        "n_samples": int(np.isfinite(arr).sum()),
-    }
+            out[stem] = exc
+    return out
+
+
+def sample_batched(
+    structures: "OrderedDict[str, str]",
+    mpnn,
+    *,
+    num_seqs: int,
+    sampling_temp: float,
+    workdir: str,
+    chain: Optional[str] = None,
+) -> Dict[str, object]:
+    """ID -> ``(ref_path, sampled sequences)`` for every design, sampled with one
+    resident BatchedProteinMPNN in length-bucketed batches; IDs that fail map to
+    the exception (no polymer chain -> None)."""
+    from tps_eval.structure_metrics.proteinmpnn_batch import featurize_all
+
+    refs: Dict[str, object] = {}
+    for stem, path in structures.items():
+        try:
+            refs[stem] = _design_input(path, workdir, chain)
+        except Exception as exc:  # noqa: BLE001
+            refs[stem] = exc
+    inputs = [(stem, ref[0]) for stem, ref in refs.items() if isinstance(ref, tuple)]
+    features, failures = featurize_all(inputs)
+    sampled = mpnn.sample(list(features.values()), num_seqs=num_seqs, temperature=sampling_temp)
+    out: Dict[str, object] = dict(refs)
+    out.update(failures)
+    for stem, seqs in zip(features, sampled):
+        out[stem] = (refs[stem][0], seqs)
+    return out
 
 
 def self_consistency_dir(
@@ -274,10 +484,22 @@ def self_consistency_dir(
     limit: Optional[int] = None,
     device: Optional[str] = None,
     chain: Optional[str] = None,
+    mpnn_engine: str = "subprocess",
+    early_stop_k: Optional[int] = None,
+    rmsd_threshold: float = DEFAULT_RMSD_THRESHOLD,
+    toks_per_batch: Optional[int] = None,
 ) -> pd.DataFrame:
-    """Self-consistency scRMSD for structures in a dir. Loads ESMFold ONCE and
-    reuses it across all structures. `ids`/`limit` restrict the structure subset
-    (validate on 1-2 first — this is GPU + slow)."""
+    """Self-consistency scRMSD for structures in a dir. Samples every design's
+    sequences first (mpnn_engine="batched": one resident ProteinMPNN in batches),
+    then loads ESMFold ONCE and refolds the samples of all designs together in
+    length batches of `toks_per_batch` padded residues (esmfold default), with an
+    optional per-design early exit (`early_stop_k`, see refold_designs).
+    `ids`/`limit` restrict the structure subset (validate on 1-2 first — this is
+    GPU + slow)."""
+    if mpnn_engine not in MPNN_ENGINES:
+        raise ValueError(f"mpnn_engine must be one of {MPNN_ENGINES}, got {mpnn_engine!r}")
+    if early_stop_k is not None and not 1 <= early_stop_k <= num_seqs:
+        raise ValueError(f"early_stop_k must be in 1..num_seqs ({num_seqs}), got {early_stop_k}")
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -296,31 +518,64 @@ def self_consistency_dir(
     print(f"Detected {mode} layout: scoring {len(structures)} structure(s) in {structs_dir}")
 
     # Load ESMFold once (reuse src/esmfold).
-    from tps_eval.esmfold.esmfold import _load_model, fold_sequence
+    from tps_eval.esmfold.esmfold import DEFAULT_TOKENS_PER_BATCH, _load_model, iter_fold_batches
 
     tokenizer, model, device = _load_model(device)
 
-    def fold_fn(seq: str) -> str:
-        # fold_sequence returns (pdb_str, pae); self-consistency only needs the PDB.
-        return fold_sequence(model, tokenizer, device, seq)[0]
+    def fold_batches(sequences):
+        # iter_fold_batches yields (pdb_str, pae, ptm); self-consistency only needs the PDB.
+        for indices, results in iter_fold_batches(
+            model, tokenizer, device, sequences,
+            toks_per_batch=toks_per_batch or DEFAULT_TOKENS_PER_BATCH,
+        ):
+            yield indices, [r if isinstance(r, Exception) else r[0] for r in results]
 
-    rows: List[Dict[str, float]] = []
     n = len(structures)
     with tempfile.TemporaryDirectory(prefix="self_consistency_") as workdir:
-        for i, (stem, path) in enumerate(structures.items(), start=1):
-            print(f"[{i}/{n}] {stem}: sampling {num_seqs} seqs + refolding ...")
-            try:
-                stats = self_consistency_for_structure(
-                    path, fold_fn=fold_fn, num_seqs=num_seqs, sampling_temp=sampling_temp,
-                    model_name=model_name, seed=seed, workdir=workdir, chain=chain,
-                )
-            except Exception as exc:  # noqa: BLE001
-                print(f"  [warn] failed on {stem}: {exc}")
-                stats = {"sc_rmsd_min": float("nan"), "sc_rmsd_mean": float("nan"), "n_samples": 0}
-            stats["ID"] = stem
-            rows.append(stats)
-            print(f"  -> {stem}: sc_rmsd_min={stats['sc_rmsd_min']}, "
-                  f"sc_rmsd_mean={stats['sc_rmsd_mean']}, n={stats['n_samples']}")
+        if mpnn_engine == "batched":
+            from tps_eval.structure_metrics.proteinmpnn_batch import (
+                BatchedProteinMPNN,
+                throughput,
+                timed,
+            )
+
+            mpnn = BatchedProteinMPNN.load(model_name, device=device, seed=seed)
+            presampled, seconds = timed(
+                sample_batched, structures, mpnn, num_seqs=num_seqs,
+                sampling_temp=sampling_temp, workdir=workdir, chain=chain,
+            )
+            print(f"Sampled {num_seqs} seqs for {throughput(n, seconds)}")
+        else:
+            presampled = sample_subprocess(
+                structures, num_seqs=num_seqs, sampling_temp=sampling_temp,
+                model_name=model_name, seed=seed, workdir=workdir, chain=chain,
+            )
+
+        designs: "OrderedDict[str, Tuple[str, List[str]]]" = OrderedDict()
+        stats_by_id: Dict[str, Dict[str, float]] = {}
+        for stem in structures:
+            entry = presampled[stem]
+            if isinstance(entry, Exception):
+                print(f"  [warn] failed on {stem}: {entry}")
+                stats_by_id[stem] = _nan_row()
+            elif entry is None:
+                stats_by_id[stem] = _nan_row()
+            else:
+                designs[stem] = entry
+        print(f"Refolding {sum(len(seqs) for _, seqs in designs.values())} sampled "
+              f"sequence(s) for {len(designs)} design(s)"
+              + (f" (early exit at {early_stop_k} under {rmsd_threshold} A)"
+                 if early_stop_k is not None else ""))
+        stats_by_id.update(refold_designs(designs, fold_batches, early_stop_k=early_stop_k,
+                                          rmsd_threshold=rmsd_threshold))
+
+    rows: List[Dict[str, float]] = []
+    for stem in structures:
+        stats = dict(stats_by_id[stem], ID=stem)
+        rows.append(stats)
+        print(f"  -> {stem}: sc_rmsd_min={stats['sc_rmsd_min']}, "
+              f"sc_rmsd_mean={stats['sc_rmsd_mean']}, n={stats['n_samples']}/"
+              f"{stats['n_samples_evaluated']}")
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
 
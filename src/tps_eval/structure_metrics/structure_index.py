@@ -0,0 +1,473 @@
+from __future__ import annotations
+
+"""Parsed-structure index: each structure of a directory is parsed ONCE into columnar
+numpy arrays, and every structure tool reads those instead of re-running Biopython.
+
+Each structure tool runs as its own job, and on a tier of thousands of predicted
+structures building Biopython ``Structure`` objects dominates the runtime of the
+cheap geometric metrics. ``run_structure_index`` parses the directory once into
+
+    <structs_dir>_structure_index/
+        structures.json     id, resolved path, mtime_ns, size, atom/residue ranges
+        coords.npy          (n_atoms, 3) float32    -- per atom, all structures
+        atom_names.npy      (n_atoms,) bytes        -- e.g. b"CA"
+        elements.npy        (n_atoms,) bytes
+        bfactors.npy        (n_atoms,) float64      -- pLDDT for predicted models
+        resnames.npy        (n_residues,) bytes     -- per residue, chain order
+        chain_ids.npy       (n_residues,) bytes
+        het_flags.npy       (n_residues,) bytes     -- Biopython hetflag: b" " = polymer
+        resseqs.npy         (n_residues,) int32
+        icodes.npy          (n_residues,) bytes
+        residue_starts.npy  (n_residues,) int64     -- first atom of each residue
+
+a sibling of the directory like the tools' ``<structs_dir>_<tool>.csv`` outputs.
+The columns are plain ``.npy`` files, memory-mapped on read, so a tool touches only
+the pages of the structures it asks for.
+
+Only the first model is stored, atoms in Biopython's iteration order (the selected
+altloc of a disordered atom), so a :class:`ParsedStructure` reproduces exactly what
+the tools' own parse returned.
+
+:func:`load_structure` is what the tools call: it looks for an index next to the
+structure's directory (or next to the AF3 ``af_output`` directory above a
+``<job>/<job>_model.cif``) and returns the indexed arrays when the entry's path,
+mtime and size still match the file; otherwise it parses the file with Biopython.
+A missing, stale or partial index therefore only costs speed, never correctness.
+"""
+
+import json
+import os
+import shutil
+import warnings
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from Bio.PDB import MMCIFParser, PDBParser
+from Bio.PDB.Polypeptide import index_to_one, three_to_index
+from Bio.PDB.PDBExceptions import PDBConstructionWarning
+
+INDEX_SUFFIX = "_structure_index"
+MANIFEST = "structures.json"
+FORMAT_VERSION = 1
+
+ATOM_COLUMNS = ("coords", "atom_names", "elements", "bfactors")
+RESIDUE_COLUMNS = ("resnames", "chain_ids", "het_flags", "resseqs", "icodes", "residue_starts")
+# Stored as fixed-width bytes (ASCII) and decoded per structure on read.
+_TEXT_COLUMNS = ("atom_names", "elements", "resnames", "chain_ids", "het_flags", "icodes")
+
+_PDB_PARSER = PDBParser(QUIET=True)
+_CIF_PARSER = MMCIFParser(QUIET=True)
+
+
+def _parser_for(path: str):
+    return _CIF_PARSER if path.lower().endswith((".cif", ".mmcif")) else _PDB_PARSER
+
+
+def _three_to_one(resname: str) -> str:
+    """3-letter residue name -> 1-letter code, 'X' for anything non-standard."""
+    try:
+        return index_to_one(three_to_index(resname))
+    except KeyError:
+        return "X"
+
+
+# --------------------------------------------------------------------------- #
+# One parsed structure                                                        #
+# --------------------------------------------------------------------------- #
+class IndexedAtom:
+    """Read-only stand-in for a Biopython ``Atom`` (the accessors the tools use)."""
+
+    __slots__ = ("_structure", "_i")
+
+    def __init__(self, structure: "ParsedStructure", i: int):
+        self._structure = structure
+        self._i = i
+
+    def get_coord(self) -> np.ndarray:
+        return np.array(self._structure.coords[self._i])
+
+    def get_name(self) -> str:
+        return str(self._structure.atom_names[self._i])
+
+    get_id = get_name
+
+    def get_bfactor(self) -> float:
+        return float(self._structure.bfactors[self._i])
+
+    @property
+    def element(self) -> str:
+        return str(self._structure.elements[self._i])
+
+    def __repr__(self) -> str:
+        return f"<IndexedAtom {self.get_name()}>"
+
+
+class IndexedResidue:
+    """Read-only stand-in for a Biopython ``Residue``: ``id``, ``get_resname()``,
+    ``name in residue``, ``residue[name]`` and iteration over its atoms."""
+
+    __slots__ = ("_structure", "_r", "_names")
+
+    def __init__(self, structure: "ParsedStructure", r: int):
+        self._structure = structure
+        self._r = r
+        self._names: Optional[Dict[str, int]] = None
+
+    def _atom_range(self) -> range:
+        offsets = self._structure.residue_offsets
+        return range(int(offsets[self._r]), int(offsets[self._r + 1]))
+
+    def _by_name(self) -> Dict[str, int]:
+        if self._names is None:
+            names: Dict[str, int] = {}
+            for i in self._atom_range():
+                names.setdefault(str(self._structure.atom_names[i]), i)
+            self._names = names
+        return self._names
+
+    @property
+    def id(self) -> Tuple[str, int, str]:
+        s = self._structure
+        return (str(s.het_flags[self._r]), int(s.resseqs[self._r]), str(s.icodes[self._r]))
+
+    def get_id(self) -> Tuple[str, int, str]:
+        return self.id
+
+    def get_resname(self) -> str:
+        return str(self._structure.resnames[self._r])
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name()
+
+    def __getitem__(self, name: str) -> IndexedAtom:
+        return IndexedAtom(self._structure, self._by_name()[name])
+
+    def __iter__(self) -> Iterator[IndexedAtom]:
+        return (IndexedAtom(self._structure, i) for i in self._atom_range())
+
+    def __len__(self) -> int:
+        return len(self._atom_range())
+
+    def __repr__(self) -> str:
+        return f"<IndexedResidue {self.get_resname()} id={self.id}>"
+
+
+class ParsedStructure:
+    """Columnar first model of one structure.
+
+    Per atom: ``coords`` (float32, N×3), ``atom_names``, ``elements``, ``bfactors``.
+    Per residue, in chain order: ``resnames``, ``chain_ids``, ``het_flags``
+    (Biopython hetflag, ``" "`` for polymer residues), ``resseqs``, ``icodes``, and
+    ``residue_offsets`` (R+1) delimiting each residue's atoms.
+    """
+
+    def __init__(
+        self,
+        coords: np.ndarray,
+        atom_names: np.ndarray,
+        elements: np.ndarray,
+        bfactors: np.ndarray,
+        resnames: np.ndarray,
+        chain_ids: np.ndarray,
+        het_flags: np.ndarray,
+        resseqs: np.ndarray,
+        icodes: np.ndarray,
+        residue_offsets: np.ndarray,
+    ):
+        self.coords = np.asarray(coords, dtype=np.float32).reshape(-1, 3)
+        self.atom_names = np.asarray(atom_names, dtype=str)
+        self.elements = np.asarray(elements, dtype=str)
+        self.bfactors = np.asarray(bfactors, dtype=float)
+        self.resnames = np.asarray(resnames, dtype=str)
+        self.chain_ids = np.asarray(chain_ids, dtype=str)
+        self.het_flags = np.asarray(het_flags, dtype=str)
+        self.resseqs = np.asarray(resseqs, dtype=np.int32)
+        self.icodes = np.asarray(icodes, dtype=str)
+        self.residue_offsets = np.asarray(residue_offsets, dtype=np.int64)
+
+    @property
+    def n_atoms(self) -> int:
+        return len(self.coords)
+
+    @property
+    def n_residues(self) -> int:
+        return len(self.resnames)
+
+    @property
+    def atom_residue(self) -> np.ndarray:
+        """Residue index of every atom."""
+        return np.repeat(np.arange(self.n_residues), np.diff(self.residue_offsets))
+
+    @property
+    def polymer(self) -> np.ndarray:
+        """Boolean mask of the standard polymer residues (hetflag ``" "``)."""
+        return self.het_flags == " "
+
+    def atom_index(self, name: str) -> np.ndarray:
+        """(R,) index of each residue's first atom called ``name``; -1 where absent."""
+        out = np.full(self.n_residues, -1, dtype=np.int64)
+        hits = np.flatnonzero(self.atom_names == name)[::-1]
+        out[self.atom_residue[hits]] = hits  # reversed, so the first atom wins
+        return out
+
+    def polymer_sequence(self) -> str:
+        """1-letter sequence of the polymer residues ('X' for non-standard)."""
+        return "".join(_three_to_one(r) for r in self.resnames[self.polymer])
+
+    def residue(self, r: int) -> IndexedResidue:
+        return IndexedResidue(self, r)
+
+    def residues(self, *, polymer: Optional[bool] = True) -> List[IndexedResidue]:
+        """Residue views in chain order: polymer only (default), HETATM only
+        (``polymer=False``) or all of them (``polymer=None``)."""
+        if polymer is None:
+            keep = np.arange(self.n_residues)
+        else:
+            keep = np.flatnonzero(self.polymer == polymer)
+        return [IndexedResidue(self, int(r)) for r in keep]
+
+    def polymer_atom_coords(self) -> np.ndarray:
+        """(n, 3) float coordinates of every atom of the polymer residues."""
+        return self.coords[self.polymer[self.atom_residue]].astype(float)
+
+
+def parse_structure(structure_path: str) -> ParsedStructure:
+    """Parse the first model of a .pdb/.cif with Biopython into a ParsedStructure."""
+    parser = _parser_for(structure_path)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", PDBConstructionWarning)
+        structure = parser.get_structure("s", structure_path)
+    model = next(iter(structure))  # first model only (predicted structs write one)
+    coords: List[np.ndarray] = []
+    atom_names: List[str] = []
+    elements: List[str] = []
+    bfactors: List[float] = []
+    resnames: List[str] = []
+    chain_ids: List[str] = []
+    het_flags: List[str] = []
+    resseqs: List[int] = []
+    icodes: List[str] = []
+    offsets = [0]
+    for chain in model:
+        for residue in chain:
+            het, resseq, icode = residue.id
+            resnames.append(residue.get_resname())
+            chain_ids.append(str(chain.id))
+            het_flags.append(het)
+            resseqs.append(int(resseq))
+            icodes.append(icode)
+            for atom in residue:
+                coords.append(atom.get_coord())
+                atom_names.append(atom.get_name())
+                elements.append(atom.element or "")
+                bfactors.append(atom.get_bfactor())
+            offsets.append(len(coords))
+    return ParsedStructure(
+        np.asarray(coords, dtype=np.float32).reshape(-1, 3),
+        atom_names,
+        elements,
+        bfactors,
+        resnames,
+        chain_ids,
+        het_flags,
+        resseqs,
+        icodes,
+        offsets,
+    )
+
+
+# --------------------------------------------------------------------------- #
+# The on-disk index                                                           #
+# --------------------------------------------------------------------------- #
+def default_index_dir(structs_dir: str) -> str:
+    return str(structs_dir).rstrip(os.sep) + INDEX_SUFFIX
+
+
+def _file_key(path: str) -> Tuple[str, int, int]:
+    st = os.stat(path)
+    return os.path.realpath(path), st.st_mtime_ns, st.st_size
+
+
+class StructureIndex:
+    """Read side of a ``<structs_dir>_structure_index`` directory."""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = str(index_dir)
+        with open(os.path.join(self.index_dir, MANIFEST)) as handle:
+            manifest = json.load(handle)
+        if manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"{self.index_dir} has index format {manifest.get('version')!r}, "
+                f"expected {FORMAT_VERSION}; rebuild it with run_structure_index"
+            )
+        self.entries: List[dict] = manifest["structures"]
+        self._by_path = {entry["path"]: entry for entry in self.entries}
+        self._columns = {
+            name: np.load(os.path.join(self.index_dir, name + ".npy"), mmap_mode="r")
+            for name in ATOM_COLUMNS + RESIDUE_COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _slice(self, entry: dict) -> ParsedStructure:
+        a0, a1 = entry["atoms"]
+        r0, r1 = entry["residues"]
+        cols = {}
+        for name in ATOM_COLUMNS:
+            cols[name] = self._columns[name][a0:a1]
+        for name in RESIDUE_COLUMNS[:-1]:
+            cols[name] = self._columns[name][r0:r1]
+        for name in _TEXT_COLUMNS:
+            cols[name] = np.char.decode(cols[name], "ascii")
+        starts = np.asarray(self._columns["residue_starts"][r0:r1]) - a0
+        cols["residue_offsets"] = np.append(starts, a1 - a0)
+        return ParsedStructure(**cols)
+
+    def get(self, structure_path: str) -> Optional[ParsedStructure]:
+        """The indexed structure, or None when the file is not indexed or changed
+        since (different mtime or size)."""
+        try:
+            path, mtime_ns, size = _file_key(structure_path)
+        except OSError:
+            return None
+        entry = self._by_path.get(path)
+        if entry is None or entry["mtime_ns"] != mtime_ns or entry["size"] != size:
+            return None
+        return self._slice(entry)
+
+
+def build_structure_index(
+    structs_dir: str,
+    *,
+    index_dir: Optional[str] = None,
+) -> Tuple[str, Dict[str, int]]:
+    """Parse every structure in ``structs_dir`` (AF3 ``af_output`` or flat layout,
+    as the tools detect it) into the index; returns ``(index_dir, counts)``.
+
+    Entries of an existing index whose file is unchanged are copied over instead
+    of re-parsed, so re-running after new structures were added only parses the
+    new ones. Unparsable structures are left out (the tools then report them as
+    they always did). The new index replaces the old one in a single rename.
+    """
+    # Imported here: plddt itself reads structures through this module.
+    from tps_eval.structure_metrics.plddt import _collect_structures
+
+    structures, mode = _collect_structures(structs_dir)
+    if not structures:
+        raise ValueError(
+            f"No structures found in {structs_dir} (expected an AlphaFold3 af_output "
+            "dir with <job>/<job>_model.cif subfolders, or a flat dir of .pdb/.cif)."
+        )
+    index_dir = default_index_dir(structs_dir) if index_dir is None else str(index_dir)
+    print(f"Detected {mode} layout: {len(structures)} structure(s) in {structs_dir}")
+    try:
+        previous: Optional[StructureIndex] = StructureIndex(index_dir)
+    except (OSError, ValueError, KeyError):
+        previous = None
+
+    counts = {"reused": 0, "parsed": 0, "failed": 0}
+    parts: Dict[str, List[np.ndarray]] = {name: [] for name in ATOM_COLUMNS + RESIDUE_COLUMNS}
+    entries: List[dict] = []
+    n_atoms = n_residues = 0
+    for i, (stem, path) in enumerate(structures.items(), start=1):
+        try:
+            parsed = previous.get(path) if previous is not None else None
+            reused = parsed is not None
+            if not reused:
+                parsed = parse_structure(path)
+            key = _file_key(path)
+            text = {name: getattr(parsed, name).astype("S") for name in _TEXT_COLUMNS}
+        except Exception as exc:  # malformed/unparsable -> not indexed, keep going
+            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
+            counts["failed"] += 1
+            continue
+        counts["reused" if reused else "parsed"] += 1
+        for name in ATOM_COLUMNS + RESIDUE_COLUMNS[:-1]:
+            parts[name].append(text.get(name, getattr(parsed, name)))
+        parts["residue_starts"].append(parsed.residue_offsets[:-1] + n_atoms)
+        entries.append(
+            {
+                "id": stem,
+                "path": key[0],
+                "mtime_ns": key[1],
+                "size": key[2],
+                "atoms": [n_atoms, n_atoms + parsed.n_atoms],
+                "residues": [n_residues, n_residues + parsed.n_residues],
+            }
+        )
+        n_atoms += parsed.n_atoms
+        n_residues += parsed.n_residues
+        if i % 500 == 0 or i == len(structures):
+            print(f"  indexed {i}/{len(structures)}")
+
+    empty = {
+        "coords": np.empty((0, 3), dtype=np.float32),
+        "bfactors": np.empty(0, dtype=float),
+        "resseqs": np.empty(0, dtype=np.int32),
+        "residue_starts": np.empty(0, dtype=np.int64),
+    }
+    tmp_dir = index_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, chunks in parts.items():
+        column = np.concatenate(chunks) if chunks else empty.get(name, np.empty(0, dtype="S1"))
+        np.save(os.path.join(tmp_dir, name + ".npy"), column)
+    with open(os.path.join(tmp_dir, MANIFEST), "w") as handle:
+        json.dump({"version": FORMAT_VERSION, "structures": entries}, handle)
+    del previous  # release the old memmaps before swapping directories
+    old_dir = index_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.isdir(index_dir):
+        os.replace(index_dir, old_dir)
+    os.replace(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    print(
+        f"Wrote {len(entries)} structure(s), {n_atoms} atoms to {index_dir} "
+        f"({counts['reused']} reused, {counts['parsed']} parsed"
+        + (f", {counts['failed']} unparsable)" if counts["failed"] else ")")
+    )
+    return index_dir, counts
+
+
+# --------------------------------------------------------------------------- #
+# Tool-side lookup                                                            #
+# --------------------------------------------------------------------------- #
+# index_dir -> (manifest mtime_ns, StructureIndex or None); one open per process.
+_OPEN_INDEXES: Dict[str, Tuple[int, Optional[StructureIndex]]] = {}
+
+
+def _open_index(index_dir: str) -> Optional[StructureIndex]:
+    try:
+        stamp = os.stat(os.path.join(index_dir, MANIFEST)).st_mtime_ns
+    except OSError:
+        return None
+    cached = _OPEN_INDEXES.get(index_dir)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        index: Optional[StructureIndex] = StructureIndex(index_dir)
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"  [warn] ignoring structure index {index_dir}: {exc}")
+        index = None
+    _OPEN_INDEXES[index_dir] = (stamp, index)
+    return index
+
+
+def _candidate_indexes(structure_path: str) -> Iterator[StructureIndex]:
+    """Indexes that may hold ``structure_path``: ``<dir>_structure_index`` for its
+    directory (flat layout), then for the directory above (AF3 ``<job>/`` subfolders)."""
+    parent = os.path.dirname(os.path.abspath(structure_path))
+    for index_dir in (default_index_dir(parent), default_index_dir(os.path.dirname(parent))):
+        index = _open_index(index_dir)
+        if index is not None:
+            yield index
+
+
+def load_structure(structure_path: str) -> ParsedStructure:
+    """The structure from its directory's index when fresh, else parsed from disk."""
+    for index in _candidate_indexes(structure_path):
+        parsed = index.get(structure_path)
+        if parsed is not None:
+            return parsed
+    return parse_structure(structure_path)
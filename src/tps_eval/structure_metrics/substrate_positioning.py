@@ -47,21 +47,20 @@ from __future__ import annotations
 
 import argparse
 import os
-import warnings
 from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from Bio.PDB.PDBExceptions import PDBConstructionWarning
 
 from tps_eval.structure_metrics.active_site_geometry import (
     _coordinating_oxygens,
     coordinating_indices_relaxed,
     metal_point as _cage_metal_point,
     structure_sequence_residues_atoms,
-    _parser_for,
 )
+from tps_eval.structure_metrics.parallel import map_structures
 from tps_eval.structure_metrics.plddt import _collect_structures
+from tps_eval.structure_metrics.structure_index import load_structure
 
 # Ions to exclude when auto-detecting the substrate, and to measure the diphosphate->ion
 # distance against.
@@ -126,34 +125,27 @@ def read_substrate_ligand(
     substrate's P + O atoms; ``carbon_coords`` = its C atoms; ``ion_coords`` = all Mg/Mn ion
     atoms (for the diphosphate->ion distance)."""
     ion_set = {r.strip().upper() for r in ion_resnames}
-    parser = _parser_for(structure_path)
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", PDBConstructionWarning)
-        structure = parser.get_structure("s", structure_path)
-    model = next(iter(structure))
+    structure = load_structure(structure_path)
 
     ions: List[np.ndarray] = []
     candidates: List[Tuple[str, List[Tuple[str, np.ndarray, float]]]] = []
-    for chain in model:
-        for residue in chain:
-            if residue.id[0] == " ":               # protein residue -> skip
-                continue
-            resname = residue.get_resname().strip().upper()
-            atoms = [(_element(a), np.asarray(a.get_coord(), float), float(a.get_bfactor()))
-                     for a in residue]
-            if (resname in ion_set) or (atoms and all(el in ION_ELEMENTS for (el, _c, _b) in atoms)):
-                ions.extend(c for (_el, c, _b) in atoms)  # element-based: AF3 'MG' & Boltz2 'LIG2'
-                continue
-            if resname in _IGNORE_RESNAMES:
-                continue
-            if substrate_resname is not None:
-                if resname == substrate_resname.strip().upper():
-                    candidates.append((resname, atoms))
-                continue
-            n_p = sum(el == "P" for (el, _c, _b) in atoms)
-            n_c = sum(el == "C" for (el, _c, _b) in atoms)
-            if n_p >= 1 and n_c >= min_carbons:
+    for residue in structure.residues(polymer=False):  # protein residues skipped
+        resname = residue.get_resname().strip().upper()
+        atoms = [(_element(a), np.asarray(a.get_coord(), float), float(a.get_bfactor()))
+                 for a in residue]
+        if (resname in ion_set) or (atoms and all(el in ION_ELEMENTS for (el, _c, _b) in atoms)):
+            ions.extend(c for (_el, c, _b) in atoms)  # element-based: AF3 'MG' & Boltz2 'LIG2'
+            continue
+        if resname in _IGNORE_RESNAMES:
+            continue
+        if substrate_resname is not None:
+            if resname == substrate_resname.strip().upper():
                 candidates.append((resname, atoms))
+            continue
+        n_p = sum(el == "P" for (el, _c, _b) in atoms)
+        n_c = sum(el == "C" for (el, _c, _b) in atoms)
+        if n_p >= 1 and n_c >= min_carbons:
+            candidates.append((resname, atoms))
 
     ion_arr = np.vstack(ions) if ions else np.empty((0, 3))
     empty = np.empty((0, 3))
@@ -263,11 +255,13 @@ def substrate_positioning_dir(
     ion_resnames: Tuple[str, ...] = DEFAULT_ION_RESNAMES,
     min_substrate_carbons: int = DEFAULT_MIN_SUBSTRATE_CARBONS,
     substrate_resname: Optional[str] = None,
+    workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """Substrate-positioning check for every structure in ``structs_dir``; CSV keyed by ID.
     Auto-detects an AF3 ``af_output`` dir vs a flat dir of .pdb/.cif (via
     ``plddt._collect_structures``); writes ``<structs_dir>_substrate_positioning.csv`` by
-    default. Structures with no prenyl-PP substrate get a graceful not-applicable row."""
+    default. Structures with no prenyl-PP substrate get a graceful not-applicable row.
+    Structures are processed on ``workers`` processes (default: all allocated CPUs)."""
     structures, mode = _collect_structures(structs_dir)
     if not structures:
         raise ValueError(
@@ -278,25 +272,17 @@ def substrate_positioning_dir(
           f"min substrate carbons {min_substrate_carbons}"
           + (f"; forced substrate resname {substrate_resname}" if substrate_resname else ""))
 
-    rows: List[Dict[str, object]] = []
-    n = len(structures)
-    n_failed = 0
-    for i, (stem, path) in enumerate(structures.items(), start=1):
-        try:
-            stats = substrate_positioning(
-                path, coord_cutoff=coord_cutoff, ion_resnames=ion_resnames,
-                min_substrate_carbons=min_substrate_carbons, substrate_resname=substrate_resname)
-        except Exception as exc:
-            print(f"  [warn] failed to parse {os.path.basename(path)}: {exc}")
-            stats = {c: (False if c in ("metal_point_found", "substrate_present", "substrate_in_site")
-                         else "" if c == "substrate_resname"
-                         else 0 if c in ("n_substrate_atoms", "n_residues") else np.nan)
-                     for c in COLUMNS if c != "ID"}
-            n_failed += 1
-        stats["ID"] = str(stem).strip()
-        rows.append(stats)
-        if i % 50 == 0 or i == n:
-            print(f"  processed {i}/{n}")
+    rows, n_failed = map_structures(
+        lambda stem, path: substrate_positioning(
+            path, coord_cutoff=coord_cutoff, ion_resnames=ion_resnames,
+            min_substrate_carbons=min_substrate_carbons, substrate_resname=substrate_resname),
+        structures,
+        lambda: {c: (False if c in ("metal_point_found", "substrate_present", "substrate_in_site")
+                     else "" if c == "substrate_resname"
+                     else 0 if c in ("n_substrate_atoms", "n_residues") else np.nan)
+                 for c in COLUMNS if c != "ID"},
+        workers=workers,
+    )
 
     df = pd.DataFrame(rows)[COLUMNS].sort_values("ID").reset_index(drop=True)
     if save_path is None:
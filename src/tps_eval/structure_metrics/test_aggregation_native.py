@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Self-contained tests for aggregation_native.py (in-process A3D static score,
+experimental: aggregation.py still runs A3D) and its parity/calibration tools.
+
+Run from the repo root:
+    python -m pytest src/tps_eval/structure_metrics/test_aggregation_native.py -q
+
+We test:
+  * Shrake-Rupley: an isolated atom's area is 4*pi*(r+probe)^2 and a touching
+    neighbour occludes part of it (same result across atom blocks),
+  * the smoothing: buried residues score 0, an isolated exposed residue scores
+    a3v * RSA, and close exposed neighbours add their distance-weighted terms,
+  * native per-residue scores on a small synthetic PDB (Biopython),
+  * parity with the recorded A3D outputs in ``PARITY_FIXTURES_DIR`` (skipped
+    until fixtures are recorded with ``aggregation_native record``),
+  * record + calibrate with A3D stubbed: fixtures written by a fake A3D using
+    other constants are recovered by ``calibrate`` and pass ``parity``.
+"""
+
+import math
+import os
+import tempfile
+
+import numpy as np
+
+import tps_eval.structure_metrics.aggregation as aggregation
+import tps_eval.structure_metrics.aggregation_native as native
+
+
+def _approx(a, b, tol=1e-6):
+    assert abs(a - b) <= tol, (a, b)
+
+
+# Two residues (ILE, ASP) far apart, plus a GLY -- heavy atoms only, with OXT.
+_PDB = """\
+ATOM      1  N   ILE A   1       0.000   0.000   0.000  1.00 90.00           N
+ATOM      2  CA  ILE A   1       1.458   0.000   0.000  1.00 90.00           C
+ATOM      3  C   ILE A   1       2.009   1.420   0.000  1.00 90.00           C
+ATOM      4  O   ILE A   1       1.251   2.390   0.000  1.00 90.00           O
+ATOM      5  CB  ILE A   1       1.988  -0.773  -1.199  1.00 90.00           C
+ATOM      6  CG1 ILE A   1       3.517  -0.773  -1.199  1.00 90.00           C
+ATOM      7  CG2 ILE A   1       1.458  -2.203  -1.199  1.00 90.00           C
+ATOM      8  CD1 ILE A   1       4.047  -1.546  -2.398  1.00 90.00           C
+ATOM      9  N   ASP A   2      20.000   0.000   0.000  1.00 90.00           N
+ATOM     10  CA  ASP A   2      21.458   0.000   0.000  1.00 90.00           C
+ATOM     11  C   ASP A   2      22.009   1.420   0.000  1.00 90.00           C
+ATOM     12  O   ASP A   2      21.251   2.390   0.000  1.00 90.00           O
+ATOM     13  CB  ASP A   2      21.988  -0.773  -1.199  1.00 90.00           C
+ATOM     14  CG  ASP A   2      23.517  -0.773  -1.199  1.00 90.00           C
+ATOM     15  OD1 ASP A   2      24.100  -1.800  -1.600  1.00 90.00           O
+ATOM     16  OD2 ASP A   2      24.100   0.200  -0.800  1.00 90.00           O
+ATOM     17  N   GLY A   3      40.000   0.000   0.000  1.00 90.00           N
+ATOM     18  CA  GLY A   3      41.458   0.000   0.000  1.00 90.00           C
+ATOM     19  C   GLY A   3      42.009   1.420   0.000  1.00 90.00           C
+ATOM     20  O   GLY A   3      41.251   2.390   0.000  1.00 90.00           O
+ATOM     21  OXT GLY A   3      43.200   1.500   0.000  1.00 90.00           O
+HETATM   22  O   HOH A 101      60.000   0.000   0.000  1.00 90.00           O
+END
+"""
+
+
+def test_shrake_rupley_isolated_and_occluded():
+    r = native.atom_radius("ALA", "CB", "C")
+    _approx(r, 1.87)
+    _approx(native.atom_radius("PHE", "CZ", "C"), 1.76)
+    _approx(native.atom_radius("ALA", "C", "C"), 1.76)
+    _approx(native.atom_radius("ALA", "N", "N"), 1.65)
+
+    area = native.shrake_rupley([[0.0, 0.0, 0.0]], [r])
+    _approx(area[0], 4.0 * math.pi * (r + native.PROBE_RADIUS_A) ** 2)
+
+    pair = native.shrake_rupley([[0.0, 0.0, 0.0], [0.0, 0.0, 3.0]], [r, r])  # spiral is z-symmetric
+    assert 0 < pair[0] < area[0]
+    _approx(pair[0], pair[1])
+    far = native.shrake_rupley([[0.0, 0.0, 0.0], [30.0, 0.0, 0.0]], [r, r])
+    _approx(far[0], area[0])
+
+    # Blocked neighbour search gives the same areas as one block.
+    rng = np.random.RandomState(0)
+    coords = rng.uniform(0, 12, size=(60, 3))
+    radii = np.full(60, 1.7)
+    whole = native.shrake_rupley(coords, radii)
+    old = native._ATOM_BLOCK
+    native._ATOM_BLOCK = 7
+    try:
+        blocked = native.shrake_rupley(coords, radii)
+    finally:
+        native._ATOM_BLOCK = old
+    assert np.allclose(whole, blocked)
+    assert native.shrake_rupley(np.zeros((0, 3)), []).shape == (0,)
+
+
+def test_smoothed_scores():
+    names = ["ILE", "ASP", "PHE", "LEU"]
+    rsa = [0.5, 0.8, 0.05, 0.4]
+    centres = [[0, 0, 0], [4, 0, 0], [2, 0, 0], [50, 0, 0]]
+    scores = native.smoothed_scores(names, rsa, centres)
+    w = math.exp(-16.0 / (2.0 * native.WEIGHT_SIGMA_A ** 2))
+    ile = native.A3V_SCALE["ILE"] * 0.5
+    asp = native.A3V_SCALE["ASP"] * 0.8
+    _approx(scores[0], ile + w * asp)
+    _approx(scores[1], asp + w * ile)
+    assert scores[2] == 0.0                       # buried: no score, no contribution
+    _approx(scores[3], native.A3V_SCALE["LEU"] * 0.4)  # outside every sphere
+
+
+def test_native_residue_scores():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "s1.pdb")
+        with open(path, "w") as fh:
+            fh.write(_PDB)
+        residues = native.residues_from_structure(native.load_structure(path))
+        assert [(r[0], r[1], r[2]) for r in residues] == [
+            ("A", "1", "ILE"), ("A", "2", "ASP"), ("A", "3", "GLY")]
+        scores = native.residue_scores(path)
+        assert scores.shape == (3,)
+        # Isolated residues: fully exposed, score = a3v * RSA with its sign.
+        assert scores[0] > 0 and scores[1] < 0 and scores[2] < 0
+
+
+def test_parity_with_recorded_a3d_outputs():
+    fixtures = native.load_parity_fixtures()
+    if not fixtures:
+        print("skip test_parity_with_recorded_a3d_outputs (no recorded A3D fixtures "
+              "in %s)" % native.PARITY_FIXTURES_DIR)
+        return
+    report = native.parity(fixtures)
+    bad = dict((k, v) for k, v in report.items() if v[2] or v[0] > native.PARITY_TOLERANCE)
+    assert not bad, bad
+
+
+def test_record_and_calibrate(monkeypatch):
+    constants = dict(radius=8.0, cutoff=0.05, sigma=3.0)
+
+    def fake_a3d(pdb_path, work_dir):
+        if "broken" in pdb_path:
+            raise RuntimeError("A3D blew up")
+        os.makedirs(work_dir)
+        residues = native.residues_from_structure(native.load_structure(pdb_path))
+        scores = native.smoothed_scores([r[2] for r in residues], native.relative_sasa(residues),
+                                        [r[5] for r in residues], **constants)
+        csv_path = os.path.join(work_dir, "A3D.csv")
+        with open(csv_path, "w") as fh:
+            fh.write("protein,chain,residue,residue_name,score\n")
+            for r, score in zip(residues, scores):
+                fh.write("input,%s,%s,%s,%.4f\n" % (r[0], r[1], r[2], score))
+        return csv_path
+
+    # Three residues within a few A of each other, so the constants matter.
+    near = _PDB.replace("  20.000", "   5.000").replace("  21.458", "   6.458") \
+        .replace("  22.009", "   7.009").replace("  21.251", "   6.251") \
+        .replace("  21.988", "   6.988").replace("  23.517", "   8.517") \
+        .replace("  24.100", "   9.100")
+    with tempfile.TemporaryDirectory() as d:
+        structs = os.path.join(d, "structs")
+        os.makedirs(structs)
+        for stem, text in (("far", _PDB), ("near", near), ("broken", _PDB)):
+            with open(os.path.join(structs, stem + ".pdb"), "w") as fh:
+                fh.write(text)
+        fixtures_dir = os.path.join(d, "fixtures")
+
+        monkeypatch.setattr(aggregation, "_run_a3d_static", fake_a3d)
+        assert aggregation.record_a3d_fixtures(structs, fixtures_dir) == ["far", "near"]
+        assert sorted(os.listdir(fixtures_dir)) == [
+            "far.a3d.csv", "far.pdb", "near.a3d.csv", "near.pdb"]
+
+        fixtures = native.load_parity_fixtures(fixtures_dir)
+        assert [f[0] for f in fixtures] == ["far", "near"]
+        assert [key for key, _ in fixtures[1][2]] == [("A", "1"), ("A", "2"), ("A", "3")]
+
+        off = native.parity(fixtures, radius=12.0, cutoff=0.05, sigma=float("inf"))
+        assert off["near"][0] > native.PARITY_TOLERANCE
+
+        worst, radius, cutoff, sigma = native.calibrate(
+            fixtures, radii=(4.0, 8.0, 12.0), cutoffs=(0.05, 0.2), sigmas=(3.0, float("inf")))
+        assert (radius, cutoff, sigma) == (8.0, 0.05, 3.0)
+        assert worst <= 1e-3  # A3D.csv keeps 4 decimals
+        report = native.parity(fixtures, radius=radius, cutoff=cutoff, sigma=sigma)
+        assert all(v[0] <= native.PARITY_TOLERANCE and v[2] == 0 for v in report.values())
+
+        # A recorded residue the native parser cannot place is never a pass.
+        with open(os.path.join(fixtures_dir, "near.a3d.csv"), "a") as fh:
+            fh.write("input,B,7,ALA,0.1000\n")
+        report = native.parity(native.load_parity_fixtures(fixtures_dir), **constants)
+        assert report["near"][2] == 1 and math.isinf(report["near"][0])
+        assert report["far"][2] == 0
+
+
+def main():
+    import inspect
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+
+    class _MP(object):
+        def __init__(self):
+            self._undo = []
+
+        def setattr(self, obj, name, value):
+            self._undo.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+        def undo(self):
+            for obj, name, old in reversed(self._undo):
+                setattr(obj, name, old)
+            self._undo = []
+
+    for t in tests:
+        if "monkeypatch" in inspect.signature(t).parameters:
+            mp = _MP()
+            try:
+                t(mp)
+            finally:
+                mp.undo()
+        else:
+            t()
+        print("  ok  %s" % t.__name__)
+    print("All %d tests passed." % len(tests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+"""Self-contained tests for combined_structure_metrics.py (the single-pass runner).
+
+Run from the repo root:
+    python -m pytest src/tps_eval/structure_metrics/test_combined_structure_metrics.py -q
+
+Synthetic PDBs in a temp dir: a DDXXD + NSE/DTE sequence with Arg/Lys/Tyr/Phe/Trp
+side chains and an MG ion scattered around the cage, plus an unparsable file. The
+combined run must write byte-identical CSVs to the seven standalone tools while
+loading each structure once.
+"""
+
+import inspect
+import os
+import tempfile
+
+import numpy as np
+
+from tps_eval.structure_metrics import combined_structure_metrics
+from tps_eval.structure_metrics.active_site_geometry import active_site_geometry_dir
+from tps_eval.structure_metrics.aromatic_lining import aromatic_lining_dir
+from tps_eval.structure_metrics.combined_structure_metrics import (
+    METRICS,
+    combined_structure_metrics_dir,
+)
+from tps_eval.structure_metrics.diphosphate_sensor import diphosphate_sensor_dir
+from tps_eval.structure_metrics.ion_site_check import ion_site_check_dir
+from tps_eval.structure_metrics.motif_structural_distance import motif_structural_distance_dir
+from tps_eval.structure_metrics.plddt import extract_plddt_dir
+from tps_eval.structure_metrics.radius_of_gyration import radius_of_gyration_dir
+
+_SEQ = "RKYAA" + "DDAAD" + "AFWAA" + "NDLASAAAE" + "AYR"
+_THREE = {"A": "ALA", "D": "ASP", "E": "GLU", "F": "PHE", "K": "LYS", "L": "LEU",
+          "N": "ASN", "R": "ARG", "S": "SER", "W": "TRP", "Y": "TYR"}
+_SIDE_CHAIN = {
+    "ASP": ("CB", "CG", "OD1", "OD2"),
+    "GLU": ("CB", "CG", "CD", "OE1", "OE2"),
+    "ASN": ("CB", "CG", "OD1", "ND2"),
+    "SER": ("CB", "OG"),
+    "ARG": ("CB", "CG", "CD", "NE", "CZ", "NH1", "NH2"),
+    "LYS": ("CB", "CG", "CD", "CE", "NZ"),
+    "TYR": ("CB", "CG", "CD1", "CD2", "CE1", "CE2", "CZ", "OH"),
+    "PHE": ("CB", "CG", "CD1", "CD2", "CE1", "CE2", "CZ"),
+    "TRP": ("CB", "CG", "CD1", "CD2", "NE1", "CE2", "CE3", "CZ2", "CZ3", "CH2"),
+    "ALA": ("CB",),
+    "LEU": ("CB", "CG", "CD1", "CD2"),
+}
+
+
+def _atom_line(serial, name, resname, resseq, xyz, *, record="ATOM", bfac=80.0):
+    x, y, z = xyz
+    atom_field = name[:4] if len(name) >= 4 else " " + name.ljust(3)
+    return (
+        f"{record:<6}{serial:>5} {atom_field} {resname:>3} A{resseq:>4}"
+        f"{'':4}{x:>8.3f}{y:>8.3f}{z:>8.3f}{1.0:>6.2f}{bfac:>6.2f}{'':10}{name[0]:>2}\n"
+    )
+
+
+def _write_design(path, seed):
+    """Backbone along a loose helix around the origin, side-chain atoms scattered
+    within a few A of their CA (oxygens pulled toward the cage), and an MG."""
+    rng = np.random.default_rng(seed)
+    lines, serial = [], 1
+    for i, aa in enumerate(_SEQ):
+        resname = _THREE[aa]
+        angle = i * 1.7
+        ca = np.array([9.0 * np.cos(angle), 9.0 * np.sin(angle), 1.5 * (i - len(_SEQ) / 2)])
+        bfac = float(rng.uniform(40, 95))
+        for name in ("N", "CA", "C", "O") + _SIDE_CHAIN[resname]:
+            xyz = ca if name == "CA" else ca + rng.normal(scale=1.5, size=3)
+            if name[0] == "O" and name != "O":
+                xyz = 0.3 * xyz  # carboxylate / hydroxyl oxygens converge on the cage
+            elif name in ("NH1", "NH2", "NZ"):
+                xyz = 0.5 * xyz  # basic heads reach toward it
+            lines.append(_atom_line(serial, name, resname, i + 1, xyz, bfac=bfac))
+            serial += 1
+    mg = rng.normal(scale=1.0, size=3)
+    lines.append(_atom_line(serial, "MG", " MG", 900, mg, record="HETATM"))
+    with open(path, "w") as fh:
+        fh.writelines(lines + ["END\n"])
+
+
+_STANDALONE = {
+    "plddt": extract_plddt_dir,
+    "radius_of_gyration": radius_of_gyration_dir,
+    "motif_structural_distance": motif_structural_distance_dir,
+    "active_site_geometry": active_site_geometry_dir,
+    "aromatic_lining": aromatic_lining_dir,
+    "diphosphate_sensor": diphosphate_sensor_dir,
+    "ion_site_check": ion_site_check_dir,
+}
+
+
+def _structs(d):
+    structs = os.path.join(d, "structs")
+    os.makedirs(structs)
+    for seed in range(3):
+        _write_design(os.path.join(structs, f"design{seed}.pdb"), seed)
+    with open(os.path.join(structs, "broken.pdb"), "w") as fh:
+        fh.write("not a pdb\n")
+    return structs
+
+
+def test_combined_csvs_match_the_standalone_tools(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        structs = _structs(d)
+        reference = os.path.join(d, "reference")
+        os.makedirs(reference)
+        for name, tool in _STANDALONE.items():
+            tool(structs, save_path=os.path.join(reference, f"{name}.csv"))
+
+        loads = []
+        real_load = combined_structure_metrics.load_structure
+        monkeypatch.setattr(
+            combined_structure_metrics, "load_structure", lambda p: loads.append(p) or real_load(p)
+        )
+        frames = combined_structure_metrics_dir(structs, workers=1)  # loads counted in-process
+        assert list(frames) == list(METRICS) == list(_STANDALONE)
+        assert len(loads) == 4  # one load per structure, not one per metric
+
+        for name in METRICS:
+            with open(os.path.join(reference, f"{name}.csv")) as fh:
+                expected = fh.read()
+            with open(f"{structs}_{name}.csv") as fh:
+                assert fh.read() == expected, name
+        assert frames["active_site_geometry"]["n_coordinating_oxygens"].max() > 0
+        assert frames["diphosphate_sensor"]["n_diphosphate_basic_residues"].max() > 0
+        assert frames["ion_site_check"]["n_ions_modelled"].tolist() == [0, 1, 1, 1]
+
+
+def test_metric_subset_and_options():
+    with tempfile.TemporaryDirectory() as d:
+        structs = _structs(d)
+        out = os.path.join(d, "out")
+        os.makedirs(out)
+        frames = combined_structure_metrics_dir(
+            structs, metrics=["plddt", "aromatic_lining"], save_dir=out,
+            confident_threshold=90.0, aromatic_cutoff=4.0,
+        )
+        assert sorted(os.listdir(out)) == ["structs_aromatic_lining.csv", "structs_plddt.csv"]
+        assert not os.path.exists(f"{structs}_plddt.csv")
+
+        expected = aromatic_lining_dir(structs, save_path=os.path.join(d, "a.csv"), cutoff=4.0)
+        assert frames["aromatic_lining"].equals(expected)
+        assert frames["plddt"]["frac_plddt_confident"].max() < 0.5
+
+        try:
+            combined_structure_metrics_dir(structs, metrics=["plddt", "pocket_descriptors"])
+            raise AssertionError("expected ValueError for an unknown metric")
+        except ValueError:
+            pass
+        try:
+            combined_structure_metrics_dir(structs, cutoff=4.0)  # ambiguous: not an option name
+            raise AssertionError("expected TypeError for an unknown option")
+        except TypeError:
+            pass
+
+
+def main():
+    class _MP:
+        def __init__(self):
+            self._undo = []
+
+        def setattr(self, obj, name, value):
+            self._undo.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+        def undo(self):
+            for obj, name, old in reversed(self._undo):
+                setattr(obj, name, old)
+            self._undo = []
+
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        if "monkeypatch" in inspect.signature(t).parameters:
+            mp = _MP()
+            try:
+                t(mp)
+            finally:
+                mp.undo()
+        else:
+            t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
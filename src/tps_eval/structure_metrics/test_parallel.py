@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+"""Self-contained tests for parallel.py (the process-pool map of the *_dir drivers).
+
+Run from the repo root:
+    python -m pytest src/tps_eval/structure_metrics/test_parallel.py -q
+
+A pool of workers must return rows in input order, isolate a failing structure to
+its failed row, report progress, and give the same CSV as the serial loop.
+"""
+
+import os
+import tempfile
+
+from tps_eval.structure_metrics.parallel import available_cpus, map_structures, resolve_workers
+from tps_eval.structure_metrics.radius_of_gyration import radius_of_gyration_dir
+
+
+def _square(stem, path):
+    if stem.startswith("bad"):
+        raise ValueError(f"cannot read {path}")
+    return {"value": int(stem[1:]) ** 2, "pid": os.getpid()}
+
+
+def _structures():
+    items = [(f"s{i}", f"/tmp/s{i}.pdb") for i in range(40)]
+    items[7] = ("bad7", "/tmp/bad7.pdb")
+    items[31] = ("bad31", "/tmp/bad31.pdb")
+    return dict(items)
+
+
+def test_ordered_rows_and_isolated_failures():
+    structures = _structures()
+    serial, n_serial = map_structures(_square, structures, lambda: {"value": -1}, workers=1)
+    pooled, n_pooled = map_structures(
+        _square, structures, lambda: {"value": -1}, workers=4, chunksize=3
+    )
+    assert n_serial == n_pooled == 2
+    assert [r["ID"] for r in pooled] == list(structures)
+    assert [r["value"] for r in pooled] == [r["value"] for r in serial]
+    assert pooled[7]["value"] == pooled[31]["value"] == -1
+    assert pooled[8]["value"] == 64
+    assert {r["pid"] for r in serial if "pid" in r} == {os.getpid()}
+    assert os.getpid() not in {r["pid"] for r in pooled if "pid" in r}
+
+
+def test_closures_pairs_and_worker_count():
+    offsets = {"a": 10, "b": 20, "c": 30}  # a closure: only inherited through fork
+    rows, n_failed = map_structures(
+        lambda stem, path: {"value": offsets[stem] + len(path)},
+        [("a", "x"), ("b", "xy"), ("c", "xyz")],
+        lambda: {},
+        workers=3,
+        id_column="id",
+    )
+    assert n_failed == 0
+    assert rows == [{"value": 11, "id": "a"}, {"value": 22, "id": "b"}, {"value": 33, "id": "c"}]
+    assert resolve_workers(None, 10**6) == available_cpus() >= 1
+    assert resolve_workers(0, 3) == min(3, available_cpus())
+    assert resolve_workers(8, 3) == 3 and resolve_workers(8, 0) == 1
+
+
+def _write_pdb(path, n_res, step):
+    with open(path, "w") as fh:
+        for i in range(n_res):
+            x = step * i
+            fh.write(
+                f"ATOM  {i + 1:>5}  CA  ALA A{i + 1:>4}    {x:>8.3f}{0.0:>8.3f}{0.0:>8.3f}"
+                f"{1.0:>6.2f}{80.0:>6.2f}           C\n"
+            )
+        fh.write("END\n")
+
+
+def test_dir_driver_pool_matches_serial():
+    with tempfile.TemporaryDirectory() as d:
+        structs = os.path.join(d, "structs")
+        os.makedirs(structs)
+        for i in range(9):
+            _write_pdb(os.path.join(structs, f"d{i}.pdb"), 5 + i, 1.0 + 0.5 * i)
+        with open(os.path.join(structs, "broken.pdb"), "w") as fh:
+            fh.write("not a pdb\n")
+        serial = os.path.join(d, "serial.csv")
+        pooled = os.path.join(d, "pooled.csv")
+        radius_of_gyration_dir(structs, save_path=serial, workers=1)
+        df = radius_of_gyration_dir(structs, save_path=pooled, workers=4)
+        with open(serial) as a, open(pooled) as b:
+            assert a.read() == b.read()
+        assert len(df) == 10 and df["radius_of_gyration"].isna().sum() == 1
+
+
+def main():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
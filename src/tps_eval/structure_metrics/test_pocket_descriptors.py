@@ -12,13 +12,17 @@ degrade gracefully to NaN — which is itself part of the contract and is tested
 The engine-independent logic IS exercised on synthetic inputs: the metal-point anchor
 (closed-form origin from a two-motif carboxylate cage), the fpocket ``*_info.txt`` and
 alpha-sphere ``*.pqr`` parsers (incl. the "Volume" vs "Volume score" disambiguation),
-the P2Rank predictions-CSV parser + rank assignment, the bounding-box enclosure test,
+the P2Rank predictions-CSV parser + rank assignment, the fpocket candidate-pocket
+scan and scratch dirs (via a stand-in ``fpocket`` script), the batched P2Rank pass (via a
+stand-in ``prank`` script), the bounding-box enclosure test,
 the ``pocket_sasa_per_volume`` derivation (via a monkeypatched fpocket result), the
 metal-point-absent -> all-NaN contract, ID keying, the sibling-CSV filename, and
 NaN-on-broken-structure.
 """
 
+import inspect
 import os
+import sys
 import tempfile
 
 import numpy as np
@@ -277,14 +281,136 @@ def test_dir_id_keying_csv_and_nan_on_broken():
         assert int(broken["n_residues"]) == 0
 
 
+_FAKE_PRANK = """#!{python}
+import os, sys
+args = sys.argv[1:]
+assert args[0] == "predict" and args[1].endswith(".ds"), args
+out = args[args.index("-o") + 1]
+os.makedirs(out, exist_ok=True)
+with open({log!r}, "a") as log:
+    log.write(" ".join(args) + "\\n")
+ds_dir = os.path.dirname(args[1])
+for line in open(args[1]):
+    pdb = os.path.join(ds_dir, line.strip())
+    assert os.path.isfile(pdb), pdb
+    with open(os.path.join(out, os.path.basename(pdb) + "_predictions.csv"), "w") as fh:
+        fh.write("name  ,rank,  score, center_x, center_y, center_z\\n")
+        fh.write("pocket1,1, 9.5, 30.0, 0.0, 0.0\\n")
+        fh.write("pocket2,2, 4.25, 1.0, 1.0, 0.0\\n")
+"""
+
+
+def test_dir_batches_p2rank_over_staged_pdbs():
+    with tempfile.TemporaryDirectory() as d:
+        structs = os.path.join(d, "structs")
+        os.makedirs(structs)
+        for name in ("a", "b", "c"):
+            _write_cage_pdb(os.path.join(structs, f"{name}.pdb"))
+        with open(os.path.join(structs, "nomotif.pdb"), "w") as fh:
+            for i in range(20):
+                fh.write(_atom_line(i + 1, "CA", "ALA", "A", i + 1, (i * 3.8, 0, 0), element="C"))
+            fh.write("END\n")
+        log = os.path.join(d, "prank.log")
+        prank = os.path.join(d, "prank")
+        with open(prank, "w") as fh:
+            fh.write(_FAKE_PRANK.format(python=sys.executable, log=log))
+        os.chmod(prank, 0o755)
+
+        df = pocket_descriptors_dir(
+            structs, fpocket_bin="fpocket_missing_bin", p2rank_bin=prank,
+            workers=2, p2rank_batch_size=2,
+        ).set_index("ID")
+        with open(log) as fh:
+            calls = fh.read().splitlines()
+        assert len(calls) == 2  # 3 structures with a metal point, batches of 2
+        assert all("-threads 2" in c and "-visualizations 0" in c for c in calls)
+        for name in ("a", "b", "c"):
+            # The pocket nearest the metal point (origin), not P2Rank's top one.
+            assert df.loc[name, "p2rank_catalytic_site_score"] == 4.25
+            assert df.loc[name, "p2rank_catalytic_pocket_rank"] == 2
+            assert bool(df.loc[name, "p2rank_catalytic_pocket_found"]) is True
+        assert np.isnan(df.loc["nomotif", "p2rank_catalytic_site_score"])
+
+
+_FAKE_FPOCKET = """#!{python}
+import os, sys
+pdb = sys.argv[sys.argv.index("-f") + 1]
+stem = os.path.splitext(os.path.basename(pdb))[0]
+out = os.path.join(os.path.dirname(os.path.abspath(pdb)), stem + "_out")
+os.makedirs(os.path.join(out, "pockets"))
+# pocket 1 far away, pocket 2 encloses the origin (the metal point), pocket 3 near-ish.
+centres = {{1: (40.0, 0.0, 0.0), 2: (0.0, 0.0, 0.0), 3: (9.0, 0.0, 0.0)}}
+info = open(os.path.join(out, stem + "_info.txt"), "w")
+stp = open(os.path.join(out, stem + "_out.pdb"), "w")
+for num, (x, y, z) in centres.items():
+    info.write("Pocket %d :\\n\\tVolume : \\t%.1f\\n\\tTotal SASA : \\t100.0\\n\\n" % (num, 100.0 * num))
+    vert = open(os.path.join(out, "pockets", "pocket%d_vert.pqr" % num), "w")
+    for k, dx in enumerate((-2.0, 2.0)):
+        rec = "%-6s%5d  POL STP C%4d    %8.3f%8.3f%8.3f  0.00  0.00          Ve\\n"
+        stp.write(rec % ("HETATM", k, num, x + dx, y, z))
+        vert.write(rec % ("ATOM", k, num, x + dx, y, z))
+"""
+
+
+def test_fpocket_candidates_scratch_and_streamed_csv(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        structs = os.path.join(d, "structs")
+        os.makedirs(structs)
+        _write_cage_pdb(os.path.join(structs, "cage.pdb"))
+        fpocket = os.path.join(d, "fpocket")
+        with open(fpocket, "w") as fh:
+            fh.write(_FAKE_FPOCKET.format(python=sys.executable))
+        os.chmod(fpocket, 0o755)
+
+        parsed, workdirs = [], []
+        real_parse, real_run = pk._parse_fpocket_alpha_spheres, pk.run_fpocket
+        monkeypatch.setattr(
+            pk, "_parse_fpocket_alpha_spheres", lambda p: parsed.append(os.path.basename(p)) or real_parse(p)
+        )
+        monkeypatch.setattr(
+            pk, "run_fpocket", lambda p, w, **k: workdirs.append(w) or real_run(p, w, **k)
+        )
+        save = os.path.join(d, "pockets.csv")
+        df = pocket_descriptors_dir(structs, save_path=save, fpocket_bin=fpocket, workers=1)
+
+        # The far pocket is never a candidate, so its vertex file is never read.
+        assert parsed == ["pocket2_vert.pqr", "pocket3_vert.pqr"]
+        row = df.iloc[0]
+        assert bool(row["fpocket_catalytic_pocket_found"]) is True
+        _approx(row["catalytic_pocket_volume"], 200.0)   # pocket 2 encloses the origin
+        assert os.path.dirname(workdirs[0]) == (pk.SCRATCH_DIR or tempfile.gettempdir())
+        assert not os.path.exists(workdirs[0])
+        assert os.path.isfile(save) and not os.path.exists(save + ".partial")
+
+
 def test_cutoff_constant():
     assert METAL_POINT_CUTOFF_A == 12.0
 
 
 def main():
+    class _MP:
+        def __init__(self):
+            self._undo = []
+
+        def setattr(self, obj, name, value):
+            self._undo.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+        def undo(self):
+            for obj, name, old in reversed(self._undo):
+                setattr(obj, name, old)
+            self._undo = []
+
     tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
     for t in tests:
-        t()
+        if "monkeypatch" in inspect.signature(t).parameters:
+            mp = _MP()
+            try:
+                t(mp)
+            finally:
+                mp.undo()
+        else:
+            t()
         print(f"  ok  {t.__name__}")
     print(f"All {len(tests)} tests passed.")
 
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+"""Self-contained tests for proteinmpnn_batch.py (resident, batched ProteinMPNN).
+
+Run from the repo root:
+    python -m pytest src/tps_eval/structure_metrics/test_proteinmpnn_batch.py -q
+
+The network is a tiny randomly initialised model on CPU: a stand-in with the vendored
+``ProteinMPNN.forward`` / ``.sample`` signatures (per-residue backbone geometry ->
+21 logits), plus the real vendored class at toy size when vendor/ProteinMPNN is
+checked out (skipped otherwise). We test:
+  * featurize: backbone tensor, NaN for a missing atom, tokens, chain encoding and
+    the 100-per-chain residue index, the chain filter, and parse_PDB's positions
+    (HETATM MSE as MET, chain-alphabet order, a residue-number gap as masked X),
+  * length_buckets: every index once, sorted by length, within the token budget,
+  * score: one-structure batches and one big batch give the same NLLs, in input
+    order, equal to the NLL computed by hand,
+  * sample: N sequences per structure of the right length, omitted 'X' never drawn,
+  * proteinmpnn_score.score_dir(engine="batched") and self_consistency.sample_batched
+    with the tiny model (NaN row / None for unusable structures).
+"""
+
+import math
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import torch
+
+import tps_eval.structure_metrics.proteinmpnn_batch as proteinmpnn_batch
+from tps_eval.structure_metrics.proteinmpnn_batch import (
+    ALPHABET,
+    BatchedProteinMPNN,
+    featurize,
+    length_buckets,
+    throughput,
+)
+from tps_eval.structure_metrics.proteinmpnn_score import COLUMNS, score_dir
+from tps_eval.structure_metrics.self_consistency import sample_batched
+
+
+class _TinyMPNN(torch.nn.Module):
+    """Randomly initialised stand-in: backbone-geometry features -> 21 logits."""
+
+    def __init__(self, hidden=8):
+        super().__init__()
+        generator = torch.Generator().manual_seed(0)
+        self.embed = torch.nn.Parameter(torch.randn(4, hidden, generator=generator))
+        self.out = torch.nn.Parameter(torch.randn(hidden, 21, generator=generator))
+
+    def _logits(self, X, mask):
+        ca = X[:, :, 1]
+        bonds = [torch.linalg.norm(X[:, :, k] - ca, dim=-1) for k in (0, 2, 3)]
+        near = ((torch.cdist(ca, ca) < 8.0).float() * mask[:, None, :]).sum(-1)
+        feats = torch.stack(bonds + [near / 10.0], dim=-1)
+        return torch.tanh(feats @ self.embed) @ self.out
+
+    def forward(self, X, S, mask, chain_M, residue_idx, chain_encoding_all, randn):
+        return torch.log_softmax(self._logits(X, mask), dim=-1)
+
+    def sample(self, X, randn, S_true, chain_mask, chain_encoding_all, residue_idx,
+               mask=None, temperature=1.0, omit_AAs_np=None, **kwargs):
+        logits = self._logits(X, mask) / temperature
+        logits = logits - 1e8 * torch.as_tensor(omit_AAs_np)
+        probs = torch.softmax(logits, dim=-1)
+        S = torch.multinomial(probs.view(-1, 21), 1).view(S_true.shape)
+        return {"S": S}
+
+
+def _write_backbone_pdb(path, chains):
+    """chains: list of (chain_id, residue names); an ideal-ish extended backbone.
+    A residue name ending in '-O' is written without its O atom, MSE is written as
+    HETATM (as in PDB files) and None leaves its residue number out."""
+    lines = []
+    serial = 1
+    x = 0.0
+    for chain_id, resnames in chains:
+        for r, name in enumerate(resnames, start=1):
+            if name is None:
+                continue
+            record = "HETATM" if name == "MSE" else "ATOM  "
+            drop_o = name.endswith("-O")
+            name = name[:3]
+            atoms = [("N", x, 0.0, 0.0), ("CA", x + 1.46, 0.0, 0.0),
+                     ("C", x + 2.0, 1.4, 0.0), ("O", x + 1.3, 2.4, 0.0)]
+            for atom, ax, ay, az in atoms:
+                if drop_o and atom == "O":
+                    continue
+                lines.append(
+                    f"{record}{serial:>5d}  {atom:<3s} {name} {chain_id}{r:>4d}    "
+                    f"{ax:8.3f}{ay:8.3f}{az:8.3f}  1.00  0.00           {atom[0]}"
+                )
+                serial += 1
+            x += 3.8
+        x += 20.0
+    with open(path, "w") as fh:
+        fh.write("\n".join(lines) + "\nEND\n")
+
+
+def test_featurize_two_chains_and_missing_atom():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "ab.pdb")
+        _write_backbone_pdb(path, [("A", ["MET", "ALA-O", "GLY"]), ("B", ["TRP", "MSE"])])
+        item = featurize(path)
+        assert item["X"].shape == (5, 4, 3)
+        assert item["sequence"] == "MAGWM"
+        assert item["S"].tolist() == [ALPHABET.index(a) for a in "MAGWM"]
+        assert item["chain_encoding"].tolist() == [1, 1, 1, 2, 2]
+        assert item["residue_idx"].tolist() == [0, 1, 2, 103, 104]
+        assert np.isnan(item["X"][1, 3]).all() and np.isfinite(item["X"][1, :3]).all()
+
+        only_b = featurize(path, ["B"])
+        assert only_b["sequence"] == "WM" and only_b["chain_encoding"].tolist() == [1, 1]
+
+
+def test_featurize_chain_order_and_numbering_gap():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "ba.pdb")
+        # Chain B first in the file; chain A skips residue number 2.
+        _write_backbone_pdb(path, [("B", ["TRP", "LYS"]), ("A", ["MET", None, "GLY"])])
+        item = featurize(path)
+        assert item["sequence"] == "MXGWK"
+        assert item["chain_encoding"].tolist() == [1, 1, 1, 2, 2]
+        assert item["residue_idx"].tolist() == [0, 1, 2, 103, 104]
+        assert np.isnan(item["X"][1]).all() and np.isfinite(item["X"][[0, 2, 3, 4]]).all()
+
+        # An explicit chain list sets the order, as parse_PDB's input_chain_list does.
+        assert featurize(path, ["B", "A"])["sequence"] == "WKMXG"
+
+
+def test_length_buckets():
+    lengths = [50, 10, 300, 12, 49, 11]
+    batches = length_buckets(lengths, token_budget=120)
+    assert sorted(i for b in batches for i in b) == list(range(6))
+    flat = [lengths[i] for b in batches for i in b]
+    assert flat == sorted(lengths)
+    for b in batches:
+        assert len(b) == 1 or len(b) * max(lengths[i] for i in b) <= 120
+    assert length_buckets(lengths, token_budget=120, rows_per_item=8)[0] == [1]
+    assert length_buckets([], token_budget=10) == []
+
+
+def _structures(d):
+    paths = []
+    for name, residues in (("s_long", ["ILE", "LEU", "VAL", "PHE", "ALA", "GLY", "SER"]),
+                           ("s_short", ["ASP", "GLU", "LYS"]),
+                           ("s_mid", ["TYR", "ALA-O", "CYS", "HIS", "ASN"])):
+        path = os.path.join(d, name + ".pdb")
+        _write_backbone_pdb(path, [("A", residues)])
+        paths.append(path)
+    return paths
+
+
+def test_score_is_batch_invariant_and_matches_manual_nll():
+    with tempfile.TemporaryDirectory() as d:
+        items = [featurize(p) for p in _structures(d)]
+        whole = BatchedProteinMPNN(_TinyMPNN(), seed=7, token_budget=10_000).score(items)
+        single = BatchedProteinMPNN(_TinyMPNN(), seed=7, token_budget=1).score(items, num_passes=2)
+        for a, b in zip(whole, single):
+            assert math.isclose(a["proteinmpnn_nll"], b["proteinmpnn_nll"], rel_tol=1e-5)
+            assert math.isclose(a["proteinmpnn_score_designed"], a["proteinmpnn_nll"])
+
+        # By hand for the structure with a missing O (that residue is masked out).
+        item = items[2]
+        X = torch.from_numpy(np.nan_to_num(item["X"], nan=0.0))[None]
+        mask = torch.from_numpy(np.isfinite(item["X"].sum(axis=(1, 2))).astype(np.float32))[None]
+        with torch.no_grad():
+            log_probs = _TinyMPNN()(X, None, mask, None, None, None, None)[0]
+        nll = -log_probs[torch.arange(5), torch.from_numpy(item["S"])]
+        expected = float((nll * mask[0]).sum() / mask[0].sum())
+        assert math.isclose(whole[2]["proteinmpnn_nll"], expected, rel_tol=1e-5)
+
+
+def test_sample_shapes_and_omitted_x():
+    with tempfile.TemporaryDirectory() as d:
+        items = [featurize(p) for p in _structures(d)]
+        mpnn = BatchedProteinMPNN(_TinyMPNN(), seed=3, token_budget=16)
+        sampled = mpnn.sample(items, num_seqs=4, temperature=1.0)
+        assert [len(s) for s in sampled] == [4, 4, 4]
+        for item, seqs in zip(items, sampled):
+            assert all(len(seq) == len(item["S"]) and "X" not in seq for seq in seqs)
+        again = BatchedProteinMPNN(_TinyMPNN(), seed=3, token_budget=16)
+        assert again.sample(items, num_seqs=4, temperature=1.0) == sampled
+
+
+def test_score_dir_and_sample_batched_with_tiny_model():
+    with tempfile.TemporaryDirectory() as d:
+        structs = os.path.join(d, "structs")
+        os.makedirs(structs)
+        _structures(structs)
+        with open(os.path.join(structs, "empty.pdb"), "w") as fh:
+            fh.write("HETATM    1 MG    MG A 900       0.000   0.000   0.000  1.00  0.00          MG\nEND\n")
+        mpnn = BatchedProteinMPNN(_TinyMPNN(), seed=1)
+        df = score_dir(structs, engine="batched", model=mpnn)
+        assert list(df.columns) == COLUMNS
+        assert df["ID"].tolist() == ["empty", "s_long", "s_mid", "s_short"]
+        by_id = df.set_index("ID")
+        assert np.isnan(by_id.loc["empty", "proteinmpnn_nll"])
+        assert by_id.drop("empty")["proteinmpnn_nll"].gt(0).all()
+        back = pd.read_csv(structs + "_proteinmpnn_score.csv")
+        assert back["ID"].tolist() == df["ID"].tolist()
+
+        workdir = os.path.join(d, "work")
+        os.makedirs(workdir)
+        structures = {os.path.splitext(f)[0]: os.path.join(structs, f)
+                      for f in sorted(os.listdir(structs))}
+        sampled = sample_batched(structures, mpnn, num_seqs=2, sampling_temp=0.1, workdir=workdir)
+        assert sampled["empty"] is None
+        ref_path, seqs = sampled["s_mid"]
+        assert ref_path == structures["s_mid"] and len(seqs) == 2 and len(seqs[0]) == 5
+
+    assert throughput(10, 4.0) == "10 structure(s) in 4.0 s (2.50 structures/s)"
+
+
+def test_vendored_model_at_toy_size():
+    """The real ProteinMPNN class, randomly initialised with toy dimensions."""
+    utils = proteinmpnn_batch.PROTEINMPNN_DIR / "protein_mpnn_utils.py"
+    if not utils.is_file():
+        print("skip vendored-model test (vendor/ProteinMPNN not checked out)")
+        return
+    import sys
+
+    sys.path.insert(0, str(proteinmpnn_batch.PROTEINMPNN_DIR))
+    from protein_mpnn_utils import ProteinMPNN
+
+    torch.manual_seed(0)
+    model = ProteinMPNN(ca_only=False, num_letters=21, node_features=16, edge_features=16,
+                        hidden_dim=16, num_encoder_layers=1, num_decoder_layers=1,
+                        augment_eps=0.0, k_neighbors=3)
+    with tempfile.TemporaryDirectory() as d:
+        items = [featurize(p) for p in _structures(d)]
+        whole = BatchedProteinMPNN(model, seed=5, token_budget=10_000).score(items)
+        single = BatchedProteinMPNN(model, seed=5, token_budget=1).score(items)
+        for a, b in zip(whole, single):
+            assert math.isclose(a["proteinmpnn_nll"], b["proteinmpnn_nll"], rel_tol=1e-4)
+        sampled = BatchedProteinMPNN(model, seed=5).sample(items, num_seqs=2)
+        assert [len(s[0]) for s in sampled] == [len(i["S"]) for i in items]
+
+
+def main():
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -165,7 +165,7 @@ def test_score_dir_end_to_end_with_nan_on_failure(monkeypatch):
         for name in ("good.pdb", "bad.pdb", "aaa.pdb"):
             open(os.path.join(structs, name), "w").close()
 
-        df = score_dir(structs)
+        df = score_dir(structs, engine="subprocess")
 
         assert list(df.columns) == COLUMNS
         assert list(df["ID"]) == ["aaa", "bad", "good"]        # sorted
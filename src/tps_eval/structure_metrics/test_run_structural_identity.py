@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+"""Self-contained tests for run_structural_identity.py (top-k + preset recall report).
+
+Run from the repo root:
+    python -m pytest src/tps_eval/structure_metrics/test_run_structural_identity.py -q
+
+foldseek is never executed: subprocess.Popen is replaced by a fake that plays the
+createdb / search / convertalis steps and answers with one hit table for the
+exhaustive preset (``--exhaustive-search`` in the last search) and another for the
+cheaper presets, so the recall report has something to find.
+"""
+
+import contextlib
+import inspect
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+import tps_eval.foldseek.databases as databases
+from tps_eval.structure_metrics import run_structural_identity
+from tps_eval.structure_metrics.run_structural_identity import topk_recall
+
+
+def _topk(rows):
+    return pd.DataFrame(
+        [(q, r, n, 1.0 - 0.1 * r) for q, ranked in rows.items() for r, n in enumerate(ranked, start=1)],
+        columns=["query_id", "rank", "neighbour_id", "score"],
+    )
+
+
+def test_topk_recall():
+    exact = _topk({"d1.pdb": ["a", "b", "c"], "d2.pdb": ["a", "b"], "d3.pdb": ["c"]})
+    approx = _topk({"d1.pdb": ["a", "b", "c"], "d2.pdb": ["b", "x"]})  # d3 lost entirely
+    report = topk_recall(exact, approx)
+    assert report["n_queries"] == 3
+    assert report["top1_recall"] == 1 / 3
+    assert abs(report["topk_recall"] - (1.0 + 0.5 + 0.0) / 3) < 1e-12
+    assert report["topk_identical"] == 1 / 3
+    assert topk_recall(exact, exact)["topk_identical"] == 1.0
+
+
+def _hit(query, target, tm):
+    return "\t".join(str(v) for v in [
+        query, target, 50.0, 100, 10, 1, 1, 100, 1, 100, 1e-20, 200.0, tm, tm, tm, tm,
+    ])
+
+
+_EXHAUSTIVE = [_hit("d1.pdb", "ref_a.pdb", 0.9), _hit("d1.pdb", "ref_b.pdb", 0.8),
+               _hit("d2.pdb", "ref_a.pdb", 0.7), _hit("d2.pdb", "ref_c.pdb", 0.6)]
+_FAST = [_hit("d1.pdb", "ref_a.pdb", 0.9), _hit("d1.pdb", "ref_b.pdb", 0.8),
+         _hit("d2.pdb", "ref_a.pdb", 0.7)]  # the prefilter missed d2 -> ref_c
+
+
+class _FakePopen:
+    last_search = []
+
+    def __init__(self, cmd, **kwargs):
+        if cmd[1] == "createdb":
+            open(cmd[3], "w").close()
+        elif cmd[1] == "search":
+            _FakePopen.last_search = list(cmd)
+        elif cmd[1] == "convertalis":
+            hits = _EXHAUSTIVE if "--exhaustive-search" in _FakePopen.last_search else _FAST
+            with open(cmd[5], "w") as fh:
+                fh.write("\n".join(hits) + "\n")
+        self.stdout = io.StringIO("")
+
+    def wait(self):
+        return 0
+
+
+def test_fast_preset_recall_report(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        structs = os.path.join(d, "designs")
+        known = os.path.join(d, "known")
+        for folder, names in ((structs, ("d1", "d2")), (known, ("ref_a", "ref_b", "ref_c"))):
+            os.makedirs(folder)
+            for name in names:
+                with open(os.path.join(folder, f"{name}.pdb"), "w") as fh:
+                    fh.write(f"ATOM {name}\n")
+        monkeypatch.setattr(databases.subprocess, "Popen", _FakePopen)
+        monkeypatch.setattr(sys, "argv", [
+            "run_structural_identity", structs, known, "--top_k", "2",
+            "--preset", "fast", "--recall_sample", "10", "--db_cache", os.path.join(d, "cache"),
+        ])
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            run_structural_identity.main()
+
+        topk = pd.read_csv(f"{structs}_structural_identity_topk.csv")
+        assert topk[topk["query_id"] == "d2.pdb"]["neighbour_id"].tolist() == ["ref_a"]
+        report = [line for line in out.getvalue().splitlines() if line.startswith("Top-2 recall")]
+        assert report == [
+            "Top-2 recall of preset fast vs exhaustive on 2 sampled queries: "
+            "top-1 1.000, top-k 0.750, identical top-k 0.500"
+        ], report
+        scores = pd.read_csv(f"{structs}_structural_identity.csv").set_index("ID")
+        assert scores.loc["d1.pdb", "structural_tmscore_to_known_hit"] == "ref_a.pdb"
+
+
+def main():
+    class _MP:
+        def __init__(self):
+            self._undo = []
+
+        def setattr(self, obj, name, value):
+            self._undo.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+        def undo(self):
+            for obj, name, old in reversed(self._undo):
+                setattr(obj, name, old)
+            self._undo = []
+
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        if "monkeypatch" in inspect.signature(t).parameters:
+            mp = _MP()
+            try:
+                t(mp)
+            finally:
+                mp.undo()
+        else:
+            t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,9 @@ checked against closed-form synthetic PDBs:
   * a symmetric 4-atom set scaled x2 -> optimal rotation is identity, RMSD == 1.0 exactly,
   * residue-count mismatch -> aligns the leading min(len) atoms,
 and the orchestration (n_samples counting, min/mean, NaN-on-all-failure), collection,
-and default CSV naming.
+and default CSV naming. The numpy Kabsch is also checked on stacks and mirror images,
+and refold_designs' batched rounds + early exit (pass / fail / off) with a fake
+batch folder, including that the result does not depend on the round batching.
 
 self_consistency_dir itself is NOT run end-to-end (it imports torch-backed esmfold at
 call time). That single path is NEEDS-AURUM; everything it composes is covered here.
@@ -24,6 +26,7 @@ call time). That single path is NEEDS-AURUM; everything it composes is covered h
 
 import os
 import tempfile
+from collections import OrderedDict
 
 import numpy as np
 import pandas as pd
@@ -32,11 +35,16 @@ import tps_eval.structure_metrics.self_consistency as self_consistency
 from tps_eval.structure_metrics.self_consistency import (
     COLUMNS,
     _ca_atoms,
+    _ca_coords_from_pdb,
     _ca_rmsd,
     _chain_ids,
     _collect_structures,
+    _decided_at,
     _default_save_path,
     _sample_sequences,
+    kabsch_rmsd,
+    refold_designs,
+    serial_fold_batches,
     self_consistency_for_structure,
 )
 
@@ -139,6 +147,106 @@ def test_ca_rmsd_no_polymer_ca_is_nan():
         assert np.isnan(_ca_rmsd(a, b))
 
 
+def _ca_pdb_text(coords):
+    return "".join(
+        f"ATOM  {i:>5d}  CA  ALA A{i:>4d}    {x:8.3f}{y:8.3f}{z:8.3f}  1.00  0.00           C\n"
+        for i, (x, y, z) in enumerate(coords, start=1)
+    ) + "END\n"
+
+
+def test_kabsch_rmsd_stack_and_mirror():
+    rng = np.random.default_rng(1)
+    ref = rng.normal(size=(10, 3)) * 4.0
+    noisy = ref + rng.normal(size=(10, 3)) * 0.5
+    th = np.deg2rad(120.0)
+    R = np.array([[1.0, 0, 0], [0, np.cos(th), -np.sin(th)], [0, np.sin(th), np.cos(th)]])
+    stack = np.stack([ref @ R.T + 3.0, noisy, ref * np.array([1.0, 1.0, -1.0])])
+    got = kabsch_rmsd(ref, stack)
+    assert got.shape == (3,)
+    _approx(got[0], 0.0, tol=1e-9)
+    for one, mob in zip(got, stack):
+        _approx(one, float(kabsch_rmsd(ref, mob)), tol=1e-12)
+    # A mirror image is not a rotation: the reflection guard keeps its RMSD > 0.
+    assert got[2] > 0.5
+    # Noise RMSD after superposition can only be below the unaligned RMSD.
+    assert 0 < got[1] < np.sqrt(((noisy - ref) ** 2).sum(axis=1).mean())
+
+
+def test_ca_coords_from_pdb_first_model_only():
+    text = _ca_pdb_text([(0, 0, 0), (1, 2, 3)])
+    two_models = "MODEL        1\n" + text.replace("END\n", "ENDMDL\n") + "MODEL        2\n" + text
+    np.testing.assert_allclose(_ca_coords_from_pdb(two_models), [[0, 0, 0], [1, 2, 3]])
+    assert _ca_coords_from_pdb("END\n").shape == (0, 3)
+
+
+def test_decided_at():
+    nan = float("nan")
+    assert _decided_at([3.0, 1.0], 8, 1, 2.0) == 2            # first pass settles k=1
+    assert _decided_at([3.0, 3.0], 8, 1, 2.0) is None         # could still pass
+    assert _decided_at([3.0, nan, 3.0], 4, 2, 2.0) == 3       # 0 passed + 1 left < 2
+    assert _decided_at([1.0, 1.5], 4, 2, 2.0) == 2
+
+
+def _designs_and_folder(d):
+    """Three designs of 4 samples: 'good' refolds perfectly, 'bad' far off, 'mixed'
+    fails its first refold, is off for the second, then perfect."""
+    ref = np.array([[0, 0, 0], [3.8, 0, 0], [3.8, 3.8, 0], [0, 3.8, 1.0], [2, 2, 4.0]])
+    designs = OrderedDict()
+    for stem in ("good", "bad", "mixed"):
+        path = os.path.join(d, stem + ".pdb")
+        _write_ca_pdb(path, ref)
+        designs[stem] = (path, [f"{stem}{j}" for j in range(4)])
+    far = ref * np.array([1.0, 3.0, -2.0])
+
+    def fold(seq):
+        stem, j = seq[:-1], int(seq[-1])
+        if stem == "good" or (stem == "mixed" and j >= 2):
+            return _ca_pdb_text(ref)
+        if stem == "mixed" and j == 0:
+            raise RuntimeError("fold failed")
+        return _ca_pdb_text(far)
+
+    return designs, fold
+
+
+def test_refold_designs_rounds_and_early_exit():
+    with tempfile.TemporaryDirectory() as d:
+        designs, fold = _designs_and_folder(d)
+        requested = []
+
+        def one_batch(sequences):
+            requested.append(len(sequences))
+            results = []
+            for seq in sequences:
+                try:
+                    results.append(fold(seq))
+                except RuntimeError as exc:
+                    results.append(exc)
+            return [(list(range(len(sequences)))[::-1], results[::-1])]  # any batch order
+
+        full = refold_designs(designs, one_batch)
+        assert requested == [12]
+        assert [full[s]["n_samples_evaluated"] for s in designs] == [4, 4, 4]
+        assert full["mixed"]["n_samples"] == 3
+        _approx(full["good"]["sc_rmsd_mean"], 0.0, tol=1e-3)
+
+        requested.clear()
+        k1 = refold_designs(designs, one_batch, early_stop_k=1)
+        assert k1["good"]["n_samples_evaluated"] == 1 and k1["good"]["n_samples"] == 1
+        assert k1["mixed"]["n_samples_evaluated"] == 3 and k1["mixed"]["n_samples"] == 2
+        assert k1["bad"]["n_samples_evaluated"] == 4          # never passes: all samples
+        assert requested == [3, 2, 2, 1]
+
+        k2 = refold_designs(designs, one_batch, early_stop_k=2)
+        assert k2["good"]["n_samples_evaluated"] == 2
+        assert k2["bad"]["n_samples_evaluated"] == 3          # 0 passed + 1 left < 2
+        assert k2["mixed"]["n_samples_evaluated"] == 4
+        # Same verdict cut whether rounds are batched or folded one at a time.
+        serial = refold_designs(designs, serial_fold_batches(fold), early_stop_k=2)
+        assert serial == k2
+        assert list(k2["good"]) == COLUMNS[1:]
+
+
 def test_collect_structures_flat_and_af3():
     with tempfile.TemporaryDirectory() as d:
         for name in ("a.pdb", "a.cif", "b.cif"):
@@ -232,6 +340,7 @@ def test_self_consistency_for_structure_fake_fold(monkeypatch):
     _approx(res["sc_rmsd_min"], 0.0, tol=1e-3)
     _approx(res["sc_rmsd_mean"], 0.0, tol=1e-3)
     assert res["n_samples"] == 2      # S3 raised -> not counted
+    assert res["n_samples_evaluated"] == 3
 
 
 def test_self_consistency_for_structure_no_chains_nan():
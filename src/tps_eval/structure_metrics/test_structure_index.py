@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+"""Self-contained tests for structure_index.py (the shared parsed-structure index).
+
+Run from the repo root:
+    python -m pytest src/tps_eval/structure_metrics/test_structure_index.py -q
+
+Tiny PDB/mmCIF files in a temp dir: the columnar parse must reproduce Biopython's
+first-model view (chains, HETATMs, missing atoms, altlocs), the tools must get the
+same numbers from the index as from a fresh parse, stale entries must fall back to
+parsing, and a rebuild must only re-parse changed files.
+"""
+
+import inspect
+import os
+import tempfile
+import time
+
+import numpy as np
+from Bio.PDB import MMCIFIO, PDBParser
+
+from tps_eval.structure_metrics import structure_index
+from tps_eval.structure_metrics.active_site_geometry import structure_sequence_residues_atoms
+from tps_eval.structure_metrics.plddt import residue_plddts
+from tps_eval.structure_metrics.radius_of_gyration import ca_coordinates
+from tps_eval.structure_metrics.structure_index import (
+    build_structure_index,
+    default_index_dir,
+    load_structure,
+    parse_structure,
+)
+
+
+def _atom_line(serial, name, resname, chain, resseq, xyz, *, record="ATOM",
+               element=None, bfac=80.0, altloc=" ", occ=1.0):
+    x, y, z = xyz
+    if element is None:
+        element = name[0]
+    atom_field = name[:4] if len(name) >= 4 else " " + name.ljust(3)
+    return (
+        f"{record:<6}{serial:>5} {atom_field}{altloc:1}{resname:>3} {chain}{resseq:>4}"
+        f"{'':4}{x:>8.3f}{y:>8.3f}{z:>8.3f}{occ:>6.2f}{bfac:>6.2f}{'':10}{element:>2}\n"
+    )
+
+
+def _write_pdb(path, *, shift=0.0):
+    """Chain A: ASP (N, CA, OD1 with altlocs), GLY without CA; chain B: PHE; an MG
+    ion and a water; a second MODEL that must be ignored."""
+    lines = [
+        _atom_line(1, "N", "ASP", "A", 1, (0.0 + shift, 0.0, 0.0), bfac=91.25),
+        _atom_line(2, "CA", "ASP", "A", 1, (1.5 + shift, 0.0, 0.0), bfac=92.5),
+        _atom_line(3, "OD1", "ASP", "A", 1, (2.0, 1.0, 0.0), altloc="A", occ=0.4, bfac=50.0),
+        _atom_line(4, "OD1", "ASP", "A", 1, (2.0, 1.5, 0.0), altloc="B", occ=0.6, bfac=60.0),
+        _atom_line(5, "N", "GLY", "A", 2, (3.8, 0.0, 0.0), bfac=70.0),
+        _atom_line(6, "CA", "PHE", "B", 1, (7.6, 2.0, 0.0), bfac=65.13),
+        _atom_line(7, "CB", "PHE", "B", 1, (8.1, 3.0, 0.5), bfac=64.0),
+        _atom_line(8, "MG", " MG", "C", 1, (5.0, 5.0, 5.0), record="HETATM", element="MG"),
+        _atom_line(9, "O", "HOH", "W", 1, (9.0, 9.0, 9.0), record="HETATM", element="O"),
+    ]
+    with open(path, "w") as fh:
+        fh.write("MODEL        1\n")
+        fh.writelines(lines)
+        fh.write("ENDMDL\nMODEL        2\n")
+        fh.write(_atom_line(1, "CA", "ALA", "A", 1, (99.0, 0.0, 0.0)))
+        fh.write("ENDMDL\nEND\n")
+
+
+def _biopython_atoms(path):
+    model = next(iter(PDBParser(QUIET=True).get_structure("s", path)))
+    return [
+        (chain.id, residue.id, residue.get_resname(), atom.get_name(), atom.element,
+         tuple(atom.get_coord()), atom.get_bfactor())
+        for chain in model for residue in chain for atom in residue
+    ]
+
+
+def _columnar_atoms(parsed):
+    return [
+        (atom_chain, residue.id, residue.get_resname(), atom.get_name(), atom.element,
+         tuple(atom.get_coord()), atom.get_bfactor())
+        for residue, atom_chain in zip(parsed.residues(polymer=None), parsed.chain_ids)
+        for atom in residue
+    ]
+
+
+def test_parse_matches_biopython_first_model():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "s.pdb")
+        _write_pdb(path)
+        parsed = parse_structure(path)
+        assert _columnar_atoms(parsed) == _biopython_atoms(path)
+        assert parsed.polymer_sequence() == "DGF"
+        assert parsed.atom_index("CA").tolist() == [1, -1, 4, -1, -1]
+        residues = parsed.residues()
+        assert [r.get_resname() for r in residues] == ["ASP", "GLY", "PHE"]
+        assert "CA" not in residues[1] and residues[0]["OD1"].get_bfactor() == 60.0
+        het = parsed.residues(polymer=False)
+        assert [r.id[0] for r in het] == ["H_MG", "W"]
+        assert parsed.polymer_atom_coords().shape == (6, 3)
+
+
+def test_tools_read_the_index_and_fall_back_when_stale(monkeypatch):
+    with tempfile.TemporaryDirectory() as d:
+        structs = os.path.join(d, "structs")
+        os.makedirs(structs)
+        paths = [os.path.join(structs, f"d{i}.pdb") for i in range(2)]
+        for i, p in enumerate(paths):
+            _write_pdb(p, shift=float(i))
+        expected = [
+            (residue_plddts(p), ca_coordinates(p), structure_sequence_residues_atoms(p))
+            for p in paths
+        ]
+        index_dir, counts = build_structure_index(structs)
+        assert index_dir == default_index_dir(structs) and counts["parsed"] == 2
+
+        parsed = []
+        real_parse = structure_index.parse_structure
+        monkeypatch.setattr(
+            structure_index, "parse_structure", lambda p: parsed.append(p) or real_parse(p)
+        )
+        for p, (plddts, ca, (seq, residues, coords)) in zip(paths, expected):
+            assert residue_plddts(p) == plddts
+            np.testing.assert_array_equal(ca_coordinates(p), ca)
+            got_seq, got_residues, got_coords = structure_sequence_residues_atoms(p)
+            assert got_seq == seq and len(got_residues) == len(residues)
+            np.testing.assert_array_equal(got_coords, coords)
+        assert parsed == []  # every read came from the index
+
+        time.sleep(0.01)
+        _write_pdb(paths[1], shift=10.0)  # same size, new mtime -> stale entry
+        assert load_structure(paths[1]).coords[0, 0] == np.float32(10.0)
+        assert parsed == [paths[1]]
+        _, counts = build_structure_index(structs)
+        assert (counts["reused"], counts["parsed"]) == (1, 1)
+        assert load_structure(paths[1]).coords[0, 0] == np.float32(10.0)
+        assert parsed == [paths[1]] * 2  # the stale read + the rebuild
+
+
+def test_af3_layout_index_sits_next_to_af_output():
+    with tempfile.TemporaryDirectory() as d:
+        af_output = os.path.join(d, "af_output")
+        job = os.path.join(af_output, "design1")
+        os.makedirs(job)
+        pdb = os.path.join(d, "tmp.pdb")
+        _write_pdb(pdb)
+
+        io = MMCIFIO()
+        io.set_structure(next(iter(PDBParser(QUIET=True).get_structure("s", pdb))))
+        cif = os.path.join(job, "design1_model.cif")
+        io.save(cif)
+        index_dir, _ = build_structure_index(af_output)
+        index = next(structure_index._candidate_indexes(cif))
+        assert index.index_dir == index_dir and len(index) == 1
+        assert index.get(cif).polymer_sequence() == parse_structure(cif).polymer_sequence()
+
+
+def main():
+    class _MP:
+        def __init__(self):
+            self._undo = []
+
+        def setattr(self, obj, name, value):
+            self._undo.append((obj, name, getattr(obj, name)))
+            setattr(obj, name, value)
+
+        def undo(self):
+            for obj, name, old in reversed(self._undo):
+                setattr(obj, name, old)
+            self._undo = []
+
+    tests = [v for k, v in sorted(globals().items()) if k.startswith("test_")]
+    for t in tests:
+        if "monkeypatch" in inspect.signature(t).parameters:
+            mp = _MP()
+            try:
+                t(mp)
+            finally:
+                mp.undo()
+        else:
+            t()
+        print(f"  ok  {t.__name__}")
+    print(f"All {len(tests)} tests passed.")
+
+
+if __name__ == "__main__":
+    main()